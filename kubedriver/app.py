@@ -7,11 +7,14 @@ from ignition.service.queue import JobQueueCapability
 from ignition.service.templating import TemplatingCapability, ResourceTemplateContextCapability 
 from kubedriver.resourcedriver import (KubeResourceDriverHandler, AdditionalResourceDriverProperties, ExtendedResourceTemplateContext,
                                         NameManager)
-from kubedriver.kubeclient import OpenshiftApiControllerFactory
+from kubedriver.kubeclient import OpenshiftApiControllerFactory, KubeApiProperties
 from kubedriver.keg import KegPersistenceFactory
 from kubedriver.kegd import KegdStrategyProcessor, KegdStrategyManager, KegDeploymentProperties, KegDeploymentStrategyProperties, KegdReportPersistenceFactory
 from kubedriver.kegd.model import DeploymentStrategyFileReader, DeploymentStrategyParser
-from kubedriver.locationcontext import LocationContextFactory
+from kubedriver.locationcontext import LocationContextFactory, LocationContextProperties
+from kubedriver.wirelog import WireLogProperties
+from kubedriver.persistence import PersistenceProperties
+from kubedriver.metrics import MetricsProperties, MetricsApiService, MetricsApiCapability, metrics_api_spec
 
 default_config_dir_path = str(pathlib.Path(driverconfig.__file__).parent.resolve())
 default_config_path = os.path.join(default_config_dir_path, 'default_config.yml')
@@ -26,15 +29,23 @@ def create_app():
 
     app_builder.add_property_group(AdditionalResourceDriverProperties())
     app_builder.add_property_group(KegDeploymentProperties())
+    app_builder.add_property_group(KubeApiProperties())
+    app_builder.add_property_group(LocationContextProperties())
+    app_builder.add_property_group(WireLogProperties())
+    app_builder.add_property_group(MetricsProperties())
+    app_builder.add_property_group(PersistenceProperties())
 
     app_builder.add_service(NameManager)
-    app_builder.add_service(KegPersistenceFactory)
-    app_builder.add_service(KegdReportPersistenceFactory)
-    app_builder.add_service(OpenshiftApiControllerFactory)
+    app_builder.add_service(KegPersistenceFactory, persistence_properties=PersistenceProperties)
+    app_builder.add_service(KegdReportPersistenceFactory, persistence_properties=PersistenceProperties)
+    app_builder.add_service(OpenshiftApiControllerFactory, kube_api_properties=KubeApiProperties)
     app_builder.add_service(LocationContextFactory, 
             api_ctl_factory=OpenshiftApiControllerFactory,
             kegd_persister_factory=KegdReportPersistenceFactory, 
-            keg_persister_factory=KegPersistenceFactory
+            keg_persister_factory=KegPersistenceFactory,
+            kube_api_properties=KubeApiProperties,
+            location_context_properties=LocationContextProperties,
+            wire_log_properties=WireLogProperties
     )
     app_builder.add_service(ExtendedResourceTemplateContext, 
             name_manager=NameManager
@@ -48,7 +59,8 @@ def create_app():
     app_builder.add_service(KegdStrategyProcessor, 
             context_factory=LocationContextFactory, 
             templating=TemplatingCapability, 
-            job_queue=JobQueueCapability
+            job_queue=JobQueueCapability,
+            kegd_properties=KegDeploymentProperties
     )
     app_builder.add_service(KegdStrategyManager, 
             context_factory=LocationContextFactory, 
@@ -63,6 +75,8 @@ def create_app():
             render_context_service=ResourceTemplateContextCapability, 
             name_manager=NameManager
     )
+    app_builder.add_service(MetricsApiService, metrics_properties=MetricsProperties)
+    app_builder.add_api(metrics_api_spec, MetricsApiCapability)
 
     return app_builder.configure()
 
@@ -11,11 +11,13 @@ from .exceptions import HelmCommandNotFoundError
 from .tls import HelmTls
 from kubedriver.kubeobjects import ObjectConfigurationDocument
 from kubedriver.helmobjects import HelmReleaseDetails
-from ignition.service.logging import logging_context
-from subprocess import CompletedProcess
+from kubedriver.wirelog import WireLogger
+from kubedriver.metrics import default_metrics_registry
 
 logger = logging.getLogger(__name__)
 
+HELM_COMMAND_SECONDS = default_metrics_registry.histogram('kubedriver_helm_command_duration_seconds', 'Duration of Helm commands', label_names=['command'])
+
 REVISION_PREFIX = 'REVISION:'
 RELEASED_PREFIX = 'RELEASED:'
 CHART_PREFIX = 'CHART:'
@@ -33,8 +35,9 @@ NOTES_PREFIX = 'NOTES:'
 
 class HelmClient:
     
-    def __init__(self, kube_config, helm_version, tls=None):
+    def __init__(self, kube_config, helm_version, tls=None, wire_logger=None):
         self.tmp_dir = tempfile.mkdtemp()
+        self.wire_logger = wire_logger if wire_logger is not None else WireLogger(logger)
         self.tls = tls if tls is not None else HelmTls(enabled=False)
         self.__configure_helm(kube_config)
         self.helm = f'helm{helm_version}'
@@ -124,7 +127,8 @@ class HelmClient:
             external_request_id = str(uuid.uuid4())
             self._generate_additional_logs(cmd_string, 'sent', external_request_id, "text/plain",
                                         'request', 'cmd', "", driver_request_id)
-            process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            with HELM_COMMAND_SECONDS.time(command='install'):
+                process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
             self._generate_additional_logs(process_result, 'received', external_request_id, "text/plain",
                                        'response', 'cmd', {'exit_code': process_result.returncode}, driver_request_id)
         except Exception as e:
@@ -180,7 +184,8 @@ class HelmClient:
             external_request_id = str(uuid.uuid4())
             self._generate_additional_logs(cmd_string, 'sent', external_request_id, "text/plain",
                                         'request', 'cmd', "", driver_request_id)
-            process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            with HELM_COMMAND_SECONDS.time(command='upgrade'):
+                process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
             self._generate_additional_logs(process_result, 'received', external_request_id, "text/plain",
                                        'response', 'cmd', {'exit_code': process_result.returncode}, driver_request_id)
         except Exception as e:
@@ -215,7 +220,8 @@ class HelmClient:
             external_request_id = str(uuid.uuid4())
             self._generate_additional_logs(cmd_string, 'sent', external_request_id, "text/plain",
                                         'request', 'cmd', "", driver_request_id)
-            process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            with HELM_COMMAND_SECONDS.time(command='get'):
+                process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             self._generate_additional_logs(process_result, 'received', external_request_id, "text/plain",
                                        'response', 'cmd', {'exit_code': process_result.returncode}, driver_request_id)
         except Exception as e:
@@ -266,7 +272,8 @@ class HelmClient:
             external_request_id = str(uuid.uuid4())
             self._generate_additional_logs(cmd_string, 'sent', external_request_id, "text/plain",
                                         'request', 'cmd', "", driver_request_id)
-            process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            with HELM_COMMAND_SECONDS.time(command='delete'):
+                process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
             self._generate_additional_logs(process_result, 'received', external_request_id, "text/plain",
                                        'response', 'cmd', {'exit_code': process_result.returncode}, driver_request_id)
         except Exception as e:
@@ -299,7 +306,8 @@ class HelmClient:
             external_request_id = str(uuid.uuid4())
             self._generate_additional_logs(cmd_string, 'sent', external_request_id, "text/plain",
                                         'request', 'cmd', "", driver_request_id)
-            process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            with HELM_COMMAND_SECONDS.time(command='purge'):
+                process_result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
             self._generate_additional_logs(process_result, 'received', external_request_id, "text/plain",
                                        'response', 'cmd', {'exit_code': process_result.returncode}, driver_request_id)
         except Exception as e:
@@ -398,34 +406,4 @@ class HelmClient:
 
     def _generate_additional_logs(self, body, message_direction, external_request_id, content_type,
                                   message_type, protocol, protocol_metadata, driver_request_id):
-        try:
-            logging_context_dict = {'message_direction' : message_direction, 'tracectx.externalrequestid' : external_request_id, 'content_type' : content_type,
-                                    'message_type' : message_type, 'protocol' : protocol, 'protocol_metadata' : str(protocol_metadata).replace("'", '\"'), 'tracectx.driverrequestid' : driver_request_id}
-            logging_context.set_from_dict(logging_context_dict)
-            filteredBody = ""
-            # Extracting stdout a& stderr from CompletedProcess and converting it to text/plain format
-            if isinstance(body, CompletedProcess):
-                if hasattr(body, 'stdout') and body.stdout is not None:
-                    filteredBody = "stdout=" + body.stdout.decode()
-                if hasattr(body, 'stderr') and body.stderr is not None and filteredBody:
-                    filteredBody = filteredBody + ",stderr=" + body.stderr.decode()
-                if hasattr(body, 'stderr') and body.stderr is not None and not filteredBody:
-                    filteredBody = "stderr=" + body.stderr.decode()
-                logger.info(filteredBody)
-            else:
-                logger.info(body)                
-        finally:
-            if('message_direction' in logging_context.data):
-                logging_context.data.pop("message_direction")
-            if('tracectx.externalrequestid' in logging_context.data):
-                logging_context.data.pop("tracectx.externalrequestid")
-            if('content_type' in logging_context.data):
-                logging_context.data.pop("content_type")
-            if('message_type' in logging_context.data):
-                logging_context.data.pop("message_type")
-            if('protocol' in logging_context.data):
-                logging_context.data.pop("protocol")
-            if('protocol_metadata' in logging_context.data):
-                logging_context.data.pop("protocol_metadata")
-            if('tracectx.driverrequestid' in logging_context.data):
-                logging_context.data.pop("tracectx.driverrequestid")
\ No newline at end of file
+        self.wire_logger.log(body, message_direction, external_request_id, content_type, message_type, protocol, protocol_metadata, driver_request_id)
@@ -1,2 +1,3 @@
 from .persistence import KegPersistenceFactory
-from .composition_loader import CompositionLoader
\ No newline at end of file
+from .sharded_persistence import ShardedKegPersister, ShardCache, KegIndex, KegIndexRecordBuilder, KegLayouts
+from .composition_loader import CompositionLoader, BulkLoadSettings
@@ -1,10 +1,26 @@
+import logging
+import collections
+from kubernetes.client.exceptions import ApiException
 from kubedriver.kubeobjects import ObjectConfiguration
+from kubedriver.kubeclient import SyncApiBridge
+
+logger = logging.getLogger(__name__)
+
+class BulkLoadSettings:
+
+    def __init__(self, label_selector, min_objects=2, page_size=250):
+        self.label_selector = label_selector
+        self.min_objects = min_objects
+        self.page_size = page_size
 
 class CompositionLoader:
 
-    def __init__(self, api_ctl, helm_client):
+    def __init__(self, api_ctl, helm_client, async_api_ctl=None, bulk_load_settings=None, informers=None):
         self.api_ctl = api_ctl
         self.helm_client = helm_client
+        self.batch_api = SyncApiBridge(async_api_ctl) if async_api_ctl is not None else None
+        self.bulk_load_settings = bulk_load_settings
+        self.informers = informers
 
     def load_composition(self, keg_status, include_helm_objects=True, driver_request_id=None):
         composition = {}
@@ -16,13 +32,84 @@ class CompositionLoader:
         result = []
         if keg_status.composition != None:
             if keg_status.composition.objects != None:
-                for object_status in keg_status.composition.objects:
-                    found, obj = self.api_ctl.safe_read_object(object_status.group, object_status.kind, object_status.name, namespace=object_status.namespace, driver_request_id=driver_request_id)
-                    if found:
-                        as_dict = obj.to_dict()
-                        result.append(as_dict)
+                references = [(object_status.group, object_status.kind, object_status.name, object_status.namespace) for object_status in keg_status.composition.objects]
+                loaded = self.__load_cached_objects(references)
+                remaining = [index for index in range(len(references)) if loaded[index] is None]
+                if len(remaining) > 0:
+                    remaining_references = [references[index] for index in remaining]
+                    if self.bulk_load_settings is not None:
+                        remaining_loaded = self.__bulk_load_objects(remaining_references, driver_request_id=driver_request_id)
+                    else:
+                        remaining_loaded = self.__load_objects(remaining_references, driver_request_id=driver_request_id)
+                    for index, obj in zip(remaining, remaining_loaded):
+                        loaded[index] = obj
+                result = [obj for obj in loaded if obj is not None]
         return result
 
+    def __load_cached_objects(self, references):
+        loaded = [None for reference in references]
+        if self.informers is None:
+            return loaded
+        for index, (api_version, kind, name, namespace) in enumerate(references):
+            self.informers.watch(api_version, kind)
+            synced, obj = self.informers.get(api_version, kind, namespace, name)
+            # Objects missing from the cache may not have been seen by the watch yet, so they are read from the API
+            if synced and obj is not None:
+                loaded[index] = obj
+        return loaded
+
+    def __load_objects(self, references, driver_request_id=None):
+        return [obj.to_dict() if found else None for found, obj in self.__read_objects(references, driver_request_id=driver_request_id)]
+
+    def __bulk_load_objects(self, references, driver_request_id=None):
+        # One LIST (by keg label) per apiVersion/kind/namespace, then a GET for anything the LIST didn't return
+        groups = collections.OrderedDict()
+        for index, (api_version, kind, name, namespace) in enumerate(references):
+            groups.setdefault((api_version, kind, namespace), []).append(index)
+        loaded = [None for reference in references]
+        listed = [False for reference in references]
+        for (api_version, kind, namespace), indices in groups.items():
+            if len(indices) < self.bulk_load_settings.min_objects:
+                continue
+            try:
+                objects_by_name = self.__list_objects(api_version, kind, namespace, driver_request_id=driver_request_id)
+            except ApiException as e:
+                logger.debug(f'Failed to list {kind} objects with label selector {self.bulk_load_settings.label_selector}, will read each object instead: {e.status} {e.reason}')
+                continue
+            for index in indices:
+                name = references[index][2]
+                if name in objects_by_name:
+                    loaded[index] = objects_by_name[name]
+                    listed[index] = True
+        remaining = [index for index in range(len(references)) if not listed[index]]
+        if len(remaining) > 0:
+            remaining_loaded = self.__load_objects([references[index] for index in remaining], driver_request_id=driver_request_id)
+            for index, obj in zip(remaining, remaining_loaded):
+                loaded[index] = obj
+        return loaded
+
+    def __list_objects(self, api_version, kind, namespace, driver_request_id=None):
+        objects_by_name = {}
+        continue_token = None
+        while True:
+            list_result = self.api_ctl.list_objects(api_version, kind, namespace=namespace, label_selector=self.bulk_load_settings.label_selector,
+                                                        limit=self.bulk_load_settings.page_size, continue_token=continue_token, driver_request_id=driver_request_id)
+            for item in list_result.get('items') or []:
+                objects_by_name[item.get('metadata', {}).get('name')] = item
+            continue_token = (list_result.get('metadata') or {}).get('continue')
+            if not continue_token:
+                return objects_by_name
+
+    def __read_objects(self, references, driver_request_id=None):
+        if self.batch_api is not None and len(references) > 1:
+            return self.batch_api.safe_read_objects(references, driver_request_id=driver_request_id)
+        return [self.api_ctl.safe_read_object(api_version, kind, name, namespace=namespace, driver_request_id=driver_request_id) for api_version, kind, name, namespace in references]
+
+    def __is_namespaced(self, api_version_kinds):
+        if self.batch_api is not None and len(api_version_kinds) > 1:
+            return self.batch_api.is_objects_namespaced(api_version_kinds)
+        return [self.api_ctl.is_object_namespaced(api_version, kind) for api_version, kind in api_version_kinds]
+
     def load_composition_helm_releases(self, keg_status, include_objects=True, driver_request_id=None):
         result = []
         if keg_status.composition != None:
@@ -40,16 +127,19 @@ class CompositionLoader:
     def load_objects_in_helm_release(self, helm_release_details, driver_request_id=None):
         result = []
         if helm_release_details.manifest != None:
-            for manifest_entry in helm_release_details.manifest:
-                object_config = ObjectConfiguration(manifest_entry)
-                if self.api_ctl.is_object_namespaced(object_config.api_version, object_config.kind):
+            object_configs = [ObjectConfiguration(manifest_entry) for manifest_entry in helm_release_details.manifest]
+            namespaced_flags = self.__is_namespaced([(object_config.api_version, object_config.kind) for object_config in object_configs])
+            references = []
+            for object_config, is_namespaced in zip(object_configs, namespaced_flags):
+                if is_namespaced:
                     if object_config.namespace != None:
                         namespace = object_config.namespace
                     else:
                         namespace = helm_release_details.namespace
                 else:
                     namespace = None
-                found, obj = self.api_ctl.safe_read_object(object_config.api_version, object_config.kind, object_config.name, namespace=namespace, driver_request_id=driver_request_id)
+                references.append((object_config.api_version, object_config.kind, object_config.name, namespace))
+            for found, obj in self.__read_objects(references, driver_request_id=driver_request_id):
                 if found:
                     as_dict = obj.to_dict()
                     result.append(as_dict)
@@ -1,8 +1,9 @@
 from ignition.service.framework import Service, Capability
-from kubedriver.persistence import ConfigMapPersister, CmRecordBuilder
+from kubedriver.persistence import ConfigMapPersister, CmRecordBuilder, CustomResourcePersister, PersistenceBackends, DEFAULT_CR_API_VERSION
 from kubedriver.kubeclient import KubeApiController
 from kubedriver.keg.model import (V1alpha1HelmReleaseStatus, V1alpha1Keg, V1alpha1KegCompositionStatus,
                                     V1alpha1KegStatus, V1alpha1ObjectStatus)
+from .sharded_persistence import ShardedKegPersister, KegIndexRecordBuilder, ShardCache, KegLayouts, DEFAULT_SHARD_SIZE, DEFAULT_SHARD_CACHE_CAPACITY
 
 data_types = {}
 data_types['V1alpha1HelmReleaseStatus'] = V1alpha1HelmReleaseStatus
@@ -13,12 +14,51 @@ data_types['V1alpha1ObjectStatus'] = V1alpha1ObjectStatus
 
 class KegPersistenceFactory(Service, Capability):
 
+    def __init__(self, persistence_properties=None):
+        self.persistence_properties = persistence_properties
+        shard_cache_capacity = persistence_properties.keg_shard_cache_capacity if persistence_properties is not None else DEFAULT_SHARD_CACHE_CAPACITY
+        self.shard_cache = ShardCache(capacity=shard_cache_capacity)
 
     def build(self, kube_location, api_ctl):
-        record_builder = self.__build_record_builder(kube_location)
+        record_builder = self.__build_record_builder(kube_location, V1alpha1KegStatus)
+        if PersistenceBackends.resolve(kube_location, self.persistence_properties) == PersistenceBackends.CUSTOM_RESOURCE:
+            return CustomResourcePersister('Keg', api_ctl, kube_location.driver_namespace, record_builder,
+                                    cr_api_version=self.__get_cr_api_version(), cr_kind='Keg')
         cm_persister_args = kube_location.get_cm_persister_args()
-        return ConfigMapPersister('Keg', api_ctl, kube_location.driver_namespace, record_builder, 
+        index_persister = ConfigMapPersister('Keg', api_ctl, kube_location.driver_namespace, KegIndexRecordBuilder(record_builder),
                                     **cm_persister_args)
+        shard_record_builder = self.__build_record_builder(kube_location, V1alpha1KegCompositionStatus)
+        shard_persister = ConfigMapPersister('KegShard', api_ctl, kube_location.driver_namespace, shard_record_builder,
+                                    **cm_persister_args)
+        return ShardedKegPersister(index_persister, shard_persister, record_builder, shard_record_builder,
+                                    layout=self.__get_keg_layout(kube_location), shard_size=self.__get_keg_shard_size(kube_location),
+                                    shard_cache=self.shard_cache)
+
+    def __get_keg_layout(self, kube_location):
+        keg_layout = getattr(kube_location, 'keg_layout', None)
+        if keg_layout in KegLayouts.ALL:
+            return keg_layout
+        if self.persistence_properties is not None and self.persistence_properties.keg_layout is not None:
+            return self.persistence_properties.keg_layout
+        return KegLayouts.SINGLE
+
+    def __get_keg_shard_size(self, kube_location):
+        keg_shard_size = getattr(kube_location, 'keg_shard_size', None)
+        if isinstance(keg_shard_size, int):
+            return keg_shard_size
+        if self.persistence_properties is not None and self.persistence_properties.keg_shard_size is not None:
+            return self.persistence_properties.keg_shard_size
+        return DEFAULT_SHARD_SIZE
+
+    def __get_cr_api_version(self):
+        if self.persistence_properties is not None and self.persistence_properties.custom_resource_api_version is not None:
+            return self.persistence_properties.custom_resource_api_version
+        return DEFAULT_CR_API_VERSION
 
-    def __build_record_builder(self, kube_location):
-        return CmRecordBuilder(kube_location.client, V1alpha1KegStatus, data_types)
+    def __build_record_builder(self, kube_location, core_type):
+        record_builder_args = {}
+        if self.persistence_properties is not None:
+            record_builder_args['record_format'] = self.persistence_properties.record_format
+            record_builder_args['compress'] = self.persistence_properties.compress_records
+            record_builder_args['compress_min_bytes'] = self.persistence_properties.compress_min_bytes
+        return CmRecordBuilder(kube_location.client, core_type, data_types, **record_builder_args)
@@ -0,0 +1,255 @@
+import json
+import logging
+import hashlib
+import threading
+import collections
+from kubedriver.persistence import PersistenceError, RecordNotFoundError, RecordAlreadyExistsError
+
+logger = logging.getLogger(__name__)
+
+RECORD_LAYOUT_KEY = 'recordLayout'
+SHARD_OF_LABEL = 'keg.kubedriver.alm/shard-of'
+DEFAULT_SHARD_SIZE = 100
+DEFAULT_SHARD_CACHE_CAPACITY = 1000
+DEFAULT_KNOWN_INDEXES_CAPACITY = 1000
+
+class KegLayouts:
+    # The whole Keg in one record
+    SINGLE = 'single'
+    # An index record listing shard records, each holding up to shard_size entries of the composition
+    SHARDED = 'sharded'
+
+    ALL = [SINGLE, SHARDED]
+
+class KegIndex:
+
+    def __init__(self, keg_data=None, object_shards=None, helm_release_shards=None):
+        self.keg_data = keg_data if keg_data is not None else {}
+        self.object_shards = object_shards if object_shards is not None else []
+        self.helm_release_shards = helm_release_shards if helm_release_shards is not None else []
+
+    @property
+    def shards(self):
+        return self.object_shards + self.helm_release_shards
+
+    def to_dict(self):
+        return {
+            'keg': self.keg_data,
+            'objectShards': self.object_shards,
+            'helmReleaseShards': self.helm_release_shards
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return KegIndex(keg_data=data.get('keg'), object_shards=data.get('objectShards'), helm_release_shards=data.get('helmReleaseShards'))
+
+class KegIndexRecordBuilder:
+    """
+    Reads and writes the main record of a Keg in either layout: a KegIndex (sharded) or the whole Keg (single)
+    """
+
+    def __init__(self, keg_record_builder):
+        self.keg_record_builder = keg_record_builder
+
+    def to_record_fields(self, record):
+        if isinstance(record, KegIndex):
+            return {RECORD_LAYOUT_KEY: KegLayouts.SHARDED, 'record': json.dumps(record.to_dict(), separators=(',', ':'))}, None
+        return self.keg_record_builder.to_record_fields(record)
+
+    def from_record_fields(self, data, binary_data=None):
+        if data is not None and data.get(RECORD_LAYOUT_KEY) == KegLayouts.SHARDED:
+            return KegIndex.from_dict(json.loads(data.get('record')))
+        return self.keg_record_builder.from_record_fields(data, binary_data=binary_data)
+
+class ShardCache:
+    """
+    Content of shards already read or written. A shard name includes the hash of its content, so entries never go stale
+    and one cache can be shared by the persisters of all locations
+    """
+
+    def __init__(self, capacity=DEFAULT_SHARD_CACHE_CAPACITY):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._shards = collections.OrderedDict()
+
+    def get(self, shard_name):
+        with self._lock:
+            shard_data = self._shards.get(shard_name)
+            if shard_data is not None:
+                self._shards.move_to_end(shard_name)
+            return shard_data
+
+    def put(self, shard_name, shard_data):
+        with self._lock:
+            self._shards[shard_name] = shard_data
+            self._shards.move_to_end(shard_name)
+            while len(self._shards) > self.capacity:
+                self._shards.popitem(last=False)
+
+    def __len__(self):
+        return len(self._shards)
+
+class ShardedKegPersister:
+    """
+    Stores Kegs in the single or sharded layout, reading either (so the layout of a location may be changed at any time).
+
+    In the sharded layout, the objects and Helm releases of the composition are split, in order, into shards of up to
+    shard_size entries. Each shard is a record named by the hash of its content, so a shard never changes: an update
+    creates the shards that are new, replaces the index, then removes the shards no longer in the index. Only the
+    shards with changed entries (and those after an insert or removal) are written, and shards already read are not read again.
+    As with the single layout, a Keg is expected to be written by one job at a time
+    """
+
+    def __init__(self, index_persister, shard_persister, keg_record_builder, shard_record_builder, layout=KegLayouts.SHARDED, shard_size=DEFAULT_SHARD_SIZE,
+                    shard_cache=None, known_indexes_capacity=DEFAULT_KNOWN_INDEXES_CAPACITY):
+        if layout not in KegLayouts.ALL:
+            raise ValueError(f'Keg layout must be one of {KegLayouts.ALL} but was: {layout}')
+        self.index_persister = index_persister
+        self.shard_persister = shard_persister
+        self.keg_record_builder = keg_record_builder
+        self.shard_record_builder = shard_record_builder
+        self.layout = layout
+        self.shard_size = shard_size if shard_size is not None and shard_size > 0 else DEFAULT_SHARD_SIZE
+        self.shard_cache = shard_cache if shard_cache is not None else ShardCache()
+        self.known_indexes_capacity = known_indexes_capacity
+        self._lock = threading.Lock()
+        self._known_indexes = collections.OrderedDict()
+
+    def build_record_reference(self, uid, record_name):
+        return self.index_persister.build_record_reference(uid, record_name)
+
+    def get_record_uid(self, record_name, driver_request_id=None):
+        return self.index_persister.get_record_uid(record_name, driver_request_id=driver_request_id)
+
+    def create(self, record_name, record_data, labels=None, driver_request_id=None):
+        if self.layout == KegLayouts.SHARDED:
+            index, shards = self.__build_index(record_name, record_data)
+            self.__create_shards(record_name, shards, [], driver_request_id=driver_request_id)
+            self.index_persister.create(record_name, index, labels=labels, driver_request_id=driver_request_id)
+        else:
+            index = KegIndex()
+            self.index_persister.create(record_name, record_data, labels=labels, driver_request_id=driver_request_id)
+        self.__remember_shards(record_name, index.shards)
+
+    def get(self, record_name, driver_request_id=None):
+        record = self.index_persister.get(record_name, driver_request_id=driver_request_id)
+        if not isinstance(record, KegIndex):
+            self.__remember_shards(record_name, [])
+            return record
+        keg_data = dict(record.keg_data)
+        if 'composition' in keg_data:
+            keg_data['composition'] = {
+                'objects': self.__read_shard_entries(record_name, record.object_shards, 'objects', driver_request_id=driver_request_id),
+                'helmReleases': self.__read_shard_entries(record_name, record.helm_release_shards, 'helmReleases', driver_request_id=driver_request_id)
+            }
+        self.__remember_shards(record_name, record.shards)
+        return self.keg_record_builder.from_dict(keg_data)
+
+    def update(self, record_name, record_data, driver_request_id=None):
+        previous_shards = self.__get_known_shards(record_name)
+        if previous_shards is None:
+            # Also remembers the version of the index, so the update below does not read it again
+            previous_shards = self.__read_index_shards(record_name, driver_request_id=driver_request_id)
+        if self.layout == KegLayouts.SHARDED:
+            index, shards = self.__build_index(record_name, record_data)
+            self.__create_shards(record_name, shards, previous_shards, driver_request_id=driver_request_id)
+            self.index_persister.update(record_name, index, driver_request_id=driver_request_id)
+        else:
+            index = KegIndex()
+            self.index_persister.update(record_name, record_data, driver_request_id=driver_request_id)
+        self.__remember_shards(record_name, index.shards)
+        self.__remove_shards([shard_name for shard_name in previous_shards if shard_name not in index.shards], driver_request_id=driver_request_id)
+
+    def delete(self, record_name, driver_request_id=None):
+        shards = self.__get_known_shards(record_name)
+        if shards is None:
+            shards = self.__read_index_shards(record_name, driver_request_id=driver_request_id)
+        try:
+            self.index_persister.delete(record_name, driver_request_id=driver_request_id)
+        finally:
+            self.__forget_shards(record_name)
+        self.__remove_shards(shards, driver_request_id=driver_request_id)
+
+    def __build_index(self, record_name, keg_status):
+        keg_data = self.keg_record_builder.to_dict(keg_status)
+        composition_data = keg_data.get('composition')
+        if composition_data is None:
+            composition_data = {}
+        else:
+            # Kept as a marker that the Keg has a composition, the entries are in the shards
+            keg_data['composition'] = {}
+        shards = collections.OrderedDict()
+        object_shards = self.__split(record_name, composition_data.get('objects'), 'objects', shards)
+        helm_release_shards = self.__split(record_name, composition_data.get('helmReleases'), 'helmReleases', shards)
+        return KegIndex(keg_data=keg_data, object_shards=object_shards, helm_release_shards=helm_release_shards), shards
+
+    def __split(self, record_name, entries, entry_key, shards):
+        shard_names = []
+        if entries is None:
+            return shard_names
+        for start in range(0, len(entries), self.shard_size):
+            shard_data = {entry_key: entries[start:start + self.shard_size]}
+            shard_name = self.__shard_name(record_name, shard_data)
+            shards[shard_name] = shard_data
+            shard_names.append(shard_name)
+        return shard_names
+
+    def __shard_name(self, record_name, shard_data):
+        content = json.dumps(shard_data, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return f'{record_name}-shard-{digest[:20]}'
+
+    def __create_shards(self, record_name, shards, existing_shard_names, driver_request_id=None):
+        for shard_name, shard_data in shards.items():
+            if shard_name in existing_shard_names:
+                continue
+            shard = self.shard_record_builder.from_dict(shard_data)
+            try:
+                self.shard_persister.create(shard_name, shard, labels={SHARD_OF_LABEL: record_name}, driver_request_id=driver_request_id)
+            except RecordAlreadyExistsError:
+                # Same name, so same content (left by an update that did not complete)
+                logger.debug(f'Shard \'{shard_name}\' of Keg \'{record_name}\' already exists')
+            self.shard_cache.put(shard_name, shard_data)
+
+    def __read_shard_entries(self, record_name, shard_names, entry_key, driver_request_id=None):
+        entries = []
+        for shard_name in shard_names:
+            shard_data = self.shard_cache.get(shard_name)
+            if shard_data is None:
+                try:
+                    shard = self.shard_persister.get(shard_name, driver_request_id=driver_request_id)
+                except RecordNotFoundError as e:
+                    raise PersistenceError(f'Shard \'{shard_name}\' of Keg \'{record_name}\' is missing') from e
+                shard_data = self.shard_record_builder.to_dict(shard)
+                self.shard_cache.put(shard_name, shard_data)
+            entries.extend(shard_data.get(entry_key, []))
+        return entries
+
+    def __read_index_shards(self, record_name, driver_request_id=None):
+        record = self.index_persister.get(record_name, driver_request_id=driver_request_id)
+        return record.shards if isinstance(record, KegIndex) else []
+
+    def __remove_shards(self, shard_names, driver_request_id=None):
+        for shard_name in shard_names:
+            try:
+                self.shard_persister.delete(shard_name, driver_request_id=driver_request_id)
+            except RecordNotFoundError:
+                pass
+            except PersistenceError:
+                # Not referenced by the index, so only takes up space
+                logger.exception(f'Failed to remove unused Keg shard \'{shard_name}\'')
+
+    def __remember_shards(self, record_name, shard_names):
+        with self._lock:
+            self._known_indexes[record_name] = list(shard_names)
+            self._known_indexes.move_to_end(record_name)
+            while len(self._known_indexes) > self.known_indexes_capacity:
+                self._known_indexes.popitem(last=False)
+
+    def __get_known_shards(self, record_name):
+        with self._lock:
+            return self._known_indexes.get(record_name)
+
+    def __forget_shards(self, record_name):
+        with self._lock:
+            self._known_indexes.pop(record_name, None)
@@ -3,4 +3,7 @@ from .processor import KegdStrategyProcessor
 from .properties import KegDeploymentStrategyProperties, KegDeploymentProperties
 from .persistence import KegdReportPersistenceFactory
 from .delta_capture import KegDeltaCapture
-from .exceptions import MissingKegDeploymentStrategyFileError, StrategyProcessingError, MultiErrorStrategyProcessingError
\ No newline at end of file
+from .exceptions import MissingKegDeploymentStrategyFileError, StrategyProcessingError, MultiErrorStrategyProcessingError, RemovalTimeoutError
+from .task_executor import TaskGroupExecutor
+from .preflight import DeployPreflight
+from .session import StrategyJobSession
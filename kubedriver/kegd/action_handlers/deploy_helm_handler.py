@@ -45,11 +45,11 @@ class DeployHelmHandler:
             if action_type == 'Install':
                 helm_client.install(chart_path, action.name, action.namespace, values=value_file_paths, setfiles=setfiles_dict, wait=action.wait, timeout=action.timeout, driver_request_id=driver_request_id)
             else:
-                captured_objects = self.__pre_capture_objects(context.api_ctl, helm_client, helm_status, driver_request_id=driver_request_id)
+                captured_objects = self.__pre_capture_objects(context.api_ctl, helm_client, helm_status, async_api_ctl=context.async_api_ctl, driver_request_id=driver_request_id)
                 helm_client.upgrade(chart_path, action.name, action.namespace, values=value_file_paths, setfiles=setfiles_dict, reuse_values=True, wait=action.wait, timeout=action.timeout, driver_request_id=driver_request_id)
             helm_status.state = EntityStates.CREATED if action_type == 'Install' else EntityStates.UPDATED
             helm_status.error = None
-            self.__capture_deltas(delta_capture, context.api_ctl, helm_client, helm_status, captured_objects, is_upgrade=helm_status.state==EntityStates.UPDATED, driver_request_id=driver_request_id)
+            self.__capture_deltas(delta_capture, context.api_ctl, helm_client, helm_status, captured_objects, is_upgrade=helm_status.state==EntityStates.UPDATED, async_api_ctl=context.async_api_ctl, driver_request_id=driver_request_id)
         except Exception as e:
             logger.exception(f'{action_type} attempt of helm release \'{action.name}\' in group \'{keg_name}\' failed')
             error_msg = f'{e}'
@@ -141,15 +141,15 @@ class DeployHelmHandler:
             dumped_setfiles[key] = filepath
         return dumped_setfiles
 
-    def __pre_capture_objects(self, api_ctl, helm_client, helm_status, driver_request_id=None):
+    def __pre_capture_objects(self, api_ctl, helm_client, helm_status, async_api_ctl=None, driver_request_id=None):
         helm_release_details = helm_client.get(helm_status.name, helm_status.namespace, driver_request_id=driver_request_id)
-        loader = CompositionLoader(api_ctl, helm_client)
+        loader = CompositionLoader(api_ctl, helm_client, async_api_ctl=async_api_ctl)
         loaded_objects = loader.load_objects_in_helm_release(helm_release_details, driver_request_id=driver_request_id)
         return loaded_objects
 
-    def __capture_deltas(self, delta_capture, api_ctl, helm_client, helm_status, pre_captured_objects, is_upgrade, driver_request_id=None):
+    def __capture_deltas(self, delta_capture, api_ctl, helm_client, helm_status, pre_captured_objects, is_upgrade, async_api_ctl=None, driver_request_id=None):
         helm_release_details = helm_client.get(helm_status.name, helm_status.namespace, driver_request_id=driver_request_id)
-        loader = CompositionLoader(api_ctl, helm_client)
+        loader = CompositionLoader(api_ctl, helm_client, async_api_ctl=async_api_ctl)
         loaded_objects = loader.load_objects_in_helm_release(helm_release_details, driver_request_id=driver_request_id)
         objects_only = False
         if is_upgrade:
@@ -2,14 +2,20 @@ import logging
 from kubedriver.keg.model import EntityStates, V1alpha1ObjectStatus, V1alpha1KegCompositionStatus
 from kubedriver.kegd.model import Tags, Labels, LabelValues, RemoveObjectAction, RemovalTask, RemovalTaskSettings
 from kubedriver.kubeobjects import ObjectConfiguration, ObjectConfigUtils
+from kubedriver.kubeclient import ApiCall
 from openshift.dynamic.exceptions import DynamicApiError
 
 logger = logging.getLogger(__name__)
 
 class DeployObjectHandler:
 
-    def __init__(self):
+    def __init__(self, deploy_properties=None):
         self.config_utils = ObjectConfigUtils()
+        self.deploy_properties = deploy_properties
+
+    @property
+    def server_side_apply(self):
+        return self.deploy_properties is not None and self.deploy_properties.server_side_apply
 
     def decorate(self, action, parent_task_settings, script_name, keg_name, keg_status):
         obj_status = self.__find_object(action, keg_status)
@@ -35,11 +41,17 @@ class DeployObjectHandler:
         obj_status = self.__find_object(action, keg_status)
         if obj_status == None:
             obj_status = self.__do_decorate(obj_status, action, parent_task_settings, script_name, keg_name, keg_status)
-        object_config = ObjectConfiguration(action.config)
-        self.config_utils.add_label(object_config, Labels.MANAGED_BY, LabelValues.MANAGED_BY)
-        self.config_utils.add_label(object_config, Labels.KEG, keg_name)
+        object_config = self.__build_object_config(action, keg_name)
         try:
-            if obj_status.state == EntityStates.UPDATE_PENDING:
+            if self.server_side_apply:
+                # Apply creates or updates, so the recorded state may not say which it will do. The object was created by the apply
+                # if the uid it returns is not the one recorded for it (never deployed by the driver, or deleted and recreated since)
+                previous_uid = obj_status.uid
+                return_obj = api_ctl.apply_object(object_config, field_manager=self.deploy_properties.field_manager,
+                                                    force=self.deploy_properties.force_conflicts, driver_request_id=driver_request_id)
+                obj_status.uid = self.__get_uid(return_obj)
+                obj_status.state = EntityStates.CREATE_PENDING if previous_uid is None or previous_uid != obj_status.uid else EntityStates.UPDATE_PENDING
+            elif obj_status.state == EntityStates.UPDATE_PENDING:
                 return_obj = api_ctl.update_object(object_config, driver_request_id=driver_request_id)
             else:
                 return_obj = api_ctl.create_object(object_config, driver_request_id=driver_request_id)
@@ -59,6 +71,26 @@ class DeployObjectHandler:
             obj_status.error = error_msg
         return task_errors
 
+    def build_preflight_call(self, action, keg_name, keg_status, driver_request_id=None):
+        """
+        Builds a server-side dry run of the request handle() would make for this action, without changing the keg status
+        """
+        obj_status = self.__find_object(action, keg_status)
+        object_config = self.__build_object_config(action, keg_name)
+        if self.server_side_apply:
+            return ApiCall('apply_object', object_config, field_manager=self.deploy_properties.field_manager, force=self.deploy_properties.force_conflicts,
+                                dry_run=True, driver_request_id=driver_request_id)
+        elif obj_status != None and obj_status.state not in [EntityStates.CREATE_FAILED, EntityStates.CREATE_PENDING]:
+            return ApiCall('update_object', object_config, dry_run=True, driver_request_id=driver_request_id)
+        else:
+            return ApiCall('create_object', object_config, dry_run=True, driver_request_id=driver_request_id)
+
+    def __build_object_config(self, action, keg_name):
+        object_config = ObjectConfiguration(action.config)
+        self.config_utils.add_label(object_config, Labels.MANAGED_BY, LabelValues.MANAGED_BY)
+        self.config_utils.add_label(object_config, Labels.KEG, keg_name)
+        return object_config
+
     def __get_uid(self, return_obj):
         if hasattr(return_obj, 'metadata'):
             metadata = return_obj.metadata
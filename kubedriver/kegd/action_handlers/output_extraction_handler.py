@@ -1,7 +1,8 @@
 import logging
-from kubedriver.kegd.model import OutputExtractionResult
-from kubedriver.keg import CompositionLoader
+from kubedriver.kegd.model import Labels, OutputExtractionResult
+from kubedriver.keg import CompositionLoader, BulkLoadSettings
 from kubedriver.sandbox import Sandbox, SandboxConfiguration, SandboxError, ExecuteError
+from kubedriver.kegd.metrics import SCRIPT_SECONDS
 from kubedriver.kegd.scripting import KegCollection, OutputExtractionResultHolder
 
 logger = logging.getLogger(__name__)
@@ -10,18 +11,23 @@ logger = logging.getLogger(__name__)
 
 class OutputExtractionHandler:
 
+    def __init__(self, composition_properties=None):
+        self.composition_properties = composition_properties
+
     def handle(self, operation_name, keg_name, keg_status, location_context, output_extraction_task, resource_context_properties, driver_request_id=None):
         script_file_name = output_extraction_task.script_file_name
         script = output_extraction_task.script
         sandbox = self.__build_sandbox()
         api_ctl = location_context.api_ctl
         helm_client = location_context.kube_location.helm_client
-        composition = self.__load_composition(keg_status, api_ctl, helm_client, driver_request_id=driver_request_id)
+        composition = self.__load_composition(keg_status, api_ctl, helm_client, async_api_ctl=location_context.async_api_ctl,
+                                                    informers=location_context.informers, keg_name=keg_name, driver_request_id=driver_request_id)
         result_holder = OutputExtractionResultHolder()
         inputs = self.__build_inputs(composition, result_holder, resource_context_properties)
         complete_script = self.__build_script(script)
         try:
-            execute_result = sandbox.run(complete_script, file_name=script_file_name, inputs=inputs)
+            with SCRIPT_SECONDS.time(script='output_extraction'):
+                execute_result = sandbox.run(complete_script, file_name=script_file_name, inputs=inputs)
         except SandboxError as e:
             full_detail = None
             if isinstance(e, ExecuteError) and hasattr(e, 'execution_log') and getattr(e, 'execution_log') != None:
@@ -46,8 +52,16 @@ class OutputExtractionHandler:
                 outputs[k] = v
             return OutputExtractionResult.success(outputs)
 
-    def __load_composition(self, keg_status, api_ctl, helm_client, driver_request_id=None):
-        return CompositionLoader(api_ctl, helm_client).load_composition(keg_status, driver_request_id=driver_request_id)
+    def __load_composition(self, keg_status, api_ctl, helm_client, async_api_ctl=None, informers=None, keg_name=None, driver_request_id=None):
+        bulk_load_settings = self.__build_bulk_load_settings(keg_name)
+        loader = CompositionLoader(api_ctl, helm_client, async_api_ctl=async_api_ctl, bulk_load_settings=bulk_load_settings, informers=informers)
+        return loader.load_composition(keg_status, driver_request_id=driver_request_id)
+
+    def __build_bulk_load_settings(self, keg_name):
+        if self.composition_properties is None or not self.composition_properties.bulk_load or keg_name is None:
+            return None
+        return BulkLoadSettings(f'{Labels.KEG}={keg_name}', min_objects=self.composition_properties.bulk_load_min_objects,
+                                    page_size=self.composition_properties.list_page_size)
 
     def __build_sandbox(self):
         config = SandboxConfiguration()
@@ -1,4 +1,5 @@
 import logging
+import threading
 from kubernetes.client.rest import ApiException
 from kubedriver.keg.model import EntityStates, V1alpha1HelmReleaseStatus, V1alpha1KegCompositionStatus, V1alpha1ObjectStatus
 from kubedriver.keg import CompositionLoader
@@ -7,6 +8,10 @@ logger = logging.getLogger(__name__)
 
 class RemoveHelmHandler:
 
+    def __init__(self):
+        # Removal tasks may run concurrently, each rebuilding the list of Helm releases in the composition
+        self._composition_lock = threading.Lock()
+
     def decorate(self, action, parent_task_settings, script_name, keg_name, keg_status):
         helm_status = self.__find_helm_status(action, keg_status)
         self.__do_decorate(helm_status, action, parent_task_settings, script_name, keg_name, keg_status)
@@ -38,7 +43,7 @@ class RemoveHelmHandler:
             if len(task_errors) == 0:
                 if should_delete:
                     try:
-                        captured_objects = self.__pre_capture_objects(context.api_ctl, helm_client, helm_status, driver_request_id=driver_request_id)
+                        captured_objects = self.__pre_capture_objects(context.api_ctl, helm_client, helm_status, async_api_ctl=context.async_api_ctl, driver_request_id=driver_request_id)
                         helm_client.purge(action.name, action.namespace, driver_request_id=driver_request_id)
                         helm_status.state = EntityStates.DELETED
                         helm_status.error = None
@@ -65,17 +70,18 @@ class RemoveHelmHandler:
         return None
 
     def __remove_helm_release_from_composition(self, action, keg_status):
-        new_helm_releases = []
-        for helm_status in keg_status.composition.helm_releases:
-            if helm_status.name == action.name and helm_status.namespace == action.namespace:
-                pass
-            else:
-                new_helm_releases.append(helm_status)
-        keg_status.composition.helm_releases = new_helm_releases
+        with self._composition_lock:
+            new_helm_releases = []
+            for helm_status in keg_status.composition.helm_releases:
+                if helm_status.name == action.name and helm_status.namespace == action.namespace:
+                    pass
+                else:
+                    new_helm_releases.append(helm_status)
+            keg_status.composition.helm_releases = new_helm_releases
 
-    def __pre_capture_objects(self, api_ctl, helm_client, helm_status, driver_request_id=None):
+    def __pre_capture_objects(self, api_ctl, helm_client, helm_status, async_api_ctl=None, driver_request_id=None):
         helm_release_details = helm_client.get(helm_status.name, helm_status.namespace, driver_request_id=driver_request_id)
-        loader = CompositionLoader(api_ctl, helm_client)
+        loader = CompositionLoader(api_ctl, helm_client, async_api_ctl=async_api_ctl)
         loaded_objects = loader.load_objects_in_helm_release(helm_release_details, driver_request_id=driver_request_id)
         return loaded_objects
 
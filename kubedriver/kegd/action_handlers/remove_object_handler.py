@@ -1,15 +1,23 @@
 import logging
+import threading
 from kubernetes.client.rest import ApiException
 from kubedriver.keg.model import EntityStates, V1alpha1ObjectStatus, V1alpha1KegCompositionStatus
 from kubedriver.kubeobjects import ObjectReference
+from kubedriver.kegd.exceptions import RemovalTimeoutError
 from openshift.dynamic.exceptions import NotFoundError, DynamicApiError
 
 logger = logging.getLogger(__name__)
 
 class RemoveObjectHandler:
 
-    def __init__(self):
-        pass
+    def __init__(self, removal_properties=None):
+        self.removal_properties = removal_properties
+        # Removal tasks may run concurrently, each rebuilding the list of objects in the composition
+        self._composition_lock = threading.Lock()
+
+    @property
+    def wait_for_deletion(self):
+        return self.removal_properties is not None and self.removal_properties.wait_for_deletion
 
     def decorate(self, action, parent_task_settings, script_name, keg_name, keg_status):
         obj_status = self.__find_object(action, keg_status)
@@ -30,6 +38,8 @@ class RemoveObjectHandler:
         if obj_status != None:
             try:
                 api_ctl.delete_object(action.group, action.kind, action.name, namespace=action.namespace, driver_request_id=driver_request_id)
+                if self.wait_for_deletion:
+                    self.__wait_for_deletion(api_ctl, action, driver_request_id=driver_request_id)
                 obj_status.state = EntityStates.DELETED
                 obj_status.error = None
             except NotFoundError:
@@ -51,6 +61,14 @@ class RemoveObjectHandler:
                 self.__remove_object_from_composition(action, keg_status)
         return task_errors
 
+    def __wait_for_deletion(self, api_ctl, action, driver_request_id=None):
+        timeout_seconds = self.removal_properties.wait_timeout_seconds
+        deleted = api_ctl.wait_for_deletion(action.group, action.kind, action.name, namespace=action.namespace, timeout_seconds=timeout_seconds,
+                                                driver_request_id=driver_request_id)
+        if not deleted:
+            reference = ObjectReference(action.group, action.kind, action.name, namespace=action.namespace)
+            raise RemovalTimeoutError(f'Object ({reference}) still exists {timeout_seconds} seconds after it was deleted')
+
     def __find_object(self, action, keg_status):
         if keg_status.composition != None and keg_status.composition.objects != None:
             for obj_status in keg_status.composition.objects:
@@ -62,14 +80,15 @@ class RemoveObjectHandler:
         return None
 
     def __remove_object_from_composition(self, action, keg_status):
-        new_objects = []
-        for obj_status in keg_status.composition.objects:
-            if (obj_status.group == action.group and obj_status.kind == action.kind 
-            and obj_status.name == action.name and obj_status.namespace == action.namespace):
-                pass
-            else:
-                new_objects.append(obj_status)
-        keg_status.composition.objects = new_objects
+        with self._composition_lock:
+            new_objects = []
+            for obj_status in keg_status.composition.objects:
+                if (obj_status.group == action.group and obj_status.kind == action.kind 
+                and obj_status.name == action.name and obj_status.namespace == action.namespace):
+                    pass
+                else:
+                    new_objects.append(obj_status)
+            keg_status.composition.objects = new_objects
 
     def __capture_deltas(self, delta_capture, object_status):
         delta_capture.removed_object(object_status)
\ No newline at end of file
@@ -9,4 +9,7 @@ class MultiErrorStrategyProcessingError(StrategyProcessingError):
 
     def __init__(self, message, original_errors, *args, **kwargs):
         super().__init__(message, *args, **kwargs)
-        self.original_errors = original_errors
\ No newline at end of file
+        self.original_errors = original_errors
+
+class RemovalTimeoutError(StrategyProcessingError):
+    pass
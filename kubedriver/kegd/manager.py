@@ -30,35 +30,40 @@ class KegdStrategyManager(Service, Capability):
                 raise ValueError(f'Must set a value on kegd.ready_checks.default_timeout_seconds ({self.kegd_properties.ready_checks.default_timeout_seconds}) that is less than kegd.ready_checks.max_timeout_seconds ({self.kegd_properties.ready_checks.max_timeout_seconds}) in the configuration properties')
 
     def apply_kegd_strategy(self, kube_location, keg_name, kegd_strategy, operation_name, kegd_files, render_context):
-        context = self.context_factory.build(kube_location)
-        worker = KegdStrategyLocationManager(self.kegd_properties, context, self.templating)
-        process_strategy_job = worker.build_process_strategy_job(keg_name, kegd_strategy, operation_name, kegd_files, render_context)
-        job_data = {
-            'job_type': ProcessStrategyJob.job_type,
-            'data': process_strategy_job.on_write(),
-            'logging_context': {k:v for k,v in logging_context.get_all().items()}
-        }
-        try:
-            self.job_queue.queue_job(job_data)
-        except Exception as e:
-            #Try and delete the request as we never scheduled the job
-            logger.exception(f'Failed to queue request \'{process_strategy_job.request_id}\', will attempt to remove report data')
+        with self.context_factory.session(kube_location) as context:
+            worker = KegdStrategyLocationManager(self.kegd_properties, context, self.templating)
+            process_strategy_job = worker.build_process_strategy_job(keg_name, kegd_strategy, operation_name, kegd_files, render_context)
+            job_data = {
+                'job_type': ProcessStrategyJob.job_type,
+                'data': process_strategy_job.on_write(),
+                'logging_context': {k:v for k,v in logging_context.get_all().items()}
+            }
             try:
-                worker.delete_request_report(request_id)
-            except Exception as nested:
-                logger.exception(f'Failed to remove report for a request which failed to be queued: {process_strategy_job.request_id}')
-            raise e from None
-        return process_strategy_job.request_id
+                self.job_queue.queue_job(job_data)
+            except Exception as e:
+                #Try and delete the request as we never scheduled the job
+                logger.exception(f'Failed to queue request \'{process_strategy_job.request_id}\', will attempt to remove report data')
+                try:
+                    worker.delete_request_report(request_id)
+                except Exception as nested:
+                    logger.exception(f'Failed to remove report for a request which failed to be queued: {process_strategy_job.request_id}')
+                raise e from None
+            return process_strategy_job.request_id
 
     def get_request_report(self, kube_location, request_id):
-        context = self.context_factory.build(kube_location)
-        worker = KegdStrategyLocationManager(self.kegd_properties, context, self.templating)
-        return worker.get_request_report(request_id)
+        with self.context_factory.session(kube_location) as context:
+            worker = KegdStrategyLocationManager(self.kegd_properties, context, self.templating)
+            return worker.get_request_report(request_id)
 
     def delete_request_report(self, kube_location, request_id):
-        context = self.context_factory.build(kube_location)
-        worker = KegdStrategyLocationManager(self.kegd_properties, context, self.templating)
-        return worker.delete_request_report(request_id)
+        with self.context_factory.session(kube_location) as context:
+            worker = KegdStrategyLocationManager(self.kegd_properties, context, self.templating)
+            return worker.delete_request_report(request_id)
+
+    def forget_request_report(self, kube_location, request_id):
+        with self.context_factory.session(kube_location) as context:
+            worker = KegdStrategyLocationManager(self.kegd_properties, context, self.templating)
+            worker.forget_request_report(request_id)
 
 class KegdStrategyLocationManager:
 
@@ -69,6 +74,7 @@ class KegdStrategyLocationManager:
         self.templating = templating
         self.keg_persister = context.keg_persister
         self.kegd_persister = context.kegd_persister
+        self.report_cache = context.report_cache
         self.api_ctl = context.api_ctl
 
     def build_process_strategy_job(self, keg_name, kegd_strategy, operation_name, kegd_files, render_context):
@@ -84,9 +90,16 @@ class KegdStrategyLocationManager:
         return ProcessStrategyJob(request_id, self.kube_location, keg_name, strategy_execution, render_context)
 
     def get_request_report(self, request_id):
+        if self.report_cache is not None:
+            return self.report_cache.get(request_id, driver_request_id=request_id)
         return self.kegd_persister.get(request_id, driver_request_id=request_id)
 
+    def forget_request_report(self, request_id):
+        if self.report_cache is not None:
+            self.report_cache.forget(request_id)
+
     def delete_request_report(self, request_id):
+        self.forget_request_report(request_id)
         try:
             return self.kegd_persister.delete(request_id, driver_request_id=request_id)
         except RecordNotFoundError:
@@ -104,9 +117,12 @@ class KegdStrategyLocationManager:
         report.error = None
         labels = {
             Labels.MANAGED_BY: LabelValues.MANAGED_BY,
-            Labels.KEG: keg_name
+            Labels.KEG: keg_name,
+            Labels.REPORT_STATE: StrategyExecutionStates.PENDING
         }
         self.kegd_persister.create(request_id, report, labels=labels, driver_request_id=request_id)
+        if self.report_cache is not None:
+            self.report_cache.put(request_id, report)
         return report
 
     def __gen_task_group_name(self, compose_script, render_context):
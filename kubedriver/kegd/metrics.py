@@ -0,0 +1,8 @@
+from kubedriver.metrics import default_metrics_registry
+
+PHASE_SECONDS = default_metrics_registry.histogram('kubedriver_strategy_phase_duration_seconds', 'Duration of each run of a deployment strategy phase',
+                                                    label_names=['phase'])
+REQUEUES = default_metrics_registry.counter('kubedriver_strategy_requeues_total', 'Deployment strategy jobs requeued to retry a task later',
+                                                    label_names=['task'])
+SCRIPT_SECONDS = default_metrics_registry.histogram('kubedriver_script_execution_duration_seconds', 'Duration of ready check and output extraction scripts in the sandbox',
+                                                    label_names=['script'])
@@ -43,22 +43,28 @@ class DeployTaskSettings:
     IMMEDIATE_CLEANUP_FAILURE = 'Failure'
     IMMEDIATE_CLEANUP_ALWAYS = 'Always'
     
-    def __init__(self, immediate_cleanup_on=None):
+    def __init__(self, immediate_cleanup_on=None, order=None):
         if immediate_cleanup_on == None:
             immediate_cleanup_on = DeployTaskSettings.IMMEDIATE_CLEANUP_NEVER
         self.immediate_cleanup_on = immediate_cleanup_on
+        self.order = order
 
     @staticmethod
-    def on_read(immediateCleanupOn=None, **kwargs):
+    def on_read(immediateCleanupOn=None, order=None, **kwargs):
         if immediateCleanupOn == None:
             immediateCleanupOn = DeployTaskSettings.IMMEDIATE_CLEANUP_NEVER
         allowed_cleanup_values = [DeployTaskSettings.IMMEDIATE_CLEANUP_NEVER, DeployTaskSettings.IMMEDIATE_CLEANUP_SUCCESS, 
                                             DeployTaskSettings.IMMEDIATE_CLEANUP_FAILURE, DeployTaskSettings.IMMEDIATE_CLEANUP_ALWAYS]
         if immediateCleanupOn not in allowed_cleanup_values:
             raise InvalidDeploymentStrategyError(f'immediateCleanupOn value must be one of: {allowed_cleanup_values}')
-        return (DeployTaskSettings(immediate_cleanup_on=immediateCleanupOn), kwargs)
+        if order is not None and (isinstance(order, bool) or not isinstance(order, int)):
+            raise InvalidDeploymentStrategyError(f'order value must be an integer but was {type(order)}')
+        return (DeployTaskSettings(immediate_cleanup_on=immediateCleanupOn, order=order), kwargs)
 
     def on_write(self):
-        return {
+        data = {
             'immediateCleanupOn': self.immediate_cleanup_on
         }
+        if self.order is not None:
+            data['order'] = self.order
+        return data
@@ -1,9 +1,12 @@
-
 class Labels:
 
     KEG = 'keg.kubedriver.alm/keg'
     MANAGED_BY = 'app.kubernetes.io/managed-by'
+    # Set on reports (Pending until they reach a terminal state), so expired reports can be selected by the report sweeper
+    REPORT_STATE = 'kegdr.kubedriver.alm/state'
+    # The UTC hour (YYYYMMDDHH) a report reached a terminal state
+    REPORT_FINISHED_HOUR = 'kegdr.kubedriver.alm/finished-hour'
 
 class LabelValues:
 
-    MANAGED_BY = 'kubedriver.alm'
\ No newline at end of file
+    MANAGED_BY = 'kubedriver.alm'
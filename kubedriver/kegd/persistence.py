@@ -1,5 +1,5 @@
 from ignition.service.framework import Service, Capability
-from kubedriver.persistence import ConfigMapPersister, CmRecordBuilder
+from kubedriver.persistence import ConfigMapPersister, CmRecordBuilder, CustomResourcePersister, PersistenceBackends, DEFAULT_CR_API_VERSION
 from kubedriver.kubeclient import KubeApiController
 from kubedriver.kegd.model import (V1alpha1KegdStrategyReport, V1alpha1KegdStrategyReportStatus, V1alpha1KegdCompositionDelta,
                                         V1alpha1KegdCompositionDeltaSubset, V1alpha1ObjectDelta, V1alpha1HelmReleaseDelta)
@@ -14,11 +14,27 @@ data_types['V1alpha1HelmReleaseDelta'] = V1alpha1HelmReleaseDelta
 
 class KegdReportPersistenceFactory(Service, Capability):
 
+    def __init__(self, persistence_properties=None):
+        self.persistence_properties = persistence_properties
+
     def build(self, kube_location, api_ctl):
         record_builder = self.__build_record_builder(kube_location)
+        if PersistenceBackends.resolve(kube_location, self.persistence_properties) == PersistenceBackends.CUSTOM_RESOURCE:
+            return CustomResourcePersister('KegDeploymentReport', api_ctl, kube_location.driver_namespace, record_builder,
+                                    cr_api_version=self.__get_cr_api_version(), cr_kind='KegdStrategyReport')
         cm_persister_args = kube_location.get_cm_persister_args()
         return ConfigMapPersister('KegDeploymentReport', api_ctl, kube_location.driver_namespace, record_builder, 
                                     **cm_persister_args)
 
+    def __get_cr_api_version(self):
+        if self.persistence_properties is not None and self.persistence_properties.custom_resource_api_version is not None:
+            return self.persistence_properties.custom_resource_api_version
+        return DEFAULT_CR_API_VERSION
+
     def __build_record_builder(self, kube_location):
-        return CmRecordBuilder(kube_location.client, V1alpha1KegdStrategyReportStatus, data_types)
+        record_builder_args = {}
+        if self.persistence_properties is not None:
+            record_builder_args['record_format'] = self.persistence_properties.record_format
+            record_builder_args['compress'] = self.persistence_properties.compress_records
+            record_builder_args['compress_min_bytes'] = self.persistence_properties.compress_min_bytes
+        return CmRecordBuilder(kube_location.client, V1alpha1KegdStrategyReportStatus, data_types, **record_builder_args)
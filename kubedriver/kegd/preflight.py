@@ -0,0 +1,72 @@
+import logging
+from openshift.dynamic.exceptions import DynamicApiError
+from kubedriver.kegd.model import DeployObjectAction
+from kubedriver.kubeclient import SyncApiBridge, BatchResult
+from kubedriver.kubeobjects import ObjectReference
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE_KIND = 'Namespace'
+CRD_KIND = 'CustomResourceDefinition'
+
+class DeployPreflight:
+    """
+    Sends a server-side dry run (dryRun=All) of every object in a deploy task group, so a group with an object the
+    API server would reject fails before anything is created.
+
+    Objects in a Namespace, or of a kind defined by a CRD, deployed by the same group cannot be validated until
+    that Namespace or CRD exists, so they are not checked.
+    """
+
+    def __init__(self, deploy_object_handler):
+        self.deploy_object_handler = deploy_object_handler
+
+    def check(self, keg_name, keg_status, deploy_tasks, context, driver_request_id=None):
+        object_actions = [task.action for task in deploy_tasks if isinstance(task.action, DeployObjectAction)]
+        created_namespaces, created_kinds = self.__find_group_dependencies(object_actions)
+        checked_actions = []
+        calls = []
+        for action in object_actions:
+            if action.namespace in created_namespaces or (self.__api_group(action.group), action.kind) in created_kinds:
+                logger.debug(f'Skipping dry run of object {action.kind}/{action.name} as it depends on a Namespace or CRD deployed by the same task group')
+                continue
+            checked_actions.append(action)
+            calls.append(self.deploy_object_handler.build_preflight_call(action, keg_name, keg_status, driver_request_id=driver_request_id))
+        if len(calls) == 0:
+            return []
+        logger.debug(f'Dry run of {len(calls)} object(s) in group \'{keg_name}\'')
+        results = self.__run(calls, context)
+        errors = []
+        for action, result in zip(checked_actions, results):
+            if result.failed:
+                reference = ObjectReference(action.group, action.kind, action.name, namespace=action.namespace)
+                error_msg = result.error.summary() if isinstance(result.error, DynamicApiError) else f'{result.error}'
+                logger.debug(f'Dry run of object ({reference}) in group \'{keg_name}\' failed: {error_msg}')
+                errors.append(f'Dry run of {action.kind} \'{action.name}\' failed: {error_msg}')
+        return errors
+
+    def __run(self, calls, context):
+        if context.async_api_ctl is not None:
+            return SyncApiBridge(context.async_api_ctl).batch(calls)
+        results = []
+        for call in calls:
+            try:
+                results.append(BatchResult(call, value=getattr(context.api_ctl, call.method_name)(*call.args, **call.kwargs)))
+            except Exception as e:
+                results.append(BatchResult(call, error=e))
+        return results
+
+    def __find_group_dependencies(self, object_actions):
+        created_namespaces = set()
+        created_kinds = set()
+        for action in object_actions:
+            if action.kind == NAMESPACE_KIND:
+                created_namespaces.add(action.name)
+            elif action.kind == CRD_KIND:
+                spec = action.config.get('spec', {}) if isinstance(action.config, dict) else {}
+                names = spec.get('names', {})
+                created_kinds.add((spec.get('group'), names.get('kind')))
+        return created_namespaces, created_kinds
+
+    def __api_group(self, api_version):
+        return api_version.split('/')[0] if '/' in api_version else ''
@@ -1,17 +1,23 @@
 import logging
+import functools
 from ignition.service.framework import Service, Capability
 from ignition.service.logging import logging_context
 from kubedriver.kegd.action_handlers import (DeployObjectHandler, RemoveObjectHandler, DeployHelmHandler, 
                                                 RemoveHelmHandler, ReadyCheckHandler, OutputExtractionHandler)
-from kubedriver.keg.model import V1alpha1KegStatus, V1alpha1KegCompositionStatus, EntityStates, V1alpha1ObjectStatus
+from kubedriver.keg.model import EntityStates, V1alpha1ObjectStatus
 from kubedriver.kegd.model import (RemovalTask, RemovalTaskSettings, RemoveObjectAction, DeployTask, DeployHelmAction,
                                     DeployObjectAction, DeployTaskSettings, RetryStatus,
                                     RemoveHelmAction, DeployHelmAction, ReadyCheckTask,
                                     StrategyExecutionStates, StrategyExecutionPhases)
 from kubedriver.kegd.jobs import ProcessStrategyJob
+from kubedriver.kubeclient import InformerManager
 from kubedriver.persistence import PersistenceError, RecordNotFoundError
 from .exceptions import StrategyProcessingError, MultiErrorStrategyProcessingError
 from .delta_capture import KegDeltaCapture
+from .task_executor import TaskGroupExecutor, removal_tier
+from .preflight import DeployPreflight
+from .metrics import PHASE_SECONDS, REQUEUES
+from .session import StrategyJobSession
 import kubedriver.utils.time as timeutil
 
 logger = logging.getLogger(__name__)
@@ -25,6 +31,8 @@ DEPLOY_ACTION_HANDLERS = {
     DeployHelmAction: DeployHelmHandler()
 }
 
+READY_CHECK_TASK_NAME = 'Ready Check'
+
 NORMAL_PHASE_ORDER = [
     StrategyExecutionPhases.TASKS, 
     StrategyExecutionPhases.READY_CHECK,
@@ -35,10 +43,11 @@ NORMAL_PHASE_ORDER = [
 
 class KegdStrategyProcessor(Service, Capability):
 
-    def __init__(self, context_factory, templating, job_queue):
+    def __init__(self, context_factory, templating, job_queue, kegd_properties=None):
         self.context_factory = context_factory
         self.templating = templating
         self.job_queue = job_queue
+        self.kegd_properties = kegd_properties
         self.job_queue.register_job_handler(ProcessStrategyJob.job_type, self.handle_process_strategy_job)
     
     def handle_process_strategy_job(self, job):
@@ -46,9 +55,9 @@ class KegdStrategyProcessor(Service, Capability):
             logging_context.set_from_dict(job.get('logging_context', {}))
             job_data = job.get('data')
             process_strategy_job = ProcessStrategyJob.on_read(**job_data)
-            context = self.context_factory.build(process_strategy_job.kube_location)
-            worker = KegdStrategyLocationProcessor(context, self.templating)
-            finished = worker.handle_process_strategy_job(process_strategy_job)
+            with self.context_factory.session(process_strategy_job.kube_location) as context:
+                worker = KegdStrategyLocationProcessor(context, self.templating, kegd_properties=self.kegd_properties)
+                finished = worker.handle_process_strategy_job(process_strategy_job)
             if not finished:
                 job['data'] = process_strategy_job.on_write()
             return finished
@@ -69,20 +78,37 @@ class RequeueRequest:
 
 class KegdStrategyLocationProcessor:
 
-    def __init__(self, context, templating):
+    def __init__(self, context, templating, kegd_properties=None):
         self.context = context
         self.kube_location = context.kube_location
         self.templating = templating
+        self.kegd_properties = kegd_properties
+        self.composition_properties = kegd_properties.composition if kegd_properties is not None else None
+        self.deploy_action_handlers = dict(DEPLOY_ACTION_HANDLERS)
+        if kegd_properties is not None:
+            self.deploy_action_handlers[DeployObjectAction] = DeployObjectHandler(deploy_properties=kegd_properties.deploy)
+        self.deploy_preflight = None
+        if kegd_properties is not None and kegd_properties.deploy.preflight:
+            self.deploy_preflight = DeployPreflight(self.deploy_action_handlers[DeployObjectAction])
+        self.remove_action_handlers = dict(REMOVE_ACTION_HANDLERS)
+        if kegd_properties is not None:
+            self.remove_action_handlers[RemoveObjectAction] = RemoveObjectHandler(removal_properties=kegd_properties.removal)
+        self.deploy_executor = TaskGroupExecutor(max_workers=kegd_properties.deploy.max_concurrent_tasks if kegd_properties is not None else 1)
+        self.removal_executor = TaskGroupExecutor(max_workers=kegd_properties.removal.max_concurrent_tasks if kegd_properties is not None else 1,
+                                                    tier_func=removal_tier)
         self.keg_persister = context.keg_persister
         self.kegd_persister = context.kegd_persister
         self.api_ctl = context.api_ctl
+        self.informers = context.informers
+        self.report_cache = context.report_cache
         self.driver_request_id = ''
+        self.session = None
 
     def handle_process_strategy_job(self, process_strategy_job):
         logger.debug(f'Processing request \'{process_strategy_job.request_id}\'')
         self.driver_request_id = process_strategy_job.request_id
 
-        cancel_process, errors, requeue_process = self.__check_retry_status(process_strategy_job)
+        cancel_process, errors, requeue_process, early_retry = self.__check_retry_status(process_strategy_job)
         if requeue_process:
             # Not finished == False
             return False
@@ -90,11 +116,15 @@ class KegdStrategyLocationProcessor:
         # Errors retrieving the request or checking request state result in the job not being requeued
         strategy_execution = process_strategy_job.strategy_execution
         try:
+            # Read from the API rather than the report cache, as the last run of this job may have been on another instance of the driver
             report_status = self.kegd_persister.get(process_strategy_job.request_id, driver_request_id=self.driver_request_id)
         except RecordNotFoundError as e:
             logger.exception(f'Report could not be found for request {process_strategy_job.request_id}, this request will no longer be processed')
+            self.__stop_ready_check_notifications(process_strategy_job.request_id)
             # Finished
             return True
+        self.session = StrategyJobSession(self.keg_persister, self.kegd_persister, report_status, driver_request_id=self.driver_request_id,
+                                            report_cache=self.report_cache)
 
         run_phases = True
         try:
@@ -127,7 +157,9 @@ class KegdStrategyLocationProcessor:
                     run_phases = False # Assume we can stop
                     errors.extend(phase_result.errors)
                     if phase_result.requeue is not None:
-                        self.__update_retry_status(timeutil.utc_to_string(timeutil.get_utc_datetime()), process_strategy_job, phase_result.requeue)
+                        self.__update_retry_status(timeutil.utc_to_string(timeutil.get_utc_datetime()), process_strategy_job, phase_result.requeue,
+                                                    counted=not early_retry)
+                        early_retry = False
                         if self.__has_exceeded_max_attempts(process_strategy_job.retry_status):
                             errors.append(f'Retryable task {process_strategy_job.retry_status.current_task} has exceeded max attempts of {process_strategy_job.retry_status.settings.max_attempts} (attempts {process_strategy_job.retry_status.attempts})')
                             # Even on retry exceeded, we may move to the Immediate cleanup stage on failure
@@ -137,6 +169,8 @@ class KegdStrategyLocationProcessor:
                                 run_phases = True # Run phase immediately
                         else:
                             # Requeue
+                            self.session.flush()
+                            REQUEUES.inc(task=phase_result.requeue.task_name)
                             return False
                     else:
                         self.__clear_retry_status(process_strategy_job)
@@ -147,6 +181,7 @@ class KegdStrategyLocationProcessor:
             errors.append(f'Internal error: {e}')
             
         # If we can't update the record then the job is lost
+        self.__stop_ready_check_notifications(process_strategy_job.request_id)
         self.__update_report_with_final_results(report_status, errors)
         return True
 
@@ -192,13 +227,16 @@ class KegdStrategyLocationProcessor:
         else:
             return False
 
-    def __update_retry_status(self, attempt_time, process_strategy_job, requeue_request): 
+    def __update_retry_status(self, attempt_time, process_strategy_job, requeue_request, counted=True): 
         if process_strategy_job.retry_status is None or process_strategy_job.retry_status.current_task != requeue_request.task_name:
             process_strategy_job.retry_status = RetryStatus(requeue_request.task_name, requeue_request.settings)
             process_strategy_job.retry_status.current_task = requeue_request.task_name
             process_strategy_job.retry_status.attempts = 1
             process_strategy_job.retry_status.start_time = attempt_time
             process_strategy_job.retry_status.recent_attempt_times = []
+        elif not counted:
+            # A retry made early as the objects changed does not count towards max attempts or delay the next retry on the interval
+            process_strategy_job.retry_status.settings = requeue_request.settings
         else:
             process_strategy_job.retry_status.settings = requeue_request.settings
             process_strategy_job.retry_status.attempts += 1
@@ -209,18 +247,20 @@ class KegdStrategyLocationProcessor:
 
     def __clear_retry_status(self, process_strategy_job):
         process_strategy_job.retry_status = None
+        self.__stop_ready_check_notifications(process_strategy_job.request_id)
         logger.debug(f'Retry status cleared on {process_strategy_job.request_id}')
 
     def __mark_as_running(self, report_status):
         if report_status.state != StrategyExecutionStates.RUNNING:
             report_status.state = StrategyExecutionStates.RUNNING
-            self.kegd_persister.update(report_status.uid, report_status, driver_request_id=self.driver_request_id)
+            self.session.report_changed()
 
     def __check_retry_status(self, process_strategy_job):
         now_as_datetime = timeutil.get_utc_datetime()
         errors = []
         cancel_process = False
         requeue_process = False
+        early_retry = False
         retry_status = process_strategy_job.retry_status
         if retry_status is not None:
             timedout, duration = self.__has_retry_timedout(now_as_datetime, retry_status)
@@ -230,12 +270,36 @@ class KegdStrategyLocationProcessor:
             else:
                 interval_passed, _ = self.__has_interval_passed(now_as_datetime, retry_status)
                 if not interval_passed:
-                    # Requeue
-                    requeue_process = True
-        return cancel_process, errors, requeue_process
+                    if self.__has_ready_check_notification(process_strategy_job):
+                        logger.debug(f'Objects of request \'{process_strategy_job.request_id}\' have changed, retrying {retry_status.current_task} before the interval has passed')
+                        early_retry = True
+                    else:
+                        # Requeue
+                        requeue_process = True
+        return cancel_process, errors, requeue_process, early_retry
+
+    def __has_ready_check_notification(self, process_strategy_job):
+        if self.informers is None or process_strategy_job.retry_status.current_task != READY_CHECK_TASK_NAME:
+            return False
+        return self.informers.notifier.consume(process_strategy_job.request_id)
+
+    def __start_ready_check_notifications(self, keg_name, keg_status):
+        # Changes to the objects of the Keg (or it's Helm releases) allow the ready check to be retried before the interval has passed
+        if self.informers is None:
+            return
+        match_keys = [InformerManager.index_match_key(keg_name)]
+        if keg_status.composition is not None and keg_status.composition.helm_releases is not None and len(keg_status.composition.helm_releases) > 0:
+            self.informers.watch_helm_releases()
+            for helm_release in keg_status.composition.helm_releases:
+                match_keys.append(InformerManager.helm_release_match_key(helm_release.name, helm_release.namespace))
+        self.informers.notifier.subscribe(self.driver_request_id, match_keys)
+
+    def __stop_ready_check_notifications(self, request_id):
+        if self.informers is not None:
+            self.informers.notifier.unsubscribe(request_id)
 
     def __process_next_phases(self, report_status, keg_name, strategy_execution, resource_context_properties):
-        keg_status, new_keg = self.__get_or_init_keg(keg_name)
+        keg_status, new_keg = self.session.load_keg(keg_name)
         if new_keg is True:
             uid = self.keg_persister.get_record_uid(keg_name, driver_request_id=self.driver_request_id)
             record_ref = self.keg_persister.build_record_reference(uid, keg_name)
@@ -244,26 +308,29 @@ class KegdStrategyLocationProcessor:
                                                                 namespace=record_ref['metadata'].get('namespace'), name=record_ref['metadata'].get('name'),
                                                                 uid=record_ref['metadata'].get('uid')))
             report_status.delta = delta_capture.delta
-            self.kegd_persister.update(report_status.uid, report_status, driver_request_id=self.driver_request_id)
+            # The Keg record is already created, so keep the report of it
+            self.session.report_changed()
+            self.session.flush_report()
         captured_errors = []
         try:
             # This point forward we must make best efforts to update the request if there is an error (and to run Immediate cleanup on error)
             while report_status.phase is not None and report_status.phase != StrategyExecutionPhases.END:
                 phase_result = None
-                try:
-                    if report_status.phase == StrategyExecutionPhases.TASKS:
-                        phase_result = self.__execute_task_groups(report_status, keg_name, keg_status, strategy_execution)
-                    elif report_status.phase == StrategyExecutionPhases.READY_CHECK:
-                        phase_result = self.__execute_ready_check_task(report_status, keg_name, keg_status, strategy_execution, resource_context_properties)
-                    elif report_status.phase == StrategyExecutionPhases.OUTPUTS:
-                        phase_result = self.__execute_output_extraction_task(report_status, keg_name, keg_status, strategy_execution, resource_context_properties)
-                    elif report_status.phase == StrategyExecutionPhases.IMMEDIATE_CLEANUP or report_status.phase == StrategyExecutionPhases.IMMEDIATE_CLEANUP_ON_FAILURE:
-                        phase_result = self.__process_immediate_cleanup(report_status, keg_name, keg_status, strategy_execution, captured_errors)
-                    elif report_status.phase == StrategyExecutionPhases.CLEANUP:
-                        phase_result = self.__execute_cleanup(report_status, keg_name, keg_status, strategy_execution)
-                except Exception as e:
-                    logger.exception(f'An error occurred whilst processing phase \'{report_status.phase}\' of deployment strategy \'{report_status.uid}\' on group \'{keg_name}\'')
-                    phase_result = PhaseResult(errors=[f'{e}'])
+                with PHASE_SECONDS.time(phase=report_status.phase):
+                    try:
+                        if report_status.phase == StrategyExecutionPhases.TASKS:
+                            phase_result = self.__execute_task_groups(report_status, keg_name, keg_status, strategy_execution)
+                        elif report_status.phase == StrategyExecutionPhases.READY_CHECK:
+                            phase_result = self.__execute_ready_check_task(report_status, keg_name, keg_status, strategy_execution, resource_context_properties)
+                        elif report_status.phase == StrategyExecutionPhases.OUTPUTS:
+                            phase_result = self.__execute_output_extraction_task(report_status, keg_name, keg_status, strategy_execution, resource_context_properties)
+                        elif report_status.phase == StrategyExecutionPhases.IMMEDIATE_CLEANUP or report_status.phase == StrategyExecutionPhases.IMMEDIATE_CLEANUP_ON_FAILURE:
+                            phase_result = self.__process_immediate_cleanup(report_status, keg_name, keg_status, strategy_execution, captured_errors)
+                        elif report_status.phase == StrategyExecutionPhases.CLEANUP:
+                            phase_result = self.__execute_cleanup(report_status, keg_name, keg_status, strategy_execution)
+                    except Exception as e:
+                        logger.exception(f'An error occurred whilst processing phase \'{report_status.phase}\' of deployment strategy \'{report_status.uid}\' on group \'{keg_name}\'')
+                        phase_result = PhaseResult(errors=[f'{e}'])
 
                 if phase_result.requeue is not None:
                     return phase_result
@@ -308,7 +375,7 @@ class KegdStrategyLocationProcessor:
             else:
                 next_phase = StrategyExecutionPhases.END
         report_status.phase = next_phase
-        self.kegd_persister.update(report_status.uid, report_status, driver_request_id=self.driver_request_id)
+        self.session.report_changed()
 
     def __execute_task_groups(self, report_status, keg_name, keg_status, strategy_execution):
         errors = []
@@ -333,53 +400,50 @@ class KegdStrategyLocationProcessor:
                 logger.debug('Processing decorate for remove task ' + str(task.on_write()))
                 handler = self.__get_removal_task_handler(task)
                 handler.decorate(task.action, task.settings, task_group_name, keg_name, keg_status)
+            # Durability point: the planned changes and current phase must be stored before any objects are touched
+            self.session.flush_report()
+            self.session.keg_changed()
             try:
-                self.keg_persister.update(keg_name, keg_status, driver_request_id=self.driver_request_id)
+                self.session.flush_keg()
             except PersistenceError as e:
                 msg = f'Failed to update Keg \'{keg_name}\' with planned composition remove changes on request \'{report_status.uid}\''
                 logger.exception(msg)
                 task_errors.append(f'{msg}: {e}')
             else:
                 #Proceed with remove
-                for task in removal_tasks:
-                    logger.debug('Processing handler for remove task ' + str(task.on_write()))
-                    handler = self.__get_removal_task_handler(task)
-                    handler_errors = handler.handle(task.action, task.settings, task_group_name, keg_name, keg_status, self.context, delta_capture, driver_request_id=self.driver_request_id)
-                    task_errors.extend(handler_errors)
-                try:
-                    self.keg_persister.update(keg_name, keg_status, driver_request_id=self.driver_request_id)
-                except PersistenceError as e:
-                    msg = f'Failed to update Keg \'{keg_name}\' with composition remove changes on request \'{report_status.uid}\''
-                    logger.exception(msg)
-                    task_errors.append(f'{msg}: {e}')
+                run_task = functools.partial(self.__run_removal_task, task_group_name, keg_name, keg_status)
+                task_errors.extend(self.removal_executor.execute(removal_tasks, run_task, delta_capture))
+                # Written at the next durability point
+                self.session.keg_changed()
         return task_errors
 
     def __process_deploy_tasks(self, report_status, keg_name, keg_status, task_group_name, deploy_tasks, delta_capture):
         task_errors = []
+        if len(deploy_tasks) > 0 and self.deploy_preflight is not None:
+            task_errors = self.deploy_preflight.check(keg_name, keg_status, deploy_tasks, self.context, driver_request_id=self.driver_request_id)
+            if len(task_errors) > 0:
+                logger.debug(f'Task group \'{task_group_name}\' on request \'{report_status.uid}\' failed dry run, no objects were deployed')
+                return task_errors
         if len(deploy_tasks) > 0:
             for task in deploy_tasks:
                 logger.debug('Processing decorate for deploy task ' + str(task.on_write()))
                 handler = self.__get_deploy_task_handler(task)
                 handler.decorate(task.action, task.settings, task_group_name, keg_name, keg_status)
+            # Durability point: the planned changes and current phase must be stored before any objects are touched
+            self.session.flush_report()
+            self.session.keg_changed()
             try:
-                self.keg_persister.update(keg_name, keg_status, driver_request_id=self.driver_request_id)
+                self.session.flush_keg()
             except PersistenceError as e:
                 msg = f'Failed to update Keg \'{keg_name}\' with planned composition deploy changes on request \'{report_status.uid}\''
                 logger.exception(msg)
                 task_errors.append(f'{msg}: {e}')
             else:
                 #Proceed with deploy
-                for task in deploy_tasks:
-                    logger.debug('Processing handler for deploy task ' + str(task.on_write()))
-                    handler = self.__get_deploy_task_handler(task)
-                    handler_errors = handler.handle(task.action, task.settings, task_group_name, keg_name, keg_status, self.context, delta_capture, driver_request_id=self.driver_request_id)
-                    task_errors.extend(handler_errors)
-                try:
-                    self.keg_persister.update(keg_name, keg_status, driver_request_id=self.driver_request_id)
-                except PersistenceError as e:
-                    msg = f'Failed to update Keg \'{keg_name}\' with composition deploy changes on request \'{report_status.uid}\''
-                    logger.exception(msg)
-                    task_errors.append(f'{msg}: {e}')
+                run_task = functools.partial(self.__run_deploy_task, task_group_name, keg_name, keg_status)
+                task_errors.extend(self.deploy_executor.execute(deploy_tasks, run_task, delta_capture))
+                # Written at the next durability point
+                self.session.keg_changed()
         return task_errors
 
     def __execute_ready_check_task(self, report_status, keg_name, keg_status, strategy_execution, resource_context_properties):
@@ -387,13 +451,17 @@ class KegdStrategyLocationProcessor:
         requeue_request = None
         if strategy_execution.ready_check_task is not None:
             ready_check_task = strategy_execution.ready_check_task
-            handler = ReadyCheckHandler()
+            handler = ReadyCheckHandler(composition_properties=self.composition_properties)
+            # Subscribe before checking so changes made during the check are not missed
+            self.__start_ready_check_notifications(keg_name, keg_status)
             ready_result = handler.handle(report_status.operation, keg_name, keg_status, self.context, ready_check_task, resource_context_properties, driver_request_id=self.driver_request_id)
             has_failed, reason = ready_result.has_failed()
             if has_failed:
                 errors.append(reason)
             elif not ready_result.is_ready():
-                requeue_request = RequeueRequest('Ready Check', ready_check_task.retry_settings)
+                requeue_request = RequeueRequest(READY_CHECK_TASK_NAME, ready_check_task.retry_settings)
+            if requeue_request is None:
+                self.__stop_ready_check_notifications(self.driver_request_id)
         return PhaseResult(errors=errors, requeue=requeue_request)
 
     def __execute_output_extraction_task(self, report_status, keg_name, keg_status, strategy_execution, resource_context_properties):
@@ -401,7 +469,7 @@ class KegdStrategyLocationProcessor:
         requeue_request = None
         if strategy_execution.output_extraction_task is not None:
             output_extraction_task = strategy_execution.output_extraction_task
-            handler = OutputExtractionHandler()
+            handler = OutputExtractionHandler(composition_properties=self.composition_properties)
             extraction_result = handler.handle(report_status.operation, keg_name, keg_status, self.context, output_extraction_task, resource_context_properties, driver_request_id=self.driver_request_id)
             has_failed, reason = extraction_result.has_failed()
             if has_failed:
@@ -432,6 +500,13 @@ class KegdStrategyLocationProcessor:
             return PhaseResult()
 
     def __update_report_with_final_results(self, report_status, exec_errors):
+        if self.session.keg_dirty:
+            try:
+                self.session.flush_keg()
+            except PersistenceError as e:
+                msg = f'Failed to update Keg \'{self.session.keg_name}\' with composition changes on request \'{report_status.uid}\''
+                logger.exception(msg)
+                exec_errors.append(f'{msg}: {e}')
         if exec_errors is not None and len(exec_errors) > 0:
             report_status.state = StrategyExecutionStates.FAILED
             if report_status.errors is None:
@@ -445,7 +520,7 @@ class KegdStrategyLocationProcessor:
             report_status.state = StrategyExecutionStates.COMPLETE
             report_status.phase = StrategyExecutionPhases.END
             report_status.errors = []
-        self.kegd_persister.update(report_status.uid, report_status, driver_request_id=self.driver_request_id)
+        self.session.flush_report(force=True)
  
     def __summarise_exec_errors(self, exec_errors):
         error_msg = 'Request encountered {0} error(s):'.format(len(exec_errors))
@@ -453,14 +528,24 @@ class KegdStrategyLocationProcessor:
             error_msg += '\n\t{0} - {1}'.format(idx+1, error)
         return error_msg
 
+    def __run_removal_task(self, task_group_name, keg_name, keg_status, task, delta_capture):
+        logger.debug('Processing handler for remove task ' + str(task.on_write()))
+        handler = self.__get_removal_task_handler(task)
+        return handler.handle(task.action, task.settings, task_group_name, keg_name, keg_status, self.context, delta_capture, driver_request_id=self.driver_request_id)
+
+    def __run_deploy_task(self, task_group_name, keg_name, keg_status, task, delta_capture):
+        logger.debug('Processing handler for deploy task ' + str(task.on_write()))
+        handler = self.__get_deploy_task_handler(task)
+        return handler.handle(task.action, task.settings, task_group_name, keg_name, keg_status, self.context, delta_capture, driver_request_id=self.driver_request_id)
+
     def __get_removal_task_handler(self, task):
-        handler = REMOVE_ACTION_HANDLERS.get(task.action.__class__)
+        handler = self.remove_action_handlers.get(task.action.__class__)
         if handler is None:
             raise StrategyProcessingError(f'Could not find a handler for remove task {task.action.__class__}')
         return handler
 
     def __get_deploy_task_handler(self, task):
-        handler = DEPLOY_ACTION_HANDLERS.get(task.action.__class__)
+        handler = self.deploy_action_handlers.get(task.action.__class__)
         if handler is None:
             raise StrategyProcessingError(f'Could not find a handler for deploy task {task.action.__class__}')
         return handler
@@ -472,7 +557,9 @@ class KegdStrategyLocationProcessor:
             cleanup_errors = self.__cleanout_keg(report_status, keg_name, keg_status, delta_capture)
             if len(cleanup_errors) == 0:
                 try:
-                    self.keg_persister.delete(keg_name, driver_request_id=self.driver_request_id)
+                    # The report must show the cleanup is underway before the Keg is gone
+                    self.session.flush_report()
+                    self.session.delete_keg()
                 except PersistenceError as e:
                     msg = f'Failed to remove Keg \'{keg_name}\' on request \'{report_status.uid}\''
                     logger.exception(msg)
@@ -495,16 +582,3 @@ class KegdStrategyLocationProcessor:
             return self.__process_removal_tasks(report_status, keg_name, keg_status, 'Cleanup', removal_tasks, delta_capture)
         else:
             return []
-
-    def __get_or_init_keg(self, keg_name):
-        try:
-            keg = self.keg_persister.get(keg_name, driver_request_id=self.driver_request_id)
-            return keg, False
-        except RecordNotFoundError:
-            # Not found
-            keg = V1alpha1KegStatus()
-            keg.composition = V1alpha1KegCompositionStatus()
-            keg.composition.objects = []
-            keg.composition.helm_releases = []
-            self.keg_persister.create(keg_name, keg, driver_request_id=self.driver_request_id)
-            return keg, True
\ No newline at end of file
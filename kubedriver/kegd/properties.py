@@ -8,6 +8,9 @@ class KegDeploymentProperties(ConfigurationPropertiesGroup, Service, Capability)
         self.ready_checks = KegDeploymentStrategyReadyCheckProperties()
         self.strategy = KegDeploymentStrategyProperties()
         self.element = KegDeploymentElementProperties()
+        self.composition = KegDeploymentCompositionProperties()
+        self.deploy = KegDeploymentDeployProperties()
+        self.removal = KegDeploymentRemovalProperties()
 
 class KegDeploymentStrategyReadyCheckProperties(ConfigurationProperties, Service, Capability):
 
@@ -17,6 +20,29 @@ class KegDeploymentStrategyReadyCheckProperties(ConfigurationProperties, Service
         self.default_interval_seconds = None
         self.max_timeout_seconds = None
 
+class KegDeploymentCompositionProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.bulk_load = True
+        self.bulk_load_min_objects = 2
+        self.list_page_size = 250
+
+class KegDeploymentDeployProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.server_side_apply = False
+        self.field_manager = 'kubedriver'
+        self.force_conflicts = True
+        self.max_concurrent_tasks = 1
+        self.preflight = False
+
+class KegDeploymentRemovalProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.max_concurrent_tasks = 1
+        self.wait_for_deletion = False
+        self.wait_timeout_seconds = 60
+
 class KegDeploymentStrategyProperties(ConfigurationProperties, Service, Capability):
 
     def __init__(self):
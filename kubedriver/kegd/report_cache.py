@@ -0,0 +1,192 @@
+import copy
+import time
+import logging
+import threading
+import collections
+from kubedriver.kubeclient.informer import ADDED, MODIFIED, DELETED, ERROR, GONE_STATUS
+from kubedriver.persistence import RecordNotFoundError
+from kubedriver.metrics import default_metrics_registry
+from .model import Labels, LabelValues
+from .report_sweeper import TERMINAL_STATES
+
+logger = logging.getLogger(__name__)
+
+REPORT_CACHE_READS = default_metrics_registry.counter('kubedriver_report_cache_reads_total', 'Report reads made through the report status cache, by result (hit, stale or miss)',
+                                                        label_names=['location', 'result'])
+
+HIT = 'hit'
+STALE = 'stale'
+MISS = 'miss'
+
+def is_not_newer_version(resource_version, other_resource_version):
+    """
+    True if resource_version is known to be the same as or come before other_resource_version. The API server only promises they
+    are opaque strings, so versions that are not integers (as etcd gives) are never compared
+    """
+    if resource_version is None or other_resource_version is None:
+        return False
+    if not resource_version.isdigit() or not other_resource_version.isdigit():
+        return False
+    return int(resource_version) <= int(other_resource_version)
+
+class CachedReport:
+
+    def __init__(self, report_status, refreshed_at, resource_version=None):
+        self.report_status = report_status
+        self.refreshed_at = refreshed_at
+        # Of the last watch event stored for the report (kept when replaced by a newer read or write), so older events are ignored
+        self.resource_version = resource_version
+
+    @property
+    def terminal(self):
+        return self.report_status.state in TERMINAL_STATES
+
+class ReportStatusCache:
+    """
+    Holds the status of the reports of a location, so the repeated polls of a request are answered from memory
+    instead of reading and decoding the report each time.
+
+    Reports created by the manager and written by the processor of this driver are stored as they are written. A report
+    in a terminal state (Complete/Failed) does not change again, so is kept until forgotten once the response for the request
+    has been posted. Other reports are served for stale_seconds after they were last read or written; whilst the watch of the
+    reports is running, changes made elsewhere (e.g. by another instance of the driver) replace cached reports as they happen,
+    so cached reports are served for up to max_age_seconds. A watch event older than the cached report (by resourceVersion), or a
+    read that began before the cached report was stored, does not replace it.
+
+    At most max_reports are held, the least recently read removed first. Reports returned must not be modified
+    """
+
+    def __init__(self, kegd_persister, location_name=None, max_reports=1000, stale_seconds=5, max_age_seconds=60, watch=True, watch_timeout_seconds=60,
+                    retry_seconds=30, clock=None):
+        self.kegd_persister = kegd_persister
+        self.location_name = location_name
+        self.max_reports = max_reports
+        self.stale_seconds = stale_seconds
+        self.max_age_seconds = max_age_seconds
+        self.watch = watch
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.retry_seconds = retry_seconds
+        self.clock = clock if clock is not None else time.monotonic
+        self._reports = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.__run, name=f'report-cache-{location_name}', daemon=True)
+
+    @property
+    def synced(self):
+        return self._synced.is_set()
+
+    def start(self):
+        if self.watch:
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._synced.clear()
+
+    def get(self, request_id, driver_request_id=None):
+        with self._lock:
+            cached = self._reports.get(request_id)
+            if cached is not None and self.__is_fresh(cached):
+                self._reports.move_to_end(request_id)
+                REPORT_CACHE_READS.inc(location=self.location_name, result=HIT)
+                return cached.report_status
+        REPORT_CACHE_READS.inc(location=self.location_name, result=STALE if cached is not None else MISS)
+        read_started_at = self.clock()
+        try:
+            report_status = self.kegd_persister.get(request_id, driver_request_id=driver_request_id)
+        except RecordNotFoundError:
+            self.forget(request_id)
+            raise
+        self.__store(request_id, report_status, read_started_at=read_started_at)
+        return report_status
+
+    def put(self, request_id, report_status):
+        """
+        Stores a report written by this driver. A copy is kept, as the writer may go on to modify it
+        """
+        self.__store(request_id, copy.deepcopy(report_status))
+
+    def forget(self, request_id):
+        with self._lock:
+            self._reports.pop(request_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._reports)
+
+    def __contains__(self, request_id):
+        with self._lock:
+            return request_id in self._reports
+
+    def __is_fresh(self, cached):
+        if cached.terminal:
+            return True
+        age = self.clock() - cached.refreshed_at
+        if self._synced.is_set():
+            return age < self.max_age_seconds
+        return age < self.stale_seconds
+
+    def __store(self, request_id, report_status, resource_version=None, read_started_at=None):
+        with self._lock:
+            cached = self._reports.get(request_id)
+            if cached is not None:
+                if cached.terminal and report_status.state not in TERMINAL_STATES:
+                    # An earlier write arriving late, a finished report does not change again
+                    return
+                if is_not_newer_version(resource_version, cached.resource_version):
+                    return
+                if read_started_at is not None and cached.refreshed_at >= read_started_at:
+                    # Written or watched whilst the read was made, so may be newer than the report read
+                    return
+                if resource_version is None:
+                    resource_version = cached.resource_version
+            self._reports[request_id] = CachedReport(report_status, self.clock(), resource_version=resource_version)
+            self._reports.move_to_end(request_id)
+            while self.max_reports is not None and len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+
+    def __run(self):
+        resource_version = None
+        while not self._stopped.is_set():
+            try:
+                resource_version = self.__watch(resource_version)
+            except Exception as e:
+                logger.warning(f'Watch of reports in location \'{self.location_name}\' failed, will retry in {self.retry_seconds} seconds: {e}')
+                self._synced.clear()
+                resource_version = None
+                self._stopped.wait(self.retry_seconds)
+        self._synced.clear()
+
+    def __watch(self, resource_version):
+        # Without a resourceVersion the watch begins with an ADDED event for each existing report, so cached reports are brought up to date
+        for event in self.kegd_persister.watch(label_selector=f'{Labels.MANAGED_BY}={LabelValues.MANAGED_BY}', resource_version=resource_version,
+                                                timeout_seconds=self.watch_timeout_seconds):
+            if self._stopped.is_set():
+                return resource_version
+            if event.event_type == ERROR:
+                if event.stored_object.get('code') == GONE_STATUS:
+                    # resourceVersion too old, changes may have been missed so start again from the current state
+                    self._synced.clear()
+                    return None
+                raise ValueError(f'Watch returned an error: {event.stored_object.get("message")}')
+            self._synced.set()
+            resource_version = event.resource_version if event.resource_version is not None else resource_version
+            self.__on_event(event)
+        return resource_version
+
+    def __on_event(self, event):
+        if event.name not in self:
+            # Only reports being polled are decoded
+            return
+        if event.event_type == DELETED:
+            self.forget(event.name)
+        elif event.event_type in (ADDED, MODIFIED):
+            try:
+                report_status = event.record
+            except Exception as e:
+                logger.debug(f'Removing \'{event.name}\' from report cache as the watched record could not be read: {e}')
+                self.forget(event.name)
+                return
+            self.__store(event.name, report_status, resource_version=event.resource_version)
@@ -0,0 +1,170 @@
+import logging
+import datetime
+import threading
+from kubedriver.kubeclient import TokenBucket
+from kubedriver.persistence import PersistenceError
+from kubedriver.metrics import default_metrics_registry
+from .model import Labels, LabelValues, StrategyExecutionStates
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DELETED = default_metrics_registry.counter('kubedriver_report_sweeper_deleted_total', 'Expired reports deleted by the report sweeper',
+                                                    label_names=['location'])
+REPORTS_LABELLED = default_metrics_registry.counter('kubedriver_report_sweeper_labelled_total', 'Terminal reports without state labels (written by older versions of the driver) labelled by the report sweeper',
+                                                    label_names=['location'])
+SWEEP_ERRORS = default_metrics_registry.counter('kubedriver_report_sweeper_errors_total', 'Report sweeps that failed', label_names=['location'])
+SWEEP_SECONDS = default_metrics_registry.histogram('kubedriver_report_sweeper_sweep_duration_seconds', 'Duration of report sweeps', label_names=['location'])
+
+TERMINAL_STATES = [StrategyExecutionStates.COMPLETE, StrategyExecutionStates.FAILED]
+FINISHED_HOUR_FORMAT = '%Y%m%d%H'
+REPORT_NAME_PREFIX = 'kegdr-'
+# Maximum values in the 'in' requirement of a single deletecollection selector
+MAX_SELECTOR_VALUES = 24
+
+def finished_hour(finished_at=None):
+    if finished_at is None:
+        finished_at = datetime.datetime.now(datetime.timezone.utc)
+    return finished_at.strftime(FINISHED_HOUR_FORMAT)
+
+def build_report_state_labels(state, finished_at=None):
+    """
+    Labels for a report in the given state: the state, and the hour it finished once terminal
+    """
+    labels = {Labels.REPORT_STATE: state}
+    if state in TERMINAL_STATES:
+        labels[Labels.REPORT_FINISHED_HOUR] = finished_hour(finished_at)
+    return labels
+
+class SweepResult:
+
+    def __init__(self, deleted=0, labelled=0):
+        self.deleted = deleted
+        self.labelled = labelled
+
+class ReportSweeper:
+    """
+    Deletes the reports of a location that reached a terminal state (Complete/Failed) more than retention_seconds ago,
+    such as those orphaned by a response that was never posted (or kept with keep_kegdrs, so the sweeper is only enabled by choice).
+
+    Terminal reports are labelled with their state and the UTC hour they finished. Each batch lists a page of up to batch_size
+    terminal reports, then deletes the expired finished hours seen in that page with deletecollection. Reports written by older
+    versions of the driver have no state label; each sweep reads one page of them and labels those already terminal, so they are
+    removed on a later sweep.
+
+    Requests made by the sweeper are limited to qps per second (on top of any rate limit of the location)
+    """
+
+    def __init__(self, kegd_persister, location_name=None, retention_seconds=86400, interval_seconds=600, batch_size=100, max_batches=10,
+                    qps=1, burst=5, clock=None):
+        self.kegd_persister = kegd_persister
+        self.location_name = location_name
+        self.retention_seconds = retention_seconds
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.rate_limit = TokenBucket(qps=qps, burst=burst)
+        self.clock = clock if clock is not None else (lambda: datetime.datetime.now(datetime.timezone.utc))
+        self._expired_continue_token = None
+        self._legacy_continue_token = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.__run, name=f'report-sweeper-{location_name}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def __run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f'Report sweep of location \'{self.location_name}\' failed, will retry in {self.interval_seconds} seconds: {e}')
+
+    def sweep(self):
+        with SWEEP_SECONDS.time(location=self.location_name):
+            try:
+                result = SweepResult()
+                result.deleted = self.__delete_expired()
+                result.labelled = self.__label_legacy_reports()
+            except PersistenceError:
+                SWEEP_ERRORS.inc(location=self.location_name)
+                # The continue tokens expire, so the next sweep starts the scans again
+                self._expired_continue_token = None
+                self._legacy_continue_token = None
+                raise
+        if result.deleted > 0 or result.labelled > 0:
+            logger.info(f'Report sweep of location \'{self.location_name}\' deleted {result.deleted} and labelled {result.labelled} report(s)')
+        return result
+
+    def finished_selector(self):
+        """
+        Selects terminal reports labelled with the hour they finished. Whether they have expired is decided from that label
+        once listed, so the selector stays the same size whatever the retention
+        """
+        return ','.join([
+            f'{Labels.MANAGED_BY}={LabelValues.MANAGED_BY}',
+            f'{Labels.REPORT_STATE} in ({",".join(TERMINAL_STATES)})',
+            Labels.REPORT_FINISHED_HOUR
+        ])
+
+    def expired_before_hour(self):
+        """
+        Reports that finished in an hour before this one (YYYYMMDDHH, so compared as strings) finished more than retention_seconds ago
+        """
+        return finished_hour(self.clock() - datetime.timedelta(seconds=self.retention_seconds))
+
+    def __delete_expired(self):
+        deleted = 0
+        cutoff_hour = self.expired_before_hour()
+        for _ in range(self.max_batches):
+            self.rate_limit.acquire()
+            # The scan continues from where the last sweep stopped, so a sweep lists at most max_batches pages however many reports are retained
+            page = self.kegd_persister.find_page(label_selector=self.finished_selector(), limit=self.batch_size,
+                                                    continue_token=self._expired_continue_token)
+            self._expired_continue_token = page.continue_token
+            hours = sorted(set(hour for hour in (labels.get(Labels.REPORT_FINISHED_HOUR) for labels in page.labels.values())
+                                if hour is not None and hour < cutoff_hour))
+            for hours_chunk in [hours[idx:idx + MAX_SELECTOR_VALUES] for idx in range(0, len(hours), MAX_SELECTOR_VALUES)]:
+                self.rate_limit.acquire()
+                batch_deleted = self.kegd_persister.delete_collection(label_selector=','.join([
+                    f'{Labels.MANAGED_BY}={LabelValues.MANAGED_BY}',
+                    f'{Labels.REPORT_STATE} in ({",".join(TERMINAL_STATES)})',
+                    f'{Labels.REPORT_FINISHED_HOUR} in ({",".join(hours_chunk)})'
+                ]))
+                if batch_deleted is None:
+                    batch_deleted = len([labels for labels in page.labels.values() if labels.get(Labels.REPORT_FINISHED_HOUR) in hours_chunk])
+                deleted += batch_deleted
+                REPORTS_DELETED.inc(batch_deleted, location=self.location_name)
+            if page.continue_token is None:
+                break
+        return deleted
+
+    def __label_legacy_reports(self):
+        labelled = 0
+        self.rate_limit.acquire()
+        page = self.kegd_persister.find_page(label_selector=f'{Labels.MANAGED_BY}={LabelValues.MANAGED_BY},!{Labels.REPORT_STATE}',
+                                                limit=self.batch_size, continue_token=self._legacy_continue_token)
+        self._legacy_continue_token = page.continue_token
+        for record_name in page.names:
+            # Other objects managed by the driver may be in the same namespace, so only records that read as finished reports are labelled
+            if record_name is None or not record_name.startswith(REPORT_NAME_PREFIX):
+                continue
+            try:
+                report = page.get_record(record_name)
+            except Exception as e:
+                logger.debug(f'Skipping \'{record_name}\' in report sweep as it could not be read as a report: {e}')
+                continue
+            if report is None or report.uid != record_name or report.state not in TERMINAL_STATES:
+                continue
+            self.rate_limit.acquire()
+            try:
+                self.kegd_persister.update(record_name, report, labels=build_report_state_labels(report.state, finished_at=self.clock()))
+            except PersistenceError as e:
+                logger.debug(f'Failed to label report \'{record_name}\' in report sweep: {e}')
+                continue
+            labelled += 1
+        if labelled > 0:
+            REPORTS_LABELLED.inc(labelled, location=self.location_name)
+        return labelled
@@ -0,0 +1,86 @@
+import logging
+from kubedriver.keg.model import V1alpha1KegStatus, V1alpha1KegCompositionStatus
+from kubedriver.persistence import RecordNotFoundError
+from .report_sweeper import build_report_state_labels, TERMINAL_STATES
+
+logger = logging.getLogger(__name__)
+
+class StrategyJobSession:
+    """
+    Unit of work for one run of a process strategy job. The Keg and report are each loaded once and changes to them
+    are tracked, then written at durability points rather than on every change:
+    - before external side effects (deploying or removing objects and Helm releases, removing the Keg)
+    - before the job is requeued
+    - at completion
+
+    Whenever an object may be created or removed, the Keg (with the planned changes) and the report (with the
+    current phase) are already stored, so a run picked up by another worker after a crash finds the same state it
+    would have found had every change been written immediately
+    """
+
+    def __init__(self, keg_persister, kegd_persister, report_status, driver_request_id=None, report_cache=None):
+        self.keg_persister = keg_persister
+        self.kegd_persister = kegd_persister
+        self.report_status = report_status
+        self.report_cache = report_cache
+        self.driver_request_id = driver_request_id
+        self.report_dirty = False
+        self.report_labelled = False
+        self.keg_name = None
+        self.keg_status = None
+        self.keg_dirty = False
+
+    def load_keg(self, keg_name):
+        """
+        Returns the Keg and True if it was created by this call. The Keg is read at most once per session
+        """
+        if self.keg_status is not None and self.keg_name == keg_name:
+            return self.keg_status, False
+        try:
+            keg_status = self.keg_persister.get(keg_name, driver_request_id=self.driver_request_id)
+            new_keg = False
+        except RecordNotFoundError:
+            keg_status = V1alpha1KegStatus()
+            keg_status.composition = V1alpha1KegCompositionStatus()
+            keg_status.composition.objects = []
+            keg_status.composition.helm_releases = []
+            self.keg_persister.create(keg_name, keg_status, driver_request_id=self.driver_request_id)
+            new_keg = True
+        self.keg_name = keg_name
+        self.keg_status = keg_status
+        self.keg_dirty = False
+        return keg_status, new_keg
+
+    def report_changed(self):
+        self.report_dirty = True
+
+    def keg_changed(self):
+        if self.keg_status is not None:
+            self.keg_dirty = True
+
+    def flush_report(self, force=False):
+        if self.report_dirty or force:
+            if self.report_status.state in TERMINAL_STATES and not self.report_labelled:
+                # Lets the report sweeper find the report once it has expired
+                self.kegd_persister.update(self.report_status.uid, self.report_status, labels=build_report_state_labels(self.report_status.state),
+                                            driver_request_id=self.driver_request_id)
+                self.report_labelled = True
+            else:
+                self.kegd_persister.update(self.report_status.uid, self.report_status, driver_request_id=self.driver_request_id)
+            self.report_dirty = False
+            if self.report_cache is not None:
+                self.report_cache.put(self.report_status.uid, self.report_status)
+
+    def flush_keg(self):
+        if self.keg_dirty:
+            self.keg_persister.update(self.keg_name, self.keg_status, driver_request_id=self.driver_request_id)
+            self.keg_dirty = False
+
+    def flush(self):
+        self.flush_keg()
+        self.flush_report()
+
+    def delete_keg(self):
+        self.keg_persister.delete(self.keg_name, driver_request_id=self.driver_request_id)
+        self.keg_status = None
+        self.keg_dirty = False
@@ -0,0 +1,168 @@
+import logging
+import concurrent.futures
+from ignition.service.logging import logging_context
+from kubedriver.kegd.model import DeployObjectAction, RemoveObjectAction
+
+logger = logging.getLogger(__name__)
+
+# Well-known kinds grouped by what they usually depend on. Lower tiers are deployed first
+NAMESPACE_TIER = 0
+CONFIGURATION_TIER = 1
+BINDING_TIER = 2
+WORKLOAD_TIER = 3
+EXPOSURE_TIER = 4
+# Helm charts may install the CRDs (and other kinds) needed by the custom resources of later tasks, so go ahead of unknown kinds
+HELM_TIER = 5
+DEFAULT_TIER = 6
+
+KIND_TIERS = {
+    'Namespace': NAMESPACE_TIER,
+    'CustomResourceDefinition': NAMESPACE_TIER,
+    'PriorityClass': NAMESPACE_TIER,
+    'StorageClass': NAMESPACE_TIER,
+    'ServiceAccount': CONFIGURATION_TIER,
+    'ConfigMap': CONFIGURATION_TIER,
+    'Secret': CONFIGURATION_TIER,
+    'ResourceQuota': CONFIGURATION_TIER,
+    'LimitRange': CONFIGURATION_TIER,
+    'PersistentVolume': CONFIGURATION_TIER,
+    'PersistentVolumeClaim': CONFIGURATION_TIER,
+    'Role': CONFIGURATION_TIER,
+    'ClusterRole': CONFIGURATION_TIER,
+    'NetworkPolicy': CONFIGURATION_TIER,
+    'RoleBinding': BINDING_TIER,
+    'ClusterRoleBinding': BINDING_TIER,
+    'Service': BINDING_TIER,
+    'Pod': WORKLOAD_TIER,
+    'ReplicaSet': WORKLOAD_TIER,
+    'ReplicationController': WORKLOAD_TIER,
+    'Deployment': WORKLOAD_TIER,
+    'DeploymentConfig': WORKLOAD_TIER,
+    'StatefulSet': WORKLOAD_TIER,
+    'DaemonSet': WORKLOAD_TIER,
+    'Job': WORKLOAD_TIER,
+    'CronJob': WORKLOAD_TIER,
+    'Ingress': EXPOSURE_TIER,
+    'Route': EXPOSURE_TIER,
+    'HorizontalPodAutoscaler': EXPOSURE_TIER,
+    'PodDisruptionBudget': EXPOSURE_TIER
+}
+
+def deploy_tier(task):
+    """
+    Tier of a deploy task: the explicit order setting if given, otherwise the tier of the object kind.
+    Helm releases go after the well-known kinds, then unknown kinds (e.g. custom resources) last
+    """
+    order = getattr(task.settings, 'order', None)
+    if order is not None:
+        return order
+    if isinstance(task.action, DeployObjectAction):
+        return KIND_TIERS.get(task.action.kind, DEFAULT_TIER)
+    return HELM_TIER
+
+def removal_tier(task):
+    """
+    Tier of a removal task: objects are removed in the reverse of the order they are deployed, so custom resources
+    go before their CRDs and workloads before the ServiceAccounts and Secrets they use. Helm releases are removed
+    after custom resources but before the Namespaces and CRDs they may have been installed into or rely on
+    """
+    if isinstance(task.action, RemoveObjectAction):
+        return DEFAULT_TIER - KIND_TIERS.get(task.action.kind, DEFAULT_TIER)
+    return DEFAULT_TIER - HELM_TIER
+
+class DeferredDeltaCapture:
+    """
+    Records the changes a task makes to the delta, so they can be applied to the shared KegDeltaCapture
+    in task order once the tasks running alongside it have finished
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def deployed_object(self, *args, **kwargs):
+        self.calls.append(('deployed_object', args, kwargs))
+
+    def removed_object(self, *args, **kwargs):
+        self.calls.append(('removed_object', args, kwargs))
+
+    def deployed_helm_release(self, *args, **kwargs):
+        self.calls.append(('deployed_helm_release', args, kwargs))
+
+    def removed_helm_release(self, *args, **kwargs):
+        self.calls.append(('removed_helm_release', args, kwargs))
+
+    def apply(self, delta_capture):
+        for method_name, args, kwargs in self.calls:
+            getattr(delta_capture, method_name)(*args, **kwargs)
+
+class TaskGroupExecutor:
+    """
+    Runs the tasks of a task group tier by tier. Tasks in the same tier are independent, so they are run
+    concurrently on a pool of at most max_workers threads.
+
+    Handlers only change the status entries of their own objects (added to the keg status by decorate, before
+    execution) so may share the keg status. Changes to the delta and the errors returned are applied in the
+    original task order, so the results do not depend on which task finished first.
+
+    With max_workers of 1 (or less) tasks are run one at a time, in the order given, exactly as before.
+    """
+
+    def __init__(self, max_workers=1, tier_func=deploy_tier):
+        self.max_workers = max_workers
+        self.tier_func = tier_func
+
+    @property
+    def concurrent(self):
+        return self.max_workers is not None and self.max_workers > 1
+
+    def plan(self, tasks):
+        """
+        Groups the tasks into tiers, lowest first. Tasks keep their original order within a tier
+        """
+        if not self.concurrent:
+            return [list(tasks)] if len(tasks) > 0 else []
+        tiers = {}
+        for task in tasks:
+            tiers.setdefault(self.tier_func(task), []).append(task)
+        return [tiers[tier] for tier in sorted(tiers.keys())]
+
+    def execute(self, tasks, run_task, delta_capture):
+        """
+        Runs each task with run_task(task, delta_capture), which returns a list of errors
+        """
+        if not self.concurrent:
+            errors = []
+            for task in tasks:
+                errors.extend(run_task(task, delta_capture))
+            return errors
+        results = [None for task in tasks]
+        self.__execute_tiers(list(enumerate(tasks)), run_task, results, dict(logging_context.get_all()))
+        errors = []
+        for deferred_capture, future in results:
+            deferred_capture.apply(delta_capture)
+            # Raises any unexpected error, as running the tasks one at a time would
+            errors.extend(future.result())
+        return errors
+
+    def __execute_tiers(self, indexed_tasks, run_task, results, logging_context_data):
+        tiers = {}
+        for idx, task in indexed_tasks:
+            tiers.setdefault(self.tier_func(task), []).append((idx, task))
+        max_workers = min(self.max_workers, len(indexed_tasks))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kegd-task') as executor:
+            for tier in sorted(tiers.keys()):
+                tier_futures = []
+                for idx, task in tiers[tier]:
+                    deferred_capture = DeferredDeltaCapture()
+                    future = executor.submit(self.__run_in_context, logging_context_data, run_task, task, deferred_capture)
+                    results[idx] = (deferred_capture, future)
+                    tier_futures.append(future)
+                # All tasks in a tier finish before the next tier starts
+                concurrent.futures.wait(tier_futures)
+
+    def __run_in_context(self, context_data, run_task, task, delta_capture):
+        logging_context.set_from_dict(context_data)
+        try:
+            return run_task(task, delta_capture)
+        finally:
+            logging_context.clear()
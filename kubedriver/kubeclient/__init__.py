@@ -3,9 +3,15 @@ from .api_ctl_factory import KubeApiControllerFactory
 from .api_version_parser import ApiVersionParser
 from .client_director import KubeClientDirector
 from .crd_director import CrdDirector
-from .defaults import DEFAULT_CRD_API_VERSION, DEFAULT_NAMESPACE
+from .defaults import DEFAULT_CRD_API_VERSION, DEFAULT_NAMESPACE, DEFAULT_FIELD_MANAGER
 from .error_reader import ErrorReader
 from .exceptions import ClientMethodNotFoundError, UnrecognisedObjectKindError
 from .mod_director import KubeModDirector
 from .os_api_ctl import OpenshiftApiController
-from .os_api_ctl_factory import OpenshiftApiControllerFactory
\ No newline at end of file
+from .os_api_ctl_factory import OpenshiftApiControllerFactory
+from .properties import KubeApiProperties, ClientPoolProperties, DiscoveryProperties, ConcurrencyProperties, InformerProperties, RateLimitProperties
+from .informer import InformerManager, KindInformer, ObjectStore
+from .async_api_ctl import AsyncApiController, SyncApiBridge, ApiCall, BatchResult, run_sync
+from .discovery import CachingDiscoverer, DynamicClientRegistry, DiscoveryStats, default_dynamic_client_registry
+from .crd_index import CrdIndex, CrdIndexRegistry, IndexedCrd, default_crd_index_registry
+from .rate_limiter import RateLimiter, RateLimiterRegistry, RateLimiterStats, TokenBucket, install_rate_limiter, default_rate_limiter_registry
@@ -5,6 +5,9 @@ from .api_ctl import KubeApiController
 
 class KubeApiControllerFactory(Service, Capability):
 
+    def __init__(self, kube_api_properties=None):
+        self.kube_api_properties = kube_api_properties
+
     def build(self, kube_location):
         crd_director = self.__build_crd_director(kube_location)
         client_director = self.__build_client_director(kube_location, crd_director)
@@ -14,6 +17,8 @@ class KubeApiControllerFactory(Service, Capability):
         kwargs = {}
         if kube_location.crd_api_version is not None:
             kwargs['crd_api_version'] = kube_location.crd_api_version
+        if self.kube_api_properties is not None:
+            kwargs['watch'] = self.kube_api_properties.crds.watch
         return CrdDirector(kube_location.client, **kwargs)
 
     def __build_client_director(self, kube_location, crd_director):
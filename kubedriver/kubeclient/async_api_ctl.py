@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import functools
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+def run_sync(coroutine):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Already inside an event loop on this thread, so the coroutine must run on a loop in another thread
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+class ApiCall:
+
+    def __init__(self, method_name, *args, **kwargs):
+        self.method_name = method_name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return f'ApiCall({self.method_name}, args={self.args}, kwargs={self.kwargs})'
+
+class BatchResult:
+
+    def __init__(self, call, value=None, error=None):
+        self.call = call
+        self.value = value
+        self.error = error
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+class AsyncApiController:
+    """
+    Asyncio front to a synchronous API controller (OpenshiftApiController or KubeApiController).
+
+    The Kubernetes client is blocking, so calls are executed on a thread pool owned by this controller. The size of
+    the pool is the cap on concurrent requests; one controller is created per location context, so the cap applies
+    to all jobs sharing that location.
+    """
+
+    def __init__(self, api_ctl, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.api_ctl = api_ctl
+        self.max_concurrency = max_concurrency
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='kube-api')
+
+    @property
+    def base_kube_client(self):
+        return self.api_ctl.base_kube_client
+
+    async def _call(self, method_name, *args, **kwargs):
+        method = getattr(self.api_ctl, method_name)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    async def create_object(self, object_config, **kwargs):
+        return await self._call('create_object', object_config, **kwargs)
+
+    async def update_object(self, object_config, **kwargs):
+        return await self._call('update_object', object_config, **kwargs)
+
+    async def apply_object(self, object_config, **kwargs):
+        return await self._call('apply_object', object_config, **kwargs)
+
+    async def patch_object(self, api_version, kind, name, patch, **kwargs):
+        return await self._call('patch_object', api_version, kind, name, patch, **kwargs)
+
+    async def read_object(self, api_version, kind, name, **kwargs):
+        return await self._call('read_object', api_version, kind, name, **kwargs)
+
+    async def safe_read_object(self, api_version, kind, name, **kwargs):
+        return await self._call('safe_read_object', api_version, kind, name, **kwargs)
+
+    async def delete_object(self, api_version, kind, name, **kwargs):
+        return await self._call('delete_object', api_version, kind, name, **kwargs)
+
+    async def delete_collection(self, api_version, kind, **kwargs):
+        return await self._call('delete_collection', api_version, kind, **kwargs)
+
+    async def wait_for_deletion(self, api_version, kind, name, **kwargs):
+        return await self._call('wait_for_deletion', api_version, kind, name, **kwargs)
+
+    async def is_object_namespaced(self, api_version, kind):
+        return await self._call('is_object_namespaced', api_version, kind)
+
+    async def batch(self, calls):
+        if len(calls) == 0:
+            return []
+        outcomes = await asyncio.gather(*[self._call(call.method_name, *call.args, **call.kwargs) for call in calls], return_exceptions=True)
+        results = []
+        for call, outcome in zip(calls, outcomes):
+            if isinstance(outcome, Exception):
+                results.append(BatchResult(call, error=outcome))
+            else:
+                results.append(BatchResult(call, value=outcome))
+        return results
+
+    async def safe_read_objects(self, references, **kwargs):
+        """
+        Reads many objects concurrently. Each reference is a tuple of (api_version, kind, name, namespace) and the
+        result is a list of (found, obj) tuples in the same order. Errors other than "not found" are raised
+        """
+        calls = [ApiCall('safe_read_object', api_version, kind, name, namespace=namespace, **kwargs) for api_version, kind, name, namespace in references]
+        results = await self.batch(calls)
+        return [self.__value_or_raise(result) for result in results]
+
+    async def is_objects_namespaced(self, api_version_kinds):
+        unique_keys = list(dict.fromkeys(api_version_kinds))
+        results = await self.batch([ApiCall('is_object_namespaced', api_version, kind) for api_version, kind in unique_keys])
+        by_key = {key: self.__value_or_raise(result) for key, result in zip(unique_keys, results)}
+        return [by_key[key] for key in api_version_kinds]
+
+    def __value_or_raise(self, result):
+        if result.failed:
+            raise result.error
+        return result.value
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+class SyncApiBridge:
+    """
+    Exposes the batch operations of an AsyncApiController to synchronous callers
+    """
+
+    def __init__(self, async_api_ctl):
+        self.async_api_ctl = async_api_ctl
+
+    def batch(self, calls):
+        return run_sync(self.async_api_ctl.batch(calls))
+
+    def safe_read_objects(self, references, **kwargs):
+        return run_sync(self.async_api_ctl.safe_read_objects(references, **kwargs))
+
+    def is_objects_namespaced(self, api_version_kinds):
+        return run_sync(self.async_api_ctl.is_objects_namespaced(api_version_kinds))
@@ -4,12 +4,26 @@ from .crd_director import CLUSTER_SCOPE, NAMESPACED_SCOPE
 
 CUSTOM_OBJECT_KIND = 'CustomObject'
 
+class DispatchEntry:
+
+    def __init__(self, api_class, method_name, is_namespaced, is_custom_object):
+        self.api_class = api_class
+        self.method_name = method_name
+        self.is_namespaced = is_namespaced
+        self.is_custom_object = is_custom_object
+
+# Entries for built-in kinds do not depend on the cluster, so are shared by all directors
+_builtin_dispatch_table = {}
+
 class KubeClientDirector:
 
     def __init__(self, base_kube_client, crd_director):
         self.base_kube_client = base_kube_client
         self.mod_director = KubeModDirector()
         self.crd_director = crd_director
+        self._api_clients = {}
+        # Custom object entries depend on the scope of the CRD on this cluster
+        self._custom_dispatch_table = {}
 
     def determine_api_method_for_create_object(self, api_version, kind, return_api_client=False):
         return self.__determine_api_method_for_action(api_version, kind, CREATE_ACTION, return_api_client)
@@ -27,12 +41,37 @@ class KubeClientDirector:
         return self.__determine_api_method_for_action(api_version, kind, LIST_ACTION, return_api_client)
 
     def __determine_api_method_for_action(self, api_version, kind, action_type, return_api_client):
-        api_client = self.mod_director.build_api_client_for_version(api_version, self.base_kube_client)
-        method, is_namespaced, is_custom_object = self.__find_api_method(api_client, api_version, kind, action_type)
+        key = (api_version, kind, action_type)
+        entry = _builtin_dispatch_table.get(key)
+        if entry is None:
+            entry = self._custom_dispatch_table.get(key)
+        if entry is None:
+            entry = self.__build_dispatch_entry(api_version, kind, action_type)
+        api_client = self.__get_api_client(entry.api_class)
+        method = getattr(api_client, entry.method_name)
         if return_api_client:
-            return method, is_namespaced, is_custom_object, api_client
+            return method, entry.is_namespaced, entry.is_custom_object, api_client
         else:
-            return method, is_namespaced, is_custom_object
+            return method, entry.is_namespaced, entry.is_custom_object
+
+    def __build_dispatch_entry(self, api_version, kind, action_type):
+        api_class = self.mod_director.get_api_client_class_for_version(api_version)
+        api_client = self.__get_api_client(api_class)
+        method, is_namespaced, is_custom_object = self.__find_api_method(api_client, api_version, kind, action_type)
+        entry = DispatchEntry(api_class, method.__name__, is_namespaced, is_custom_object)
+        if is_custom_object:
+            self._custom_dispatch_table[(api_version, kind, action_type)] = entry
+        else:
+            _builtin_dispatch_table[(api_version, kind, action_type)] = entry
+        return entry
+
+    def __get_api_client(self, api_class):
+        # API clients hold no state besides the base client, so one instance of each class is enough
+        api_client = self._api_clients.get(api_class)
+        if api_client is None:
+            api_client = api_class(self.base_kube_client)
+            self._api_clients[api_class] = api_client
+        return api_client
 
     def __find_api_method(self, api_client, api_version, kind, action_type):
         if self.mod_director.is_custom_obj_api(api_client):
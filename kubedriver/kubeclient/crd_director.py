@@ -1,14 +1,18 @@
+import logging
+from kubernetes.client.rest import ApiException
 from .defaults import  DEFAULT_CRD_API_VERSION
 from .mod_director import KubeModDirector, READ_ACTION, LIST_ACTION
 from .exceptions import ClientMethodNotFoundError
-from kubedriver.utils.lru import LRUCache
+from .crd_index import CrdIndex, IndexedCrd, default_crd_index_registry, CLUSTER_SCOPE, NAMESPACED_SCOPE
 
-CLUSTER_SCOPE = 'Cluster'
-NAMESPACED_SCOPE = 'Namespaced'
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIST_PAGE_SIZE = 100
 
 class CrdDirector:
 
-    def __init__(self, base_kube_client, crd_api_version=DEFAULT_CRD_API_VERSION, cache_capacity=100, mod_director=None):
+    def __init__(self, base_kube_client, crd_api_version=DEFAULT_CRD_API_VERSION, cache_capacity=None, mod_director=None,
+                    crd_index=None, crd_index_registry=None, list_page_size=DEFAULT_LIST_PAGE_SIZE, watch=False):
         self.base_kube_client = base_kube_client
         self.mod_director = mod_director if mod_director is not None else KubeModDirector()
         self.crd_api_version = crd_api_version
@@ -16,38 +20,107 @@ class CrdDirector:
         found, self._list_crds = self.mod_director.try_plain_method(self.crd_api_client, LIST_ACTION, 'custom_resource_definition')
         if not found:
             raise ClientMethodNotFoundError(f'Could not find list method for custom_resource_definitions at version {self.crd_api_version} (Client: {self.crd_api_client})')
-        self._type_cache = LRUCache(capacity=cache_capacity)
+        self.list_page_size = list_page_size
+        self.crd_index = self.__get_crd_index(crd_index, crd_index_registry, cache_capacity)
+        if watch:
+            self.crd_index.start_watch(self._list_crds)
+
+    def __get_crd_index(self, crd_index, crd_index_registry, cache_capacity):
+        if crd_index is not None:
+            return crd_index
+        if cache_capacity is not None:
+            # A director asking for its own capacity gets its own index
+            return CrdIndex(capacity=cache_capacity)
+        registry = crd_index_registry if crd_index_registry is not None else default_crd_index_registry
+        return registry.get(self.__cluster_key())
+
+    def __cluster_key(self):
+        configuration = getattr(self.base_kube_client, 'configuration', None)
+        host = getattr(configuration, 'host', None)
+        return host if host is not None else id(self.base_kube_client)
 
     def get_crd_by_kind(self, group, kind):
-        crd = self._try_cache_by_kind(group, kind)
-        if crd is None:
-            # Not found in cache
-            # Currently have to list all CRDs because we don't know the plural so cannot find by name (name = <plural>.<group>)
-            crds = self._list_crds()
-            matching_crd = None
-            for crd in crds.items:
-                if crd.spec.group == group and crd.spec.names.kind == kind:
-                    matching_crd = crd
-                else:
-                    # Might as well build up the cache
-                    cache_key = self._build_crd_type_cache_key(crd.spec.group, crd.spec.names.kind)
-                    self._type_cache.add(cache_key, crd)
-            # Add the match to the cache last so it is the most recently used
-            if matching_crd is not None:
-                cache_key = self._build_crd_type_cache_key(matching_crd.spec.group, matching_crd.spec.names.kind)
-                self._type_cache.add(cache_key, matching_crd)
-                crd = matching_crd
-        return crd
-            
-    def _try_cache_by_kind(self, group, kind):
-        cache_key = self._build_crd_type_cache_key(group, kind)
-        found, crd = self._type_cache.get(cache_key)
+        found, crd = self.crd_index.get(group, kind)
         if found:
             return crd
-        else:
-            return None
+        completed, crd = self.__discover_crd(group, kind)
+        if not completed:
+            crd = self.__find_crd_in_list(group, kind)
+        if crd is None:
+            self.crd_index.add_missing(group, kind)
+        return crd
+
+    def __discover_crd(self, group, kind):
+        """
+        Finds the plural and scope of a kind from the discovery documents of its group, without listing CRDs.
+        Returns (completed, crd) where completed is False if discovery could not give an answer either way
+        """
+        if group is None or len(group) == 0:
+            return False, None
+        try:
+            group_document = self.__get_discovery_document(f'/apis/{group}')
+            if not isinstance(group_document, dict):
+                return False, None
+            for version in self.__ordered_versions(group_document):
+                group_version_document = self.__get_discovery_document(f'/apis/{group}/{version}')
+                if not isinstance(group_version_document, dict):
+                    return False, None
+                match = None
+                for api_resource in group_version_document.get('resources', []):
+                    if '/' in api_resource.get('name', ''):
+                        # Subresource (e.g. status or scale)
+                        continue
+                    indexed_crd = IndexedCrd.from_api_resource(group, api_resource)
+                    if indexed_crd.kind == kind:
+                        match = indexed_crd
+                    else:
+                        self.crd_index.add(indexed_crd)
+                if match is not None:
+                    self.crd_index.add(match)
+                    return True, match
+            return True, None
+        except ApiException as e:
+            if e.status == 404:
+                # Group not served by the cluster
+                return True, None
+            logger.debug(f'Discovery of group {group} failed, falling back to listing CRDs: {e}')
+            return False, None
 
-    def _build_crd_type_cache_key(self, group, kind):
-        return f'{group}/{kind}'
+    def __ordered_versions(self, group_document):
+        versions = []
+        preferred = group_document.get('preferredVersion')
+        if isinstance(preferred, dict) and preferred.get('version') is not None:
+            versions.append(preferred.get('version'))
+        for version in group_document.get('versions', []):
+            version_name = version.get('version')
+            if version_name is not None and version_name not in versions:
+                versions.append(version_name)
+        return versions
 
-    
\ No newline at end of file
+    def __get_discovery_document(self, path):
+        return self.base_kube_client.call_api(path, 'GET', header_params={'Accept': 'application/json'}, response_type='object',
+                                                auth_settings=['BearerToken'], _return_http_data_only=True)
+
+    def __find_crd_in_list(self, group, kind):
+        # Pages through the CRDs, stopping at the match, and keeps only the fields we need from each
+        continue_token = None
+        while True:
+            kwargs = {'limit': self.list_page_size}
+            if continue_token is not None:
+                kwargs['_continue'] = continue_token
+            crds = self._list_crds(**kwargs)
+            match = None
+            for crd in crds.items:
+                indexed_crd = IndexedCrd.from_crd(crd)
+                if indexed_crd.group == group and indexed_crd.kind == kind:
+                    match = indexed_crd
+                else:
+                    # Might as well build up the index
+                    self.crd_index.add(indexed_crd)
+            if match is not None:
+                # Add the match last so it is the most recently used
+                self.crd_index.add(match)
+                return match
+            continue_token = getattr(crds.metadata, '_continue', None) if getattr(crds, 'metadata', None) is not None else None
+            if continue_token is None or len(continue_token) == 0:
+                return None
@@ -0,0 +1,255 @@
+import time
+import logging
+import threading
+import collections
+from kubernetes import watch
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_SCOPE = 'Cluster'
+NAMESPACED_SCOPE = 'Namespaced'
+
+DEFAULT_INDEX_CAPACITY = 500
+DEFAULT_NEGATIVE_TTL_SECONDS = 30
+DEFAULT_WATCH_TIMEOUT_SECONDS = 300
+DEFAULT_WATCH_RETRY_SECONDS = 30
+
+ADDED_EVENT = 'ADDED'
+MODIFIED_EVENT = 'MODIFIED'
+DELETED_EVENT = 'DELETED'
+ERROR_EVENT = 'ERROR'
+
+class IndexedCrdNames:
+
+    def __init__(self, kind, plural):
+        self.kind = kind
+        self.plural = plural
+
+class IndexedCrdSpec:
+
+    def __init__(self, group, scope, names):
+        self.group = group
+        self.scope = scope
+        self.names = names
+
+class IndexedCrd:
+    """
+    Trimmed view of a CustomResourceDefinition, keeping only the fields needed to address its objects.
+    Mirrors the attribute paths of the full model (crd.spec.scope, crd.spec.names.plural)
+    """
+
+    def __init__(self, group, kind, plural, scope):
+        self.spec = IndexedCrdSpec(group, scope, IndexedCrdNames(kind, plural))
+
+    @property
+    def group(self):
+        return self.spec.group
+
+    @property
+    def kind(self):
+        return self.spec.names.kind
+
+    @property
+    def plural(self):
+        return self.spec.names.plural
+
+    @property
+    def scope(self):
+        return self.spec.scope
+
+    @staticmethod
+    def from_crd(crd):
+        return IndexedCrd(crd.spec.group, crd.spec.names.kind, crd.spec.names.plural, crd.spec.scope)
+
+    @staticmethod
+    def from_api_resource(group, api_resource):
+        scope = NAMESPACED_SCOPE if api_resource.get('namespaced', False) else CLUSTER_SCOPE
+        return IndexedCrd(group, api_resource.get('kind'), api_resource.get('name'), scope)
+
+    def __eq__(self, other):
+        if not isinstance(other, IndexedCrd):
+            return False
+        return (self.group, self.kind, self.plural, self.scope) == (other.group, other.kind, other.plural, other.scope)
+
+    def __repr__(self):
+        return f'IndexedCrd(group={self.group}, kind={self.kind}, plural={self.plural}, scope={self.scope})'
+
+class CrdIndex:
+    """
+    Thread-safe index of CRDs by group and kind, for a single cluster.
+    Kinds confirmed missing are remembered for negative_ttl_seconds, unless a watch sees them added sooner
+    """
+
+    def __init__(self, capacity=DEFAULT_INDEX_CAPACITY, negative_ttl_seconds=DEFAULT_NEGATIVE_TTL_SECONDS,
+                    watch_timeout_seconds=DEFAULT_WATCH_TIMEOUT_SECONDS, watch_retry_seconds=DEFAULT_WATCH_RETRY_SECONDS):
+        self.capacity = capacity
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.watch_retry_seconds = watch_retry_seconds
+        self._lock = threading.RLock()
+        self._entries = collections.OrderedDict()
+        self._missing = {}
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+
+    def get(self, group, kind):
+        """
+        Returns (found, crd). When found is True and crd is None the kind is known to be missing
+        """
+        key = self.__build_key(group, kind)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True, self._entries[key]
+            expires_at = self._missing.get(key)
+            if expires_at is not None:
+                if time.monotonic() < expires_at:
+                    return True, None
+                self._missing.pop(key)
+        return False, None
+
+    def add(self, crd):
+        key = self.__build_key(crd.spec.group, crd.spec.names.kind)
+        with self._lock:
+            self._missing.pop(key, None)
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.capacity and len(self._entries) > 0:
+                self._entries.popitem(last=False)
+            self._entries[key] = crd
+
+    def add_missing(self, group, kind):
+        if self.negative_ttl_seconds is None or self.negative_ttl_seconds <= 0:
+            return
+        key = self.__build_key(group, kind)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._missing[key] = time.monotonic() + self.negative_ttl_seconds
+            if len(self._missing) > self.capacity:
+                self.__purge_expired_missing()
+
+    def remove(self, group, kind):
+        key = self.__build_key(group, kind)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._missing.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._missing.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+    def apply_event(self, event_type, crd):
+        """
+        Applies a change to a CRD seen by the watch. Only kinds already indexed (or negatively cached) are updated,
+        so the index never grows with CRDs nobody asked for
+        """
+        key = self.__build_key(crd.spec.group, crd.spec.names.kind)
+        with self._lock:
+            if event_type == DELETED_EVENT:
+                self._entries.pop(key, None)
+            elif event_type in (ADDED_EVENT, MODIFIED_EVENT):
+                if key in self._entries:
+                    self._entries[key] = IndexedCrd.from_crd(crd)
+                elif self._missing.pop(key, None) is not None:
+                    self.add(IndexedCrd.from_crd(crd))
+
+    def is_watching(self):
+        return self._watch_thread is not None and self._watch_thread.is_alive()
+
+    def start_watch(self, list_crds_func):
+        with self._lock:
+            if self.is_watching():
+                return
+            self._watch_stop.clear()
+            self._watch_thread = threading.Thread(target=self.__run_watch, args=(list_crds_func,), name='crd-index-watch', daemon=True)
+            self._watch_thread.start()
+
+    def stop_watch(self):
+        self._watch_stop.set()
+        thread = self._watch_thread
+        self._watch_thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
+
+    def __run_watch(self, list_crds_func):
+        resource_version = None
+        while not self._watch_stop.is_set():
+            crd_watch = watch.Watch()
+            try:
+                kwargs = {'timeout_seconds': self.watch_timeout_seconds}
+                if resource_version is not None:
+                    kwargs['resource_version'] = resource_version
+                for event in crd_watch.stream(list_crds_func, **kwargs):
+                    if self._watch_stop.is_set():
+                        break
+                    event_type = event.get('type')
+                    if event_type == ERROR_EVENT:
+                        # Most likely "410 Gone" - start again from the current state
+                        resource_version = None
+                        break
+                    self.apply_event(event_type, event['object'])
+                    resource_version = crd_watch.resource_version
+            except Exception as e:
+                resource_version = None
+                logger.warning(f'CRD watch failed, retrying in {self.watch_retry_seconds} seconds: {e}')
+                self._watch_stop.wait(self.watch_retry_seconds)
+            finally:
+                crd_watch.stop()
+
+    def __purge_expired_missing(self):
+        now = time.monotonic()
+        for key in [key for key, expires_at in self._missing.items() if expires_at <= now]:
+            self._missing.pop(key)
+
+    def __build_key(self, group, kind):
+        return f'{group}/{kind}'
+
+class CrdIndexRegistry:
+    """
+    Process-wide CRD indexes, one per cluster, shared by every CrdDirector talking to that cluster
+    """
+
+    def __init__(self, capacity=20, index_capacity=DEFAULT_INDEX_CAPACITY, negative_ttl_seconds=DEFAULT_NEGATIVE_TTL_SECONDS):
+        self.capacity = capacity
+        self.index_capacity = index_capacity
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        self._indexes = collections.OrderedDict()
+
+    def configure(self, capacity=None, index_capacity=None, negative_ttl_seconds=None):
+        with self._lock:
+            if capacity is not None:
+                self.capacity = capacity
+            if index_capacity is not None:
+                self.index_capacity = index_capacity
+            if negative_ttl_seconds is not None:
+                self.negative_ttl_seconds = negative_ttl_seconds
+
+    def get(self, cluster_key):
+        evicted = []
+        with self._lock:
+            index = self._indexes.get(cluster_key)
+            if index is not None:
+                self._indexes.move_to_end(cluster_key)
+                return index
+            while len(self._indexes) >= self.capacity and len(self._indexes) > 0:
+                _, oldest = self._indexes.popitem(last=False)
+                evicted.append(oldest)
+            index = CrdIndex(capacity=self.index_capacity, negative_ttl_seconds=self.negative_ttl_seconds)
+            self._indexes[cluster_key] = index
+        for oldest in evicted:
+            oldest.stop_watch()
+        return index
+
+    def clear(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+            self._indexes.clear()
+        for index in indexes:
+            index.stop_watch()
+
+default_crd_index_registry = CrdIndexRegistry()
@@ -1,2 +1,3 @@
 DEFAULT_NAMESPACE = 'default'
 DEFAULT_CRD_API_VERSION = 'apiextensions.k8s.io/v1beta1'
+DEFAULT_FIELD_MANAGER = 'kubedriver'
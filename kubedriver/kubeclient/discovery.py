@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+import functools
+import collections
+from openshift.dynamic import DynamicClient
+from openshift import __version__ as openshift_version
+from openshift.dynamic.discovery import LazyDiscoverer, CacheEncoder, CacheDecoder
+from openshift.dynamic.exceptions import ResourceNotFoundError
+
+logger = logging.getLogger(__name__)
+
+CORE_PREFIX = 'api'
+GROUPS_PREFIX = 'apis'
+DEFAULT_NEGATIVE_TTL_SECONDS = 30
+
+class DiscoveryStats:
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.group_version_loads = 0
+        self.group_version_refreshes = 0
+        self.group_list_refreshes = 0
+        self.resolution_hits = 0
+        self.negative_resolution_hits = 0
+
+    def add(self, other):
+        self.hits += other.hits
+        self.misses += other.misses
+        self.group_version_loads += other.group_version_loads
+        self.group_version_refreshes += other.group_version_refreshes
+        self.group_list_refreshes += other.group_list_refreshes
+        self.resolution_hits += other.resolution_hits
+        self.negative_resolution_hits += other.negative_resolution_hits
+
+    def to_dict(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'groupVersionLoads': self.group_version_loads,
+            'groupVersionRefreshes': self.group_version_refreshes,
+            'groupListRefreshes': self.group_list_refreshes,
+            'resolutionHits': self.resolution_hits,
+            'negativeResolutionHits': self.negative_resolution_hits
+        }
+
+class ResolvedResource:
+    """
+    Result of resolving an apiVersion and kind, with the values needed on every request taken once
+    """
+
+    def __init__(self, resource):
+        self.resource = resource
+        self.namespaced = resource.namespaced
+        self.base_url = resource.urls['base']
+
+class _Resolution:
+
+    def __init__(self, resolved=None, not_found_message=None, expires_at=None):
+        self.resolved = resolved
+        self.not_found_message = not_found_message
+        self.expires_at = expires_at
+
+class CachingDiscoverer(LazyDiscoverer):
+    """
+    LazyDiscoverer that can be shared between threads and only refreshes what it needs to.
+
+    The upstream LazyDiscoverer drops the entire cache (server version, group list and every loaded group/version)
+    when a search finds nothing. This discoverer instead reloads the resources of the group/version being searched
+    for, or the group list when the group itself is unknown (e.g. a CRD with a new group has just been created).
+    """
+
+    def __init__(self, client, cache_file=None, persist=False, negative_ttl_seconds=DEFAULT_NEGATIVE_TTL_SECONDS):
+        self.persist = persist
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.stats = DiscoveryStats()
+        self._lock = threading.RLock()
+        self._resolutions = {}
+        self._dirty = False
+        self._persist_path = cache_file if persist else None
+        super().__init__(client, cache_file)
+
+    def _Discoverer__init_cache(self, refresh=False):
+        # Replaces the private Discoverer.__init_cache. In openshift 0.12 it passes a CacheDecoder instance as the
+        # "cls" of json.load, which always fails, so a cache file was never reused. It would also read a shared
+        # file in the temp directory even when persistence is not wanted
+        loaded = False
+        if not refresh and self._persist_path is not None and os.path.exists(self._persist_path):
+            loaded = self.__read_cache()
+        if not loaded:
+            self._cache = {'library_version': openshift_version}
+        self._resolutions = {}
+        self._load_server_info()
+        self.discover()
+        if not loaded:
+            self._write_cache()
+
+    def __read_cache(self):
+        try:
+            with open(self._persist_path, 'r') as f:
+                cache = json.load(f, cls=CacheDecoder, client=self.client)
+        except Exception as e:
+            logger.warning(f'Failed to read discovery cache from {self._persist_path}, it will be rebuilt: {e}')
+            return False
+        if cache.get('library_version') != openshift_version:
+            return False
+        self._cache = cache
+        return True
+
+    def _write_cache(self):
+        if self._persist_path is None:
+            return
+        tmp_path = f'{self._persist_path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._cache, f, cls=CacheEncoder)
+            os.replace(tmp_path, self._persist_path)
+        except Exception as e:
+            logger.warning(f'Failed to write discovery cache to {self._persist_path}: {e}')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def search(self, prefix=None, group=None, api_version=None, kind=None, **kwargs):
+        if not group and api_version and '/' in api_version:
+            group, api_version = api_version.split('/')
+        with self._lock:
+            results = self.__find(prefix, group, api_version, kind, kwargs)
+            if results:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+                self.__refresh_for(prefix, group, api_version)
+                results = self.__find(prefix, group, api_version, kind, kwargs)
+            if self._dirty:
+                self._write_cache()
+                self._dirty = False
+            return results
+
+    def resolve(self, api_version, kind):
+        """
+        Memoized get of the resource for an apiVersion and kind. Kinds that are not found are remembered for
+        negative_ttl_seconds, so repeated lookups of an unknown kind do not each refresh discovery. All resolutions
+        are forgotten whenever discovered resources are refreshed or invalidated
+        """
+        key = (api_version, kind)
+        with self._lock:
+            resolution = self._resolutions.get(key)
+            if resolution is not None:
+                if resolution.resolved is not None:
+                    self.stats.resolution_hits += 1
+                    return resolution.resolved
+                if time.monotonic() < resolution.expires_at:
+                    self.stats.negative_resolution_hits += 1
+                    raise ResourceNotFoundError(resolution.not_found_message)
+                self._resolutions.pop(key)
+            try:
+                resolved = ResolvedResource(self.get(api_version=api_version, kind=kind))
+            except ResourceNotFoundError as e:
+                if self.negative_ttl_seconds is not None and self.negative_ttl_seconds > 0:
+                    self._resolutions[key] = _Resolution(not_found_message=str(e), expires_at=time.monotonic() + self.negative_ttl_seconds)
+                raise
+            self._resolutions[key] = _Resolution(resolved=resolved)
+            return resolved
+
+    def invalidate_group(self, group):
+        with self._lock:
+            groups = self._cache.get('resources', {}).get(GROUPS_PREFIX, {})
+            if group in groups:
+                logger.debug(f'Invalidating discovered resources for API group {group}')
+                groups.pop(group)
+                self._dirty = True
+            self._resolutions = {}
+
+    def __find(self, prefix, group, api_version, kind, extra_terms):
+        resources = self._cache.get('resources', {})
+        if not group and api_version:
+            # "v1" is the core group, only fallback to searching all groups for the version if it's not found there
+            core_matches = self.__find_in(resources, prefix, '', api_version, kind, extra_terms)
+            if core_matches:
+                return core_matches
+        return self.__find_in(resources, prefix, group or None, api_version, kind, extra_terms)
+
+    def __find_in(self, resources, prefix, group, api_version, kind, extra_terms):
+        matches = []
+        for prefix_key, groups in resources.items():
+            if prefix and prefix_key != prefix:
+                continue
+            for group_key, versions in groups.items():
+                if group is not None and group_key != group:
+                    continue
+                for version_key, resource_group in versions.items():
+                    if api_version and version_key != api_version:
+                        continue
+                    self.__ensure_loaded(prefix_key, group_key, version_key, resource_group)
+                    matches.extend(self.__match_kind(resource_group.resources, kind, extra_terms))
+        return matches
+
+    def __match_kind(self, resources, kind, extra_terms):
+        if kind:
+            candidates = resources.get(kind, [])
+        else:
+            candidates = [resource for kind_resources in resources.values() for resource in kind_resources]
+        if extra_terms:
+            for resource in candidates:
+                for term, value in extra_terms.items():
+                    if getattr(resource, term, None) == value:
+                        return [resource]
+            return []
+        return list(candidates)
+
+    def __ensure_loaded(self, prefix, group, version, resource_group):
+        if not resource_group.resources:
+            resource_group.resources = self.get_resources_for_api_version(prefix, group, version, resource_group.preferred)
+            self.stats.group_version_loads += 1
+            self._dirty = True
+
+    def __refresh_for(self, prefix, group, api_version):
+        resources = self._cache.get('resources', {})
+        if not group and api_version:
+            group = ''
+        if group is not None and api_version:
+            if not prefix:
+                prefix = CORE_PREFIX if group == '' else GROUPS_PREFIX
+            resource_group = resources.get(prefix, {}).get(group, {}).get(api_version)
+            if resource_group is not None:
+                logger.debug(f'Refreshing discovered resources for {prefix}/{group}/{api_version}')
+                resource_group.resources = self.get_resources_for_api_version(prefix, group, api_version, resource_group.preferred)
+                self.stats.group_version_refreshes += 1
+                self._dirty = True
+                self._resolutions = {}
+                return
+        self.__refresh_group_list()
+
+    def __refresh_group_list(self):
+        logger.debug('Refreshing discovered API groups')
+        resources = self._cache.get('resources', {})
+        # parse_api_groups keeps resources already loaded for groups under "apis" but resets the core groups
+        preserved_core = resources.get(CORE_PREFIX)
+        self.parse_api_groups(request_resources=False, update=True)
+        if preserved_core is not None:
+            self._cache['resources'][CORE_PREFIX] = preserved_core
+        self.stats.group_list_refreshes += 1
+        self._dirty = True
+        self._resolutions = {}
+
+class DynamicClientRegistry:
+
+    def __init__(self, capacity=20, persist=False, cache_dir=None, negative_ttl_seconds=DEFAULT_NEGATIVE_TTL_SECONDS):
+        self.capacity = capacity
+        self.persist = persist
+        self.cache_dir = cache_dir
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._clients = collections.OrderedDict()
+        # Stats of clients no longer held, so totals do not go down when a client is evicted or replaced
+        self._retired_stats = DiscoveryStats()
+        self._lock = threading.Lock()
+
+    def configure(self, capacity=None, persist=None, cache_dir=None, negative_ttl_seconds=None):
+        with self._lock:
+            if negative_ttl_seconds is not None:
+                self.negative_ttl_seconds = negative_ttl_seconds
+            if capacity is not None:
+                self.capacity = capacity
+            if persist is not None:
+                self.persist = persist
+            if cache_dir is not None:
+                self.cache_dir = cache_dir
+
+    def get(self, key, base_kube_client):
+        with self._lock:
+            dynamic_client = self._clients.get(key)
+            if dynamic_client is not None and dynamic_client.client is base_kube_client:
+                self._clients.move_to_end(key)
+                return dynamic_client
+            if dynamic_client is not None:
+                self.__retire(dynamic_client)
+            dynamic_client = self.__build(key, base_kube_client)
+            self._clients[key] = dynamic_client
+            self._clients.move_to_end(key)
+            while self.capacity is not None and self.capacity > 0 and len(self._clients) > self.capacity:
+                _, evicted = self._clients.popitem(last=False)
+                self.__retire(evicted)
+            return dynamic_client
+
+    def __retire(self, dynamic_client):
+        discoverer_stats = getattr(dynamic_client.resources, 'stats', None)
+        if discoverer_stats is not None:
+            self._retired_stats.add(discoverer_stats)
+
+    def stats(self):
+        """
+        Totals of all clients held by this registry since it was created (or cleared), including those since evicted
+        """
+        with self._lock:
+            totals = DiscoveryStats()
+            totals.add(self._retired_stats)
+            for dynamic_client in self._clients.values():
+                discoverer_stats = getattr(dynamic_client.resources, 'stats', None)
+                if discoverer_stats is not None:
+                    totals.add(discoverer_stats)
+            return totals
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self._retired_stats = DiscoveryStats()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __build(self, key, base_kube_client):
+        cache_file = None
+        if self.persist:
+            cache_dir = self.cache_dir if self.cache_dir is not None else tempfile.gettempdir()
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_file = os.path.join(cache_dir, f'kubedriver-discovery-{key}.json')
+        discoverer = functools.partial(CachingDiscoverer, persist=self.persist, negative_ttl_seconds=self.negative_ttl_seconds)
+        return DynamicClient(base_kube_client, cache_file=cache_file, discoverer=discoverer)
+
+default_dynamic_client_registry = DynamicClientRegistry()
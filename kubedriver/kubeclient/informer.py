@@ -0,0 +1,381 @@
+import time
+import collections
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ADDED = 'ADDED'
+MODIFIED = 'MODIFIED'
+DELETED = 'DELETED'
+BOOKMARK = 'BOOKMARK'
+ERROR = 'ERROR'
+
+GONE_STATUS = 410
+
+# Helm 3 stores each release revision in a Secret labelled with the owner and release name
+HELM_RELEASE_API_VERSION = 'v1'
+HELM_RELEASE_KIND = 'Secret'
+HELM_RELEASE_SELECTOR = 'owner=helm'
+HELM_RELEASE_NAME_LABEL = 'name'
+
+INDEX_MATCH = 'index'
+HELM_RELEASE_MATCH = 'helm-release'
+
+class StoreFullError(Exception):
+    pass
+
+class ObjectStore:
+
+    def __init__(self, max_objects=10000, index_label=None):
+        self.max_objects = max_objects
+        self.index_label = index_label
+        self._objects = {}
+        self._index = {}
+        self._count = 0
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def get(self, api_version, kind, namespace, name):
+        with self._lock:
+            return self._objects.get((api_version, kind), {}).get((namespace, name))
+
+    def list_indexed(self, index_value):
+        with self._lock:
+            return [self._objects[kind_key][object_key] for kind_key, object_key in self._index.get(index_value, set())]
+
+    def count(self):
+        with self._lock:
+            return self._count
+
+    def replace_kind(self, api_version, kind, objects):
+        with self._lock:
+            previous = dict(self._objects.get((api_version, kind), {}))
+            self.clear_kind(api_version, kind)
+            for obj in objects:
+                self.__put(api_version, kind, obj, notify=False)
+            # Changes made whilst no watch was running are only seen on the re-list
+            current = self._objects.get((api_version, kind), {})
+            for object_key, obj in current.items():
+                existing = previous.pop(object_key, None)
+                if existing is None:
+                    self.__notify(ADDED, api_version, kind, obj)
+                elif self.__resource_version(existing) != self.__resource_version(obj):
+                    self.__notify(MODIFIED, api_version, kind, obj)
+            for obj in previous.values():
+                self.__notify(DELETED, api_version, kind, obj)
+
+    def put(self, api_version, kind, obj):
+        with self._lock:
+            self.__put(api_version, kind, obj, notify=True)
+
+    def remove(self, api_version, kind, obj):
+        with self._lock:
+            kind_key = (api_version, kind)
+            object_key = self.__object_key(obj)
+            existing = self._objects.get(kind_key, {}).pop(object_key, None)
+            if existing is not None:
+                self._count -= 1
+                self.__unindex(kind_key, object_key, existing)
+            self.__notify(DELETED, api_version, kind, obj)
+
+    def clear_kind(self, api_version, kind):
+        with self._lock:
+            kind_key = (api_version, kind)
+            existing = self._objects.pop(kind_key, {})
+            self._count -= len(existing)
+            for object_key, obj in existing.items():
+                self.__unindex(kind_key, object_key, obj)
+
+    def __put(self, api_version, kind, obj, notify=True):
+        kind_key = (api_version, kind)
+        object_key = self.__object_key(obj)
+        kind_objects = self._objects.setdefault(kind_key, {})
+        existing = kind_objects.get(object_key)
+        if existing is None:
+            if self.max_objects is not None and self._count >= self.max_objects:
+                raise StoreFullError(f'Object store has reached it\'s limit of {self.max_objects} objects')
+            self._count += 1
+        else:
+            self.__unindex(kind_key, object_key, existing)
+        kind_objects[object_key] = obj
+        self.__index(kind_key, object_key, obj)
+        if notify:
+            self.__notify(MODIFIED if existing is not None else ADDED, api_version, kind, obj)
+
+    def __object_key(self, obj):
+        metadata = obj.get('metadata') or {}
+        return (metadata.get('namespace'), metadata.get('name'))
+
+    def __resource_version(self, obj):
+        return (obj.get('metadata') or {}).get('resourceVersion')
+
+    def __index_value(self, obj):
+        if self.index_label is None:
+            return None
+        labels = (obj.get('metadata') or {}).get('labels') or {}
+        return labels.get(self.index_label)
+
+    def __index(self, kind_key, object_key, obj):
+        index_value = self.__index_value(obj)
+        if index_value is not None:
+            self._index.setdefault(index_value, set()).add((kind_key, object_key))
+
+    def __unindex(self, kind_key, object_key, obj):
+        index_value = self.__index_value(obj)
+        if index_value is not None and index_value in self._index:
+            self._index[index_value].discard((kind_key, object_key))
+            if len(self._index[index_value]) == 0:
+                self._index.pop(index_value)
+
+    def __notify(self, event_type, api_version, kind, obj):
+        for listener in list(self._listeners):
+            try:
+                listener(event_type, api_version, kind, obj)
+            except Exception as e:
+                logger.exception(f'Object store listener failed to handle {event_type} event: {e}')
+
+class ChangeNotifier:
+    """
+    Records which subscribers have had a change to one of their objects since they last checked.
+
+    Each subscription is a set of match keys, each object event is converted to match keys by the function given
+    when the store was attached. A subscription is notified when they share a key.
+    """
+
+    def __init__(self, max_subscriptions=1000):
+        self.max_subscriptions = max_subscriptions
+        self._subscriptions = collections.OrderedDict()
+        self._notified = set()
+        self._lock = threading.Lock()
+
+    def attach(self, store, match_keys_func):
+        def listener(event_type, api_version, kind, obj):
+            self.__on_event(match_keys_func(api_version, kind, obj))
+        store.add_listener(listener)
+
+    def subscribe(self, subscriber, match_keys):
+        with self._lock:
+            self._subscriptions.pop(subscriber, None)
+            self._subscriptions[subscriber] = set(match_keys)
+            self._notified.discard(subscriber)
+            while self.max_subscriptions is not None and len(self._subscriptions) > self.max_subscriptions:
+                oldest, _ = self._subscriptions.popitem(last=False)
+                self._notified.discard(oldest)
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscriptions.pop(subscriber, None)
+            self._notified.discard(subscriber)
+
+    def is_subscribed(self, subscriber):
+        with self._lock:
+            return subscriber in self._subscriptions
+
+    def consume(self, subscriber):
+        """
+        Returns True if the subscriber has been notified of a change since it subscribed or last called this method
+        """
+        with self._lock:
+            if subscriber in self._notified:
+                self._notified.discard(subscriber)
+                return True
+            return False
+
+    def __on_event(self, match_keys):
+        if len(match_keys) == 0:
+            return
+        with self._lock:
+            for subscriber, subscribed_keys in self._subscriptions.items():
+                if not subscribed_keys.isdisjoint(match_keys):
+                    self._notified.add(subscriber)
+
+class KindInformer:
+
+    def __init__(self, api_ctl, api_version, kind, store, label_selector=None, resync_seconds=300, watch_timeout_seconds=60,
+                    page_size=500, retry_seconds=30):
+        self.api_ctl = api_ctl
+        self.api_version = api_version
+        self.kind = kind
+        self.store = store
+        self.label_selector = label_selector
+        self.resync_seconds = resync_seconds
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.page_size = page_size
+        self.retry_seconds = retry_seconds
+        self.disabled = False
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.__run, name=f'informer-{kind}', daemon=True)
+
+    @property
+    def synced(self):
+        return self._synced.is_set() and not self.disabled
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._synced.clear()
+
+    def wait_for_sync(self, timeout=None):
+        return self._synced.wait(timeout)
+
+    def __run(self):
+        while not self._stopped.is_set():
+            try:
+                resource_version = self.__list()
+                self._synced.set()
+                self.__watch_until_resync(resource_version)
+            except StoreFullError as e:
+                logger.warning(f'Disabling informer for {self.api_version}/{self.kind}, objects will be read directly from the API: {e}')
+                self.disabled = True
+                self.__unsync()
+                return
+            except Exception as e:
+                logger.warning(f'Informer for {self.api_version}/{self.kind} failed, will retry in {self.retry_seconds} seconds: {e}')
+                self.__unsync()
+                self._stopped.wait(self.retry_seconds)
+        self.__unsync()
+
+    def __unsync(self):
+        self._synced.clear()
+        self.store.clear_kind(self.api_version, self.kind)
+
+    def __list(self):
+        items = []
+        continue_token = None
+        while True:
+            list_result = self.api_ctl.list_objects(self.api_version, self.kind, label_selector=self.label_selector,
+                                                        limit=self.page_size, continue_token=continue_token)
+            items.extend(list_result.get('items') or [])
+            list_metadata = list_result.get('metadata') or {}
+            continue_token = list_metadata.get('continue')
+            if not continue_token:
+                self.store.replace_kind(self.api_version, self.kind, items)
+                return list_metadata.get('resourceVersion')
+
+    def __watch_until_resync(self, resource_version):
+        resync_at = time.monotonic() + self.resync_seconds
+        while not self._stopped.is_set():
+            remaining = resync_at - time.monotonic()
+            if remaining <= 0:
+                return
+            timeout = int(max(1, min(self.watch_timeout_seconds, remaining)))
+            for event in self.api_ctl.watch_objects(self.api_version, self.kind, label_selector=self.label_selector,
+                                                        resource_version=resource_version, timeout_seconds=timeout):
+                if self._stopped.is_set():
+                    return
+                event_type = event.get('type')
+                obj = event.get('raw_object') or {}
+                if event_type == ERROR:
+                    if obj.get('code') == GONE_STATUS:
+                        # resourceVersion too old, start again with a fresh list
+                        return
+                    raise ValueError(f'Watch returned an error: {obj.get("message")}')
+                resource_version = (obj.get('metadata') or {}).get('resourceVersion', resource_version)
+                if event_type in (ADDED, MODIFIED):
+                    self.store.put(self.api_version, self.kind, obj)
+                elif event_type == DELETED:
+                    self.store.remove(self.api_version, self.kind, obj)
+
+class InformerManager:
+
+    def __init__(self, api_ctl, label_selector=None, index_label=None, max_objects=10000, max_kinds=50, resync_seconds=300,
+                    watch_timeout_seconds=60, page_size=500, retry_seconds=30):
+        self.api_ctl = api_ctl
+        self.label_selector = label_selector
+        self.max_kinds = max_kinds
+        self.resync_seconds = resync_seconds
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.page_size = page_size
+        self.retry_seconds = retry_seconds
+        self.index_label = index_label
+        self.store = ObjectStore(max_objects=max_objects, index_label=index_label)
+        self.helm_release_store = ObjectStore(max_objects=max_objects)
+        self.notifier = ChangeNotifier()
+        self.notifier.attach(self.store, self.__index_match_keys)
+        self.notifier.attach(self.helm_release_store, self.__helm_release_match_keys)
+        self._helm_release_informer = None
+        self._informers = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def watch(self, api_version, kind):
+        with self._lock:
+            key = (api_version, kind)
+            if self._closed or key in self._informers:
+                return
+            if self.max_kinds is not None and len(self._informers) >= self.max_kinds:
+                return
+            logger.debug(f'Starting informer for {api_version}/{kind}')
+            informer = KindInformer(self.api_ctl, api_version, kind, self.store, label_selector=self.label_selector,
+                                        resync_seconds=self.resync_seconds, watch_timeout_seconds=self.watch_timeout_seconds,
+                                        page_size=self.page_size, retry_seconds=self.retry_seconds)
+            self._informers[key] = informer
+            informer.start()
+
+    def watch_helm_releases(self):
+        with self._lock:
+            if self._closed or self._helm_release_informer is not None:
+                return
+            logger.debug('Starting informer for Helm releases')
+            self._helm_release_informer = KindInformer(self.api_ctl, HELM_RELEASE_API_VERSION, HELM_RELEASE_KIND, self.helm_release_store,
+                                                            label_selector=HELM_RELEASE_SELECTOR, resync_seconds=self.resync_seconds,
+                                                            watch_timeout_seconds=self.watch_timeout_seconds, page_size=self.page_size,
+                                                            retry_seconds=self.retry_seconds)
+            self._helm_release_informer.start()
+
+    @staticmethod
+    def index_match_key(index_value):
+        return (INDEX_MATCH, index_value)
+
+    @staticmethod
+    def helm_release_match_key(name, namespace):
+        return (HELM_RELEASE_MATCH, namespace, name)
+
+    def __index_match_keys(self, api_version, kind, obj):
+        labels = (obj.get('metadata') or {}).get('labels') or {}
+        if self.index_label is None or labels.get(self.index_label) is None:
+            return []
+        return [InformerManager.index_match_key(labels.get(self.index_label))]
+
+    def __helm_release_match_keys(self, api_version, kind, obj):
+        metadata = obj.get('metadata') or {}
+        release_name = (metadata.get('labels') or {}).get(HELM_RELEASE_NAME_LABEL)
+        if release_name is None:
+            return []
+        return [InformerManager.helm_release_match_key(release_name, metadata.get('namespace'))]
+
+    def is_synced(self, api_version, kind):
+        informer = self._informers.get((api_version, kind))
+        return informer is not None and informer.synced
+
+    def get(self, api_version, kind, namespace, name):
+        """
+        Returns a tuple of (synced, obj). When synced is False the store has no reliable view of this kind and the
+        object must be read from the API
+        """
+        if not self.is_synced(api_version, kind):
+            return False, None
+        return True, self.store.get(api_version, kind, namespace, name)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for informer in self._informers.values():
+                informer.stop()
+            self._informers.clear()
+            if self._helm_release_informer is not None:
+                self._helm_release_informer.stop()
+                self._helm_release_informer = None
@@ -12,12 +12,24 @@ GET_ACTION = 'get'
 LIST_ACTION = 'list'
 API_CLIENT_CLASS_SUFFIX = 'Api'
 
+# Results of the reflection on the kubernetes.client module never change, so are shared by all directors
+_api_client_class_names = {}
+_method_ready_kinds = {}
+_class_attributes = {}
+
 class KubeModDirector:
 
     def __init__(self):
         self.api_version_parser = ApiVersionParser()
     
     def get_api_client_class_name_for_version(self, api_version):
+        api_client_name = _api_client_class_names.get(api_version)
+        if api_client_name is None:
+            api_client_name = self.__find_api_client_class_name_for_version(api_version)
+            _api_client_class_names[api_version] = api_client_name
+        return api_client_name
+
+    def __find_api_client_class_name_for_version(self, api_version):
         resource_group, resource_version = self.api_version_parser.parse(api_version)
         # Remove the k8s.io part
         if EXTENSIONS_GROUP_SUFFIX in resource_group:
@@ -47,34 +59,46 @@ class KubeModDirector:
         return api_class(base_kube_client)
 
     def convert_kind_to_method_ready(self, kind):
-        # Lower case and split camel case to snake_case
-        kind = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', kind)
-        kind = re.sub('([a-z0-9])([A-Z])', r'\1_\2', kind).lower()
-        return kind
+        method_ready_kind = _method_ready_kinds.get(kind)
+        if method_ready_kind is None:
+            # Lower case and split camel case to snake_case
+            method_ready_kind = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', kind)
+            method_ready_kind = re.sub('([a-z0-9])([A-Z])', r'\1_\2', method_ready_kind).lower()
+            _method_ready_kinds[kind] = method_ready_kind
+        return method_ready_kind
 
     def try_namespaced_method(self, api_client, action_type, kind):
         method_ready_kind = self.convert_kind_to_method_ready(kind)
         namespaced_method_name = '{0}_namespaced_{1}'.format(action_type, method_ready_kind)
-        found = hasattr(api_client, namespaced_method_name)
-        if found:
-            return found, getattr(api_client, namespaced_method_name)
-        return found, None
+        return self.__try_method(api_client, namespaced_method_name)
 
     def try_plain_method(self, api_client, action_type, kind):
         method_ready_kind = self.convert_kind_to_method_ready(kind)
         plain_method_name = '{0}_{1}'.format(action_type, method_ready_kind)
-        found = hasattr(api_client, plain_method_name)
-        if found:
-            return found, getattr(api_client, plain_method_name)
-        return found, None
+        return self.__try_method(api_client, plain_method_name)
     
     def try_cluster_method(self, api_client, action_type, kind):
         method_ready_kind = self.convert_kind_to_method_ready(kind)
         method_name = '{0}_cluster_{1}'.format(action_type, method_ready_kind)
-        found = hasattr(api_client, method_name)
+        return self.__try_method(api_client, method_name)
+
+    def __try_method(self, api_client, method_name):
+        found = self.__has_class_attribute(api_client, method_name)
         if found:
             return found, getattr(api_client, method_name)
         return found, None
 
+    def __has_class_attribute(self, api_client, name):
+        api_class = api_client.__class__
+        if api_class.__module__.startswith(kubernetes_client_mod.__name__):
+            # API methods are defined on the class, so the check can be shared by every instance
+            key = (api_class, name)
+            found = _class_attributes.get(key)
+            if found is None:
+                found = hasattr(api_client, name)
+                _class_attributes[key] = found
+            return found
+        return hasattr(api_client, name)
+
     def is_custom_obj_api(self, api_client):
         return api_client.__class__ == kubernetes_client_mod.CustomObjectsApi
\ No newline at end of file
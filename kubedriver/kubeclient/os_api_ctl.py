@@ -1,85 +1,79 @@
+import json
 import logging
 import uuid
-from .defaults import DEFAULT_NAMESPACE
+from .defaults import DEFAULT_NAMESPACE, DEFAULT_FIELD_MANAGER
+from .discovery import CachingDiscoverer, ResolvedResource
 from openshift.dynamic.exceptions import NotFoundError
 from openshift.dynamic import DynamicClient
 from kubernetes.client import V1DeleteOptions
-from ignition.service.logging import logging_context
+from kubedriver.wirelog import WireLogger
+from kubedriver.metrics import default_metrics_registry
 from kubernetes.client.exceptions import ApiException
-import copy
 
 logger = logging.getLogger(__name__)
 
+API_REQUEST_SECONDS = default_metrics_registry.histogram('kubedriver_kube_api_request_duration_seconds', 'Duration of Kubernetes API requests',
+                                                            label_names=['verb', 'kind', 'location'])
+
+APPLY_PATCH_CONTENT_TYPE = 'application/apply-patch+yaml'
+MERGE_PATCH_CONTENT_TYPE = 'application/merge-patch+json'
+DRY_RUN_ALL = 'All'
+
 class OpenshiftApiController:
 
-    def __init__(self, base_kube_client, default_namespace=DEFAULT_NAMESPACE):
+    def __init__(self, base_kube_client, default_namespace=DEFAULT_NAMESPACE, dynamic_client=None, wire_logger=None, location_name=None):
         self.base_kube_client = base_kube_client
-        self.dynamic_client = DynamicClient(base_kube_client)
+        self.location_name = location_name
+        self.dynamic_client = dynamic_client if dynamic_client is not None else DynamicClient(base_kube_client)
         self.default_namespace = default_namespace
+        self.wire_logger = wire_logger if wire_logger is not None else WireLogger(logger)
 
-    def __get_resource_client(self, api_version, kind):
-        return self.dynamic_client.resources.get(api_version=api_version, kind=kind)
+    def __resolve(self, api_version, kind):
+        resources = self.dynamic_client.resources
+        if isinstance(resources, CachingDiscoverer):
+            return resources.resolve(api_version, kind)
+        return ResolvedResource(resources.get(api_version=api_version, kind=kind))
 
     def _generate_additional_logs(self, body, message_direction, external_request_id, content_type,
                                   message_type, protocol, protocol_metadata, driver_request_id):
-        try:
-            # Removing sensitive data from logs
-            filtered_protocol_metadata = copy.deepcopy(protocol_metadata)
-            if 'headers' in protocol_metadata.keys():
-                for key in protocol_metadata['headers']:
-                    if(key.lower() == "authorization" or key.lower() == "set-cookie"):
-                        filtered_protocol_metadata['headers'].pop(key)
-
-            logging_context_dict = {'message_direction' : message_direction, 'tracectx.externalrequestid' : external_request_id,
-                                    'content_type' : content_type, 'message_type' : message_type,
-                                    'protocol' : protocol, 'protocol_metadata' : str(filtered_protocol_metadata).replace("'", '\"'),
-                                    'tracectx.driverrequestid' : driver_request_id}
-            logging_context.set_from_dict(logging_context_dict)
-
-            logger.info(str(body).replace("'", '\"'))
-        finally:
-            if('message_direction' in logging_context.data):
-                logging_context.data.pop("message_direction")
-            if('tracectx.externalrequestid' in logging_context.data):
-                logging_context.data.pop("tracectx.externalrequestid")
-            if('content_type' in logging_context.data):
-                logging_context.data.pop("content_type")
-            if('message_type' in logging_context.data):
-                logging_context.data.pop("message_type")
-            if('protocol' in logging_context.data):
-                logging_context.data.pop("protocol")
-            if('protocol_metadata' in logging_context.data):
-                logging_context.data.pop("protocol_metadata")
-            if('tracectx.driverrequestid' in logging_context.data):
-                logging_context.data.pop("tracectx.driverrequestid")
-
-    
-    def create_object(self, object_config, default_namespace=None, driver_request_id=None):
+        self.wire_logger.log(body, message_direction, external_request_id, content_type, message_type, protocol, protocol_metadata, driver_request_id)
+
+    def create_object(self, object_config, default_namespace=None, dry_run=False, driver_request_id=None):
         logger.debug("Calling create_object API")
-        resource_client = self.__get_resource_client(object_config.api_version, object_config.kind)
+        resolved = self.__resolve(object_config.api_version, object_config.kind)
+        resource_client = resolved.resource
         create_args = self.__build_create_arguments(resource_client, object_config, default_namespace)
+        self.__add_dry_run_argument(create_args, dry_run)
         external_request_id = str(uuid.uuid4())
         logger.debug("create_args : %s", create_args)
-        uri = resource_client.client.client.configuration.host + resource_client.urls['base'] + "/" + object_config.metadata.get('name')
+        uri = resource_client.client.client.configuration.host + resolved.base_url + "/" + object_config.metadata.get('name')
         self._generate_additional_logs(create_args['body'], 'sent', external_request_id, 'application/json',
                                        'request', 'http', {'uri' : uri, 'method' : 'post'}, driver_request_id)
         try:
-            return_obj = resource_client.create(**create_args)
+            with API_REQUEST_SECONDS.time(verb='create', kind=object_config.kind, location=self.location_name):
+                return_obj = resource_client.create(**create_args)
             # Have to change the response logs for success case
-            self._generate_additional_logs(return_obj.to_dict(), 'received', external_request_id, 'application/json',
+            self._generate_additional_logs(return_obj.to_dict, 'received', external_request_id, 'application/json',
                                         'response', 'http', {'status_code' : 201}, driver_request_id)
+            if not dry_run:
+                self.__invalidate_discovery_for_crd(object_config)
             return return_obj
         except ApiException as e:
             dict_headers = {}
             if hasattr(e, 'headers'):
                 for header_key in e.headers:
                     dict_headers[header_key] = e.headers[header_key]
-            self._generate_additional_logs(e.body.decode('ASCII'), 'received', external_request_id, 'application/json', 'response', 'http',
+            self._generate_additional_logs(e.body, 'received', external_request_id, 'application/json', 'response', 'http',
                                           {'status_code' : e.status, 'status_reason_phrase' : e.reason, 'headers' : dict_headers},
                                           driver_request_id)
             raise e
         
 
+    def __add_dry_run_argument(self, args, dry_run):
+        if dry_run:
+            # Validated and admitted by the API server, but not persisted
+            args['dry_run'] = DRY_RUN_ALL
+
     def __build_create_arguments(self, resource_client, object_config, supplied_default_namespace):
         args = {
             'body': object_config.data
@@ -88,18 +82,106 @@ class OpenshiftApiController:
             args['namespace'] = self.__determine_namespace(object_config, supplied_default_namespace)
         return args
 
-    def update_object(self, object_config, default_namespace=None, driver_request_id=None):
+    def update_object(self, object_config, default_namespace=None, dry_run=False, driver_request_id=None):
         logger.debug("Calling update_object API")
-        resource_client = self.__get_resource_client(object_config.api_version, object_config.kind)
+        resolved = self.__resolve(object_config.api_version, object_config.kind)
+        resource_client = resolved.resource
         update_args = self.__build_update_arguments(resource_client, object_config, default_namespace)
+        self.__add_dry_run_argument(update_args, dry_run)
         external_request_id = str(uuid.uuid4())
         logger.debug("update_args : %s", update_args)
-        uri = resource_client.client.client.configuration.host + resource_client.urls['base'] + "/" + object_config.metadata.get('name')
+        uri = resource_client.client.client.configuration.host + resolved.base_url + "/" + object_config.metadata.get('name')
         self._generate_additional_logs(update_args['body'], 'sent', external_request_id, 'application/json',
                                        'request', 'http', {'uri' : uri, 'method':'put'}, driver_request_id)   
         try:
-            return_obj = resource_client.replace(**update_args)
-            self._generate_additional_logs(return_obj.to_dict(), 'received', external_request_id, 'application/json',
+            with API_REQUEST_SECONDS.time(verb='update', kind=object_config.kind, location=self.location_name):
+                return_obj = resource_client.replace(**update_args)
+            self._generate_additional_logs(return_obj.to_dict, 'received', external_request_id, 'application/json',
+                                        'response', 'http', {'status_code' : 200}, driver_request_id)
+            if not dry_run:
+                self.__invalidate_discovery_for_crd(object_config)
+            return return_obj
+        except ApiException as e:
+            dict_headers = {}
+            if hasattr(e, 'headers'):
+                for header_key in e.headers:
+                    dict_headers[header_key] = e.headers[header_key]
+            self._generate_additional_logs(e.body, 'received', external_request_id, 'application/json', 'response', 'http',
+                                          {'status_code' : e.status, 'status_reason_phrase' : e.reason, 'headers' : dict_headers},
+                                          driver_request_id)
+            raise e
+
+    def apply_object(self, object_config, default_namespace=None, field_manager=DEFAULT_FIELD_MANAGER, force=True, dry_run=False, driver_request_id=None):
+        logger.debug("Calling apply_object API")
+        resolved = self.__resolve(object_config.api_version, object_config.kind)
+        resource_client = resolved.resource
+        apply_args = self.__build_apply_arguments(resource_client, object_config, default_namespace, field_manager, force)
+        self.__add_dry_run_argument(apply_args, dry_run)
+        external_request_id = str(uuid.uuid4())
+        logger.debug("apply_args : %s", apply_args)
+        uri = resource_client.client.client.configuration.host + resolved.base_url + "/" + object_config.metadata.get('name')
+        self._generate_additional_logs(object_config.data, 'sent', external_request_id, APPLY_PATCH_CONTENT_TYPE,
+                                       'request', 'http', {'uri' : uri, 'method':'patch'}, driver_request_id)
+        try:
+            with API_REQUEST_SECONDS.time(verb='apply', kind=object_config.kind, location=self.location_name):
+                return_obj = resource_client.patch(**apply_args)
+            self._generate_additional_logs(return_obj.to_dict, 'received', external_request_id, 'application/json',
+                                        'response', 'http', {'status_code' : 200}, driver_request_id)
+            if not dry_run:
+                self.__invalidate_discovery_for_crd(object_config)
+            return return_obj
+        except ApiException as e:
+            dict_headers = {}
+            if hasattr(e, 'headers'):
+                for header_key in e.headers:
+                    dict_headers[header_key] = e.headers[header_key]
+            self._generate_additional_logs(e.body, 'received', external_request_id, 'application/json', 'response', 'http',
+                                          {'status_code' : e.status, 'status_reason_phrase' : e.reason, 'headers' : dict_headers},
+                                          driver_request_id)
+            raise e
+
+    def __build_apply_arguments(self, resource_client, object_config, supplied_default_namespace, field_manager, force):
+        query_params = [('fieldManager', field_manager)]
+        if force:
+            query_params.append(('force', 'true'))
+        args = {
+            # The Kubernetes client only serializes dict bodies for JSON content types, so the (JSON is valid YAML) body is serialized here
+            'body': json.dumps(object_config.data),
+            'name': object_config.metadata.get('name'),
+            'content_type': APPLY_PATCH_CONTENT_TYPE,
+            'query_params': query_params
+        }
+        if resource_client.namespaced:
+            args['namespace'] = self.__determine_namespace(object_config, supplied_default_namespace)
+        return args
+
+    def patch_object(self, api_version, kind, name, patch, namespace=None, subresource=None, content_type=MERGE_PATCH_CONTENT_TYPE, driver_request_id=None):
+        """
+        Patches an object (a JSON merge patch by default). When a subresource (e.g. 'status') is given, the patch is sent to it,
+        unless the kind does not serve that subresource, in which case the object itself is patched
+        """
+        logger.debug("Calling patch_object API")
+        resolved = self.__resolve(api_version, kind)
+        resource_client = resolved.resource
+        uri = resource_client.client.client.configuration.host + resolved.base_url + "/" + name
+        if subresource is not None and subresource in resource_client.subresources:
+            resource_client = resource_client.subresources[subresource]
+            uri = uri + "/" + subresource
+        patch_args = {
+            'body': patch,
+            'name': name,
+            'content_type': content_type
+        }
+        if resolved.namespaced:
+            patch_args['namespace'] = namespace if namespace is not None else self.default_namespace
+        external_request_id = str(uuid.uuid4())
+        logger.debug("patch_args : %s", patch_args)
+        self._generate_additional_logs(patch, 'sent', external_request_id, content_type,
+                                       'request', 'http', {'uri' : uri, 'method':'patch'}, driver_request_id)
+        try:
+            with API_REQUEST_SECONDS.time(verb='patch', kind=kind, location=self.location_name):
+                return_obj = resource_client.patch(**patch_args)
+            self._generate_additional_logs(return_obj.to_dict, 'received', external_request_id, 'application/json',
                                         'response', 'http', {'status_code' : 200}, driver_request_id)
             return return_obj
         except ApiException as e:
@@ -107,11 +189,21 @@ class OpenshiftApiController:
             if hasattr(e, 'headers'):
                 for header_key in e.headers:
                     dict_headers[header_key] = e.headers[header_key]
-            self._generate_additional_logs(e.body.decode('ASCII'), 'received', external_request_id, 'application/json', 'response', 'http',
+            self._generate_additional_logs(e.body, 'received', external_request_id, 'application/json', 'response', 'http',
                                           {'status_code' : e.status, 'status_reason_phrase' : e.reason, 'headers' : dict_headers},
                                           driver_request_id)
             raise e
 
+    def __invalidate_discovery_for_crd(self, object_config):
+        # The kinds served by a new/updated CRD will not be in the discovery cache, so make sure they are found next time
+        if object_config.kind != 'CustomResourceDefinition':
+            return
+        spec = object_config.data.get('spec', {})
+        group = spec.get('group') if isinstance(spec, dict) else None
+        resources = self.dynamic_client.resources
+        if group is not None and hasattr(resources, 'invalidate_group'):
+            resources.invalidate_group(group)
+
     def __build_update_arguments(self, resource_client, object_config, supplied_default_namespace):
         args = {
             'body': object_config.data
@@ -129,16 +221,18 @@ class OpenshiftApiController:
 
     def read_object(self, api_version, kind, name, namespace=None, driver_request_id=None):
         logger.debug("Calling read_object API")
-        resource_client = self.__get_resource_client(api_version, kind)
+        resolved = self.__resolve(api_version, kind)
+        resource_client = resolved.resource
         read_args = self.__build_read_arguments(resource_client, name, namespace)
         external_request_id = str(uuid.uuid4())
         logger.debug("read_args : %s", read_args)
-        uri = resource_client.client.client.configuration.host + resource_client.urls['base'] + "/" + name
+        uri = resource_client.client.client.configuration.host + resolved.base_url + "/" + name
         self._generate_additional_logs("", 'sent', external_request_id, "",
                                        'request', 'http', {'uri' : uri, 'method':'get'}, driver_request_id)
         try:
-            return_obj = resource_client.get(**read_args)
-            self._generate_additional_logs(return_obj.to_dict(), 'received', external_request_id, 'application/json',
+            with API_REQUEST_SECONDS.time(verb='get', kind=kind, location=self.location_name):
+                return_obj = resource_client.get(**read_args)
+            self._generate_additional_logs(return_obj.to_dict, 'received', external_request_id, 'application/json',
                                         'response', 'http', {'status_code' : 200}, driver_request_id)
             return return_obj
         except ApiException as e:
@@ -146,7 +240,7 @@ class OpenshiftApiController:
             if hasattr(e, 'headers'):
                 for header_key in e.headers:
                     dict_headers[header_key] = e.headers[header_key]
-            self._generate_additional_logs(e.body.decode('ASCII'), 'received', external_request_id, 'application/json', 'response', 'http',
+            self._generate_additional_logs(e.body, 'received', external_request_id, 'application/json', 'response', 'http',
                                           {'status_code' : e.status, 'status_reason_phrase' : e.reason, 'headers' : dict_headers},
                                           driver_request_id)
             raise e
@@ -159,25 +253,134 @@ class OpenshiftApiController:
             args['namespace'] = namespace
         return args
 
+    def list_objects(self, api_version, kind, namespace=None, label_selector=None, limit=None, continue_token=None, driver_request_id=None):
+        logger.debug("Calling list_objects API")
+        resolved = self.__resolve(api_version, kind)
+        resource_client = resolved.resource
+        list_args = self.__build_list_arguments(resource_client, namespace, label_selector, limit, continue_token)
+        external_request_id = str(uuid.uuid4())
+        logger.debug("list_args : %s", list_args)
+        uri = resource_client.client.client.configuration.host + resolved.base_url
+        self._generate_additional_logs("", 'sent', external_request_id, "",
+                                       'request', 'http', {'uri' : uri, 'method':'get', 'query' : list_args}, driver_request_id)
+        try:
+            with API_REQUEST_SECONDS.time(verb='list', kind=kind, location=self.location_name):
+                return_obj = resource_client.get(**list_args)
+            return_dict = return_obj.to_dict()
+            self._generate_additional_logs(return_dict, 'received', external_request_id, 'application/json',
+                                        'response', 'http', {'status_code' : 200}, driver_request_id)
+            return return_dict
+        except ApiException as e:
+            dict_headers = {}
+            if hasattr(e, 'headers'):
+                for header_key in e.headers:
+                    dict_headers[header_key] = e.headers[header_key]
+            self._generate_additional_logs(e.body, 'received', external_request_id, 'application/json', 'response', 'http',
+                                          {'status_code' : e.status, 'status_reason_phrase' : e.reason, 'headers' : dict_headers},
+                                          driver_request_id)
+            raise e
+
+    def __build_list_arguments(self, resource_client, namespace, label_selector, limit, continue_token):
+        args = {}
+        if namespace is not None and resource_client.namespaced:
+            args['namespace'] = namespace
+        if label_selector is not None:
+            args['label_selector'] = label_selector
+        if limit is not None:
+            args['limit'] = limit
+        if continue_token is not None:
+            args['_continue'] = continue_token
+        return args
+
+    def watch_objects(self, api_version, kind, namespace=None, label_selector=None, resource_version=None, timeout_seconds=None, field_selector=None):
+        logger.debug(f"Watching {api_version}/{kind} objects from resourceVersion {resource_version}")
+        resolved = self.__resolve(api_version, kind)
+        resource_client = resolved.resource
+        watch_args = {}
+        if namespace is not None and resource_client.namespaced:
+            watch_args['namespace'] = namespace
+        if field_selector is not None:
+            watch_args['field_selector'] = field_selector
+        return self.dynamic_client.watch(resource_client, label_selector=label_selector, resource_version=resource_version,
+                                            timeout=timeout_seconds, **watch_args)
+
+    def wait_for_deletion(self, api_version, kind, name, namespace=None, timeout_seconds=None, driver_request_id=None):
+        """
+        Blocks until the object no longer exists (e.g. its finalizers have completed), returning False if it still exists after timeout_seconds.
+        Waits on a single watch of the object rather than polling
+        """
+        found, obj = self.safe_read_object(api_version, kind, name, namespace=namespace, driver_request_id=driver_request_id)
+        if not found:
+            return True
+        resource_version = obj.metadata.resourceVersion
+        for event in self.watch_objects(api_version, kind, namespace=namespace, field_selector=f'metadata.name={name}',
+                                            resource_version=resource_version, timeout_seconds=timeout_seconds):
+            if event.get('type') == 'DELETED':
+                return True
+        # The watch ended without seeing the delete, which may have happened as it was closed
+        found, _ = self.safe_read_object(api_version, kind, name, namespace=namespace, driver_request_id=driver_request_id)
+        return not found
+
     def delete_object(self, api_version, kind, name, namespace=None, driver_request_id=None):
         logger.debug("Calling delete_object API")
-        resource_client = self.__get_resource_client(api_version, kind)
+        resolved = self.__resolve(api_version, kind)
+        resource_client = resolved.resource
         delete_args = self.__build_delete_arguments(resource_client, name, namespace)
         external_request_id = str(uuid.uuid4())
         logger.debug("delete_args : %s", delete_args)
-        uri = resource_client.client.client.configuration.host + resource_client.urls['base'] + "/" + name
+        uri = resource_client.client.client.configuration.host + resolved.base_url + "/" + name
         self._generate_additional_logs(delete_args['body'], 'sent', external_request_id, 'application/json',
                                         'request', 'http', {'uri' : uri, 'method':'delete'}, driver_request_id)
         try:
-            return_obj = resource_client.delete(**delete_args)
-            self._generate_additional_logs(return_obj.to_dict(), 'received', external_request_id, 'application/json',
+            with API_REQUEST_SECONDS.time(verb='delete', kind=kind, location=self.location_name):
+                return_obj = resource_client.delete(**delete_args)
+            self._generate_additional_logs(return_obj.to_dict, 'received', external_request_id, 'application/json',
                                        'response', 'http', {'status_code' : 204}, driver_request_id)
         except ApiException as e:
             dict_headers = {}
             if hasattr(e, 'headers'):
                 for header_key in e.headers:
                     dict_headers[header_key] = e.headers[header_key]
-            self._generate_additional_logs(e.body.decode('ASCII'), 'received', external_request_id, 'application/json', 'response', 'http',
+            self._generate_additional_logs(e.body, 'received', external_request_id, 'application/json', 'response', 'http',
+                                          {'status_code' : e.status, 'status_reason_phrase' : e.reason, 'headers' : dict_headers},
+                                          driver_request_id)
+            raise e
+
+    def delete_collection(self, api_version, kind, namespace=None, label_selector=None, field_selector=None, driver_request_id=None):
+        """
+        Deletes every object of the kind matching the selectors (at least one is required) with a single deletecollection request.
+        Returns the response, which lists the deleted objects when the API server includes them
+        """
+        logger.debug("Calling delete_collection API")
+        if label_selector is None and field_selector is None:
+            raise ValueError('A label_selector or field_selector is required to delete a collection')
+        resolved = self.__resolve(api_version, kind)
+        resource_client = resolved.resource
+        delete_args = {}
+        if resolved.namespaced:
+            delete_args['namespace'] = namespace if namespace is not None else self.default_namespace
+        if label_selector is not None:
+            delete_args['label_selector'] = label_selector
+        if field_selector is not None:
+            delete_args['field_selector'] = field_selector
+        external_request_id = str(uuid.uuid4())
+        logger.debug("delete_collection_args : %s", delete_args)
+        uri = resource_client.client.client.configuration.host + resolved.base_url
+        self._generate_additional_logs("", 'sent', external_request_id, "",
+                                        'request', 'http', {'uri' : uri, 'method':'delete', 'query' : delete_args}, driver_request_id)
+        try:
+            with API_REQUEST_SECONDS.time(verb='deletecollection', kind=kind, location=self.location_name):
+                return_obj = resource_client.delete(**delete_args)
+            return_dict = return_obj.to_dict() if return_obj is not None else {}
+            self._generate_additional_logs(return_dict, 'received', external_request_id, 'application/json',
+                                       'response', 'http', {'status_code' : 200}, driver_request_id)
+            return return_dict
+        except ApiException as e:
+            dict_headers = {}
+            if hasattr(e, 'headers'):
+                for header_key in e.headers:
+                    dict_headers[header_key] = e.headers[header_key]
+            self._generate_additional_logs(e.body, 'received', external_request_id, 'application/json', 'response', 'http',
                                           {'status_code' : e.status, 'status_reason_phrase' : e.reason, 'headers' : dict_headers},
                                           driver_request_id)
             raise e
@@ -192,8 +395,7 @@ class OpenshiftApiController:
         return args
 
     def is_object_namespaced(self, api_version, kind):
-        resource_client = self.__get_resource_client(api_version, kind)
-        return resource_client.namespaced
+        return self.__resolve(api_version, kind).namespaced
 
     def __determine_namespace(self, object_config, supplied_default_namespace):
         if 'namespace' in object_config.metadata:
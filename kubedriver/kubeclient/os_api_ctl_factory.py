@@ -1,7 +1,51 @@
 from ignition.service.framework import Service, Capability
 from .os_api_ctl import OpenshiftApiController
+from .discovery import default_dynamic_client_registry
+from .rate_limiter import default_rate_limiter_registry, install_rate_limiter
+from kubedriver.metrics import default_metrics_registry, Counter
 
 class OpenshiftApiControllerFactory(Service, Capability):
 
+    def __init__(self, kube_api_properties=None, dynamic_client_registry=None, rate_limiter_registry=None, metrics_registry=None):
+        self.kube_api_properties = kube_api_properties
+        self.dynamic_client_registry = dynamic_client_registry if dynamic_client_registry is not None else default_dynamic_client_registry
+        self.rate_limiter_registry = rate_limiter_registry if rate_limiter_registry is not None else default_rate_limiter_registry
+        self.rate_limit_enabled = False
+        self.metrics_registry = metrics_registry if metrics_registry is not None else default_metrics_registry
+        self.metrics_registry.add_collector('kube_api', self.__collect_metrics)
+        if self.kube_api_properties is not None:
+            discovery_properties = self.kube_api_properties.discovery
+            self.dynamic_client_registry.configure(capacity=discovery_properties.capacity, persist=discovery_properties.persist,
+                                                    cache_dir=discovery_properties.cache_dir, negative_ttl_seconds=discovery_properties.negative_ttl_seconds)
+            rate_limit_properties = self.kube_api_properties.rate_limit
+            self.rate_limit_enabled = rate_limit_properties.enabled
+            self.rate_limiter_registry.configure(qps=rate_limit_properties.qps, burst=rate_limit_properties.burst,
+                                                    max_in_flight=rate_limit_properties.max_in_flight, max_retries=rate_limit_properties.max_retries,
+                                                    backoff_base_seconds=rate_limit_properties.backoff_base_seconds,
+                                                    backoff_max_seconds=rate_limit_properties.backoff_max_seconds)
+
     def build(self, kube_location):
-        return OpenshiftApiController(kube_location.client, default_namespace=kube_location.default_object_namespace)
+        base_kube_client = kube_location.client
+        if self.rate_limit_enabled:
+            rate_limiter = self.rate_limiter_registry.get(kube_location.client_fingerprint, **getattr(kube_location, 'rate_limit', {}))
+            install_rate_limiter(base_kube_client, rate_limiter)
+        dynamic_client = self.dynamic_client_registry.get(kube_location.client_fingerprint, base_kube_client)
+        return OpenshiftApiController(base_kube_client, default_namespace=kube_location.default_object_namespace, dynamic_client=dynamic_client,
+                                        location_name=kube_location.name)
+
+    def __collect_metrics(self):
+        discovery = Counter('kubedriver_kube_api_discovery_events_total', 'API discovery cache lookups and loads', label_names=['event'])
+        for event, value in self.dynamic_client_registry.stats().to_dict().items():
+            discovery.set_total(value, event=event)
+        rate_limiter_stats = self.rate_limiter_registry.stats()
+        rate_limiter_events = Counter('kubedriver_kube_api_rate_limiter_events_total', 'Requests passed through the rate limiters', label_names=['event'])
+        rate_limiter_events.set_total(rate_limiter_stats.requests, event='requests')
+        rate_limiter_events.set_total(rate_limiter_stats.blocked_requests, event='blocked')
+        rate_limiter_events.set_total(rate_limiter_stats.queued_requests, event='queued')
+        rate_limiter_events.set_total(rate_limiter_stats.throttled_responses, event='throttled')
+        rate_limiter_events.set_total(rate_limiter_stats.retries, event='retried')
+        rate_limiter_events.set_total(rate_limiter_stats.retries_exhausted, event='retries_exhausted')
+        rate_limiter_seconds = Counter('kubedriver_kube_api_rate_limiter_wait_seconds_total', 'Time requests waited on the rate limit (blocked) or the in-flight cap (queued)', label_names=['state'])
+        rate_limiter_seconds.set_total(rate_limiter_stats.blocked_seconds, state='blocked')
+        rate_limiter_seconds.set_total(rate_limiter_stats.queued_seconds, state='queued')
+        return [discovery, rate_limiter_events, rate_limiter_seconds]
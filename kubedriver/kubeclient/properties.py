@@ -0,0 +1,59 @@
+from ignition.service.framework import Service, Capability
+from ignition.service.config import ConfigurationPropertiesGroup, ConfigurationProperties
+
+class KubeApiProperties(ConfigurationPropertiesGroup, Service, Capability):
+
+    def __init__(self):
+        super().__init__('kube_api')
+        self.client_pool = ClientPoolProperties()
+        self.discovery = DiscoveryProperties()
+        self.concurrency = ConcurrencyProperties()
+        self.informers = InformerProperties()
+        self.rate_limit = RateLimitProperties()
+        self.crds = CrdProperties()
+
+class ClientPoolProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.capacity = 20
+        self.idle_ttl_seconds = 600
+
+class DiscoveryProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.capacity = 20
+        self.persist = False
+        self.cache_dir = None
+        self.negative_ttl_seconds = 30
+
+class ConcurrencyProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.max_concurrent_requests = 8
+
+class InformerProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.enabled = False
+        self.max_objects = 10000
+        self.max_kinds = 50
+        self.resync_seconds = 300
+        self.watch_timeout_seconds = 60
+        self.page_size = 500
+        self.retry_seconds = 30
+
+class RateLimitProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.enabled = False
+        self.qps = 50
+        self.burst = 100
+        self.max_in_flight = 20
+        self.max_retries = 5
+        self.backoff_base_seconds = 0.5
+        self.backoff_max_seconds = 30
+
+class CrdProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.watch = False
@@ -0,0 +1,282 @@
+import time
+import random
+import logging
+import threading
+import functools
+import collections
+import email.utils
+from kubernetes.client.rest import ApiException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QPS = 50
+DEFAULT_BURST = 100
+DEFAULT_MAX_IN_FLIGHT = 20
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE_SECONDS = 0.5
+DEFAULT_BACKOFF_MAX_SECONDS = 30
+
+TOO_MANY_REQUESTS = 429
+SERVICE_UNAVAILABLE = 503
+RETRY_AFTER_HEADER = 'Retry-After'
+
+class RateLimiterStats:
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked_requests = 0
+        self.blocked_seconds = 0.0
+        self.queued_requests = 0
+        self.queued_seconds = 0.0
+        self.throttled_responses = 0
+        self.retries = 0
+        self.retries_exhausted = 0
+
+    def add(self, other):
+        self.requests += other.requests
+        self.blocked_requests += other.blocked_requests
+        self.blocked_seconds += other.blocked_seconds
+        self.queued_requests += other.queued_requests
+        self.queued_seconds += other.queued_seconds
+        self.throttled_responses += other.throttled_responses
+        self.retries += other.retries
+        self.retries_exhausted += other.retries_exhausted
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'blockedRequests': self.blocked_requests,
+            'blockedSeconds': self.blocked_seconds,
+            'queuedRequests': self.queued_requests,
+            'queuedSeconds': self.queued_seconds,
+            'throttledResponses': self.throttled_responses,
+            'retries': self.retries,
+            'retriesExhausted': self.retries_exhausted
+        }
+
+class TokenBucket:
+    """
+    Allows qps requests per second on average, with bursts of up to burst requests. A qps of None (or 0 or less) disables the limit
+    """
+
+    def __init__(self, qps=DEFAULT_QPS, burst=DEFAULT_BURST, clock=time.monotonic, sleep=time.sleep):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._sleep = sleep
+        self.qps = qps
+        self.burst = max(1, burst if burst is not None else 1)
+        self._tokens = float(self.burst)
+        self._last_refill = self._clock()
+
+    def configure(self, qps, burst):
+        # Tokens already spent stay spent, so reconfiguring (on every build of a controller for the location) does not refill the bucket
+        with self._lock:
+            self.qps = qps
+            self.burst = max(1, burst if burst is not None else 1)
+            self._tokens = min(self._tokens, float(self.burst))
+
+    @property
+    def enabled(self):
+        return self.qps is not None and self.qps > 0
+
+    def acquire(self):
+        """
+        Takes a token, waiting for one if none are available. Returns the seconds spent waiting
+        """
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._last_refill) * self.qps)
+            self._last_refill = now
+            # Reserve the token now, so concurrent callers queue behind each other rather than all waking at once
+            self._tokens -= 1
+            wait_seconds = 0.0 if self._tokens >= 0 else -self._tokens / self.qps
+        if wait_seconds > 0:
+            self._sleep(wait_seconds)
+        return wait_seconds
+
+class RateLimiter:
+    """
+    Client-side limits on the requests made to the API server of one location: a token bucket on the request rate,
+    a cap on requests in flight, and retries (with jittered exponential backoff honouring Retry-After) of requests
+    rejected with 429 Too Many Requests, or with 503 Service Unavailable and a Retry-After header
+    """
+
+    def __init__(self, qps=DEFAULT_QPS, burst=DEFAULT_BURST, max_in_flight=DEFAULT_MAX_IN_FLIGHT, max_retries=DEFAULT_MAX_RETRIES,
+                    backoff_base_seconds=DEFAULT_BACKOFF_BASE_SECONDS, backoff_max_seconds=DEFAULT_BACKOFF_MAX_SECONDS,
+                    clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._stats_lock = threading.Lock()
+        self._in_flight_condition = threading.Condition()
+        self._in_flight = 0
+        self.stats = RateLimiterStats()
+        self.bucket = TokenBucket(qps=qps, burst=burst, clock=clock, sleep=sleep)
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+
+    def configure(self, qps=None, burst=None, max_in_flight=None, max_retries=None, backoff_base_seconds=None, backoff_max_seconds=None):
+        if qps is not None or burst is not None:
+            self.bucket.configure(qps if qps is not None else self.bucket.qps, burst if burst is not None else self.bucket.burst)
+        with self._in_flight_condition:
+            if max_in_flight is not None:
+                self.max_in_flight = max_in_flight
+                self._in_flight_condition.notify_all()
+        if max_retries is not None:
+            self.max_retries = max_retries
+        if backoff_base_seconds is not None:
+            self.backoff_base_seconds = backoff_base_seconds
+        if backoff_max_seconds is not None:
+            self.backoff_max_seconds = backoff_max_seconds
+
+    def call(self, func, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.__acquire()
+            try:
+                return func(*args, **kwargs)
+            except ApiException as e:
+                status = e.status
+                retry_after = self.__retry_after(e)
+                if not self.__is_throttled(e, retry_after):
+                    raise
+                with self._stats_lock:
+                    self.stats.throttled_responses += 1
+                if attempt >= self.max_retries:
+                    with self._stats_lock:
+                        self.stats.retries_exhausted += 1
+                    raise
+            finally:
+                self.__release()
+            delay = self.backoff_seconds(attempt, retry_after)
+            attempt += 1
+            with self._stats_lock:
+                self.stats.retries += 1
+            logger.debug(f'API request throttled (status {status}), retry {attempt} of {self.max_retries} in {delay:.2f} seconds')
+            self._sleep(delay)
+
+    def backoff_seconds(self, attempt, retry_after=None):
+        if retry_after is not None:
+            # The server knows best, but spread the retries of concurrent callers a little
+            return min(self.backoff_max_seconds, retry_after) * random.uniform(1.0, 1.1)
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        # "Equal jitter": at least half the exponential delay, so retries never come straight back
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def __acquire(self):
+        blocked_seconds = self.bucket.acquire()
+        queued_seconds = 0.0
+        with self._in_flight_condition:
+            if self.max_in_flight is not None and self.max_in_flight > 0 and self._in_flight >= self.max_in_flight:
+                queued_from = self._clock()
+                while self._in_flight >= self.max_in_flight:
+                    self._in_flight_condition.wait()
+                queued_seconds = self._clock() - queued_from
+            self._in_flight += 1
+        with self._stats_lock:
+            self.stats.requests += 1
+            if blocked_seconds > 0:
+                self.stats.blocked_requests += 1
+                self.stats.blocked_seconds += blocked_seconds
+            if queued_seconds > 0:
+                self.stats.queued_requests += 1
+                self.stats.queued_seconds += queued_seconds
+
+    def __release(self):
+        with self._in_flight_condition:
+            self._in_flight -= 1
+            self._in_flight_condition.notify()
+
+    def __is_throttled(self, error, retry_after):
+        if error.status == TOO_MANY_REQUESTS:
+            return True
+        return error.status == SERVICE_UNAVAILABLE and retry_after is not None
+
+    def __retry_after(self, error):
+        headers = getattr(error, 'headers', None)
+        if headers is None:
+            return None
+        value = headers.get(RETRY_AFTER_HEADER)
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+def install_rate_limiter(api_client, rate_limiter):
+    """
+    Routes every request made by a Kubernetes ApiClient (and so any DynamicClient or API class built on it) through the rate limiter.
+    Installing again replaces the previous limiter
+    """
+    request = getattr(api_client, '_unlimited_request', None)
+    if request is None:
+        request = api_client.request
+        api_client._unlimited_request = request
+    api_client.rate_limiter = rate_limiter
+    api_client.request = functools.partial(rate_limiter.call, request)
+    return api_client
+
+class RateLimiterRegistry:
+    """
+    Process-wide rate limiters, one per location (keyed by client fingerprint), so all jobs against a location share its limits
+    """
+
+    def __init__(self, capacity=20, **defaults):
+        self.capacity = capacity
+        self.defaults = defaults
+        self._limiters = collections.OrderedDict()
+        # Stats of limiters no longer held, so totals do not go down when a limiter is evicted
+        self._retired_stats = RateLimiterStats()
+        self._lock = threading.Lock()
+
+    def configure(self, capacity=None, **defaults):
+        with self._lock:
+            if capacity is not None:
+                self.capacity = capacity
+            self.defaults.update({k: v for k, v in defaults.items() if v is not None})
+
+    def get(self, key, **overrides):
+        settings = dict(self.defaults)
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        with self._lock:
+            rate_limiter = self._limiters.get(key)
+            if rate_limiter is None:
+                rate_limiter = RateLimiter(**settings)
+                self._limiters[key] = rate_limiter
+                while self.capacity is not None and self.capacity > 0 and len(self._limiters) > self.capacity:
+                    _, evicted = self._limiters.popitem(last=False)
+                    self._retired_stats.add(evicted.stats)
+            else:
+                self._limiters.move_to_end(key)
+                rate_limiter.configure(**settings)
+            return rate_limiter
+
+    def stats(self):
+        """
+        Totals of all limiters held by this registry since it was created (or cleared), including those since evicted
+        """
+        with self._lock:
+            totals = RateLimiterStats()
+            totals.add(self._retired_stats)
+            for rate_limiter in self._limiters.values():
+                totals.add(rate_limiter.stats)
+            return totals
+
+    def clear(self):
+        with self._lock:
+            self._limiters.clear()
+            self._retired_stats = RateLimiterStats()
+
+    def __len__(self):
+        return len(self._limiters)
+
+default_rate_limiter_registry = RateLimiterRegistry()
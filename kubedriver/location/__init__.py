@@ -1 +1,2 @@
 from .deployment_location import KubeDeploymentLocation
+from .client_pool import KubeClientPool, default_client_pool
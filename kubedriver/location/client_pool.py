@@ -0,0 +1,139 @@
+import time
+import json
+import hashlib
+import logging
+import threading
+import collections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 20
+DEFAULT_IDLE_TTL_SECONDS = 600
+
+def fingerprint_client_config(client_config):
+    as_string = json.dumps(client_config, sort_keys=True, default=str)
+    return hashlib.sha256(as_string.encode('utf-8')).hexdigest()
+
+class PooledClient:
+
+    def __init__(self, key, client):
+        self.key = key
+        self.client = client
+        self.references = 0
+        self.last_used = time.monotonic()
+        self.retired = False
+
+class KubeClientPool:
+    """
+    Shares Kubernetes API clients between the locations with the same client config. Each get() is a lease on the
+    client, ended by release(): clients are only closed (on idle timeout, over capacity or when cleared) once no
+    lease is held, so a client is never closed under a request in flight. Clients of configs no longer in use
+    (e.g. the previous config of a location) are closed once idle
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, idle_ttl_seconds=DEFAULT_IDLE_TTL_SECONDS):
+        self.capacity = capacity
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._entries = collections.OrderedDict()
+        self._retired = []
+        self._lock = threading.RLock()
+
+    def configure(self, capacity=None, idle_ttl_seconds=None):
+        with self._lock:
+            if capacity is not None:
+                self.capacity = capacity
+            if idle_ttl_seconds is not None:
+                self.idle_ttl_seconds = idle_ttl_seconds
+            self.__evict_idle(time.monotonic())
+            self.__evict_over_capacity()
+
+    def get(self, key, builder):
+        """
+        Returns the client for the key, building it if not pooled. Each call must be matched by a call to release(key, client)
+        once the client is no longer used
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.__evict_idle(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            else:
+                logger.debug(f'Building new Kubernetes API client for key {key}')
+                entry = PooledClient(key, builder())
+                self._entries[key] = entry
+            entry.references += 1
+            entry.last_used = now
+            self.__evict_over_capacity()
+            return entry.client
+
+    def release(self, key, client):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.client is not client:
+                # Evicted whilst leased, a new client may since have been pooled for the key
+                entry = next((retired for retired in self._retired if retired.client is client), None)
+                if entry is None:
+                    return
+            entry.references -= 1
+            entry.last_used = time.monotonic()
+            if entry.retired and entry.references <= 0:
+                self._retired.remove(entry)
+                self.__close(entry, 'released after eviction')
+
+    def evict_idle(self):
+        with self._lock:
+            self.__evict_idle(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries.keys()):
+                self.__evict(key, 'pool cleared')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __evict_idle(self, now):
+        if self.idle_ttl_seconds is None or self.idle_ttl_seconds < 0:
+            return
+        expired = [key for key, entry in self._entries.items() if entry.references <= 0 and (now - entry.last_used) > self.idle_ttl_seconds]
+        for key in expired:
+            self.__evict(key, 'idle timeout')
+
+    def __evict_over_capacity(self):
+        if self.capacity is None or self.capacity <= 0:
+            return
+        # Least recently used first, clients still leased are not evicted
+        for key in [key for key, entry in self._entries.items() if entry.references <= 0]:
+            if len(self._entries) <= self.capacity:
+                break
+            self.__evict(key, 'capacity reached')
+
+    def __evict(self, key, reason):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        entry.retired = True
+        if entry.references > 0:
+            # Still leased, closed once released
+            self._retired.append(entry)
+        else:
+            self.__close(entry, reason)
+
+    def __close(self, entry, reason):
+        logger.debug(f'Closing Kubernetes API client for key {entry.key} ({reason})')
+        self.__close_client(entry.client)
+
+    def __close_client(self, client):
+        try:
+            client.close()
+            rest_client = getattr(client, 'rest_client', None)
+            if rest_client is not None and hasattr(rest_client, 'pool_manager'):
+                rest_client.pool_manager.clear()
+        except Exception as e:
+            logger.exception(f'Encountered an error whilst closing a Kubernetes API client: {e}')
+
+default_client_pool = KubeClientPool()
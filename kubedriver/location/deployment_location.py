@@ -1,11 +1,13 @@
 import yaml
 import os
+import weakref
 import kubernetes.config as kubeconfig
 import ignition.locations.kubernetes as common_kube_dl
 from ignition.locations.exceptions import InvalidDeploymentLocationError
 from ignition.locations.utils import get_property_or_default
 from kubedriver.kubeclient import DEFAULT_NAMESPACE
 from kubedriver.helmclient import HelmClient, HelmTls
+from .client_pool import default_client_pool, fingerprint_client_config
 
 KubeDeploymentLocationBase = common_kube_dl.KubernetesDeploymentLocation
 
@@ -22,6 +24,16 @@ class KubeDeploymentLocation(KubeDeploymentLocationBase):
     CM_DATA_FIELD_PROP = 'cmDataField'
     CM_DATA_FIELD_ALT2_PROP = 'cm_data_field'
 
+    #Keg records (override the persistence driver config for this location)
+    KEG_LAYOUT_PROP = 'kegLayout'
+    KEG_LAYOUT_ALT2_PROP = 'keg_layout'
+    KEG_SHARD_SIZE_PROP = 'kegShardSize'
+    KEG_SHARD_SIZE_ALT2_PROP = 'keg_shard_size'
+    KEG_LAYOUTS = ['single', 'sharded']
+    PERSISTENCE_BACKEND_PROP = 'persistenceBackend'
+    PERSISTENCE_BACKEND_ALT2_PROP = 'persistence_backend'
+    PERSISTENCE_BACKENDS = ['configMap', 'customResource']
+
     #Helm
     HELM_VERSION_PROP = 'helmVersion'
     HELM_VERSION_ALT2_PROP = 'helm_version'
@@ -32,6 +44,12 @@ class KubeDeploymentLocation(KubeDeploymentLocationBase):
     HELM_TLS_CERT_PROP = 'helm.tls.cert'
     HELM_TLS_KEY_PROP = 'helm.tls.key' 
 
+    #Rate limits (override the kube_api.rate_limit driver config for this location)
+    RATE_LIMIT_QPS_PROP = 'rateLimit.qps'
+    RATE_LIMIT_BURST_PROP = 'rateLimit.burst'
+    RATE_LIMIT_MAX_IN_FLIGHT_PROP = 'rateLimit.maxInFlight'
+    RATE_LIMIT_MAX_RETRIES_PROP = 'rateLimit.maxRetries'
+
     @staticmethod
     def from_dict(dl_data):
         name = dl_data.get(KubeDeploymentLocationBase.NAME)
@@ -59,6 +77,22 @@ class KubeDeploymentLocation(KubeDeploymentLocationBase):
         cm_data_field = get_property_or_default(properties, KubeDeploymentLocation.CM_DATA_FIELD_PROP, KubeDeploymentLocation.CM_DATA_FIELD_ALT2_PROP)
         if cm_data_field is not None:
             kwargs['cm_data_field'] = cm_data_field
+        keg_layout = get_property_or_default(properties, KubeDeploymentLocation.KEG_LAYOUT_PROP, KubeDeploymentLocation.KEG_LAYOUT_ALT2_PROP)
+        if keg_layout is not None:
+            if keg_layout not in KubeDeploymentLocation.KEG_LAYOUTS:
+                raise InvalidDeploymentLocationError(f'Deployment location property \'{KubeDeploymentLocation.KEG_LAYOUT_PROP}\' must be one of {KubeDeploymentLocation.KEG_LAYOUTS} but was: {keg_layout}')
+            kwargs['keg_layout'] = keg_layout
+        persistence_backend = get_property_or_default(properties, KubeDeploymentLocation.PERSISTENCE_BACKEND_PROP, KubeDeploymentLocation.PERSISTENCE_BACKEND_ALT2_PROP)
+        if persistence_backend is not None:
+            if persistence_backend not in KubeDeploymentLocation.PERSISTENCE_BACKENDS:
+                raise InvalidDeploymentLocationError(f'Deployment location property \'{KubeDeploymentLocation.PERSISTENCE_BACKEND_PROP}\' must be one of {KubeDeploymentLocation.PERSISTENCE_BACKENDS} but was: {persistence_backend}')
+            kwargs['persistence_backend'] = persistence_backend
+        keg_shard_size = get_property_or_default(properties, KubeDeploymentLocation.KEG_SHARD_SIZE_PROP, KubeDeploymentLocation.KEG_SHARD_SIZE_ALT2_PROP)
+        if keg_shard_size is not None:
+            try:
+                kwargs['keg_shard_size'] = int(keg_shard_size)
+            except (TypeError, ValueError) as e:
+                raise InvalidDeploymentLocationError(f'Deployment location property \'{KubeDeploymentLocation.KEG_SHARD_SIZE_PROP}\' must be a number but was: {keg_shard_size}') from e
         default_object_namespace = get_property_or_default(properties, KubeDeploymentLocationBase.DEFAULT_OBJECT_NAMESPACE_PROP, KubeDeploymentLocationBase.DEFAULT_OBJECT_NAMESPACE_ALT2_PROP)
         if default_object_namespace is not None:
             kwargs['default_object_namespace'] = default_object_namespace
@@ -74,10 +108,31 @@ class KubeDeploymentLocation(KubeDeploymentLocationBase):
                 kwargs['helm_tls'].ca_cert = get_property_or_default(properties, KubeDeploymentLocation.HELM_TLS_CA_CERT_PROP, KubeDeploymentLocation.HELM_TLS_CA_CERT_ALT2_PROP)
                 kwargs['helm_tls'].cert = get_property_or_default(properties, KubeDeploymentLocation.HELM_TLS_CERT_PROP)
                 kwargs['helm_tls'].key = get_property_or_default(properties, KubeDeploymentLocation.HELM_TLS_KEY_PROP)
+        rate_limit = KubeDeploymentLocation.__read_rate_limit(properties)
+        if len(rate_limit) > 0:
+            kwargs['rate_limit'] = rate_limit
         return KubeDeploymentLocation(name, client_config, **kwargs)
 
+    @staticmethod
+    def __read_rate_limit(properties):
+        rate_limit = {}
+        for prop_name, arg_name, value_type in [
+                    (KubeDeploymentLocation.RATE_LIMIT_QPS_PROP, 'qps', float),
+                    (KubeDeploymentLocation.RATE_LIMIT_BURST_PROP, 'burst', int),
+                    (KubeDeploymentLocation.RATE_LIMIT_MAX_IN_FLIGHT_PROP, 'max_in_flight', int),
+                    (KubeDeploymentLocation.RATE_LIMIT_MAX_RETRIES_PROP, 'max_retries', int)
+                ]:
+            value = get_property_or_default(properties, prop_name)
+            if value is not None:
+                try:
+                    rate_limit[arg_name] = value_type(value)
+                except (TypeError, ValueError) as e:
+                    raise InvalidDeploymentLocationError(f'Deployment location property \'{prop_name}\' must be a number but was: {value}') from e
+        return rate_limit
+
     def __init__(self, name, client_config, default_object_namespace=DEFAULT_NAMESPACE, crd_api_version=None, driver_namespace=None, \
-                    cm_api_version='v1', cm_kind='ConfigMap', cm_data_field='data', helm_version='3.16.4', helm_tls=None):
+                    cm_api_version='v1', cm_kind='ConfigMap', cm_data_field='data', helm_version='3.16.4', helm_tls=None, client_pool=None, rate_limit=None, \
+                    keg_layout=None, keg_shard_size=None, persistence_backend=None):
         super().__init__(name, client_config, default_object_namespace=default_object_namespace)
         self.crd_api_version = crd_api_version
         self.cm_api_version = cm_api_version
@@ -88,20 +143,44 @@ class KubeDeploymentLocation(KubeDeploymentLocationBase):
             self.driver_namespace = self.default_object_namespace
         self.helm_version = helm_version
         self.helm_tls = helm_tls
+        self.rate_limit = rate_limit if rate_limit is not None else {}
+        self.keg_layout = keg_layout
+        self.keg_shard_size = keg_shard_size
+        self.persistence_backend = persistence_backend
+        self.client_pool = client_pool if client_pool is not None else default_client_pool
         self._client = None
+        self._client_fingerprint = None
+        self._client_lease = None
         self._helm_client = None
 
+    @property
+    def client_fingerprint(self):
+        if self._client_fingerprint is None:
+            self._client_fingerprint = fingerprint_client_config(self.client_config)
+        return self._client_fingerprint
+
     @property
     def client(self):
         if self._client is None:
-            config_file_path = super().write_config_file()
-            try:
-                self._client = kubeconfig.new_client_from_config(config_file_path, persist_config=False)            
-            finally:
-                if os.path.exists(config_file_path):
-                    os.remove(config_file_path)
+            self._client = self.client_pool.get(self.client_fingerprint, self.__build_client)
+            # The lease on the pooled client ends on clean(), or when this location is garbage collected if never cleaned
+            self._client_lease = weakref.finalize(self, self.client_pool.release, self.client_fingerprint, self._client)
         return self._client
 
+    def release_client(self):
+        if self._client_lease is not None:
+            self._client_lease()
+            self._client_lease = None
+        self._client = None
+
+    def __build_client(self):
+        config_file_path = super().write_config_file()
+        try:
+            return kubeconfig.new_client_from_config(config_file_path, persist_config=False)
+        finally:
+            if os.path.exists(config_file_path):
+                os.remove(config_file_path)
+
     @property
     def helm_client(self):
         if self._helm_client is None:
@@ -110,6 +189,7 @@ class KubeDeploymentLocation(KubeDeploymentLocationBase):
 
     def clean(self):
         self.clear_config_files()
+        self.release_client()
         if self._helm_client is not None:
             self._helm_client.close()
             self._helm_client = None
@@ -138,4 +218,17 @@ class KubeDeploymentLocation(KubeDeploymentLocationBase):
             KubeDeploymentLocation.HELM_TLS_CERT_PROP: self.helm_tls.cert if self.helm_tls is not None else None,
             KubeDeploymentLocation.HELM_TLS_KEY_PROP: self.helm_tls.key if self.helm_tls is not None else None,
         })
+        # Optional properties are only included when set on the location, so the driver configuration still applies on reload
+        optional_properties = {
+            KubeDeploymentLocation.KEG_LAYOUT_PROP: self.keg_layout,
+            KubeDeploymentLocation.KEG_SHARD_SIZE_PROP: self.keg_shard_size,
+            KubeDeploymentLocation.PERSISTENCE_BACKEND_PROP: self.persistence_backend,
+            KubeDeploymentLocation.RATE_LIMIT_QPS_PROP: self.rate_limit.get('qps'),
+            KubeDeploymentLocation.RATE_LIMIT_BURST_PROP: self.rate_limit.get('burst'),
+            KubeDeploymentLocation.RATE_LIMIT_MAX_IN_FLIGHT_PROP: self.rate_limit.get('max_in_flight'),
+            KubeDeploymentLocation.RATE_LIMIT_MAX_RETRIES_PROP: self.rate_limit.get('max_retries')
+        }
+        for prop_name, value in optional_properties.items():
+            if value is not None:
+                data[KubeDeploymentLocationBase.PROPERTIES][prop_name] = value
         return data
@@ -1,2 +1,4 @@
 from .factory import LocationContextFactory
-from .context import LocationContext
\ No newline at end of file
+from .context import LocationContext
+from .properties import LocationContextProperties
+from .registry import LocationContextRegistry
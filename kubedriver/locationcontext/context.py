@@ -1,10 +1,22 @@
-
-
-
 class LocationContext:
 
-    def __init__(self, kube_location, api_ctl, kegd_persister, keg_persister):
+    def __init__(self, kube_location, api_ctl, kegd_persister, keg_persister, async_api_ctl=None, informers=None, report_sweeper=None, report_cache=None):
         self.kube_location = kube_location
         self.api_ctl = api_ctl
         self.kegd_persister = kegd_persister
         self.keg_persister = keg_persister
+        self.async_api_ctl = async_api_ctl
+        self.informers = informers
+        self.report_sweeper = report_sweeper
+        self.report_cache = report_cache
+
+    def close(self):
+        if self.report_sweeper is not None:
+            self.report_sweeper.stop()
+        if self.report_cache is not None:
+            self.report_cache.stop()
+        if self.informers is not None:
+            self.informers.close()
+        if self.async_api_ctl is not None:
+            self.async_api_ctl.close()
+        self.kube_location.clean()
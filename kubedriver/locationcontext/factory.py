@@ -1,16 +1,111 @@
+import logging
+from contextlib import contextmanager
 from ignition.service.framework import Service, Capability
-from kubedriver.kubeclient import KubeApiController, KubeClientDirector, CrdDirector
+from kubedriver.kubeclient import KubeApiController, KubeClientDirector, CrdDirector, AsyncApiController, InformerManager
+from kubedriver.kegd.model import Labels, LabelValues
+from kubedriver.kegd.report_sweeper import ReportSweeper
+from kubedriver.kegd.report_cache import ReportStatusCache
+from kubedriver.location import default_client_pool
+from kubedriver.location.client_pool import fingerprint_client_config
+from kubedriver.wirelog import default_wire_log_settings
 from .context import LocationContext
+from .registry import LocationContextRegistry
+
+logger = logging.getLogger(__name__)
 
 class LocationContextFactory(Service, Capability):
 
-    def __init__(self, api_ctl_factory, kegd_persister_factory, keg_persister_factory):
+    def __init__(self, api_ctl_factory, kegd_persister_factory, keg_persister_factory, kube_api_properties=None, client_pool=None,
+                    location_context_properties=None, context_registry=None, wire_log_properties=None, wire_log_settings=None):
         self.api_ctl_factory = api_ctl_factory
         self.kegd_persister_factory = kegd_persister_factory
         self.keg_persister_factory = keg_persister_factory
+        self.kube_api_properties = kube_api_properties
+        self.client_pool = client_pool if client_pool is not None else default_client_pool
+        if self.kube_api_properties is not None:
+            pool_properties = self.kube_api_properties.client_pool
+            self.client_pool.configure(capacity=pool_properties.capacity, idle_ttl_seconds=pool_properties.idle_ttl_seconds)
+        self.location_context_properties = location_context_properties
+        self.context_registry = context_registry if context_registry is not None else LocationContextRegistry()
+        if self.location_context_properties is not None:
+            session_properties = self.location_context_properties.sessions
+            self.context_registry.configure(capacity=session_properties.capacity, idle_ttl_seconds=session_properties.idle_ttl_seconds)
+        self.wire_log_properties = wire_log_properties
+        self.wire_log_settings = wire_log_settings if wire_log_settings is not None else default_wire_log_settings
+        if self.wire_log_properties is not None:
+            self.wire_log_settings.configure(level=self.wire_log_properties.level, max_body_chars=self.wire_log_properties.max_body_chars,
+                                                sample_rate=self.wire_log_properties.sample_rate, redact_keys=self.wire_log_properties.redact_keys,
+                                                redact_secret_data=self.wire_log_properties.redact_secret_data)
     
     def build(self, kube_location):
+        self.client_pool.evict_idle()
         api_ctl = self.api_ctl_factory.build(kube_location)
         kegd_persister = self.kegd_persister_factory.build(kube_location, api_ctl)
         keg_persister = self.keg_persister_factory.build(kube_location, api_ctl)
-        return LocationContext(kube_location=kube_location, api_ctl=api_ctl, kegd_persister=kegd_persister, keg_persister=keg_persister)    
+        async_api_ctl = self.__build_async_api_ctl(api_ctl)
+        informers = self.__build_informers(api_ctl)
+        return LocationContext(kube_location=kube_location, api_ctl=api_ctl, kegd_persister=kegd_persister, keg_persister=keg_persister,
+                                    async_api_ctl=async_api_ctl, informers=informers)
+
+    def __build_informers(self, api_ctl):
+        if self.kube_api_properties is None or not self.kube_api_properties.informers.enabled:
+            return None
+        informer_properties = self.kube_api_properties.informers
+        return InformerManager(api_ctl, label_selector=f'{Labels.MANAGED_BY}={LabelValues.MANAGED_BY}', index_label=Labels.KEG,
+                                    max_objects=informer_properties.max_objects, max_kinds=informer_properties.max_kinds,
+                                    resync_seconds=informer_properties.resync_seconds, watch_timeout_seconds=informer_properties.watch_timeout_seconds,
+                                    page_size=informer_properties.page_size, retry_seconds=informer_properties.retry_seconds)
+
+    def __build_async_api_ctl(self, api_ctl):
+        max_concurrency = None
+        if self.kube_api_properties is not None:
+            max_concurrency = self.kube_api_properties.concurrency.max_concurrent_requests
+        if max_concurrency is None or max_concurrency <= 1:
+            return None
+        return AsyncApiController(api_ctl, max_concurrency=max_concurrency)
+
+    @contextmanager
+    def session(self, kube_location):
+        if not self.context_registry.enabled:
+            context = self.build(kube_location)
+            try:
+                yield context
+            finally:
+                context.close()
+            return
+        self.context_registry.evict_idle()
+        key = fingerprint_client_config(kube_location.to_dict())
+        entry = self.context_registry.acquire(key, lambda: self.__build_for_session(kube_location))
+        try:
+            yield entry.context
+        finally:
+            self.context_registry.release(entry)
+
+    def __build_for_session(self, kube_location):
+        # The context outlives the request, so it is given its own copy of the location. The caller remains free to clean() theirs
+        session_location = type(kube_location).from_dict(kube_location.to_dict())
+        context = self.build(session_location)
+        # Only contexts kept for reuse run a sweeper, rather than one being started for every job and request
+        context.report_sweeper = self.__build_report_sweeper(context)
+        context.report_cache = self.__build_report_cache(context)
+        return context
+
+    def __build_report_sweeper(self, context):
+        if self.location_context_properties is None or not self.location_context_properties.report_sweeper.enabled:
+            return None
+        sweeper_properties = self.location_context_properties.report_sweeper
+        report_sweeper = ReportSweeper(context.kegd_persister, location_name=context.kube_location.name, retention_seconds=sweeper_properties.retention_seconds,
+                                        interval_seconds=sweeper_properties.interval_seconds, batch_size=sweeper_properties.batch_size,
+                                        max_batches=sweeper_properties.max_batches, qps=sweeper_properties.qps, burst=sweeper_properties.burst)
+        report_sweeper.start()
+        return report_sweeper
+
+    def __build_report_cache(self, context):
+        if self.location_context_properties is None or not self.location_context_properties.report_cache.enabled:
+            return None
+        cache_properties = self.location_context_properties.report_cache
+        report_cache = ReportStatusCache(context.kegd_persister, location_name=context.kube_location.name, max_reports=cache_properties.max_reports,
+                                            stale_seconds=cache_properties.stale_seconds, max_age_seconds=cache_properties.max_age_seconds, watch=cache_properties.watch,
+                                            watch_timeout_seconds=cache_properties.watch_timeout_seconds, retry_seconds=cache_properties.retry_seconds)
+        report_cache.start()
+        return report_cache
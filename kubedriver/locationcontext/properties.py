@@ -0,0 +1,38 @@
+from ignition.service.framework import Service, Capability
+from ignition.service.config import ConfigurationPropertiesGroup, ConfigurationProperties
+
+class LocationContextProperties(ConfigurationPropertiesGroup, Service, Capability):
+
+    def __init__(self):
+        super().__init__('location_context')
+        self.sessions = LocationContextSessionProperties()
+        self.report_sweeper = ReportSweeperProperties()
+        self.report_cache = ReportCacheProperties()
+
+class LocationContextSessionProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.capacity = 20
+        self.idle_ttl_seconds = 600
+
+class ReportSweeperProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.enabled = False
+        self.retention_seconds = 86400
+        self.interval_seconds = 600
+        self.batch_size = 100
+        self.max_batches = 10
+        self.qps = 1
+        self.burst = 5
+
+class ReportCacheProperties(ConfigurationProperties, Service, Capability):
+
+    def __init__(self):
+        self.enabled = False
+        self.max_reports = 1000
+        self.stale_seconds = 5
+        self.max_age_seconds = 60
+        self.watch = False
+        self.watch_timeout_seconds = 60
+        self.retry_seconds = 30
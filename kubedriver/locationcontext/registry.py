@@ -0,0 +1,100 @@
+import time
+import logging
+import threading
+import collections
+
+logger = logging.getLogger(__name__)
+
+class ContextEntry:
+
+    def __init__(self, context):
+        self.context = context
+        self.references = 0
+        self.last_used = time.monotonic()
+        self.retired = False
+
+class LocationContextRegistry:
+
+    def __init__(self, capacity=20, idle_ttl_seconds=600):
+        self.capacity = capacity
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._entries = collections.OrderedDict()
+        self._retired = []
+        self._lock = threading.RLock()
+
+    def configure(self, capacity=None, idle_ttl_seconds=None):
+        with self._lock:
+            if capacity is not None:
+                self.capacity = capacity
+            if idle_ttl_seconds is not None:
+                self.idle_ttl_seconds = idle_ttl_seconds
+            self.__evict(time.monotonic())
+
+    @property
+    def enabled(self):
+        return self.capacity is None or self.capacity > 0
+
+    def acquire(self, key, builder):
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is None:
+                logger.debug(f'Building new location context for key {key}')
+                entry = ContextEntry(builder())
+                self._entries[key] = entry
+            else:
+                self._entries.move_to_end(key)
+            entry.references += 1
+            entry.last_used = now
+            self.__evict(now)
+            return entry
+
+    def release(self, entry):
+        with self._lock:
+            entry.references -= 1
+            entry.last_used = time.monotonic()
+            if entry.retired and entry.references <= 0:
+                self._retired.remove(entry)
+                self.__clean(entry)
+
+    def evict_idle(self):
+        with self._lock:
+            self.__evict(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries.keys()):
+                self.__retire(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __evict(self, now):
+        if self.idle_ttl_seconds is not None and self.idle_ttl_seconds >= 0:
+            expired = [key for key, entry in self._entries.items() if entry.references <= 0 and (now - entry.last_used) > self.idle_ttl_seconds]
+            for key in expired:
+                self.__retire(key)
+        if self.capacity is not None and self.capacity > 0:
+            # Least recently used first, contexts still in use are not evicted
+            for key in [key for key, entry in self._entries.items() if entry.references <= 0]:
+                if len(self._entries) <= self.capacity:
+                    break
+                self.__retire(key)
+
+    def __retire(self, key):
+        entry = self._entries.pop(key)
+        entry.retired = True
+        if entry.references > 0:
+            # Still in use by a session, clean it once released
+            self._retired.append(entry)
+        else:
+            self.__clean(entry)
+
+    def __clean(self, entry):
+        try:
+            entry.context.close()
+        except Exception as e:
+            logger.exception(f'Encountered an error whilst trying to clean up location context: {e}')
@@ -0,0 +1,7 @@
+import os
+from .registry import (MetricsRegistry, Counter, Gauge, Histogram, DEFAULT_BUCKETS, TEXT_CONTENT_TYPE,
+                        default_metrics_registry)
+from .api import MetricsApiCapability, MetricsApiService
+from .properties import MetricsProperties
+
+metrics_api_spec = os.path.join(os.path.dirname(__file__), 'openapi', 'metrics.yaml')
@@ -0,0 +1,23 @@
+import logging
+from ignition.service.framework import Service, Capability, interface
+from .registry import default_metrics_registry, TEXT_CONTENT_TYPE
+
+logger = logging.getLogger(__name__)
+
+class MetricsApiCapability(Capability):
+
+    @interface
+    def metrics(self):
+        pass
+
+class MetricsApiService(Service, MetricsApiCapability):
+
+    def __init__(self, metrics_properties=None, metrics_registry=None):
+        self.metrics_registry = metrics_registry if metrics_registry is not None else default_metrics_registry
+        if metrics_properties is not None:
+            self.metrics_registry.configure(enabled=metrics_properties.enabled)
+
+    def metrics(self):
+        if not self.metrics_registry.enabled:
+            return ('Metrics are disabled', 404, {'Content-Type': 'text/plain'})
+        return (self.metrics_registry.render(), 200, {'Content-Type': TEXT_CONTENT_TYPE})
@@ -0,0 +1,8 @@
+from ignition.service.framework import Service, Capability
+from ignition.service.config import ConfigurationPropertiesGroup
+
+class MetricsProperties(ConfigurationPropertiesGroup, Service, Capability):
+
+    def __init__(self):
+        super().__init__('metrics')
+        self.enabled = True
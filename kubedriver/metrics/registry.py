@@ -0,0 +1,234 @@
+import re
+import math
+import time
+import threading
+import contextlib
+
+# Suits everything from a cached API read to a Helm install waiting on its release
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TEXT_CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+NAME_PATTERN = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*$')
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(label_names, label_values):
+    if len(label_names) == 0:
+        return ''
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    return '{' + ','.join(pairs) + '}'
+
+class Metric:
+
+    def __init__(self, name, description, metric_type, label_names=None, registry=None):
+        if not NAME_PATTERN.match(name):
+            raise ValueError(f'Invalid metric name: {name}')
+        self.name = name
+        self.description = description
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names) if label_names is not None else tuple()
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._values = {}
+
+    @property
+    def enabled(self):
+        return self.registry is None or self.registry.enabled
+
+    def _label_values(self, labels):
+        if set(labels.keys()) != set(self.label_names):
+            raise ValueError(f'Metric {self.name} expects labels {list(self.label_names)} but was given {list(labels.keys())}')
+        return tuple('' if labels[name] is None else str(labels[name]) for name in self.label_names)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in sorted(values):
+            lines.extend(self._render_samples(label_values, value))
+        return lines
+
+    def _render_samples(self, label_values, value):
+        return [f'{self.name}{format_labels(self.label_names, label_values)} {format_value(value)}']
+
+class Counter(Metric):
+
+    def __init__(self, name, description, label_names=None, registry=None):
+        super().__init__(name, description, COUNTER, label_names=label_names, registry=registry)
+
+    def inc(self, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """
+        Sets the total directly, for counters produced by collectors from totals kept elsewhere
+        """
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels):
+        return self._values.get(self._label_values(labels), 0)
+
+class Gauge(Metric):
+
+    def __init__(self, name, description, label_names=None, registry=None):
+        super().__init__(name, description, GAUGE, label_names=label_names, registry=registry)
+
+    def set(self, value, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels):
+        return self._values.get(self._label_values(labels), 0)
+
+class HistogramValue:
+
+    def __init__(self, buckets):
+        self.bucket_counts = [0 for bucket in buckets]
+        self.count = 0
+        self.sum = 0.0
+
+class Histogram(Metric):
+
+    def __init__(self, name, description, label_names=None, buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, description, HISTOGRAM, label_names=label_names, registry=registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not self.enabled:
+            return
+        key = self._label_values(labels)
+        with self._lock:
+            histogram_value = self._values.get(key)
+            if histogram_value is None:
+                histogram_value = HistogramValue(self.buckets)
+                self._values[key] = histogram_value
+            histogram_value.count += 1
+            histogram_value.sum += value
+            for idx, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    histogram_value.bucket_counts[idx] += 1
+                    break
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """
+        Observes the time taken by the body of the with statement, including when it raises
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get(self, **labels):
+        return self._values.get(self._label_values(labels))
+
+    def _render_samples(self, label_values, value):
+        samples = []
+        bucket_label_names = self.label_names + ('le',)
+        cumulative = 0
+        for upper_bound, bucket_count in zip(self.buckets, value.bucket_counts):
+            cumulative += bucket_count
+            samples.append(f'{self.name}_bucket{format_labels(bucket_label_names, label_values + (format_value(float(upper_bound)),))} {cumulative}')
+        samples.append(f'{self.name}_bucket{format_labels(bucket_label_names, label_values + ("+Inf",))} {value.count}')
+        samples.append(f'{self.name}_sum{format_labels(self.label_names, label_values)} {format_value(value.sum)}')
+        samples.append(f'{self.name}_count{format_labels(self.label_names, label_values)} {value.count}')
+        return samples
+
+class MetricsRegistry:
+    """
+    Metrics recorded by this process, rendered in the Prometheus text exposition format.
+
+    Collectors are called on each render to produce metrics from state kept elsewhere (e.g. the stats of
+    the discovery cache), so nothing has to be copied on the request path
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = {}
+
+    def configure(self, enabled=None):
+        if enabled is not None:
+            self.enabled = enabled
+
+    def counter(self, name, description, label_names=None):
+        return self.__get_or_add(Counter, name, description, label_names=label_names)
+
+    def gauge(self, name, description, label_names=None):
+        return self.__get_or_add(Gauge, name, description, label_names=label_names)
+
+    def histogram(self, name, description, label_names=None, buckets=DEFAULT_BUCKETS):
+        return self.__get_or_add(Histogram, name, description, label_names=label_names, buckets=buckets)
+
+    def __get_or_add(self, metric_class, name, description, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, description, registry=self, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f'Metric {name} is already registered as a {metric.metric_type}')
+            return metric
+
+    def add_collector(self, name, collector):
+        """
+        Adds (or replaces) a function returning a list of metrics to include in each render
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def remove_collector(self, name):
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+        for collector in collectors:
+            metrics.extend(collector())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n' if len(lines) > 0 else ''
+
+    def reset(self):
+        """
+        Clears recorded values (metrics stay registered, as modules hold references to them)
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+default_metrics_registry = MetricsRegistry()
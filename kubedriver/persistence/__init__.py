@@ -1,3 +1,7 @@
 from .config_map_persister import ConfigMapPersister
+from .custom_resource_persister import CustomResourcePersister, PersistenceBackends, build_merge_patch, DEFAULT_CR_API_VERSION
 from .record_builder import CmRecordBuilder
-from .exceptions import RecordNotFoundError, PersistenceError, InvalidRecordError
\ No newline at end of file
+from .model_codec import ModelCodec, ModelCodecGenerator
+from .record_codec import RecordCodec, RecordFormats
+from .properties import PersistenceProperties
+from .exceptions import RecordNotFoundError, PersistenceError, InvalidRecordError, RecordAlreadyExistsError, RecordConflictError
@@ -1,14 +1,45 @@
 import logging
+import threading
+import collections
 from kubernetes.client.rest import ApiException
 from kubedriver.kubeobjects import ObjectConfiguration, ObjectAttributes
-from .exceptions import RecordNotFoundError, PersistenceError, InvalidRecordError
-from openshift.dynamic.exceptions import DynamicApiError, NotFoundError, BadRequestError
+from .exceptions import RecordNotFoundError, PersistenceError, InvalidRecordError, RecordAlreadyExistsError, RecordConflictError
+from .record_page import RecordPage, RecordEvent
+from openshift.dynamic.exceptions import DynamicApiError, NotFoundError, BadRequestError, ConflictError
+from kubedriver.metrics import default_metrics_registry
 
 logger = logging.getLogger(__name__)
 
+RECORD_OPERATION_SECONDS = default_metrics_registry.histogram('kubedriver_record_operation_duration_seconds', 'Duration of reads and writes of ConfigMap records',
+                                                                label_names=['stored_type', 'operation'])
+RECORD_OPERATION_ERRORS = default_metrics_registry.counter('kubedriver_record_operation_errors_total', 'Failed reads and writes of ConfigMap records',
+                                                                label_names=['stored_type', 'operation'])
+
+CONFLICT_STATUS = 409
+BINARY_DATA_FIELD = 'binaryData'
+DEFAULT_KNOWN_VERSIONS_CAPACITY = 1000
+
+class KnownVersion:
+
+    def __init__(self, resource_version, labels, data_digest=None):
+        self.resource_version = resource_version
+        self.labels = labels
+        # Hash of the record fields at this version, to tell a change to the record from a change to only its metadata (e.g. labels)
+        self.data_digest = data_digest
+
 class ConfigMapPersister:
+    """
+    Stores records as ConfigMaps (or another kind with a data field).
 
-    def __init__(self, stored_type_name, kube_api_ctl, storage_namespace, record_builder, cm_api_version='v1', cm_kind='ConfigMap', cm_data_field='data'):
+    The resourceVersion (and labels) of each record seen by the last get, create or update is remembered, so an
+    update is a single replace made with that version rather than a read followed by a replace. A replace rejected
+    with 409 Conflict is retried once with a refetched version if only the metadata of the record changed since (e.g. labels
+    added by another worker). If the record itself was changed, RecordConflictError is raised rather than overwriting that
+    write, so the caller may read the record again and merge its changes.
+    """
+
+    def __init__(self, stored_type_name, kube_api_ctl, storage_namespace, record_builder, cm_api_version='v1', cm_kind='ConfigMap', cm_data_field='data',
+                    known_versions_capacity=DEFAULT_KNOWN_VERSIONS_CAPACITY):
         self.stored_type_name = stored_type_name
         self.kube_api_ctl = kube_api_ctl
         self.storage_namespace = storage_namespace
@@ -16,8 +47,12 @@ class ConfigMapPersister:
         self.cm_api_version = cm_api_version
         self.cm_kind = cm_kind
         self.cm_data_field = cm_data_field
+        self.known_versions_capacity = known_versions_capacity
+        self._known_versions = collections.OrderedDict()
+        self._known_versions_lock = threading.Lock()
 
     def __raise_error(self, operation, exception, config_map_name):
+        RECORD_OPERATION_ERRORS.inc(stored_type=self.stored_type_name, operation=operation)
         if isinstance(exception, DynamicApiError):
             summary = exception.summary()
         else:
@@ -27,6 +62,10 @@ class ConfigMapPersister:
             raise RecordNotFoundError(message) from exception
         elif isinstance(exception, BadRequestError):
             raise InvalidRecordError(message) from exception
+        elif isinstance(exception, ConflictError) and operation == 'create':
+            raise RecordAlreadyExistsError(message) from exception
+        elif isinstance(exception, ConflictError) and operation == 'update':
+            raise RecordConflictError(message) from exception
         else:
             raise PersistenceError(message) from exception
 
@@ -48,24 +87,88 @@ class ConfigMapPersister:
     def create(self, record_name, record_data, labels=None, driver_request_id=None):
         cm_config = self.__build_config_map_for_record(record_name, record_data, labels=labels)
         try:
-            self.kube_api_ctl.create_object(cm_config, default_namespace=self.storage_namespace, driver_request_id=driver_request_id)
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='create'):
+                created_cm = self.kube_api_ctl.create_object(cm_config, default_namespace=self.storage_namespace, driver_request_id=driver_request_id)
         except ApiException as e:
             self.__raise_error('create', e, record_name)
+        self.__remember_version(record_name, created_cm, cm_config.metadata.get(ObjectAttributes.LABELS))
 
-    def update(self, record_name, record_data, driver_request_id=None):
-        existing_cm = self.__get_config_map_for(record_name, driver_request_id=driver_request_id)
-        cm_config = self.__build_config_map_for_record(record_name, record_data, existing_cm=existing_cm)
+    def update(self, record_name, record_data, labels=None, driver_request_id=None):
+        """
+        Replaces the record. Any labels given are added to (or replace values of) those already on the record
+        """
+        known_version = self.__get_known_version(record_name)
+        if known_version is None:
+            known_version = self.__refetch_version(record_name, driver_request_id=driver_request_id)
         try:
-            self.kube_api_ctl.update_object(cm_config, default_namespace=self.storage_namespace, driver_request_id=driver_request_id)
+            self.__replace(record_name, record_data, known_version, labels=labels, driver_request_id=driver_request_id)
         except ApiException as e:
-            self.__raise_error('update', e, record_name)
+            if e.status != CONFLICT_STATUS:
+                self.__raise_error('update', e, record_name)
+            latest_version = self.__refetch_version(record_name, driver_request_id=driver_request_id)
+            if latest_version.data_digest != known_version.data_digest:
+                logger.warning(f'Record for {self.stored_type_name} \'{record_name}\' was changed by another writer since version {known_version.resource_version} '
+                                f'(now version {latest_version.resource_version}), not overwriting it')
+                self.__raise_error('update', e, record_name)
+            logger.debug(f'Metadata of record for {self.stored_type_name} \'{record_name}\' was modified since version {known_version.resource_version}, retrying update with version {latest_version.resource_version}')
+            try:
+                self.__replace(record_name, record_data, latest_version, labels=labels, driver_request_id=driver_request_id)
+            except ApiException as e:
+                self.__forget_version(record_name)
+                self.__raise_error('update', e, record_name)
+
+    def __replace(self, record_name, record_data, known_version, labels=None, driver_request_id=None):
+        cm_config = self.__build_config_map_for_record(record_name, record_data, labels=labels, existing_labels=known_version.labels,
+                                                        resource_version=known_version.resource_version)
+        with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='update'):
+            updated_cm = self.kube_api_ctl.update_object(cm_config, default_namespace=self.storage_namespace, driver_request_id=driver_request_id)
+        self.__remember_version(record_name, updated_cm, cm_config.metadata.get(ObjectAttributes.LABELS))
+
+    def __refetch_version(self, record_name, driver_request_id=None):
+        existing_cm = self.__get_config_map_for(record_name, driver_request_id=driver_request_id)
+        labels = existing_cm.metadata.labels if existing_cm.metadata is not None else None
+        return KnownVersion(self.__resource_version_of(existing_cm), dict(labels) if labels is not None else {}, data_digest=self.__data_digest_of(existing_cm))
+
+    def __resource_version_of(self, config_map):
+        metadata = getattr(config_map, 'metadata', None)
+        return getattr(metadata, 'resourceVersion', None) if metadata is not None else None
+
+    def __data_digest_of(self, config_map):
+        fields = []
+        for field_name in [self.cm_data_field, BINARY_DATA_FIELD]:
+            field = getattr(config_map, field_name, None)
+            fields.append(tuple(sorted(field.items())) if field is not None else None)
+        return hash(tuple(fields))
+
+    def __remember_version(self, record_name, config_map, labels):
+        resource_version = self.__resource_version_of(config_map)
+        if resource_version is None:
+            self.__forget_version(record_name)
+            return
+        with self._known_versions_lock:
+            self._known_versions[record_name] = KnownVersion(resource_version, dict(labels) if labels is not None else {},
+                                                                data_digest=self.__data_digest_of(config_map))
+            self._known_versions.move_to_end(record_name)
+            while len(self._known_versions) > self.known_versions_capacity:
+                self._known_versions.popitem(last=False)
+
+    def __get_known_version(self, record_name):
+        with self._known_versions_lock:
+            return self._known_versions.get(record_name)
+
+    def __forget_version(self, record_name):
+        with self._known_versions_lock:
+            self._known_versions.pop(record_name, None)
 
     def __get_config_map_for(self, record_name, driver_request_id=None):
         try:
-            record_cm = self.kube_api_ctl.read_object(self.cm_api_version, self.cm_kind, record_name, namespace=self.storage_namespace, driver_request_id=driver_request_id)
-            return record_cm
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='read'):
+                record_cm = self.kube_api_ctl.read_object(self.cm_api_version, self.cm_kind, record_name, namespace=self.storage_namespace, driver_request_id=driver_request_id)
         except ApiException as e:
             self.__raise_error('read', e, record_name)
+        labels = record_cm.metadata.labels if record_cm.metadata is not None else None
+        self.__remember_version(record_name, record_cm, labels)
+        return record_cm
 
     def get(self, record_name, driver_request_id=None):
         record_cm = self.__get_config_map_for(record_name, driver_request_id=driver_request_id)
@@ -73,16 +176,71 @@ class ConfigMapPersister:
 
     def delete(self, record_name, driver_request_id=None):
         try:
-            self.kube_api_ctl.delete_object(self.cm_api_version, self.cm_kind, record_name, namespace=self.storage_namespace, driver_request_id=driver_request_id)
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='delete'):
+                self.kube_api_ctl.delete_object(self.cm_api_version, self.cm_kind, record_name, namespace=self.storage_namespace, driver_request_id=driver_request_id)
         except ApiException as e:
             self.__raise_error('delete', e, record_name)
+        finally:
+            self.__forget_version(record_name)
+
+    def find(self, label_selector=None, page_size=None, driver_request_id=None):
+        """
+        Returns the records matching a label selector, keyed by record name
+        """
+        records = {}
+        continue_token = None
+        while True:
+            page = self.find_page(label_selector=label_selector, limit=page_size, continue_token=continue_token, driver_request_id=driver_request_id)
+            records.update(page.records)
+            continue_token = page.continue_token
+            if not continue_token:
+                return records
+
+    def find_page(self, label_selector=None, limit=None, continue_token=None, driver_request_id=None):
+        try:
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='list'):
+                list_result = self.kube_api_ctl.list_objects(self.cm_api_version, self.cm_kind, namespace=self.storage_namespace, label_selector=label_selector,
+                                                                limit=limit, continue_token=continue_token, driver_request_id=driver_request_id)
+        except ApiException as e:
+            self.__raise_error('list', e, label_selector)
+        entries = []
+        for item in list_result.get('items') or []:
+            metadata = item.get(ObjectAttributes.METADATA) or {}
+            entries.append((metadata.get(ObjectAttributes.NAME), metadata.get(ObjectAttributes.LABELS) or {}, item))
+        return RecordPage(entries, continue_token=(list_result.get(ObjectAttributes.METADATA) or {}).get('continue'), decoder=self.__read_list_item_to_record)
+
+    def watch(self, label_selector=None, resource_version=None, timeout_seconds=None):
+        """
+        Yields a RecordEvent for each change to the records matching a label selector, from resource_version
+        (or starting with an ADDED event for each existing record when not given), until timeout_seconds
+        """
+        for event in self.kube_api_ctl.watch_objects(self.cm_api_version, self.cm_kind, namespace=self.storage_namespace, label_selector=label_selector,
+                                                        resource_version=resource_version, timeout_seconds=timeout_seconds):
+            yield RecordEvent(event.get('type'), event.get('raw_object'), decoder=self.__read_list_item_to_record)
 
-    def __build_config_map_for_record(self, record_name, record_data, labels=None, existing_cm=None):
+    def delete_collection(self, label_selector=None, field_selector=None, driver_request_id=None):
+        """
+        Deletes every record matching the selectors in one request. Returns the number deleted, or None if the API server did not say
+        """
+        try:
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='deletecollection'):
+                result = self.kube_api_ctl.delete_collection(self.cm_api_version, self.cm_kind, namespace=self.storage_namespace, label_selector=label_selector,
+                                                                field_selector=field_selector, driver_request_id=driver_request_id)
+        except ApiException as e:
+            self.__raise_error('delete', e, label_selector)
+        items = result.get('items') if isinstance(result, dict) else None
+        if items is None:
+            return None
+        for item in items:
+            self.__forget_version((item.get(ObjectAttributes.METADATA) or {}).get(ObjectAttributes.NAME))
+        return len(items)
+
+    def __build_config_map_for_record(self, record_name, record_data, labels=None, existing_labels=None, resource_version=None):
         if labels == None: 
             labels = {}
-        if existing_cm is not None and existing_cm.metadata is not None and existing_cm.metadata.labels is not None:
+        if existing_labels is not None:
             merged_labels = {}
-            merged_labels.update(existing_cm.metadata.labels)
+            merged_labels.update(existing_labels)
             merged_labels.update(labels)
             labels = merged_labels
         cm_obj_config = {
@@ -93,13 +251,26 @@ class ConfigMapPersister:
                 ObjectAttributes.NAMESPACE: self.storage_namespace,
                 ObjectAttributes.LABELS: labels
             },
-            self.cm_data_field: {
-                'record': self.record_builder.to_record(record_data)
-            }
         }
+        data, binary_data = self.record_builder.to_record_fields(record_data)
+        if binary_data is not None and len(binary_data) > 0:
+            if self.__supports_binary_data():
+                cm_obj_config[BINARY_DATA_FIELD] = binary_data
+            else:
+                data = dict(data)
+                data.update(binary_data)
+        cm_obj_config[self.cm_data_field] = data
+        if resource_version is not None:
+            cm_obj_config[ObjectAttributes.METADATA]['resourceVersion'] = resource_version
         return ObjectConfiguration(cm_obj_config)
 
+    def __supports_binary_data(self):
+        return self.cm_kind == 'ConfigMap' and self.cm_data_field == 'data'
+
     def __read_config_map_to_record(self, config_map):
         cm_data = config_map.data
-        record_data = cm_data.get('record')
-        return self.record_builder.from_record(record_data)
+        cm_binary_data = getattr(config_map, BINARY_DATA_FIELD, None)
+        return self.record_builder.from_record_fields(cm_data, binary_data=cm_binary_data)
+
+    def __read_list_item_to_record(self, item):
+        return self.record_builder.from_record_fields(item.get(self.cm_data_field), binary_data=item.get(BINARY_DATA_FIELD))
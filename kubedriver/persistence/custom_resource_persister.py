@@ -0,0 +1,284 @@
+import logging
+import threading
+import collections
+from kubernetes.client.rest import ApiException
+from kubedriver.kubeobjects import ObjectConfiguration, ObjectAttributes
+from .exceptions import RecordNotFoundError, PersistenceError, InvalidRecordError, RecordAlreadyExistsError
+from .config_map_persister import RECORD_OPERATION_SECONDS, RECORD_OPERATION_ERRORS
+from .record_page import RecordPage, RecordEvent
+from openshift.dynamic.exceptions import DynamicApiError, NotFoundError, BadRequestError, ConflictError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CR_API_VERSION = 'keg.ibm/v1alpha1'
+STATUS_FIELD = 'status'
+STATUS_SUBRESOURCE = 'status'
+DEFAULT_KNOWN_STATUSES_CAPACITY = 1000
+DEFAULT_LIST_PAGE_SIZE = 100
+# Attempts to patch a status changed by another writer since it was read, each re-reading the status first
+MAX_CONFLICT_RETRIES = 3
+
+class PersistenceBackends:
+    # Records stored in the data of ConfigMaps (or the kind set by cmApiVersion/cmKind/cmDataField)
+    CONFIG_MAP = 'configMap'
+    # Records stored in the status of custom resources (see docs/reference/persistence-crds.md)
+    CUSTOM_RESOURCE = 'customResource'
+
+    ALL = [CONFIG_MAP, CUSTOM_RESOURCE]
+
+    @staticmethod
+    def resolve(kube_location, persistence_properties=None):
+        backend = getattr(kube_location, 'persistence_backend', None)
+        if backend in PersistenceBackends.ALL:
+            return backend
+        if persistence_properties is not None and persistence_properties.backend in PersistenceBackends.ALL:
+            return persistence_properties.backend
+        return PersistenceBackends.CONFIG_MAP
+
+def build_merge_patch(previous, current):
+    """
+    Returns the JSON merge patch (RFC 7386) turning previous into current: changed values, with None for removed keys.
+    Lists are replaced whole, as merge patches cannot address list items
+    """
+    patch = {}
+    for key, value in current.items():
+        previous_value = previous.get(key)
+        if isinstance(value, dict) and isinstance(previous_value, dict):
+            nested_patch = build_merge_patch(previous_value, value)
+            if len(nested_patch) > 0:
+                patch[key] = nested_patch
+        elif value != previous_value or key not in previous:
+            patch[key] = value
+    for key in previous:
+        if key not in current:
+            patch[key] = None
+    return patch
+
+class CustomResourcePersister:
+    """
+    Stores records as custom resources, with the record held in the status of the object.
+
+    Updates are JSON merge patches of only the changed fields, sent to the status subresource (or to the object when the
+    custom resource definition does not enable the subresource). The status and resourceVersion last written or read for each record
+    are remembered to build the patch; a status not seen before is read first. Patches are conditional on the resourceVersion, so a
+    patch built from a status since changed elsewhere is rejected and built again from a fresh read of the record.
+    """
+
+    def __init__(self, stored_type_name, kube_api_ctl, storage_namespace, record_builder, cr_api_version=DEFAULT_CR_API_VERSION, cr_kind=None,
+                    known_statuses_capacity=DEFAULT_KNOWN_STATUSES_CAPACITY, list_page_size=DEFAULT_LIST_PAGE_SIZE):
+        self.stored_type_name = stored_type_name
+        self.kube_api_ctl = kube_api_ctl
+        self.storage_namespace = storage_namespace
+        self.record_builder = record_builder
+        self.cr_api_version = cr_api_version
+        self.cr_kind = cr_kind if cr_kind is not None else stored_type_name
+        self.known_statuses_capacity = known_statuses_capacity
+        self.list_page_size = list_page_size
+        self._known_statuses = collections.OrderedDict()
+        self._known_statuses_lock = threading.Lock()
+
+    def __raise_error(self, operation, exception, record_name):
+        RECORD_OPERATION_ERRORS.inc(stored_type=self.stored_type_name, operation=operation)
+        if isinstance(exception, DynamicApiError):
+            summary = exception.summary()
+        else:
+            summary = str(exception)
+        message = f'Failed to {operation} record for {self.stored_type_name} \'{record_name}\' as an error occurred: {summary}'
+        if isinstance(exception, NotFoundError):
+            raise RecordNotFoundError(message) from exception
+        elif isinstance(exception, BadRequestError):
+            raise InvalidRecordError(message) from exception
+        elif isinstance(exception, ConflictError) and operation == 'create':
+            raise RecordAlreadyExistsError(message) from exception
+        else:
+            raise PersistenceError(message) from exception
+
+    def build_record_reference(self, uid, record_name):
+        return {
+            'apiVersion': self.cr_api_version,
+            'kind': self.cr_kind,
+            'metadata': {
+                'name': record_name,
+                'namespace': self.storage_namespace,
+                'uid': uid
+            }
+        }
+
+    def get_record_uid(self, record_name, driver_request_id=None):
+        record_cr = self.__read(record_name, driver_request_id=driver_request_id)
+        return record_cr.get(ObjectAttributes.METADATA, {}).get('uid')
+
+    def create(self, record_name, record_data, labels=None, driver_request_id=None):
+        status = self.record_builder.to_dict(record_data)
+        cr_config = ObjectConfiguration({
+            ObjectAttributes.API_VERSION: self.cr_api_version,
+            ObjectAttributes.KIND: self.cr_kind,
+            ObjectAttributes.METADATA: {
+                ObjectAttributes.NAME: record_name,
+                ObjectAttributes.NAMESPACE: self.storage_namespace,
+                ObjectAttributes.LABELS: labels if labels is not None else {}
+            },
+            STATUS_FIELD: status
+        })
+        try:
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='create'):
+                created_cr = self.kube_api_ctl.create_object(cr_config, default_namespace=self.storage_namespace, driver_request_id=driver_request_id)
+        except ApiException as e:
+            self.__raise_error('create', e, record_name)
+        created_cr = self.__to_dict(created_cr)
+        self.__remember_status(record_name, created_cr)
+        if status is not None and len(status) > 0 and len(self.__status_of(created_cr)) == 0:
+            # The API server drops the status on create when the status subresource is enabled
+            self.__patch_status(record_name, status, driver_request_id=driver_request_id)
+
+    def get(self, record_name, driver_request_id=None):
+        record_cr = self.__read(record_name, driver_request_id=driver_request_id)
+        return self.record_builder.from_dict(self.__status_of(record_cr))
+
+    def update(self, record_name, record_data, labels=None, driver_request_id=None):
+        """
+        Patches the changed fields of the record. Any labels given are added to (or replace values of) those already on the record
+        """
+        status = self.record_builder.to_dict(record_data)
+        self.__patch_status(record_name, status if status is not None else {}, driver_request_id=driver_request_id)
+        if labels is not None and len(labels) > 0:
+            self.__patch_labels(record_name, labels, driver_request_id=driver_request_id)
+
+    def delete(self, record_name, driver_request_id=None):
+        try:
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='delete'):
+                self.kube_api_ctl.delete_object(self.cr_api_version, self.cr_kind, record_name, namespace=self.storage_namespace, driver_request_id=driver_request_id)
+        except ApiException as e:
+            self.__raise_error('delete', e, record_name)
+        finally:
+            self.__forget_status(record_name)
+
+    def find(self, label_selector=None, page_size=None, driver_request_id=None):
+        """
+        Returns the records matching a label selector (e.g. 'keg.kubedriver.alm/keg=my-keg'), keyed by record name.
+        Records are listed in pages of page_size (default list_page_size)
+        """
+        records = {}
+        continue_token = None
+        while True:
+            page = self.find_page(label_selector=label_selector, limit=page_size if page_size is not None else self.list_page_size,
+                                    continue_token=continue_token, driver_request_id=driver_request_id)
+            records.update(page.records)
+            continue_token = page.continue_token
+            if not continue_token:
+                return records
+
+    def find_page(self, label_selector=None, limit=None, continue_token=None, driver_request_id=None):
+        try:
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='list'):
+                list_result = self.kube_api_ctl.list_objects(self.cr_api_version, self.cr_kind, namespace=self.storage_namespace, label_selector=label_selector,
+                                                                limit=limit, continue_token=continue_token, driver_request_id=driver_request_id)
+        except ApiException as e:
+            self.__raise_error('list', e, label_selector)
+        entries = []
+        for item in list_result.get('items') or []:
+            metadata = item.get(ObjectAttributes.METADATA) or {}
+            entries.append((metadata.get(ObjectAttributes.NAME), metadata.get(ObjectAttributes.LABELS) or {}, item))
+        return RecordPage(entries, continue_token=(list_result.get(ObjectAttributes.METADATA) or {}).get('continue'), decoder=self.__read_list_item_to_record)
+
+    def watch(self, label_selector=None, resource_version=None, timeout_seconds=None):
+        """
+        Yields a RecordEvent for each change to the records matching a label selector, from resource_version
+        (or starting with an ADDED event for each existing record when not given), until timeout_seconds
+        """
+        for event in self.kube_api_ctl.watch_objects(self.cr_api_version, self.cr_kind, namespace=self.storage_namespace, label_selector=label_selector,
+                                                        resource_version=resource_version, timeout_seconds=timeout_seconds):
+            yield RecordEvent(event.get('type'), event.get('raw_object'), decoder=self.__read_list_item_to_record)
+
+    def delete_collection(self, label_selector=None, field_selector=None, driver_request_id=None):
+        """
+        Deletes every record matching the selectors in one request. Returns the number deleted, or None if the API server did not say
+        """
+        try:
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='deletecollection'):
+                result = self.kube_api_ctl.delete_collection(self.cr_api_version, self.cr_kind, namespace=self.storage_namespace, label_selector=label_selector,
+                                                                field_selector=field_selector, driver_request_id=driver_request_id)
+        except ApiException as e:
+            self.__raise_error('delete', e, label_selector)
+        items = result.get('items') if isinstance(result, dict) else None
+        if items is None:
+            return None
+        for item in items:
+            self.__forget_status((item.get(ObjectAttributes.METADATA) or {}).get(ObjectAttributes.NAME))
+        return len(items)
+
+    def __read_list_item_to_record(self, item):
+        self.__remember_status(item.get(ObjectAttributes.METADATA, {}).get(ObjectAttributes.NAME), item)
+        return self.record_builder.from_dict(self.__status_of(item))
+
+    def __patch_labels(self, record_name, labels, driver_request_id=None):
+        try:
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='update'):
+                self.kube_api_ctl.patch_object(self.cr_api_version, self.cr_kind, record_name, {ObjectAttributes.METADATA: {ObjectAttributes.LABELS: labels}},
+                                                    namespace=self.storage_namespace, driver_request_id=driver_request_id)
+        except ApiException as e:
+            self.__raise_error('update', e, record_name)
+
+    def __patch_status(self, record_name, status, driver_request_id=None):
+        attempt = 0
+        while True:
+            attempt += 1
+            known = self.__get_known_status(record_name)
+            if known is None:
+                known = self.__known_status_of(self.__read(record_name, driver_request_id=driver_request_id))
+            previous_status, resource_version = known
+            patch = build_merge_patch(previous_status, status)
+            if len(patch) == 0:
+                return
+            body = {STATUS_FIELD: patch}
+            if resource_version is not None:
+                body[ObjectAttributes.METADATA] = {'resourceVersion': resource_version}
+            try:
+                with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='update'):
+                    patched_cr = self.kube_api_ctl.patch_object(self.cr_api_version, self.cr_kind, record_name, body, namespace=self.storage_namespace,
+                                                                    subresource=STATUS_SUBRESOURCE, driver_request_id=driver_request_id)
+            except ApiException as e:
+                self.__forget_status(record_name)
+                if isinstance(e, ConflictError) and attempt < MAX_CONFLICT_RETRIES:
+                    logger.debug(f'Record for {self.stored_type_name} \'{record_name}\' changed since it was read, patching again from its current status')
+                    continue
+                self.__raise_error('update', e, record_name)
+            self.__remember_status(record_name, self.__to_dict(patched_cr))
+            return
+
+    def __read(self, record_name, driver_request_id=None):
+        try:
+            with RECORD_OPERATION_SECONDS.time(stored_type=self.stored_type_name, operation='read'):
+                record_cr = self.kube_api_ctl.read_object(self.cr_api_version, self.cr_kind, record_name, namespace=self.storage_namespace, driver_request_id=driver_request_id)
+        except ApiException as e:
+            self.__raise_error('read', e, record_name)
+        record_cr = self.__to_dict(record_cr)
+        self.__remember_status(record_name, record_cr)
+        return record_cr
+
+    def __to_dict(self, record_cr):
+        if record_cr is None or isinstance(record_cr, dict):
+            return record_cr if record_cr is not None else {}
+        return record_cr.to_dict()
+
+    def __status_of(self, record_cr):
+        status = record_cr.get(STATUS_FIELD)
+        return status if status is not None else {}
+
+    def __known_status_of(self, record_cr):
+        return self.__status_of(record_cr), (record_cr.get(ObjectAttributes.METADATA) or {}).get('resourceVersion')
+
+    def __remember_status(self, record_name, record_cr):
+        with self._known_statuses_lock:
+            self._known_statuses[record_name] = self.__known_status_of(record_cr)
+            self._known_statuses.move_to_end(record_name)
+            while len(self._known_statuses) > self.known_statuses_capacity:
+                self._known_statuses.popitem(last=False)
+
+    def __get_known_status(self, record_name):
+        with self._known_statuses_lock:
+            return self._known_statuses.get(record_name)
+
+    def __forget_status(self, record_name):
+        with self._known_statuses_lock:
+            self._known_statuses.pop(record_name, None)
@@ -6,4 +6,10 @@ class InvalidRecordError(Exception):
     pass
 
 class RecordNotFoundError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class RecordAlreadyExistsError(PersistenceError):
+    pass
+
+class RecordConflictError(PersistenceError):
+    pass
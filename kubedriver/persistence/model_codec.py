@@ -0,0 +1,221 @@
+import re
+import datetime
+import threading
+import dateutil.parser
+
+LIST_TYPE_PATTERN = re.compile(r'^list\[(.*)\]$')
+DICT_TYPE_PATTERN = re.compile(r'^dict\(([^,]*), (.*)\)$')
+PRIMITIVE_TYPES = {
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': bool
+}
+
+def sanitize(obj):
+    """
+    Converts any value to plain dicts, lists and primitives, as sanitize_for_serialization of the Kubernetes ApiClient does.
+    Only used for values without a declared model type (e.g. 'object') or which don't match their declared type
+    """
+    if obj is None:
+        return None
+    if isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return [sanitize(item) for item in obj]
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, dict):
+        return {key: sanitize(value) for key, value in obj.items()}
+    obj_dict = {}
+    for attr in obj.openapi_types:
+        value = getattr(obj, attr)
+        if value is not None:
+            obj_dict[obj.attribute_map[attr]] = sanitize(value)
+    return obj_dict
+
+def to_primitive(primitive_type, value):
+    if type(value) is primitive_type:
+        return value
+    try:
+        return primitive_type(value)
+    except (UnicodeEncodeError, TypeError, ValueError):
+        return value
+
+def to_date(value):
+    return dateutil.parser.parse(value).date()
+
+def to_datetime(value):
+    return dateutil.parser.parse(value)
+
+class ModelCodecGenerator:
+    """
+    Generates an encode and decode function for each model reachable from a core type, specialised to the model's
+    openapi_types and attribute_map. Model types must be in data_types, nothing is looked up in the Kubernetes client
+    """
+
+    def __init__(self, core_type, data_types):
+        self.core_type = core_type
+        self.data_types = dict(data_types) if data_types is not None else {}
+        self.data_types[core_type.__name__] = core_type
+        self.models = []
+        self.__var_count = 0
+
+    def generate(self):
+        """
+        Returns the encoders and decoders (keyed by model class) and the source they were compiled from
+        """
+        self.__collect(self.core_type)
+        lines = []
+        for model in self.models:
+            lines.extend(self.__encoder_source(model))
+            lines.append('')
+            lines.extend(self.__decoder_source(model))
+            lines.append('')
+        source = '\n'.join(lines)
+        namespace = {
+            '_sanitize': sanitize,
+            '_to_primitive': to_primitive,
+            '_to_date': to_date,
+            '_to_datetime': to_datetime
+        }
+        for model in self.models:
+            namespace[self.__model_ref(model)] = model
+        exec(compile(source, f'<codec {self.core_type.__name__}>', 'exec'), namespace)
+        encoders = {model: namespace[self.__encoder_name(model)] for model in self.models}
+        decoders = {model: namespace[self.__decoder_name(model)] for model in self.models}
+        return encoders, decoders, source
+
+    def __collect(self, model):
+        if model in self.models:
+            return
+        self.models.append(model)
+        for attr_type in model.openapi_types.values():
+            for model_name in self.__model_names_in(attr_type):
+                model_type = self.data_types.get(model_name)
+                if model_type is None:
+                    raise ValueError(f'Cannot generate codec for {self.core_type.__name__}, no model provided for type: {model_name}')
+                self.__collect(model_type)
+
+    def __model_names_in(self, type_name):
+        list_match = LIST_TYPE_PATTERN.match(type_name)
+        if list_match is not None:
+            return self.__model_names_in(list_match.group(1))
+        dict_match = DICT_TYPE_PATTERN.match(type_name)
+        if dict_match is not None:
+            return self.__model_names_in(dict_match.group(2))
+        if type_name in PRIMITIVE_TYPES or type_name in ['object', 'date', 'datetime']:
+            return []
+        return [type_name]
+
+    def __model_ref(self, model):
+        return f'_model_{model.__name__}'
+
+    def __encoder_name(self, model):
+        return f'encode_{model.__name__}'
+
+    def __decoder_name(self, model):
+        return f'decode_{model.__name__}'
+
+    def __next_var(self):
+        self.__var_count += 1
+        return f'v{self.__var_count}'
+
+    def __encoder_source(self, model):
+        lines = [f'def {self.__encoder_name(model)}(obj):', '    result = {}']
+        for attr, attr_type in model.openapi_types.items():
+            lines.append(f'    value = obj.{attr}')
+            lines.append('    if value is not None:')
+            lines.append(f'        result[{model.attribute_map[attr]!r}] = {self.__encode_expr("value", attr_type)}')
+        lines.append('    return result')
+        return lines
+
+    def __encode_expr(self, var, type_name):
+        list_match = LIST_TYPE_PATTERN.match(type_name)
+        if list_match is not None:
+            item_var = self.__next_var()
+            item_expr = self.__encode_expr(item_var, list_match.group(1))
+            return f'([{item_expr} for {item_var} in {var}] if type({var}) is list else _sanitize({var}))'
+        dict_match = DICT_TYPE_PATTERN.match(type_name)
+        if dict_match is not None:
+            key_var = self.__next_var()
+            item_var = self.__next_var()
+            item_expr = self.__encode_expr(item_var, dict_match.group(2))
+            return f'({{{key_var}: {item_expr} for {key_var}, {item_var} in {var}.items()}} if type({var}) is dict else _sanitize({var}))'
+        if type_name in PRIMITIVE_TYPES:
+            return f'({var} if type({var}) is {type_name} else _sanitize({var}))'
+        if type_name in ['object', 'date', 'datetime']:
+            return f'_sanitize({var})'
+        model = self.data_types[type_name]
+        return f'({self.__encoder_name(model)}({var}) if type({var}) is {self.__model_ref(model)} else _sanitize({var}))'
+
+    def __decoder_source(self, model):
+        lines = [f'def {self.__decoder_name(model)}(data):', '    kwargs = {}', '    if type(data) is dict:']
+        for attr, attr_type in model.openapi_types.items():
+            key = model.attribute_map[attr]
+            lines.append(f'        if {key!r} in data:')
+            lines.append(f'            value = data[{key!r}]')
+            lines.append(f'            kwargs[{attr!r}] = {self.__decode_expr("value", attr_type)}')
+        lines.append(f'    return {self.__model_ref(model)}(**kwargs)')
+        return lines
+
+    def __decode_expr(self, var, type_name):
+        list_match = LIST_TYPE_PATTERN.match(type_name)
+        if list_match is not None:
+            item_var = self.__next_var()
+            item_expr = self.__decode_expr(item_var, list_match.group(1))
+            return f'(None if {var} is None else [{item_expr} for {item_var} in {var}])'
+        dict_match = DICT_TYPE_PATTERN.match(type_name)
+        if dict_match is not None:
+            key_var = self.__next_var()
+            item_var = self.__next_var()
+            item_expr = self.__decode_expr(item_var, dict_match.group(2))
+            return f'(None if {var} is None else {{{key_var}: {item_expr} for {key_var}, {item_var} in {var}.items()}})'
+        if type_name in PRIMITIVE_TYPES:
+            return f'(None if {var} is None else _to_primitive({type_name}, {var}))'
+        if type_name == 'object':
+            return var
+        if type_name == 'date':
+            return f'(None if {var} is None else _to_date({var}))'
+        if type_name == 'datetime':
+            return f'(None if {var} is None else _to_datetime({var}))'
+        model = self.data_types[type_name]
+        return f'(None if {var} is None else {self.__decoder_name(model)}({var}))'
+
+class ModelCodec:
+    """
+    Converts between models and plain dicts with functions generated from each model's openapi_types and attribute_map.
+
+    Gives the same results as sanitize_for_serialization and deserialize of the Kubernetes ApiClient. Functions are generated
+    once per core type and set of data types, then shared by every codec built for them
+    """
+
+    _generated = {}
+    _generated_lock = threading.Lock()
+
+    def __init__(self, core_type, data_types=None):
+        self.core_type = core_type
+        self.encoders, self.decoders, self.source = self.__get_generated(core_type, data_types if data_types is not None else {})
+        self.__encode = self.encoders[core_type]
+        self.__decode = self.decoders[core_type]
+
+    def __get_generated(self, core_type, data_types):
+        key = (core_type, tuple(sorted(data_types.items(), key=lambda item: item[0])))
+        with ModelCodec._generated_lock:
+            generated = ModelCodec._generated.get(key)
+            if generated is None:
+                generated = ModelCodecGenerator(core_type, data_types).generate()
+                ModelCodec._generated[key] = generated
+            return generated
+
+    def to_dict(self, obj):
+        if obj is None:
+            return None
+        if type(obj) is not self.core_type:
+            return sanitize(obj)
+        return self.__encode(obj)
+
+    def from_dict(self, data):
+        if data is None:
+            return None
+        return self.__decode(data)
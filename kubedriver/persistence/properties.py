@@ -0,0 +1,17 @@
+from ignition.service.framework import Service, Capability
+from ignition.service.config import ConfigurationPropertiesGroup
+from .record_codec import RecordFormats, DEFAULT_COMPRESS_MIN_BYTES
+from .custom_resource_persister import PersistenceBackends, DEFAULT_CR_API_VERSION
+
+class PersistenceProperties(ConfigurationPropertiesGroup, Service, Capability):
+
+    def __init__(self):
+        super().__init__('persistence')
+        self.backend = PersistenceBackends.CONFIG_MAP
+        self.custom_resource_api_version = DEFAULT_CR_API_VERSION
+        self.record_format = RecordFormats.JSON
+        self.compress_records = False
+        self.compress_min_bytes = DEFAULT_COMPRESS_MIN_BYTES
+        self.keg_layout = 'single'
+        self.keg_shard_size = 100
+        self.keg_shard_cache_capacity = 1000
@@ -1,28 +1,29 @@
-import yaml
-import json
-import kubernetes.client.models
-import sys
-
-class RecordWrapper:
-
-    def __init__(self, data):
-        self.data = data
+from .record_codec import ModelCodec, RecordCodec, RecordFormats, DEFAULT_COMPRESS_MIN_BYTES
 
 class CmRecordBuilder:
 
-    def __init__(self, api_client, core_type, data_types):
+    def __init__(self, api_client, core_type, data_types, record_format=RecordFormats.JSON, compress=False, compress_min_bytes=DEFAULT_COMPRESS_MIN_BYTES):
         self.api_client = api_client
         self.core_type = core_type
-        for data_type_name, data_type in data_types.items():
-            # Register our custom types on the Kubernetes model module so they can be deserialized by the client in Kubernetes module
-            # Replace with our own generated client and/or deserializer
-            setattr(sys.modules['kubernetes.client.models'], data_type_name, data_type)
+        self.codec = RecordCodec(ModelCodec(core_type, data_types), record_format=record_format, compress=compress, compress_min_bytes=compress_min_bytes)
 
     def to_record(self, orig_obj):
-        obj_as_dict = self.api_client.sanitize_for_serialization(orig_obj)
-        return yaml.safe_dump(obj_as_dict)
+        return self.codec.encode_string(orig_obj)
 
     def from_record(self, obj_as_dict_str):
-        obj_as_dict = yaml.safe_load(obj_as_dict_str)
-        obj_as_json = json.dumps(obj_as_dict)
-        return self.api_client.deserialize(RecordWrapper(obj_as_json), self.core_type)
+        return self.codec.decode_string(obj_as_dict_str)
+
+    def to_record_fields(self, orig_obj):
+        """
+        Returns the data and binaryData (None when not needed) fields of the record
+        """
+        return self.codec.encode(orig_obj)
+
+    def from_record_fields(self, data, binary_data=None):
+        return self.codec.decode(data, binary_data=binary_data)
+
+    def to_dict(self, orig_obj):
+        return self.codec.model_codec.to_dict(orig_obj)
+
+    def from_dict(self, obj_as_dict):
+        return self.codec.model_codec.from_dict(obj_as_dict)
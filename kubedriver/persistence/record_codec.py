@@ -0,0 +1,109 @@
+import gzip
+import json
+import base64
+import yaml
+from .exceptions import InvalidRecordError
+from .model_codec import ModelCodec
+
+RECORD_KEY = 'record'
+RECORD_FORMAT_KEY = 'recordFormat'
+
+DEFAULT_COMPRESS_MIN_BYTES = 4096
+# Level 6 gives most of the size reduction of 9 at a fraction of the CPU
+COMPRESS_LEVEL = 6
+
+class RecordFormats:
+    # Records written before the format was versioned have no recordFormat and hold YAML (or JSON, which is also YAML)
+    YAML = 'yaml'
+    JSON = 'json'
+    JSON_GZIP = 'json+gzip'
+
+    ALL = [YAML, JSON]
+
+class RecordCodec:
+    """
+    Encodes models into the fields of a record (ConfigMap) and back.
+
+    New records are written as JSON, with their format in the recordFormat field. When compression is enabled, JSON records of
+    at least compress_min_bytes are gzipped into binaryData (base64 encoded). Records written as YAML, including all records
+    written before the format was versioned, are still read
+    """
+
+    def __init__(self, model_codec, record_format=RecordFormats.JSON, compress=False, compress_min_bytes=DEFAULT_COMPRESS_MIN_BYTES):
+        if record_format not in RecordFormats.ALL:
+            raise ValueError(f'Record format must be one of {RecordFormats.ALL} but was: {record_format}')
+        self.model_codec = model_codec
+        self.record_format = record_format
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes if compress_min_bytes is not None else 0
+
+    def encode(self, obj):
+        """
+        Returns the string and binary fields (None when there are none) of the record
+        """
+        if self.record_format == RecordFormats.YAML:
+            return {RECORD_KEY: self.encode_string(obj)}, None
+        obj_as_json = self.encode_string(obj)
+        if self.compress:
+            obj_as_bytes = obj_as_json.encode('utf-8')
+            if len(obj_as_bytes) >= self.compress_min_bytes:
+                # mtime=0 so the same record always compresses to the same bytes
+                compressed = gzip.compress(obj_as_bytes, compresslevel=COMPRESS_LEVEL, mtime=0)
+                return {RECORD_FORMAT_KEY: RecordFormats.JSON_GZIP}, {RECORD_KEY: base64.b64encode(compressed).decode('ascii')}
+        return {RECORD_KEY: obj_as_json, RECORD_FORMAT_KEY: RecordFormats.JSON}, None
+
+    def encode_string(self, obj):
+        """
+        Returns the record as an uncompressed string in the configured format
+        """
+        obj_as_dict = self.model_codec.to_dict(obj)
+        if self.record_format == RecordFormats.YAML:
+            return yaml.safe_dump(obj_as_dict)
+        return json.dumps(obj_as_dict, separators=(',', ':'))
+
+    def decode(self, data, binary_data=None):
+        data = data if data is not None else {}
+        record_format = data.get(RECORD_FORMAT_KEY)
+        if record_format is None or record_format == RecordFormats.YAML:
+            obj_as_dict = self.__parse_legacy(data.get(RECORD_KEY))
+        elif record_format == RecordFormats.JSON:
+            obj_as_dict = self.__parse_json(data.get(RECORD_KEY))
+        elif record_format == RecordFormats.JSON_GZIP:
+            # Kinds without binaryData hold the compressed record in their data field
+            compressed = binary_data.get(RECORD_KEY) if binary_data is not None else None
+            if compressed is None:
+                compressed = data.get(RECORD_KEY)
+            obj_as_dict = self.__parse_json(self.__decompress(compressed))
+        else:
+            raise InvalidRecordError(f'Cannot read record, unsupported format: {record_format}')
+        return self.model_codec.from_dict(obj_as_dict)
+
+    def decode_string(self, record):
+        return self.model_codec.from_dict(self.__parse_legacy(record))
+
+    def __parse_legacy(self, record):
+        if record is None:
+            return None
+        if record.lstrip().startswith('{'):
+            try:
+                return json.loads(record)
+            except ValueError:
+                # YAML flow mapping
+                pass
+        return yaml.safe_load(record)
+
+    def __parse_json(self, record):
+        if record is None:
+            return None
+        try:
+            return json.loads(record)
+        except ValueError as e:
+            raise InvalidRecordError(f'Cannot read record, invalid JSON: {e}') from e
+
+    def __decompress(self, compressed):
+        if compressed is None:
+            return None
+        try:
+            return gzip.decompress(base64.b64decode(compressed)).decode('utf-8')
+        except (ValueError, OSError, EOFError) as e:
+            raise InvalidRecordError(f'Cannot read record, invalid compressed data: {e}') from e
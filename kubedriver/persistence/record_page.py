@@ -0,0 +1,63 @@
+class RecordPage:
+    """
+    One page of the records matching a label selector. Records are only decoded when read, so the names and labels
+    of a page can be used without the cost of decoding every record
+    """
+
+    def __init__(self, entries, continue_token=None, decoder=None):
+        # Each entry is (record name, labels, stored object)
+        self.entries = entries
+        self.continue_token = continue_token
+        self.decoder = decoder
+
+    @property
+    def names(self):
+        return [record_name for record_name, _, _ in self.entries]
+
+    @property
+    def labels(self):
+        return {record_name: labels for record_name, labels, _ in self.entries}
+
+    def get_record(self, record_name):
+        for entry_name, _, stored_object in self.entries:
+            if entry_name == record_name:
+                return self.decoder(stored_object)
+        return None
+
+    @property
+    def records(self):
+        return {record_name: self.decoder(stored_object) for record_name, _, stored_object in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+class RecordEvent:
+    """
+    A change to a record seen by a watch (ADDED, MODIFIED, DELETED, BOOKMARK or ERROR). As with a page,
+    the record is only decoded when read
+    """
+
+    def __init__(self, event_type, stored_object, decoder=None):
+        self.event_type = event_type
+        self.stored_object = stored_object if stored_object is not None else {}
+        self.decoder = decoder
+
+    @property
+    def metadata(self):
+        return self.stored_object.get('metadata') or {}
+
+    @property
+    def name(self):
+        return self.metadata.get('name')
+
+    @property
+    def labels(self):
+        return self.metadata.get('labels') or {}
+
+    @property
+    def resource_version(self):
+        return self.metadata.get('resourceVersion')
+
+    @property
+    def record(self):
+        return self.decoder(self.stored_object)
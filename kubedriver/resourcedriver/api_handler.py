@@ -136,10 +136,20 @@ class KubeResourceDriverHandler(Service, ResourceDriverHandlerCapability):
         """
         Clears the kegd report to keep Kubernetes clusters tidy. 
         This is only called if the lifecycle monitor has posted a message on Kafka (in response to Brent) so this is safe to do, as this request will not be checked again.
+        When kegd reports are kept, the report is still removed from the report cache for the same reason
         """
-        if self.resource_driver_properties.keep_kegdrs is False:
-            kube_location = self.__translate_location(deployment_location)
-            self.kegd_strategy_manager.delete_request_report(kube_location, request_id)
+        kube_location = self.__translate_location(deployment_location)
+        try:
+            if self.resource_driver_properties.keep_kegdrs is False:
+                self.kegd_strategy_manager.delete_request_report(kube_location, request_id)
+            else:
+                self.kegd_strategy_manager.forget_request_report(kube_location, request_id)
+        finally:
+            try:
+                logger.debug(f'Attempting to clean up deployment location related files')
+                kube_location.clean()
+            except Exception as e:
+                logger.exception(f'Encountered an error whilst trying to clean up deployment location related files: {e}')
 
     def find_reference(self, instance_name, driver_files, deployment_location):
         """
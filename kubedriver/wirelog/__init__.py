@@ -0,0 +1,2 @@
+from .logger import WireLogger, WireLogSettings, default_wire_log_settings
+from .properties import WireLogProperties
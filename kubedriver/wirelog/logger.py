@@ -0,0 +1,216 @@
+import json
+import zlib
+import types
+import logging
+import functools
+from subprocess import CompletedProcess
+from ignition.service.logging import logging_context
+
+REDACTED = '******'
+SENSITIVE_HEADERS = ['authorization', 'set-cookie']
+DEFAULT_REDACT_KEYS = ['password', 'token', 'authorization', 'client-key-data', 'client-certificate-data']
+SECRET_KIND = 'Secret'
+SECRET_DATA_KEYS = ['data', 'stringData']
+# Bodies of these types are called to produce the body to log, so they are only produced when logged
+LAZY_BODY_TYPES = (types.FunctionType, types.MethodType, types.BuiltinMethodType, functools.partial)
+CONTEXT_KEYS = ['message_direction', 'tracectx.externalrequestid', 'content_type', 'message_type', 'protocol', 'protocol_metadata',
+                    'tracectx.driverrequestid']
+
+class WireLogSettings:
+
+    def __init__(self, level=logging.INFO, max_body_chars=16384, sample_rate=1.0, redact_keys=None, redact_secret_data=True):
+        self.level = logging.INFO
+        self.max_body_chars = None
+        self.sample_rate = 1.0
+        self.redact_keys = frozenset()
+        self.redact_secret_data = True
+        self.configure(level=level, max_body_chars=max_body_chars, sample_rate=sample_rate,
+                        redact_keys=redact_keys if redact_keys is not None else DEFAULT_REDACT_KEYS, redact_secret_data=redact_secret_data)
+
+    def configure(self, level=None, max_body_chars=None, sample_rate=None, redact_keys=None, redact_secret_data=None):
+        if level is not None:
+            self.level = level if isinstance(level, int) else logging.getLevelName(str(level).upper())
+        if max_body_chars is not None:
+            # Zero or less means no limit
+            self.max_body_chars = max_body_chars if max_body_chars > 0 else None
+        if sample_rate is not None:
+            self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        if redact_keys is not None:
+            self.redact_keys = frozenset(key.lower() for key in redact_keys)
+        if redact_secret_data is not None:
+            self.redact_secret_data = redact_secret_data
+
+default_wire_log_settings = WireLogSettings()
+
+class _LimitReached(Exception):
+    pass
+
+class _BoundedWriter:
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.truncated = False
+
+    def remaining(self):
+        return None if self.limit is None else self.limit - self.size
+
+    def write(self, text):
+        if self.limit is not None and self.size + len(text) > self.limit:
+            self.parts.append(text[:self.limit - self.size])
+            self.size = self.limit
+            self.truncated = True
+            raise _LimitReached()
+        self.parts.append(text)
+        self.size += len(text)
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+class WireLogger:
+    """
+    Logs the requests and responses exchanged with external systems (Kubernetes API, Helm).
+
+    Nothing is serialized unless the logger is enabled for the configured level and the exchange is sampled. Bodies may be
+    passed as a callable (e.g. `obj.to_dict`) so the conversion is also skipped when not logged. Serialization writes
+    straight to a bounded buffer, redacting sensitive keys as it goes, and stops once the size limit is reached.
+    """
+
+    def __init__(self, logger, settings=None):
+        self.logger = logger
+        self.settings = settings if settings is not None else default_wire_log_settings
+
+    def is_enabled(self, external_request_id=None):
+        if not self.logger.isEnabledFor(self.settings.level):
+            return False
+        sample_rate = self.settings.sample_rate
+        if sample_rate >= 1.0:
+            return True
+        if sample_rate <= 0.0 or external_request_id is None:
+            return False
+        # Sampled by request ID so both the request and response of an exchange are logged (or neither)
+        return (zlib.crc32(str(external_request_id).encode()) / 0xFFFFFFFF) < sample_rate
+
+    def log(self, body, message_direction, external_request_id, content_type, message_type, protocol, protocol_metadata, driver_request_id):
+        if not self.is_enabled(external_request_id):
+            return
+        try:
+            logging_context.set_from_dict({
+                'message_direction': message_direction,
+                'tracectx.externalrequestid': external_request_id,
+                'content_type': content_type,
+                'message_type': message_type,
+                'protocol': protocol,
+                'protocol_metadata': self.serialize_metadata(protocol_metadata),
+                'tracectx.driverrequestid': driver_request_id
+            })
+            self.logger.log(self.settings.level, self.serialize(body))
+        finally:
+            for key in CONTEXT_KEYS:
+                logging_context.data.pop(key, None)
+
+    def serialize_metadata(self, protocol_metadata):
+        if protocol_metadata is None:
+            return ''
+        if not isinstance(protocol_metadata, dict):
+            return str(protocol_metadata)
+        headers = protocol_metadata.get('headers')
+        if isinstance(headers, dict):
+            protocol_metadata = {key: value for key, value in protocol_metadata.items() if key != 'headers'}
+            protocol_metadata['headers'] = {key: value for key, value in headers.items() if key.lower() not in SENSITIVE_HEADERS}
+        return json.dumps(protocol_metadata, default=str)
+
+    def serialize(self, body):
+        if isinstance(body, LAZY_BODY_TYPES):
+            body = body()
+        writer = _BoundedWriter(self.settings.max_body_chars)
+        try:
+            self.__write_top_level(body, writer)
+        except _LimitReached:
+            pass
+        value = writer.getvalue()
+        if writer.truncated:
+            value += f'... [truncated at {writer.limit} characters]'
+        return value
+
+    def __write_top_level(self, body, writer):
+        # Text bodies are logged as they are, structured bodies as JSON
+        if body is None:
+            return
+        if isinstance(body, str):
+            writer.write(body)
+        elif isinstance(body, (bytes, bytearray)):
+            self.__write_bytes(body, writer)
+        elif isinstance(body, CompletedProcess):
+            self.__write_completed_process(body, writer)
+        else:
+            self.__write_value(body, writer)
+
+    def __write_bytes(self, value, writer):
+        remaining = writer.remaining()
+        if remaining is not None:
+            # Decoding never produces more characters than bytes, so one extra byte is enough to trigger truncation
+            value = value[:remaining + 1]
+        writer.write(value.decode('utf-8', errors='replace'))
+
+    def __write_completed_process(self, process, writer):
+        stdout = getattr(process, 'stdout', None)
+        stderr = getattr(process, 'stderr', None)
+        if stdout is not None:
+            writer.write('stdout=')
+            self.__write_stream(stdout, writer)
+        if stderr is not None:
+            writer.write(',stderr=' if stdout is not None else 'stderr=')
+            self.__write_stream(stderr, writer)
+
+    def __write_stream(self, value, writer):
+        if isinstance(value, (bytes, bytearray)):
+            self.__write_bytes(value, writer)
+        else:
+            writer.write(str(value))
+
+    def __write_value(self, value, writer):
+        if isinstance(value, dict):
+            self.__write_dict(value, writer)
+        elif isinstance(value, (list, tuple)):
+            writer.write('[')
+            for index, item in enumerate(value):
+                if index > 0:
+                    writer.write(', ')
+                self.__write_value(item, writer)
+            writer.write(']')
+        elif value is None or isinstance(value, (bool, int, float)):
+            writer.write(json.dumps(value))
+        elif isinstance(value, str):
+            remaining = writer.remaining()
+            writer.write(json.dumps(value if remaining is None else value[:remaining + 1]))
+        elif isinstance(value, (bytes, bytearray)):
+            writer.write('"')
+            self.__write_bytes(value, writer)
+            writer.write('"')
+        elif hasattr(value, 'to_dict'):
+            as_dict = value.to_dict()
+            if isinstance(as_dict, dict):
+                self.__write_dict(as_dict, writer)
+            else:
+                writer.write(json.dumps(str(value)))
+        else:
+            writer.write(json.dumps(str(value)))
+
+    def __write_dict(self, value, writer):
+        redact_secret_data = self.settings.redact_secret_data and value.get('kind') == SECRET_KIND
+        redact_keys = self.settings.redact_keys
+        writer.write('{')
+        first = True
+        for key, item in value.items():
+            if not first:
+                writer.write(', ')
+            first = False
+            writer.write(json.dumps(str(key)))
+            writer.write(': ')
+            if str(key).lower() in redact_keys or (redact_secret_data and key in SECRET_DATA_KEYS):
+                writer.write(json.dumps(REDACTED))
+            else:
+                self.__write_value(item, writer)
+        writer.write('}')
@@ -0,0 +1,13 @@
+from ignition.service.framework import Service, Capability
+from ignition.service.config import ConfigurationPropertiesGroup
+from .logger import DEFAULT_REDACT_KEYS
+
+class WireLogProperties(ConfigurationPropertiesGroup, Service, Capability):
+
+    def __init__(self):
+        super().__init__('wire_log')
+        self.level = 'INFO'
+        self.max_body_chars = 16384
+        self.sample_rate = 1.0
+        self.redact_keys = list(DEFAULT_REDACT_KEYS)
+        self.redact_secret_data = True
@@ -0,0 +1,145 @@
+import unittest
+from unittest.mock import MagicMock
+from kubernetes.client.exceptions import ApiException
+from kubedriver.keg.composition_loader import CompositionLoader, BulkLoadSettings
+from kubedriver.keg.model import V1alpha1KegStatus, V1alpha1KegCompositionStatus, V1alpha1ObjectStatus
+from kubedriver.kubeclient import AsyncApiController
+
+class MockObject:
+
+    def __init__(self, data):
+        self.data = data
+
+    def to_dict(self):
+        return self.data
+
+def build_keg_status(*names):
+    objects = [V1alpha1ObjectStatus(group='v1', kind='ConfigMap', name=name, namespace='default') for name in names]
+    return V1alpha1KegStatus(composition=V1alpha1KegCompositionStatus(objects=objects, helm_releases=[]))
+
+class TestCompositionLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.api_ctl = MagicMock()
+        self.api_ctl.safe_read_object.side_effect = self._read
+        self.helm_client = MagicMock()
+
+    def _read(self, api_version, kind, name, namespace=None, driver_request_id=None):
+        if name == 'missing':
+            return False, None
+        return True, MockObject({'kind': kind, 'metadata': {'name': name, 'namespace': namespace}})
+
+    def test_load_composition_objects(self):
+        loader = CompositionLoader(self.api_ctl, self.helm_client)
+        result = loader.load_composition_objects(build_keg_status('a', 'missing', 'b'), driver_request_id='123')
+        self.assertEqual([obj['metadata']['name'] for obj in result], ['a', 'b'])
+        self.api_ctl.safe_read_object.assert_any_call('v1', 'ConfigMap', 'a', namespace='default', driver_request_id='123')
+
+    def test_load_composition_objects_with_async_api_ctl(self):
+        async_api_ctl = AsyncApiController(self.api_ctl, max_concurrency=2)
+        try:
+            loader = CompositionLoader(self.api_ctl, self.helm_client, async_api_ctl=async_api_ctl)
+            result = loader.load_composition_objects(build_keg_status('a', 'missing', 'b', 'c'), driver_request_id='123')
+        finally:
+            async_api_ctl.close()
+        self.assertEqual([obj['metadata']['name'] for obj in result], ['a', 'b', 'c'])
+        self.assertEqual(self.api_ctl.safe_read_object.call_count, 4)
+
+    def test_load_objects_in_helm_release_with_async_api_ctl(self):
+        self.api_ctl.is_object_namespaced.side_effect = lambda api_version, kind: kind != 'Namespace'
+        helm_release_details = MagicMock(namespace='release-ns', manifest=[
+            {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'a'}},
+            {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'b', 'namespace': 'other'}},
+            {'apiVersion': 'v1', 'kind': 'Namespace', 'metadata': {'name': 'c'}}
+        ])
+        async_api_ctl = AsyncApiController(self.api_ctl, max_concurrency=2)
+        try:
+            loader = CompositionLoader(self.api_ctl, self.helm_client, async_api_ctl=async_api_ctl)
+            result = loader.load_objects_in_helm_release(helm_release_details)
+        finally:
+            async_api_ctl.close()
+        self.assertEqual([obj['metadata']['namespace'] for obj in result], ['release-ns', 'other', None])
+        self.assertEqual(self.api_ctl.is_object_namespaced.call_count, 2)
+
+class TestCompositionLoaderBulkLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.api_ctl = MagicMock()
+        self.api_ctl.safe_read_object.side_effect = self._read
+        self.helm_client = MagicMock()
+        self.bulk_load_settings = BulkLoadSettings('keg.kubedriver.alm/keg=my-keg', min_objects=2, page_size=2)
+
+    def _read(self, api_version, kind, name, namespace=None, driver_request_id=None):
+        if name == 'missing':
+            return False, None
+        return True, MockObject({'kind': kind, 'metadata': {'name': name, 'namespace': namespace}, 'read': True})
+
+    def _list_item(self, name):
+        return {'kind': 'ConfigMap', 'metadata': {'name': name, 'namespace': 'default'}, 'listed': True}
+
+    def test_lists_objects_by_label_selector(self):
+        self.api_ctl.list_objects.return_value = {'items': [self._list_item('a'), self._list_item('b')], 'metadata': {}}
+        loader = CompositionLoader(self.api_ctl, self.helm_client, bulk_load_settings=self.bulk_load_settings)
+        result = loader.load_composition_objects(build_keg_status('a', 'b'), driver_request_id='123')
+        self.assertEqual(result, [self._list_item('a'), self._list_item('b')])
+        self.api_ctl.list_objects.assert_called_once_with('v1', 'ConfigMap', namespace='default', label_selector='keg.kubedriver.alm/keg=my-keg',
+                                                            limit=2, continue_token=None, driver_request_id='123')
+        self.api_ctl.safe_read_object.assert_not_called()
+
+    def test_follows_continue_token(self):
+        self.api_ctl.list_objects.side_effect = [
+            {'items': [self._list_item('a'), self._list_item('b')], 'metadata': {'continue': 'next'}},
+            {'items': [self._list_item('c')], 'metadata': {}}
+        ]
+        loader = CompositionLoader(self.api_ctl, self.helm_client, bulk_load_settings=self.bulk_load_settings)
+        result = loader.load_composition_objects(build_keg_status('a', 'b', 'c'))
+        self.assertEqual([obj['metadata']['name'] for obj in result], ['a', 'b', 'c'])
+        self.assertEqual(self.api_ctl.list_objects.call_args_list[1][1]['continue_token'], 'next')
+
+    def test_reads_objects_missing_from_list(self):
+        self.api_ctl.list_objects.return_value = {'items': [self._list_item('b')], 'metadata': {}}
+        loader = CompositionLoader(self.api_ctl, self.helm_client, bulk_load_settings=self.bulk_load_settings)
+        result = loader.load_composition_objects(build_keg_status('a', 'b', 'missing'))
+        self.assertEqual([obj['metadata']['name'] for obj in result], ['a', 'b'])
+        self.assertTrue(result[0]['read'])
+        self.assertTrue(result[1]['listed'])
+        self.assertEqual(self.api_ctl.safe_read_object.call_count, 2)
+
+    def test_reads_objects_when_list_fails(self):
+        self.api_ctl.list_objects.side_effect = ApiException(status=403, reason='Forbidden')
+        loader = CompositionLoader(self.api_ctl, self.helm_client, bulk_load_settings=self.bulk_load_settings)
+        result = loader.load_composition_objects(build_keg_status('a', 'b'))
+        self.assertEqual([obj['metadata']['name'] for obj in result], ['a', 'b'])
+        self.assertEqual(self.api_ctl.safe_read_object.call_count, 2)
+
+    def test_reads_objects_below_min_objects(self):
+        loader = CompositionLoader(self.api_ctl, self.helm_client, bulk_load_settings=self.bulk_load_settings)
+        result = loader.load_composition_objects(build_keg_status('a'))
+        self.assertEqual([obj['metadata']['name'] for obj in result], ['a'])
+        self.api_ctl.list_objects.assert_not_called()
+
+class TestCompositionLoaderWithInformers(unittest.TestCase):
+
+    def setUp(self):
+        self.api_ctl = MagicMock()
+        self.api_ctl.safe_read_object.side_effect = lambda api_version, kind, name, namespace=None, driver_request_id=None: (True, MockObject({'metadata': {'name': name}, 'read': True}))
+        self.helm_client = MagicMock()
+        self.informers = MagicMock()
+
+    def test_uses_cached_objects(self):
+        self.informers.get.side_effect = lambda api_version, kind, namespace, name: (True, {'metadata': {'name': name}, 'cached': True}) if name != 'b' else (True, None)
+        loader = CompositionLoader(self.api_ctl, self.helm_client, informers=self.informers)
+        result = loader.load_composition_objects(build_keg_status('a', 'b', 'c'))
+        self.assertEqual([obj['metadata']['name'] for obj in result], ['a', 'b', 'c'])
+        self.assertTrue(result[0]['cached'])
+        self.assertTrue(result[1]['read'])
+        self.assertTrue(result[2]['cached'])
+        self.api_ctl.safe_read_object.assert_called_once_with('v1', 'ConfigMap', 'b', namespace='default', driver_request_id=None)
+        self.informers.watch.assert_called_with('v1', 'ConfigMap')
+
+    def test_reads_objects_when_not_synced(self):
+        self.informers.get.return_value = (False, None)
+        loader = CompositionLoader(self.api_ctl, self.helm_client, informers=self.informers)
+        result = loader.load_composition_objects(build_keg_status('a', 'b'))
+        self.assertEqual([obj['metadata']['name'] for obj in result], ['a', 'b'])
+        self.assertEqual(self.api_ctl.safe_read_object.call_count, 2)
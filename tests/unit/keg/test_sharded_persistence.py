@@ -0,0 +1,201 @@
+import unittest
+import copy
+from unittest.mock import MagicMock
+from kubernetes.client.rest import ApiException
+from openshift.dynamic.resource import ResourceField
+from openshift.dynamic.exceptions import ConflictError, NotFoundError
+from kubedriver.keg import KegPersistenceFactory, ShardedKegPersister, ShardCache
+from kubedriver.keg.model import V1alpha1KegStatus, V1alpha1KegCompositionStatus, V1alpha1ObjectStatus, V1alpha1HelmReleaseStatus
+from kubedriver.persistence import PersistenceError, RecordNotFoundError
+
+def to_resource_field(value):
+    # As returned by the dynamic client
+    if isinstance(value, dict):
+        return ResourceField(**{k: to_resource_field(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [to_resource_field(item) for item in value]
+    return value
+
+class FakeApiCtl:
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+        self.version = 0
+
+    def __stored(self, object_config):
+        self.version += 1
+        data = copy.deepcopy(object_config.data)
+        data['metadata']['resourceVersion'] = str(self.version)
+        data['metadata']['uid'] = f'uid-{data["metadata"]["name"]}'
+        self.objects[data['metadata']['name']] = data
+        return to_resource_field(copy.deepcopy(data))
+
+    def create_object(self, object_config, default_namespace=None, driver_request_id=None):
+        self.calls.append(('create', object_config.name))
+        if object_config.name in self.objects:
+            raise ConflictError(ApiException(status=409, reason='AlreadyExists'))
+        return self.__stored(object_config)
+
+    def update_object(self, object_config, default_namespace=None, driver_request_id=None):
+        self.calls.append(('update', object_config.name))
+        if object_config.name not in self.objects:
+            raise NotFoundError(ApiException(status=404, reason='Not Found'))
+        return self.__stored(object_config)
+
+    def read_object(self, api_version, kind, name, namespace=None, driver_request_id=None):
+        self.calls.append(('read', name))
+        if name not in self.objects:
+            raise NotFoundError(ApiException(status=404, reason='Not Found'))
+        return to_resource_field(copy.deepcopy(self.objects[name]))
+
+    def delete_object(self, api_version, kind, name, namespace=None, driver_request_id=None):
+        self.calls.append(('delete', name))
+        if name not in self.objects:
+            raise NotFoundError(ApiException(status=404, reason='Not Found'))
+        self.objects.pop(name)
+
+    def shard_names(self):
+        return sorted(name for name in self.objects if '-shard-' in name)
+
+    def calls_of(self, call_type):
+        return [call[1] for call in self.calls if call[0] == call_type]
+
+def build_keg_status(num_objects=5, num_helm_releases=1):
+    objects = [V1alpha1ObjectStatus(group='v1', kind='ConfigMap', namespace='default', name=f'cm-{idx}', state='Created', tags={'deployOn': ['Create']})
+                for idx in range(num_objects)]
+    helm_releases = [V1alpha1HelmReleaseStatus(name=f'release-{idx}', namespace='default', state='Created') for idx in range(num_helm_releases)]
+    return V1alpha1KegStatus(uid='123', composition=V1alpha1KegCompositionStatus(objects=objects, helm_releases=helm_releases))
+
+def build_location(keg_layout='sharded', keg_shard_size=2):
+    kube_location = MagicMock(driver_namespace='driver', keg_layout=keg_layout, keg_shard_size=keg_shard_size)
+    kube_location.get_cm_persister_args.return_value = {}
+    return kube_location
+
+class TestShardedKegPersister(unittest.TestCase):
+
+    def setUp(self):
+        self.api_ctl = FakeApiCtl()
+        self.factory = KegPersistenceFactory()
+
+    def __persister(self, keg_layout='sharded', keg_shard_size=2):
+        return self.factory.build(build_location(keg_layout=keg_layout, keg_shard_size=keg_shard_size), self.api_ctl)
+
+    def test_create_and_get(self):
+        persister = self.__persister()
+        persister.create('keg', build_keg_status())
+        # 5 objects in shards of 2, 1 Helm release
+        self.assertEqual(len(self.api_ctl.shard_names()), 4)
+        self.assertEqual(self.api_ctl.objects['keg']['data']['recordLayout'], 'sharded')
+        self.assertEqual(self.__persister().get('keg'), build_keg_status())
+
+    def test_get_without_composition(self):
+        persister = self.__persister()
+        persister.create('keg', V1alpha1KegStatus(uid='123'))
+        self.assertEqual(self.api_ctl.shard_names(), [])
+        self.assertEqual(self.__persister().get('keg'), V1alpha1KegStatus(uid='123'))
+
+    def test_update_only_writes_changed_shards(self):
+        persister = self.__persister()
+        persister.create('keg', build_keg_status())
+        shards_before = self.api_ctl.shard_names()
+        self.api_ctl.calls = []
+        keg_status = build_keg_status()
+        keg_status.composition.objects[4].state = 'Deleted'
+        persister.update('keg', keg_status)
+        self.assertEqual(len(self.api_ctl.calls_of('create')), 1)
+        self.assertEqual(self.api_ctl.calls_of('update'), ['keg'])
+        self.assertEqual(len(self.api_ctl.calls_of('delete')), 1)
+        self.assertEqual(self.api_ctl.calls_of('read'), [])
+        self.assertEqual(len(set(self.api_ctl.shard_names()) - set(shards_before)), 1)
+        self.assertEqual(self.__persister().get('keg'), keg_status)
+
+    def test_get_reads_cached_shards_once(self):
+        self.__persister().create('keg', build_keg_status())
+        self.api_ctl.calls = []
+        self.__persister().get('keg')
+        self.__persister().get('keg')
+        self.assertEqual(self.api_ctl.calls_of('read'), ['keg', 'keg'])
+
+    def test_get_reads_shards_not_cached(self):
+        self.__persister().create('keg', build_keg_status())
+        self.api_ctl.calls = []
+        persister = ShardedKegPersister(*self.__parts(), shard_cache=ShardCache())
+        self.assertEqual(persister.get('keg'), build_keg_status())
+        self.assertEqual(len(self.api_ctl.calls_of('read')), 5)
+
+    def __parts(self):
+        persister = self.__persister()
+        return persister.index_persister, persister.shard_persister, persister.keg_record_builder, persister.shard_record_builder
+
+    def test_get_missing_shard(self):
+        self.__persister().create('keg', build_keg_status())
+        self.api_ctl.objects.pop(self.api_ctl.shard_names()[0])
+        persister = ShardedKegPersister(*self.__parts(), shard_cache=ShardCache())
+        with self.assertRaises(PersistenceError):
+            persister.get('keg')
+
+    def test_create_tolerates_existing_shard(self):
+        persister = self.__persister()
+        persister.create('keg', build_keg_status())
+        self.api_ctl.objects.pop('keg')
+        persister.create('keg', build_keg_status())
+        self.assertEqual(self.__persister().get('keg'), build_keg_status())
+
+    def test_delete_removes_shards(self):
+        persister = self.__persister()
+        persister.create('keg', build_keg_status())
+        self.__persister().delete('keg')
+        self.assertEqual(self.api_ctl.objects, {})
+
+    def test_delete_not_found(self):
+        with self.assertRaises(RecordNotFoundError):
+            self.__persister().delete('keg')
+
+    def test_reads_single_layout(self):
+        self.__persister(keg_layout='single').create('keg', build_keg_status())
+        self.assertEqual(self.api_ctl.shard_names(), [])
+        self.assertEqual(self.__persister().get('keg'), build_keg_status())
+
+    def test_update_converts_single_to_sharded(self):
+        self.__persister(keg_layout='single').create('keg', build_keg_status())
+        self.__persister().update('keg', build_keg_status())
+        self.assertEqual(len(self.api_ctl.shard_names()), 4)
+        self.assertEqual(self.__persister(keg_layout='single').get('keg'), build_keg_status())
+
+    def test_update_converts_sharded_to_single(self):
+        self.__persister().create('keg', build_keg_status())
+        self.__persister(keg_layout='single').update('keg', build_keg_status())
+        self.assertEqual(self.api_ctl.shard_names(), [])
+        self.assertEqual(self.__persister().get('keg'), build_keg_status())
+
+    def test_shard_failing_removal_is_ignored(self):
+        persister = self.__persister()
+        persister.create('keg', build_keg_status())
+        self.api_ctl.delete_object = MagicMock(side_effect=ApiException(status=500, reason='Error'))
+        persister.update('keg', build_keg_status(num_objects=1))
+        self.assertEqual(self.__persister().get('keg'), build_keg_status(num_objects=1))
+
+class TestKegPersistenceFactory(unittest.TestCase):
+
+    def test_layout_from_location(self):
+        persister = KegPersistenceFactory().build(build_location(keg_layout='sharded', keg_shard_size=10), MagicMock())
+        self.assertEqual(persister.layout, 'sharded')
+        self.assertEqual(persister.shard_size, 10)
+
+    def test_layout_from_properties(self):
+        properties = MagicMock(keg_layout='sharded', keg_shard_size=20, keg_shard_cache_capacity=5, record_format='json', compress_records=False, compress_min_bytes=0)
+        factory = KegPersistenceFactory(persistence_properties=properties)
+        persister = factory.build(build_location(keg_layout=None, keg_shard_size=None), MagicMock())
+        self.assertEqual(persister.layout, 'sharded')
+        self.assertEqual(persister.shard_size, 20)
+        self.assertEqual(persister.shard_cache.capacity, 5)
+
+    def test_default_layout(self):
+        persister = KegPersistenceFactory().build(build_location(keg_layout=None, keg_shard_size=None), MagicMock())
+        self.assertEqual(persister.layout, 'single')
+        self.assertEqual(persister.shard_size, 100)
+
+    def test_shard_cache_shared(self):
+        factory = KegPersistenceFactory()
+        self.assertIs(factory.build(build_location(), MagicMock()).shard_cache, factory.build(build_location(), MagicMock()).shard_cache)
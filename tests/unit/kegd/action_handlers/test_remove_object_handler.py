@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import MagicMock
+from kubedriver.keg.model import V1alpha1KegStatus, V1alpha1KegCompositionStatus, V1alpha1ObjectStatus, EntityStates
+from kubedriver.kegd.action_handlers import RemoveObjectHandler
+from kubedriver.kegd.model import RemoveObjectAction
+from kubedriver.kegd.properties import KegDeploymentRemovalProperties
+
+def build_keg_status(*names):
+    objects = [V1alpha1ObjectStatus(group='v1', kind='ConfigMap', name=name, namespace='default', state=EntityStates.DELETE_PENDING) for name in names]
+    return V1alpha1KegStatus(composition=V1alpha1KegCompositionStatus(objects=objects, helm_releases=[]))
+
+class TestRemoveObjectHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.context = MagicMock()
+        self.api_ctl = self.context.api_ctl
+        self.delta_capture = MagicMock()
+        self.action = RemoveObjectAction('v1', 'ConfigMap', 'a', namespace='default')
+
+    def test_handle(self):
+        keg_status = build_keg_status('a', 'b')
+        errors = RemoveObjectHandler().handle(self.action, None, 'Cleanup', 'keg', keg_status, self.context, self.delta_capture)
+        self.assertEqual(errors, [])
+        self.api_ctl.delete_object.assert_called_once_with('v1', 'ConfigMap', 'a', namespace='default', driver_request_id=None)
+        self.api_ctl.wait_for_deletion.assert_not_called()
+        self.assertEqual([obj.name for obj in keg_status.composition.objects], ['b'])
+        self.delta_capture.removed_object.assert_called_once()
+
+    def test_handle_waits_for_deletion(self):
+        removal_properties = KegDeploymentRemovalProperties()
+        removal_properties.wait_for_deletion = True
+        removal_properties.wait_timeout_seconds = 20
+        self.api_ctl.wait_for_deletion.return_value = True
+        keg_status = build_keg_status('a')
+        errors = RemoveObjectHandler(removal_properties=removal_properties).handle(self.action, None, 'Cleanup', 'keg', keg_status, self.context, self.delta_capture)
+        self.assertEqual(errors, [])
+        self.api_ctl.wait_for_deletion.assert_called_once_with('v1', 'ConfigMap', 'a', namespace='default', timeout_seconds=20, driver_request_id=None)
+        self.assertEqual(keg_status.composition.objects, [])
+
+    def test_handle_wait_for_deletion_timeout(self):
+        removal_properties = KegDeploymentRemovalProperties()
+        removal_properties.wait_for_deletion = True
+        self.api_ctl.wait_for_deletion.return_value = False
+        keg_status = build_keg_status('a')
+        errors = RemoveObjectHandler(removal_properties=removal_properties).handle(self.action, None, 'Cleanup', 'keg', keg_status, self.context, self.delta_capture)
+        self.assertEqual(len(errors), 1)
+        self.assertIn('still exists 60 seconds after it was deleted', errors[0])
+        self.assertEqual(keg_status.composition.objects[0].state, EntityStates.DELETE_FAILED)
+        self.delta_capture.removed_object.assert_not_called()
@@ -0,0 +1,2 @@
+def checkReady(keg, props, resultBuilder, log, *args, **kwargs):
+    return resultBuilder.notReady()
\ No newline at end of file
@@ -109,4 +109,21 @@ class TestKegdStrategyLocationManager(unittest.TestCase):
         self.assertEqual(task_group.name, 'Create')
         self.assertEqual(task_group.removal_tasks, [])
         self.assertEqual(len(task_group.deploy_tasks), 1)
-        
\ No newline at end of file
+        
+    def test_get_request_report_reads_through_report_cache(self):
+        result = self.worker.get_request_report('kegdr-123')
+        self.assertEqual(result, self.context.report_cache.get.return_value)
+        self.context.report_cache.get.assert_called_once_with('kegdr-123', driver_request_id='kegdr-123')
+        self.kegd_persister.get.assert_not_called()
+
+    def test_get_request_report_without_report_cache(self):
+        self.context.report_cache = None
+        worker = KegdStrategyLocationManager(KegDeploymentProperties(), self.context, self.templating)
+        result = worker.get_request_report('kegdr-123')
+        self.assertEqual(result, self.kegd_persister.get.return_value)
+        self.kegd_persister.get.assert_called_once_with('kegdr-123', driver_request_id='kegdr-123')
+
+    def test_delete_request_report_forgets_cached_report(self):
+        self.worker.delete_request_report('kegdr-123')
+        self.context.report_cache.forget.assert_called_once_with('kegdr-123')
+        self.kegd_persister.delete.assert_called_once_with('kegdr-123', driver_request_id='kegdr-123')
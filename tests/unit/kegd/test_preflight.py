@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import MagicMock
+from kubedriver.kegd.preflight import DeployPreflight
+from kubedriver.kegd.action_handlers import DeployObjectHandler
+from kubedriver.kegd.model import DeployTask, DeployTaskSettings, DeployObjectAction, DeployHelmAction
+from kubedriver.kegd.properties import KegDeploymentDeployProperties
+from kubedriver.keg.model import V1alpha1KegStatus, V1alpha1KegCompositionStatus, V1alpha1ObjectStatus, EntityStates
+from kubedriver.kubeclient import AsyncApiController
+
+def object_task(api_version, kind, name, namespace=None, config=None):
+    if config is None:
+        config = {'apiVersion': api_version, 'kind': kind, 'metadata': {'name': name}}
+    return DeployTask(DeployTaskSettings(), DeployObjectAction(api_version, kind, name, config, namespace=namespace))
+
+def build_keg_status(*objects):
+    return V1alpha1KegStatus(composition=V1alpha1KegCompositionStatus(objects=list(objects), helm_releases=[]))
+
+class TestDeployPreflight(unittest.TestCase):
+
+    def setUp(self):
+        self.api_ctl = MagicMock()
+        self.context = MagicMock(api_ctl=self.api_ctl, async_api_ctl=None)
+        self.preflight = DeployPreflight(DeployObjectHandler())
+
+    def test_dry_run_create(self):
+        errors = self.preflight.check('keg', build_keg_status(), [object_task('v1', 'ConfigMap', 'a', namespace='default')], self.context, driver_request_id='123')
+        self.assertEqual(errors, [])
+        self.api_ctl.create_object.assert_called_once()
+        args, kwargs = self.api_ctl.create_object.call_args
+        self.assertEqual(args[0].data['metadata']['labels']['keg.kubedriver.alm/keg'], 'keg')
+        self.assertEqual(kwargs, {'dry_run': True, 'driver_request_id': '123'})
+
+    def test_dry_run_update_of_existing_object(self):
+        keg_status = build_keg_status(V1alpha1ObjectStatus(group='v1', kind='ConfigMap', name='a', namespace='default', state=EntityStates.CREATED))
+        self.preflight.check('keg', keg_status, [object_task('v1', 'ConfigMap', 'a', namespace='default')], self.context)
+        self.api_ctl.update_object.assert_called_once()
+        self.api_ctl.create_object.assert_not_called()
+        self.assertEqual(keg_status.composition.objects[0].state, EntityStates.CREATED)
+
+    def test_dry_run_server_side_apply(self):
+        deploy_properties = KegDeploymentDeployProperties()
+        deploy_properties.server_side_apply = True
+        preflight = DeployPreflight(DeployObjectHandler(deploy_properties=deploy_properties))
+        preflight.check('keg', build_keg_status(), [object_task('v1', 'ConfigMap', 'a', namespace='default')], self.context)
+        self.api_ctl.apply_object.assert_called_once()
+        self.assertTrue(self.api_ctl.apply_object.call_args[1]['dry_run'])
+
+    def test_returns_rejected_objects(self):
+        self.api_ctl.create_object.side_effect = lambda object_config, **kwargs: self._reject(object_config, 'b')
+        tasks = [object_task('v1', 'ConfigMap', 'a', namespace='default'), object_task('v1', 'ConfigMap', 'b', namespace='default')]
+        errors = self.preflight.check('keg', build_keg_status(), tasks, self.context)
+        self.assertEqual(errors, ['Dry run of ConfigMap \'b\' failed: Invalid value'])
+
+    def _reject(self, object_config, name):
+        if object_config.data['metadata']['name'] == name:
+            raise ValueError('Invalid value')
+        return {}
+
+    def test_skips_objects_depending_on_group(self):
+        crd_config = {'apiVersion': 'apiextensions.k8s.io/v1', 'kind': 'CustomResourceDefinition', 'metadata': {'name': 'mycustoms.example.com'},
+                        'spec': {'group': 'example.com', 'names': {'kind': 'MyCustom', 'plural': 'mycustoms'}}}
+        tasks = [
+            object_task('v1', 'Namespace', 'new-ns'),
+            object_task('apiextensions.k8s.io/v1', 'CustomResourceDefinition', 'mycustoms.example.com', config=crd_config),
+            object_task('v1', 'ConfigMap', 'a', namespace='new-ns'),
+            object_task('example.com/v1', 'MyCustom', 'b', namespace='default'),
+            object_task('v1', 'ConfigMap', 'c', namespace='default'),
+            DeployTask(DeployTaskSettings(), DeployHelmAction('chart.tgz', 'release'))
+        ]
+        self.preflight.check('keg', build_keg_status(), tasks, self.context)
+        checked = [call[0][0].data['metadata']['name'] for call in self.api_ctl.create_object.call_args_list]
+        self.assertEqual(checked, ['new-ns', 'mycustoms.example.com', 'c'])
+
+    def test_dry_run_with_async_api_ctl(self):
+        self.api_ctl.create_object.side_effect = lambda object_config, **kwargs: self._reject(object_config, 'a')
+        async_api_ctl = AsyncApiController(self.api_ctl, max_concurrency=2)
+        self.context.async_api_ctl = async_api_ctl
+        try:
+            tasks = [object_task('v1', 'ConfigMap', 'a', namespace='default'), object_task('v1', 'ConfigMap', 'b', namespace='default')]
+            errors = self.preflight.check('keg', build_keg_status(), tasks, self.context)
+        finally:
+            async_api_ctl.close()
+        self.assertEqual(errors, ['Dry run of ConfigMap \'a\' failed: Invalid value'])
+        self.assertEqual(self.api_ctl.create_object.call_count, 2)
@@ -10,10 +10,14 @@ from ignition.service.templating import Jinja2TemplatingService
 from kubedriver.resourcedriver import ExtendedResourceTemplateContext, NameManager
 from kubedriver.kegd.manager import KegdStrategyLocationManager
 from kubedriver.kegd.processor import KegdStrategyLocationProcessor
+from kubedriver.kegd.metrics import PHASE_SECONDS, SCRIPT_SECONDS
+from kubedriver.kegd.model import StrategyExecutionPhases
 from kubedriver.kegd.properties import KegDeploymentProperties
 from kubedriver.kegd.strategy_files import KegDeploymentStrategyFiles
 from kubedriver.kegd.jobs import ProcessStrategyJob
 from kubedriver.kegd.model.strategy_execution import StrategyExecution, TaskGroup
+from kubedriver.kubeclient import InformerManager
+from kubedriver.locationcontext import LocationContext
 
 
 test_kegd_files_path = os.path.dirname(inspect.getfile(test_kegd_files))
@@ -56,7 +60,7 @@ class TestKegdStrategyLocationProcessor(unittest.TestCase):
         self.keg_persister = testutils.mem_persistence_mock.create()
         self.kegd_persister = testutils.mem_persistence_mock.create()
         self.api_ctl = MagicMock()
-        self.context = MagicMock(kube_location=self.kube_location, keg_persister=self.keg_persister, kegd_persister=self.kegd_persister, api_ctl=self.api_ctl)
+        self.context = MagicMock(kube_location=self.kube_location, keg_persister=self.keg_persister, kegd_persister=self.kegd_persister, api_ctl=self.api_ctl, async_api_ctl=None, informers=None)
         self.processor = KegdStrategyLocationProcessor(self.context, self.templating)
         self.manager = KegdStrategyLocationManager(KegDeploymentProperties(), self.context, self.templating)
 
@@ -99,7 +103,7 @@ class TestKegdStrategyLocationProcessor(unittest.TestCase):
         self.assertTrue(finished) 
 
         self.assertTrue(len(self.kegd_persister.update.call_args_list)>0)
-        before_end_calls = self.kegd_persister.update.call_args_list[-3]
+        before_end_calls = self.kegd_persister.update.call_args_list[-2]
         self.assertEqual(before_end_calls[0][1].phase, 'Immediate cleanup on failure')
 
         # Confirm cleanup of object took place
@@ -146,12 +150,93 @@ class TestKegdStrategyLocationProcessor(unittest.TestCase):
         self.assertTrue(finished)
 
         self.assertTrue(len(self.kegd_persister.update.call_args_list)>0)
-        before_end_calls = self.kegd_persister.update.call_args_list[-3]
+        before_end_calls = self.kegd_persister.update.call_args_list[-2]
         self.assertEqual(before_end_calls[0][1].phase, 'Immediate cleanup on failure')
 
         # Confirm cleanup of object took place
         self.api_ctl.delete_object.assert_called_once_with('v1', 'ConfigMap', 'just-testing-123-a', namespace='default', driver_request_id=job.request_id)
 
+    def test_ready_check_retried_before_interval_when_notified(self):
+        render_context = generate_base_render_context()
+        keg_name = render_context['system_properties']['resourceName']
+        kegd_files = get_kegd_files('ready-check-notified')
+        kegd_strategy = parse_strategy(kegd_files.get_strategy_file())
+        job = self.manager.build_process_strategy_job(
+            keg_name=keg_name,
+            kegd_strategy=kegd_strategy, 
+            operation_name='Create',
+            kegd_files=kegd_files,
+            render_context=render_context
+        )
+
+        # Configure Mocks
+        informers = InformerManager(self.api_ctl, index_label=kegd_model.Labels.KEG)
+        informers.watch = MagicMock()
+        context = LocationContext(self.kube_location, self.api_ctl, self.kegd_persister, self.keg_persister, informers=informers)
+        processor = KegdStrategyLocationProcessor(context, self.templating)
+        mock_obj = MagicMock()
+        mock_obj.to_dict.return_value = {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'just-testing-123-a'}, 'data': {}}
+        self.api_ctl.safe_read_object.return_value = (True, mock_obj)
+
+        # Run #1
+        finished = processor.handle_process_strategy_job(job)
+        self.assertFalse(finished)
+        self.assertEqual(job.retry_status.attempts, 1)
+        self.assertTrue(informers.notifier.is_subscribed(job.request_id))
+
+        # Run #2, the first retry has no previous attempt time so is not delayed
+        finished = processor.handle_process_strategy_job(job)
+        self.assertFalse(finished)
+        self.assertEqual(job.retry_status.attempts, 2)
+
+        # Run #3, interval has not passed and nothing has changed
+        finished = processor.handle_process_strategy_job(job)
+        self.assertFalse(finished)
+        self.assertEqual(job.retry_status.attempts, 2)
+
+        # Object of another Keg changes
+        informers.store.put('v1', 'ConfigMap', {'metadata': {'name': 'other', 'namespace': 'default', 'labels': {kegd_model.Labels.KEG: 'other-keg'}}})
+        finished = processor.handle_process_strategy_job(job)
+        self.assertFalse(finished)
+        self.assertEqual(job.retry_status.attempts, 2)
+
+        # Object of this Keg changes, so the ready check runs again (without counting as an attempt)
+        reads = self.api_ctl.safe_read_object.call_count
+        informers.store.put('v1', 'ConfigMap', {'metadata': {'name': 'just-testing-123-a', 'namespace': 'default', 'labels': {kegd_model.Labels.KEG: keg_name}}})
+        finished = processor.handle_process_strategy_job(job)
+        self.assertFalse(finished)
+        self.assertGreater(self.api_ctl.safe_read_object.call_count, reads)
+        self.assertEqual(job.retry_status.attempts, 2)
+
+        # Notification is consumed by the retry
+        reads = self.api_ctl.safe_read_object.call_count
+        finished = processor.handle_process_strategy_job(job)
+        self.assertFalse(finished)
+        self.assertEqual(self.api_ctl.safe_read_object.call_count, reads)
+
+    def test_burst_of_ready_check_notifications_does_not_exceed_max_attempts(self):
+        render_context = generate_base_render_context()
+        keg_name = render_context['system_properties']['resourceName']
+        kegd_files = get_kegd_files('ready-check-notified')
+        job = self.manager.build_process_strategy_job(keg_name=keg_name, kegd_strategy=parse_strategy(kegd_files.get_strategy_file()),
+                                                        operation_name='Create', kegd_files=kegd_files, render_context=render_context)
+        informers = InformerManager(self.api_ctl, index_label=kegd_model.Labels.KEG)
+        informers.watch = MagicMock()
+        context = LocationContext(self.kube_location, self.api_ctl, self.kegd_persister, self.keg_persister, informers=informers)
+        processor = KegdStrategyLocationProcessor(context, self.templating)
+        mock_obj = MagicMock()
+        mock_obj.to_dict.return_value = {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'just-testing-123-a'}, 'data': {}}
+        self.api_ctl.safe_read_object.return_value = (True, mock_obj)
+        processor.handle_process_strategy_job(job)
+        processor.handle_process_strategy_job(job)
+        # Many more status updates than maxAttempts (5), all within the interval
+        for idx in range(20):
+            informers.store.put('v1', 'ConfigMap', {'metadata': {'name': 'just-testing-123-a', 'namespace': 'default', 'resourceVersion': str(idx),
+                                                                    'labels': {kegd_model.Labels.KEG: keg_name}}})
+            finished = processor.handle_process_strategy_job(job)
+            self.assertFalse(finished)
+        self.assertEqual(job.retry_status.attempts, 2)
+
     def test_immediate_cleanup_with_templated_ready(self):
         render_context = generate_base_render_context()
         keg_name = render_context['system_properties']['resourceName']
@@ -191,7 +276,7 @@ class TestKegdStrategyLocationProcessor(unittest.TestCase):
         self.assertTrue(finished) 
 
         self.assertTrue(len(self.kegd_persister.update.call_args_list)>0)
-        before_end_calls = self.kegd_persister.update.call_args_list[-3]
+        before_end_calls = self.kegd_persister.update.call_args_list[-2]
         self.assertEqual(before_end_calls[0][1].phase, 'Immediate cleanup on failure')
 
         # Confirm cleanup of object took place
@@ -255,6 +340,89 @@ class TestKegdStrategyLocationProcessor(unittest.TestCase):
             driver_request_id=job.request_id
         )
     
+    def test_deploy_object_with_server_side_apply(self):
+        render_context = generate_base_render_context()
+        keg_name = render_context['system_properties']['resourceName']
+        kegd_files = get_kegd_files('simple-deploy-objects')
+        kegd_strategy = parse_strategy(kegd_files.get_strategy_file())
+        job = self.manager.build_process_strategy_job(
+            keg_name=keg_name,
+            kegd_strategy=kegd_strategy, 
+            operation_name='Create',
+            kegd_files=kegd_files,
+            render_context=render_context
+        )
+        kegd_properties = KegDeploymentProperties()
+        kegd_properties.deploy.server_side_apply = True
+        processor = KegdStrategyLocationProcessor(self.context, self.templating, kegd_properties=kegd_properties)
+        processor.handle_process_strategy_job(job)
+        keg_status = self.keg_persister.get(keg_name)
+        object_status = keg_status.composition.objects[0]
+        self.assertEqual(object_status.uid, self.api_ctl.apply_object.return_value.metadata.uid)
+        self.assertEqual(object_status.state, 'Created')
+        self.api_ctl.safe_read_object.assert_not_called()
+        self.api_ctl.create_object.assert_not_called()
+        self.api_ctl.update_object.assert_not_called()
+        self.api_ctl.apply_object.assert_called_once_with(
+            ObjectConfigurationMatcher({
+                'apiVersion': 'v1', 
+                'kind': 'ConfigMap', 
+                'metadata': {
+                    'name': 'just-testing-123-a', 
+                    'labels': {
+                        'app.kubernetes.io/managed-by': 'kubedriver.alm', 
+                        'keg.kubedriver.alm/keg': 'just-testing'
+                    }
+                }, 
+                'data': {
+                    'propertyA': 'A property', 
+                    'propertyB': 'Include a number - 123'
+                }
+            }),
+            field_manager='kubedriver',
+            force=True,
+            driver_request_id=job.request_id
+        )
+
+    def __build_server_side_apply_job(self):
+        render_context = generate_base_render_context()
+        kegd_files = get_kegd_files('simple-deploy-objects')
+        job = self.manager.build_process_strategy_job(keg_name=render_context['system_properties']['resourceName'], kegd_strategy=parse_strategy(kegd_files.get_strategy_file()),
+                                                        operation_name='Create', kegd_files=kegd_files, render_context=render_context)
+        kegd_properties = KegDeploymentProperties()
+        kegd_properties.deploy.server_side_apply = True
+        return job, KegdStrategyLocationProcessor(self.context, self.templating, kegd_properties=kegd_properties)
+
+    def test_server_side_apply_of_existing_object_is_update(self):
+        self.api_ctl.apply_object.return_value = {'metadata': {'uid': 'existing'}}
+        job, processor = self.__build_server_side_apply_job()
+        processor.handle_process_strategy_job(job)
+        self.assertEqual(self.keg_persister.get('just-testing').composition.objects[0].state, 'Created')
+        # Apply returns the uid already recorded for the object
+        job, processor = self.__build_server_side_apply_job()
+        processor.handle_process_strategy_job(job)
+        object_status = self.keg_persister.get('just-testing').composition.objects[0]
+        self.assertEqual(object_status.state, 'Updated')
+        report_status = self.kegd_persister.update.call_args_list[-1][0][1]
+        self.assertIsNone(report_status.delta.deployed)
+        self.api_ctl.safe_read_object.assert_not_called()
+
+    def test_server_side_apply_uses_recorded_uid(self):
+        job, processor = self.__build_server_side_apply_job()
+        self.api_ctl.apply_object.return_value = {'metadata': {'uid': 'first'}}
+        processor.handle_process_strategy_job(job)
+        # Same uid, so updated
+        job, processor = self.__build_server_side_apply_job()
+        processor.handle_process_strategy_job(job)
+        self.assertEqual(self.keg_persister.get('just-testing').composition.objects[0].state, 'Updated')
+        # The object was deleted elsewhere and recreated by the apply
+        self.api_ctl.apply_object.return_value = {'metadata': {'uid': 'second'}}
+        job, processor = self.__build_server_side_apply_job()
+        processor.handle_process_strategy_job(job)
+        object_status = self.keg_persister.get('just-testing').composition.objects[0]
+        self.assertEqual((object_status.state, object_status.uid), ('Created', 'second'))
+        self.api_ctl.safe_read_object.assert_not_called()
+
     def test_property_inputs_to_scripts(self):
         render_context = generate_base_render_context()
         render_context['string_input'] = 'A string input'
@@ -322,6 +490,116 @@ class TestKegdStrategyLocationProcessor(unittest.TestCase):
             'custom': {'name': 'Testing', 'age': 42}
         })
 
+    def test_records_phase_and_script_durations(self):
+        render_context = generate_base_render_context()
+        keg_name = render_context['system_properties']['resourceName']
+        kegd_files = get_kegd_files('return-outputs')
+        kegd_strategy = parse_strategy(kegd_files.get_strategy_file())
+        job = self.manager.build_process_strategy_job(
+            keg_name=keg_name,
+            kegd_strategy=kegd_strategy, 
+            operation_name='Create',
+            kegd_files=kegd_files,
+            render_context=render_context
+        )
+        self.api_ctl.safe_read_object.return_value = (True, MockObject({}))
+        outputs_phase_before = self.__recorded_count(PHASE_SECONDS, phase=StrategyExecutionPhases.OUTPUTS)
+        scripts_before = self.__recorded_count(SCRIPT_SECONDS, script='output_extraction')
+        self.processor.handle_process_strategy_job(job)
+        self.assertEqual(self.__recorded_count(PHASE_SECONDS, phase=StrategyExecutionPhases.OUTPUTS), outputs_phase_before + 1)
+        self.assertEqual(self.__recorded_count(SCRIPT_SECONDS, script='output_extraction'), scripts_before + 1)
+
+    def __recorded_count(self, histogram, **labels):
+        recorded = histogram.get(**labels)
+        return recorded.count if recorded is not None else 0
+
+    def test_deploy_objects_concurrently_by_tier(self):
+        render_context = generate_base_render_context()
+        keg_name = render_context['system_properties']['resourceName']
+        kegd_files = get_kegd_files('tiered-deploy-objects')
+        kegd_strategy = parse_strategy(kegd_files.get_strategy_file())
+        job = self.manager.build_process_strategy_job(
+            keg_name=keg_name,
+            kegd_strategy=kegd_strategy, 
+            operation_name='Create',
+            kegd_files=kegd_files,
+            render_context=render_context
+        )
+        created = []
+        def create_object(object_config, driver_request_id=None):
+            created.append(object_config.data['kind'])
+            return {'metadata': {'uid': object_config.data['metadata']['name']}}
+        self.api_ctl.create_object.side_effect = create_object
+        kegd_properties = KegDeploymentProperties()
+        kegd_properties.deploy.max_concurrent_tasks = 4
+        processor = KegdStrategyLocationProcessor(self.context, self.templating, kegd_properties=kegd_properties)
+        processor.handle_process_strategy_job(job)
+        self.assertEqual(created, ['Namespace', 'ConfigMap', 'ConfigMap', 'Deployment'])
+        keg_status = self.keg_persister.get(keg_name)
+        self.assertEqual([obj.state for obj in keg_status.composition.objects], ['Created', 'Created', 'Created', 'Created'])
+        self.assertEqual([obj.uid for obj in keg_status.composition.objects], 
+                            ['just-testing-123-dep', 'just-testing-123-a', 'just-testing-123-ns', 'just-testing-123-b'])
+        report_status = self.kegd_persister.update.call_args_list[-1][0][1]
+        self.assertEqual([obj.name for obj in report_status.delta.deployed.objects if obj.name != keg_name], 
+                            ['just-testing-123-dep', 'just-testing-123-a', 'just-testing-123-ns', 'just-testing-123-b'])
+
+    def test_batches_keg_and_report_writes(self):
+        render_context = generate_base_render_context()
+        keg_name = render_context['system_properties']['resourceName']
+        kegd_files = get_kegd_files('tiered-deploy-objects')
+        kegd_strategy = parse_strategy(kegd_files.get_strategy_file())
+        job = self.manager.build_process_strategy_job(
+            keg_name=keg_name,
+            kegd_strategy=kegd_strategy, 
+            operation_name='Create',
+            kegd_files=kegd_files,
+            render_context=render_context
+        )
+        self.api_ctl.create_object.return_value = {'metadata': {'uid': '1'}}
+        self.keg_persister.get.reset_mock()
+        finished = self.processor.handle_process_strategy_job(job)
+        self.assertTrue(finished)
+        # Keg read once, then written with the planned changes and at completion
+        self.keg_persister.get.assert_called_once()
+        self.keg_persister.create.assert_called_once()
+        self.assertEqual(self.keg_persister.update.call_count, 2)
+        # Report written once the Keg record exists (before any objects are deployed) and at completion
+        self.assertEqual(self.kegd_persister.update.call_count, 2)
+        self.assertEqual(self.kegd_persister.update.call_args_list[0][0][1].state, 'Running')
+        self.assertEqual(self.kegd_persister.update.call_args_list[-1][0][1].state, 'Complete')
+        keg_status = self.keg_persister.get(keg_name)
+        self.assertEqual([obj.state for obj in keg_status.composition.objects], ['Created', 'Created', 'Created', 'Created'])
+
+    def test_deploy_preflight_failure_deploys_nothing(self):
+        render_context = generate_base_render_context()
+        keg_name = render_context['system_properties']['resourceName']
+        kegd_files = get_kegd_files('tiered-deploy-objects')
+        kegd_strategy = parse_strategy(kegd_files.get_strategy_file())
+        job = self.manager.build_process_strategy_job(
+            keg_name=keg_name,
+            kegd_strategy=kegd_strategy, 
+            operation_name='Create',
+            kegd_files=kegd_files,
+            render_context=render_context
+        )
+        def create_object(object_config, dry_run=False, driver_request_id=None):
+            if object_config.data['kind'] == 'Deployment':
+                raise ValueError('spec.template is required')
+            return {'metadata': {'uid': '1'}}
+        self.api_ctl.create_object.side_effect = create_object
+        kegd_properties = KegDeploymentProperties()
+        kegd_properties.deploy.preflight = True
+        processor = KegdStrategyLocationProcessor(self.context, self.templating, kegd_properties=kegd_properties)
+        processor.handle_process_strategy_job(job)
+        self.assertEqual(self.api_ctl.create_object.call_count, 4)
+        for call in self.api_ctl.create_object.call_args_list:
+            self.assertTrue(call[1]['dry_run'])
+        report_status = self.kegd_persister.update.call_args_list[-1][0][1]
+        self.assertEqual(report_status.state, 'Failed')
+        self.assertIn('Dry run of Deployment \'just-testing-123-dep\' failed: spec.template is required', report_status.errors)
+        keg_status = self.keg_persister.get(keg_name)
+        self.assertEqual(keg_status.composition.objects, [])
+
 class MockObject:
 
     def __init__(self, data):
@@ -0,0 +1,177 @@
+import unittest
+import threading
+from unittest.mock import MagicMock
+from kubedriver.persistence import RecordNotFoundError
+from kubedriver.persistence.record_page import RecordEvent
+from kubedriver.kegd.model import V1alpha1KegdStrategyReportStatus, StrategyExecutionStates
+from kubedriver.kegd.report_cache import ReportStatusCache
+
+def report(uid, state):
+    return V1alpha1KegdStrategyReportStatus(uid=uid, state=state)
+
+def record_event(event_type, name, state=None, resource_version='1'):
+    stored_object = {'metadata': {'name': name, 'resourceVersion': resource_version}, 'state': state}
+    return RecordEvent(event_type, stored_object, decoder=lambda obj: report(obj['metadata']['name'], obj['state']))
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+class TestReportStatusCache(unittest.TestCase):
+
+    def setUp(self):
+        self.kegd_persister = MagicMock()
+        self.kegd_persister.get.side_effect = lambda request_id, driver_request_id=None: report(request_id, StrategyExecutionStates.RUNNING)
+        self.clock = FakeClock()
+        self.cache = ReportStatusCache(self.kegd_persister, location_name='test', stale_seconds=5, watch=False, clock=self.clock)
+
+    def test_get_reads_through_on_miss(self):
+        result = self.cache.get('kegdr-a', driver_request_id='kegdr-a')
+        self.assertEqual(result.state, StrategyExecutionStates.RUNNING)
+        self.kegd_persister.get.assert_called_once_with('kegdr-a', driver_request_id='kegdr-a')
+        self.assertIn('kegdr-a', self.cache)
+
+    def test_non_terminal_served_within_staleness_bound(self):
+        self.cache.get('kegdr-a')
+        self.clock.now = 4
+        self.cache.get('kegdr-a')
+        self.assertEqual(self.kegd_persister.get.call_count, 1)
+        self.clock.now = 6
+        self.cache.get('kegdr-a')
+        self.assertEqual(self.kegd_persister.get.call_count, 2)
+
+    def test_terminal_kept_until_forgotten(self):
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.COMPLETE))
+        self.clock.now = 1000
+        self.assertEqual(self.cache.get('kegdr-a').state, StrategyExecutionStates.COMPLETE)
+        self.kegd_persister.get.assert_not_called()
+        self.cache.forget('kegdr-a')
+        self.cache.get('kegdr-a')
+        self.kegd_persister.get.assert_called_once()
+
+    def test_put_stores_copy(self):
+        report_status = report('kegdr-a', StrategyExecutionStates.RUNNING)
+        self.cache.put('kegdr-a', report_status)
+        report_status.state = StrategyExecutionStates.FAILED
+        self.assertEqual(self.cache.get('kegdr-a').state, StrategyExecutionStates.RUNNING)
+
+    def test_terminal_not_replaced_by_earlier_state(self):
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.FAILED))
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.RUNNING))
+        self.assertEqual(self.cache.get('kegdr-a').state, StrategyExecutionStates.FAILED)
+
+    def test_read_does_not_replace_report_stored_whilst_reading(self):
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.PENDING))
+        self.clock.now = 10
+        def get(request_id, driver_request_id=None):
+            # Written by this driver whilst the stale report is read
+            self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.RUNNING))
+            return report('kegdr-a', StrategyExecutionStates.PENDING)
+        self.kegd_persister.get.side_effect = get
+        self.cache.get('kegdr-a')
+        self.assertEqual(self.cache.get('kegdr-a').state, StrategyExecutionStates.RUNNING)
+
+    def test_not_found_forgets(self):
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.RUNNING))
+        self.clock.now = 10
+        self.kegd_persister.get.side_effect = RecordNotFoundError('Not found')
+        with self.assertRaises(RecordNotFoundError):
+            self.cache.get('kegdr-a')
+        self.assertNotIn('kegdr-a', self.cache)
+
+    def test_max_reports(self):
+        cache = ReportStatusCache(self.kegd_persister, max_reports=2, watch=False, clock=self.clock)
+        cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.COMPLETE))
+        cache.put('kegdr-b', report('kegdr-b', StrategyExecutionStates.COMPLETE))
+        cache.get('kegdr-a')
+        cache.put('kegdr-c', report('kegdr-c', StrategyExecutionStates.COMPLETE))
+        self.assertEqual(len(cache), 2)
+        self.assertIn('kegdr-a', cache)
+        self.assertNotIn('kegdr-b', cache)
+
+class TestReportStatusCacheWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.kegd_persister = MagicMock()
+        self.clock = FakeClock()
+        self.watch_calls = []
+        self.events = []
+        self.watched = threading.Event()
+        self.release = threading.Event()
+        def watch(label_selector=None, resource_version=None, timeout_seconds=None):
+            self.watch_calls.append(resource_version)
+            if len(self.watch_calls) == 1:
+                for event in self.events:
+                    yield event
+                return
+            # Events of the first watch have all been handled once the next begins
+            self.watched.set()
+            self.release.wait(5)
+        self.kegd_persister.watch.side_effect = watch
+        self.cache = ReportStatusCache(self.kegd_persister, location_name='test', stale_seconds=5, watch_timeout_seconds=1, clock=self.clock)
+        self.addCleanup(self.__stop)
+
+    def __stop(self):
+        self.cache.stop()
+        self.release.set()
+        self.cache._thread.join(timeout=5)
+
+    def __start_and_wait(self):
+        self.cache.start()
+        self.assertTrue(self.watched.wait(5))
+
+    def test_watch_updates_cached_reports(self):
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.RUNNING))
+        self.events.extend([record_event('MODIFIED', 'kegdr-a', state=StrategyExecutionStates.COMPLETE, resource_version='7'),
+                            record_event('MODIFIED', 'kegdr-other', state=StrategyExecutionStates.COMPLETE, resource_version='8')])
+        self.__start_and_wait()
+        self.assertTrue(self.cache.synced)
+        self.assertEqual(self.cache.get('kegdr-a').state, StrategyExecutionStates.COMPLETE)
+        self.assertNotIn('kegdr-other', self.cache)
+        self.kegd_persister.get.assert_not_called()
+        self.assertEqual(self.kegd_persister.watch.call_args[1]['label_selector'], 'app.kubernetes.io/managed-by=kubedriver.alm')
+
+    def test_watch_removes_deleted_reports(self):
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.COMPLETE))
+        self.events.append(record_event('DELETED', 'kegdr-a'))
+        self.__start_and_wait()
+        self.assertNotIn('kegdr-a', self.cache)
+
+    def test_synced_watch_serves_past_staleness_bound(self):
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.RUNNING))
+        self.events.append(record_event('ADDED', 'kegdr-a', state=StrategyExecutionStates.RUNNING, resource_version='3'))
+        self.__start_and_wait()
+        self.clock.now = 30
+        self.cache.get('kegdr-a')
+        self.kegd_persister.get.assert_not_called()
+
+    def test_synced_watch_reads_again_after_max_age(self):
+        self.kegd_persister.get.return_value = report('kegdr-a', StrategyExecutionStates.RUNNING)
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.RUNNING))
+        self.events.append(record_event('ADDED', 'kegdr-a', state=StrategyExecutionStates.RUNNING, resource_version='3'))
+        self.__start_and_wait()
+        self.clock.now = 61
+        self.cache.get('kegdr-a')
+        self.kegd_persister.get.assert_called_once()
+
+    def test_older_event_does_not_replace_newer(self):
+        self.cache.put('kegdr-a', report('kegdr-a', StrategyExecutionStates.PENDING))
+        self.events.extend([record_event('MODIFIED', 'kegdr-a', state=StrategyExecutionStates.RUNNING, resource_version='9'),
+                            record_event('MODIFIED', 'kegdr-a', state=StrategyExecutionStates.PENDING, resource_version='8')])
+        self.__start_and_wait()
+        self.assertEqual(self.cache.get('kegdr-a').state, StrategyExecutionStates.RUNNING)
+
+    def test_watch_resumes_from_last_resource_version(self):
+        self.events.append(record_event('ADDED', 'kegdr-a', state=StrategyExecutionStates.RUNNING, resource_version='3'))
+        self.__start_and_wait()
+        self.assertEqual(self.watch_calls[:2], [None, '3'])
+
+    def test_watch_restarts_when_resource_version_gone(self):
+        self.events.extend([record_event('ADDED', 'kegdr-a', resource_version='3'),
+                            RecordEvent('ERROR', {'kind': 'Status', 'code': 410, 'message': 'too old resource version'})])
+        self.__start_and_wait()
+        self.assertEqual(self.watch_calls[:2], [None, None])
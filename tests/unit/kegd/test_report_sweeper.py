@@ -0,0 +1,116 @@
+import unittest
+import datetime
+import functools
+from unittest.mock import MagicMock
+from openshift.dynamic import DynamicClient
+from kubedriver.kubeclient import OpenshiftApiController, CachingDiscoverer
+from kubedriver.kegd import KegdReportPersistenceFactory
+from kubedriver.kegd.model import V1alpha1KegdStrategyReportStatus, Labels, LabelValues, StrategyExecutionStates
+from kubedriver.kegd.report_sweeper import ReportSweeper, build_report_state_labels
+from kubedriver.persistence import PersistenceProperties
+from tests.utils import FakeKubeApiServer, FakeKind
+
+NOW = datetime.datetime(2026, 10, 18, 12, 30, tzinfo=datetime.timezone.utc)
+
+def build_location():
+    kube_location = MagicMock(driver_namespace='driver', persistence_backend='customResource')
+    kube_location.get_cm_persister_args.return_value = {}
+    return kube_location
+
+class TestBuildReportStateLabels(unittest.TestCase):
+
+    def test_terminal_state(self):
+        self.assertEqual(build_report_state_labels('Complete', finished_at=NOW), {Labels.REPORT_STATE: 'Complete', Labels.REPORT_FINISHED_HOUR: '2026101812'})
+
+    def test_non_terminal_state(self):
+        self.assertEqual(build_report_state_labels('Running', finished_at=NOW), {Labels.REPORT_STATE: 'Running'})
+
+class TestReportSweeper(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeKubeApiServer(kinds=[FakeKind('KegdStrategyReport', 'kegdstrategyreports')]).start()
+        self.addCleanup(self.server.stop)
+        dynamic_client = DynamicClient(self.server.build_api_client(), discoverer=functools.partial(CachingDiscoverer, persist=False))
+        api_ctl = OpenshiftApiController(dynamic_client.client, default_namespace='driver', dynamic_client=dynamic_client)
+        self.persister = KegdReportPersistenceFactory(persistence_properties=PersistenceProperties()).build(build_location(), api_ctl)
+        self.sweeper = ReportSweeper(self.persister, location_name='test', retention_seconds=3600, batch_size=2, qps=None, clock=lambda: NOW)
+
+    def __create_report(self, name, state, finished_hours_ago=None, labelled=True):
+        labels = {Labels.MANAGED_BY: LabelValues.MANAGED_BY, Labels.KEG: 'keg'}
+        if labelled:
+            labels[Labels.REPORT_STATE] = state
+            if finished_hours_ago is not None:
+                labels[Labels.REPORT_FINISHED_HOUR] = (NOW - datetime.timedelta(hours=finished_hours_ago)).strftime('%Y%m%d%H')
+        self.persister.create(name, V1alpha1KegdStrategyReportStatus(uid=name, keg_name='keg', state=state), labels=labels)
+
+    def __report_names(self):
+        return sorted(name for _, _, name in self.server.objects.keys())
+
+    def test_deletes_expired_terminal_reports_in_batches(self):
+        for idx in range(5):
+            self.__create_report(f'kegdr-old-{idx}', StrategyExecutionStates.COMPLETE if idx % 2 == 0 else StrategyExecutionStates.FAILED, finished_hours_ago=3 + idx)
+        self.__create_report('kegdr-recent', StrategyExecutionStates.COMPLETE, finished_hours_ago=1)
+        self.__create_report('kegdr-running', StrategyExecutionStates.RUNNING)
+        self.server.clear_requests()
+        result = self.sweeper.sweep()
+        self.assertEqual(result.deleted, 5)
+        self.assertEqual(self.__report_names(), ['kegdr-recent', 'kegdr-running'])
+        delete_requests = self.server.requests_of('DELETE')
+        self.assertEqual(len(delete_requests), 3)
+        self.assertTrue(all(request[1] == '/apis/keg.ibm/v1alpha1/namespaces/driver/kegdstrategyreports' for request in delete_requests))
+
+    def test_keeps_reports_within_retention(self):
+        self.__create_report('kegdr-recent', StrategyExecutionStates.COMPLETE, finished_hours_ago=0)
+        self.__create_report('kegdr-last-hour', StrategyExecutionStates.FAILED, finished_hours_ago=1)
+        result = self.sweeper.sweep()
+        self.assertEqual(result.deleted, 0)
+        self.assertEqual(self.__report_names(), ['kegdr-last-hour', 'kegdr-recent'])
+
+    def test_stops_after_max_batches(self):
+        for idx in range(5):
+            self.__create_report(f'kegdr-old-{idx}', StrategyExecutionStates.COMPLETE, finished_hours_ago=3 + idx)
+        self.sweeper.max_batches = 1
+        self.assertEqual(self.sweeper.sweep().deleted, 2)
+        self.assertEqual(len(self.__report_names()), 3)
+
+    def test_labels_terminal_legacy_reports(self):
+        self.__create_report('kegdr-legacy-complete', StrategyExecutionStates.COMPLETE, labelled=False)
+        self.__create_report('kegdr-legacy-running', StrategyExecutionStates.RUNNING, labelled=False)
+        result = self.sweeper.sweep()
+        self.assertEqual(result.labelled, 1)
+        self.assertEqual(result.deleted, 0)
+        labels = self.server.objects[('kegdstrategyreports', 'driver', 'kegdr-legacy-complete')]['metadata']['labels']
+        self.assertEqual(labels[Labels.REPORT_STATE], 'Complete')
+        self.assertEqual(labels[Labels.REPORT_FINISHED_HOUR], '2026101812')
+        self.assertNotIn(Labels.REPORT_STATE, self.server.objects[('kegdstrategyreports', 'driver', 'kegdr-legacy-running')]['metadata']['labels'])
+
+    def test_does_not_label_other_records(self):
+        self.persister.create('other', V1alpha1KegdStrategyReportStatus(uid='other', state=StrategyExecutionStates.COMPLETE),
+                                labels={Labels.MANAGED_BY: LabelValues.MANAGED_BY})
+        self.assertEqual(self.sweeper.sweep().labelled, 0)
+
+    def test_finished_selector(self):
+        self.assertEqual(self.sweeper.finished_selector(), 'app.kubernetes.io/managed-by=kubedriver.alm,kegdr.kubedriver.alm/state in (Complete,Failed),'
+                                                            'kegdr.kubedriver.alm/finished-hour')
+
+    def test_expired_before_hour(self):
+        self.assertEqual(self.sweeper.expired_before_hour(), '2026101811')
+
+    def test_long_retention_uses_bounded_selectors(self):
+        self.sweeper.retention_seconds = 30 * 86400
+        self.sweeper.batch_size = 100
+        for idx in range(40):
+            self.__create_report(f'kegdr-old-{idx}', StrategyExecutionStates.COMPLETE, finished_hours_ago=(31 * 24) + idx)
+        self.__create_report('kegdr-retained', StrategyExecutionStates.COMPLETE, finished_hours_ago=29 * 24)
+        self.server.clear_requests()
+        self.assertEqual(self.sweeper.sweep().deleted, 40)
+        self.assertEqual(self.__report_names(), ['kegdr-retained'])
+        # 40 expired hours seen in one page, deleted 24 hours at a time
+        self.assertEqual(len(self.server.requests_of('DELETE')), 2)
+
+    def test_start_and_stop(self):
+        sweeper = ReportSweeper(MagicMock(), interval_seconds=60)
+        sweeper.start()
+        sweeper.stop()
+        sweeper._thread.join(timeout=5)
+        self.assertFalse(sweeper._thread.is_alive())
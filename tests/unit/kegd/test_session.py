@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import MagicMock
+from kubedriver.kegd.session import StrategyJobSession
+from kubedriver.kegd.model import Labels
+from kubedriver.persistence import RecordNotFoundError
+
+class TestStrategyJobSession(unittest.TestCase):
+
+    def setUp(self):
+        self.keg_persister = MagicMock()
+        self.kegd_persister = MagicMock()
+        self.report_status = MagicMock(uid='123')
+        self.session = StrategyJobSession(self.keg_persister, self.kegd_persister, self.report_status, driver_request_id='123')
+
+    def test_load_keg_reads_once(self):
+        keg_status, new_keg = self.session.load_keg('keg')
+        self.assertEqual(keg_status, self.keg_persister.get.return_value)
+        self.assertFalse(new_keg)
+        keg_status, new_keg = self.session.load_keg('keg')
+        self.assertEqual(keg_status, self.keg_persister.get.return_value)
+        self.assertFalse(new_keg)
+        self.keg_persister.get.assert_called_once_with('keg', driver_request_id='123')
+
+    def test_load_keg_creates_when_not_found(self):
+        self.keg_persister.get.side_effect = RecordNotFoundError('Not found')
+        keg_status, new_keg = self.session.load_keg('keg')
+        self.assertTrue(new_keg)
+        self.assertEqual(keg_status.composition.objects, [])
+        self.assertEqual(keg_status.composition.helm_releases, [])
+        self.keg_persister.create.assert_called_once_with('keg', keg_status, driver_request_id='123')
+
+    def test_flush_report_only_when_changed(self):
+        self.session.flush_report()
+        self.kegd_persister.update.assert_not_called()
+        self.session.report_changed()
+        self.session.report_changed()
+        self.session.flush_report()
+        self.session.flush_report()
+        self.kegd_persister.update.assert_called_once_with('123', self.report_status, driver_request_id='123')
+
+    def test_flush_report_forced(self):
+        self.session.flush_report(force=True)
+        self.kegd_persister.update.assert_called_once_with('123', self.report_status, driver_request_id='123')
+
+    def test_flush_report_labels_terminal_state_once(self):
+        self.report_status.state = 'Complete'
+        self.session.report_changed()
+        self.session.flush_report()
+        labels = self.kegd_persister.update.call_args[1]['labels']
+        self.assertEqual(labels[Labels.REPORT_STATE], 'Complete')
+        self.assertIn(Labels.REPORT_FINISHED_HOUR, labels)
+        self.session.flush_report(force=True)
+        self.assertEqual(self.kegd_persister.update.call_count, 2)
+        self.assertNotIn('labels', self.kegd_persister.update.call_args[1])
+
+    def test_flush_report_updates_report_cache(self):
+        report_cache = MagicMock()
+        session = StrategyJobSession(self.keg_persister, self.kegd_persister, self.report_status, driver_request_id='123', report_cache=report_cache)
+        session.report_changed()
+        session.flush_report()
+        report_cache.put.assert_called_once_with('123', self.report_status)
+
+    def test_failed_flush_does_not_update_report_cache(self):
+        report_cache = MagicMock()
+        session = StrategyJobSession(self.keg_persister, self.kegd_persister, self.report_status, driver_request_id='123', report_cache=report_cache)
+        self.kegd_persister.update.side_effect = ValueError('Mock error')
+        session.report_changed()
+        with self.assertRaises(ValueError):
+            session.flush_report()
+        report_cache.put.assert_not_called()
+
+    def test_flush_keg_only_when_changed(self):
+        keg_status, _ = self.session.load_keg('keg')
+        self.session.flush_keg()
+        self.keg_persister.update.assert_not_called()
+        self.session.keg_changed()
+        self.session.flush()
+        self.session.flush()
+        self.keg_persister.update.assert_called_once_with('keg', keg_status, driver_request_id='123')
+        self.kegd_persister.update.assert_not_called()
+
+    def test_keg_changed_ignored_before_load(self):
+        self.session.keg_changed()
+        self.session.flush_keg()
+        self.keg_persister.update.assert_not_called()
+
+    def test_failed_flush_stays_dirty(self):
+        self.session.report_changed()
+        self.kegd_persister.update.side_effect = ValueError('Failed')
+        with self.assertRaises(ValueError):
+            self.session.flush_report()
+        self.kegd_persister.update.side_effect = None
+        self.session.flush_report()
+        self.assertEqual(self.kegd_persister.update.call_count, 2)
+
+    def test_delete_keg_discards_changes(self):
+        self.session.load_keg('keg')
+        self.session.keg_changed()
+        self.session.delete_keg()
+        self.keg_persister.delete.assert_called_once_with('keg', driver_request_id='123')
+        self.session.flush()
+        self.keg_persister.update.assert_not_called()
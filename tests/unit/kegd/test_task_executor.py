@@ -0,0 +1,173 @@
+import time
+import threading
+import unittest
+from unittest.mock import MagicMock
+from ignition.service.logging import logging_context
+from kubedriver.kegd.task_executor import (TaskGroupExecutor, DeferredDeltaCapture, deploy_tier, removal_tier, DEFAULT_TIER, 
+                                            NAMESPACE_TIER, WORKLOAD_TIER, HELM_TIER)
+from kubedriver.kegd.model import (DeployTask, DeployTaskSettings, DeployObjectAction, DeployHelmAction, RemovalTask, RemovalTaskSettings,
+                                    RemoveObjectAction, RemoveHelmAction)
+
+def object_task(kind, name, order=None):
+    return DeployTask(DeployTaskSettings(order=order), DeployObjectAction('v1', kind, name, {}))
+
+def helm_task(name):
+    return DeployTask(DeployTaskSettings(), DeployHelmAction('chart.tgz', name))
+
+class TestDeployTier(unittest.TestCase):
+
+    def test_known_kind(self):
+        self.assertEqual(deploy_tier(object_task('Namespace', 'a')), NAMESPACE_TIER)
+        self.assertEqual(deploy_tier(object_task('Deployment', 'a')), WORKLOAD_TIER)
+
+    def test_unknown_kind(self):
+        self.assertEqual(deploy_tier(object_task('MyCustom', 'a')), DEFAULT_TIER)
+
+    def test_helm(self):
+        self.assertEqual(deploy_tier(helm_task('a')), HELM_TIER)
+        self.assertLess(deploy_tier(helm_task('a')), deploy_tier(object_task('MyCustom', 'a')))
+
+    def test_order_setting(self):
+        self.assertEqual(deploy_tier(object_task('MyCustom', 'a', order=2)), 2)
+
+def remove_object_task(kind, name):
+    return RemovalTask(RemovalTaskSettings(), RemoveObjectAction('v1', kind, name))
+
+def remove_helm_task(name):
+    return RemovalTask(RemovalTaskSettings(), RemoveHelmAction(name))
+
+class TestRemovalTier(unittest.TestCase):
+
+    def test_reverse_of_deploy(self):
+        self.assertLess(removal_tier(remove_object_task('MyCustom', 'a')), removal_tier(remove_object_task('Deployment', 'a')))
+        self.assertLess(removal_tier(remove_object_task('Deployment', 'a')), removal_tier(remove_object_task('ConfigMap', 'a')))
+        self.assertLess(removal_tier(remove_object_task('ConfigMap', 'a')), removal_tier(remove_object_task('Namespace', 'a')))
+
+    def test_helm_before_namespace_and_crd(self):
+        self.assertLess(removal_tier(remove_object_task('MyCustom', 'a')), removal_tier(remove_helm_task('a')))
+        self.assertLess(removal_tier(remove_helm_task('a')), removal_tier(remove_object_task('Namespace', 'a')))
+        self.assertLess(removal_tier(remove_helm_task('a')), removal_tier(remove_object_task('CustomResourceDefinition', 'a')))
+
+class TestTaskGroupExecutor(unittest.TestCase):
+
+    def test_plan_sequential_keeps_order(self):
+        tasks = [object_task('Deployment', 'a'), object_task('Namespace', 'b')]
+        self.assertEqual(TaskGroupExecutor(max_workers=1).plan(tasks), [tasks])
+
+    def test_plan_concurrent_groups_by_tier(self):
+        deployment = object_task('Deployment', 'a')
+        namespace = object_task('Namespace', 'b')
+        config_map = object_task('ConfigMap', 'c')
+        secret = object_task('Secret', 'd')
+        custom = object_task('MyCustom', 'e', order=0)
+        plan = TaskGroupExecutor(max_workers=4).plan([deployment, namespace, config_map, secret, custom])
+        self.assertEqual(plan, [[namespace, custom], [config_map, secret], [deployment]])
+
+    def test_execute_sequential(self):
+        calls = []
+        delta_capture = MagicMock()
+        def run_task(task, task_delta_capture):
+            calls.append(task.action.name)
+            self.assertIs(task_delta_capture, delta_capture)
+            return [f'{task.action.name} failed']
+        errors = TaskGroupExecutor(max_workers=1).execute([object_task('Deployment', 'a'), object_task('Namespace', 'b')], run_task, delta_capture)
+        self.assertEqual(calls, ['a', 'b'])
+        self.assertEqual(errors, ['a failed', 'b failed'])
+
+    def test_execute_concurrent_runs_tier_together(self):
+        barrier = threading.Barrier(3, timeout=5)
+        def run_task(task, task_delta_capture):
+            if task.action.kind == 'ConfigMap':
+                # Would time out if the tasks of the tier were run one at a time
+                barrier.wait()
+            return []
+        tasks = [object_task('ConfigMap', 'a'), object_task('ConfigMap', 'b'), object_task('ConfigMap', 'c')]
+        errors = TaskGroupExecutor(max_workers=3).execute(tasks, run_task, MagicMock())
+        self.assertEqual(errors, [])
+
+    def test_execute_concurrent_completes_tier_before_next(self):
+        finished = []
+        def run_task(task, task_delta_capture):
+            if task.action.kind == 'Namespace':
+                time.sleep(0.05)
+            else:
+                self.assertIn('ns1', finished)
+                self.assertIn('ns2', finished)
+            finished.append(task.action.name)
+            return []
+        tasks = [object_task('Deployment', 'dep1'), object_task('Namespace', 'ns1'), object_task('Namespace', 'ns2'), object_task('Deployment', 'dep2')]
+        TaskGroupExecutor(max_workers=4).execute(tasks, run_task, MagicMock())
+        self.assertEqual(sorted(finished[:2]), ['ns1', 'ns2'])
+
+    def test_execute_concurrent_helm_release_before_custom_resource(self):
+        finished = []
+        def run_task(task, task_delta_capture):
+            if isinstance(task.action, DeployHelmAction):
+                # e.g. a chart installing the CRD of the custom resource
+                time.sleep(0.05)
+            else:
+                self.assertIn('operator', finished)
+            finished.append(task.action.name)
+            return []
+        tasks = [helm_task('operator'), object_task('MyCustom', 'instance')]
+        errors = TaskGroupExecutor(max_workers=4).execute(tasks, run_task, MagicMock())
+        self.assertEqual(errors, [])
+        self.assertEqual(finished, ['operator', 'instance'])
+
+    def test_execute_concurrent_deltas_and_errors_in_task_order(self):
+        delta_capture = MagicMock()
+        def run_task(task, task_delta_capture):
+            # Later tasks finish first
+            time.sleep(0.05 if task.action.name == 'a' else 0)
+            task_delta_capture.deployed_object(task.action.name)
+            return [f'{task.action.name} failed']
+        tasks = [object_task('ConfigMap', 'a'), object_task('ConfigMap', 'b'), object_task('ConfigMap', 'c')]
+        errors = TaskGroupExecutor(max_workers=3).execute(tasks, run_task, delta_capture)
+        self.assertEqual(errors, ['a failed', 'b failed', 'c failed'])
+        self.assertEqual([call[0][0] for call in delta_capture.deployed_object.call_args_list], ['a', 'b', 'c'])
+
+    def test_execute_concurrent_raises_unexpected_error(self):
+        def run_task(task, task_delta_capture):
+            if task.action.name == 'b':
+                raise ValueError('Unexpected')
+            return []
+        tasks = [object_task('ConfigMap', 'a'), object_task('ConfigMap', 'b')]
+        with self.assertRaises(ValueError):
+            TaskGroupExecutor(max_workers=2).execute(tasks, run_task, MagicMock())
+
+    def test_execute_concurrent_copies_logging_context(self):
+        seen = []
+        def run_task(task, task_delta_capture):
+            seen.append(logging_context.get('tracectx.transactionid'))
+            return []
+        logging_context.set_from_dict({'tracectx.transactionid': '123'})
+        try:
+            TaskGroupExecutor(max_workers=2).execute([object_task('ConfigMap', 'a'), object_task('ConfigMap', 'b')], run_task, MagicMock())
+        finally:
+            logging_context.clear()
+        self.assertEqual(seen, ['123', '123'])
+
+    def test_execute_removes_helm_before_namespace(self):
+        calls = []
+        def run_task(task, task_delta_capture):
+            calls.append(task.action.name)
+            task_delta_capture.removed_object(task.action.name)
+            return [task.action.name]
+        tasks = [remove_object_task('Namespace', 'ns'), remove_helm_task('helm-a'), remove_object_task('MyCustom', 'cr')]
+        delta_capture = MagicMock()
+        executor = TaskGroupExecutor(max_workers=2, tier_func=removal_tier)
+        errors = executor.execute(tasks, run_task, delta_capture)
+        self.assertEqual(errors, ['ns', 'helm-a', 'cr'])
+        self.assertEqual([call[0][0] for call in delta_capture.removed_object.call_args_list], ['ns', 'helm-a', 'cr'])
+        self.assertEqual(calls, ['cr', 'helm-a', 'ns'])
+
+class TestDeferredDeltaCapture(unittest.TestCase):
+
+    def test_apply(self):
+        deferred = DeferredDeltaCapture()
+        deferred.deployed_object('a')
+        deferred.removed_helm_release('b', removed_objects=['c'])
+        delta_capture = MagicMock()
+        deferred.apply(delta_capture)
+        delta_capture.deployed_object.assert_called_once_with('a')
+        delta_capture.removed_helm_release.assert_called_once_with('b', removed_objects=['c'])
@@ -0,0 +1,22 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from kubedriver.kubeclient import KubeApiControllerFactory, KubeApiProperties
+
+class TestKubeApiControllerFactory(unittest.TestCase):
+
+    def setUp(self):
+        self.kube_location = MagicMock(crd_api_version=None, default_object_namespace='default')
+
+    @patch('kubedriver.kubeclient.api_ctl_factory.CrdDirector')
+    def test_build_without_crd_watch_by_default(self, mock_crd_director):
+        api_ctl = KubeApiControllerFactory(kube_api_properties=KubeApiProperties()).build(self.kube_location)
+        mock_crd_director.assert_called_once_with(self.kube_location.client, watch=False)
+        self.assertEqual(api_ctl.crd_director, mock_crd_director.return_value)
+
+    @patch('kubedriver.kubeclient.api_ctl_factory.CrdDirector')
+    def test_build_with_crd_watch(self, mock_crd_director):
+        kube_api_properties = KubeApiProperties()
+        kube_api_properties.crds.watch = True
+        self.kube_location.crd_api_version = 'apiextensions.k8s.io/v1'
+        KubeApiControllerFactory(kube_api_properties=kube_api_properties).build(self.kube_location)
+        mock_crd_director.assert_called_once_with(self.kube_location.client, crd_api_version='apiextensions.k8s.io/v1', watch=True)
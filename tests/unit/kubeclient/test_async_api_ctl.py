@@ -0,0 +1,104 @@
+import unittest
+import asyncio
+import threading
+from unittest.mock import MagicMock
+from kubedriver.kubeclient.async_api_ctl import AsyncApiController, SyncApiBridge, ApiCall, run_sync
+
+class TestAsyncApiController(unittest.TestCase):
+
+    def setUp(self):
+        self.api_ctl = MagicMock()
+        self.async_api_ctl = AsyncApiController(self.api_ctl, max_concurrency=4)
+
+    def tearDown(self):
+        self.async_api_ctl.close()
+
+    def test_read_object(self):
+        result = run_sync(self.async_api_ctl.read_object('v1', 'ConfigMap', 'test', namespace='default'))
+        self.assertEqual(result, self.api_ctl.read_object.return_value)
+        self.api_ctl.read_object.assert_called_once_with('v1', 'ConfigMap', 'test', namespace='default')
+
+    def test_create_object(self):
+        object_config = MagicMock()
+        result = run_sync(self.async_api_ctl.create_object(object_config, default_namespace='default'))
+        self.assertEqual(result, self.api_ctl.create_object.return_value)
+        self.api_ctl.create_object.assert_called_once_with(object_config, default_namespace='default')
+
+    def test_is_object_namespaced(self):
+        self.api_ctl.is_object_namespaced.return_value = True
+        self.assertTrue(run_sync(self.async_api_ctl.is_object_namespaced('v1', 'ConfigMap')))
+
+    def test_batch_runs_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        def read(api_version, kind, name, namespace=None):
+            barrier.wait()
+            return name
+        self.api_ctl.read_object.side_effect = read
+        calls = [ApiCall('read_object', 'v1', 'ConfigMap', name) for name in ['a', 'b', 'c']]
+        results = run_sync(self.async_api_ctl.batch(calls))
+        self.assertEqual([result.value for result in results], ['a', 'b', 'c'])
+
+    def test_batch_respects_max_concurrency(self):
+        async_api_ctl = AsyncApiController(self.api_ctl, max_concurrency=2)
+        lock = threading.Lock()
+        state = {'current': 0, 'max': 0}
+        def read(api_version, kind, name, namespace=None):
+            with lock:
+                state['current'] += 1
+                state['max'] = max(state['max'], state['current'])
+            threading.Event().wait(0.01)
+            with lock:
+                state['current'] -= 1
+            return name
+        self.api_ctl.read_object.side_effect = read
+        try:
+            run_sync(async_api_ctl.batch([ApiCall('read_object', 'v1', 'ConfigMap', str(i)) for i in range(10)]))
+        finally:
+            async_api_ctl.close()
+        self.assertEqual(state['max'], 2)
+
+    def test_batch_captures_errors(self):
+        self.api_ctl.delete_object.side_effect = [None, ValueError('mock error')]
+        calls = [ApiCall('delete_object', 'v1', 'ConfigMap', 'a'), ApiCall('delete_object', 'v1', 'ConfigMap', 'b')]
+        results = run_sync(self.async_api_ctl.batch(calls))
+        self.assertFalse(results[0].failed)
+        self.assertTrue(results[1].failed)
+        self.assertIsInstance(results[1].error, ValueError)
+        self.assertEqual(results[1].call, calls[1])
+
+    def test_safe_read_objects(self):
+        self.api_ctl.safe_read_object.side_effect = lambda api_version, kind, name, namespace=None, driver_request_id=None: (name != 'missing', name)
+        results = run_sync(self.async_api_ctl.safe_read_objects([('v1', 'ConfigMap', 'a', 'default'), ('v1', 'ConfigMap', 'missing', 'default')], driver_request_id='123'))
+        self.assertEqual(results, [(True, 'a'), (False, 'missing')])
+        self.api_ctl.safe_read_object.assert_any_call('v1', 'ConfigMap', 'a', namespace='default', driver_request_id='123')
+
+    def test_safe_read_objects_raises_error(self):
+        self.api_ctl.safe_read_object.side_effect = ValueError('mock error')
+        with self.assertRaises(ValueError):
+            run_sync(self.async_api_ctl.safe_read_objects([('v1', 'ConfigMap', 'a', 'default')]))
+
+    def test_is_objects_namespaced_checks_each_kind_once(self):
+        self.api_ctl.is_object_namespaced.side_effect = lambda api_version, kind: kind != 'Namespace'
+        results = run_sync(self.async_api_ctl.is_objects_namespaced([('v1', 'ConfigMap'), ('v1', 'Namespace'), ('v1', 'ConfigMap')]))
+        self.assertEqual(results, [True, False, True])
+        self.assertEqual(self.api_ctl.is_object_namespaced.call_count, 2)
+
+class TestSyncApiBridge(unittest.TestCase):
+
+    def setUp(self):
+        self.api_ctl = MagicMock()
+        self.async_api_ctl = AsyncApiController(self.api_ctl, max_concurrency=2)
+        self.bridge = SyncApiBridge(self.async_api_ctl)
+
+    def tearDown(self):
+        self.async_api_ctl.close()
+
+    def test_safe_read_objects(self):
+        self.api_ctl.safe_read_object.return_value = (True, 'obj')
+        self.assertEqual(self.bridge.safe_read_objects([('v1', 'ConfigMap', 'a', None)]), [(True, 'obj')])
+
+    def test_bridge_from_running_event_loop(self):
+        self.api_ctl.safe_read_object.return_value = (True, 'obj')
+        async def call_from_loop():
+            return self.bridge.safe_read_objects([('v1', 'ConfigMap', 'a', None)])
+        self.assertEqual(asyncio.run(call_from_loop()), [(True, 'obj')])
@@ -307,4 +307,37 @@ class TestKubeClientDirector(unittest.TestCase):
         self.assertEqual(api_client.__class__, kubernetes_clients.CoreV1Api)
         self.assertEqual(api_client.list_namespaced_config_map, method)
         self.assertTrue(is_namespaced)
-        self.assertFalse(is_custom_object)
\ No newline at end of file
+        self.assertFalse(is_custom_object)
+    def test_determine_api_method_reuses_api_client(self):
+        _, _, _, first_api_client = self.director.determine_api_method_for_create_object('v1', 'Pod', return_api_client=True)
+        _, _, _, second_api_client = self.director.determine_api_method_for_read_object('v1', 'ConfigMap', return_api_client=True)
+        self.assertIs(first_api_client, second_api_client)
+        self.assertIs(first_api_client.api_client, self.base_kube_client)
+
+    def test_determine_api_method_api_client_per_director(self):
+        other_base_kube_client = MagicMock()
+        other_director = KubeClientDirector(other_base_kube_client, self.crd_director)
+        _, _, _, api_client = self.director.determine_api_method_for_create_object('v1', 'Pod', return_api_client=True)
+        method, _, _, other_api_client = other_director.determine_api_method_for_create_object('v1', 'Pod', return_api_client=True)
+        self.assertIsNot(api_client, other_api_client)
+        self.assertIs(other_api_client.api_client, other_base_kube_client)
+        self.assertEqual(other_api_client.create_namespaced_pod, method)
+
+    def test_determine_api_method_for_custom_object_looks_up_crd_once(self):
+        self._mock_namespaced_crd(group='example.com', versions='v1alpha1', kind='MyCustom')
+        self.director.determine_api_method_for_create_object('example.com/v1alpha1', 'MyCustom')
+        method, is_namespaced, is_custom_object, api_client = self.director.determine_api_method_for_create_object('example.com/v1alpha1', 'MyCustom', return_api_client=True)
+        self.assertEqual(api_client.create_namespaced_custom_object, method)
+        self.assertTrue(is_namespaced)
+        self.assertTrue(is_custom_object)
+        self.crd_director.get_crd_by_kind.assert_called_once_with('example.com', 'MyCustom')
+
+    def test_determine_api_method_for_custom_object_scope_per_director(self):
+        self._mock_namespaced_crd(group='example.com', versions='v1alpha1', kind='MyScopedCustom')
+        _, is_namespaced, _ = self.director.determine_api_method_for_create_object('example.com/v1alpha1', 'MyScopedCustom')
+        self.assertTrue(is_namespaced)
+        other_crd_director = MagicMock()
+        other_crd_director.get_crd_by_kind.return_value = build_crd(group='example.com', versions='v1alpha1', kind='MyScopedCustom', scope='Cluster')
+        other_director = KubeClientDirector(MagicMock(), other_crd_director)
+        _, is_namespaced, _ = other_director.determine_api_method_for_create_object('example.com/v1alpha1', 'MyScopedCustom')
+        self.assertFalse(is_namespaced)
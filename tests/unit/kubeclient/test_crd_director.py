@@ -1,8 +1,10 @@
 import unittest
 from unittest.mock import MagicMock
+from kubernetes.client.rest import ApiException
 from kubedriver.kubeclient.crd_director import CrdDirector
+from kubedriver.kubeclient.crd_index import CrdIndex, CrdIndexRegistry, IndexedCrd
 from kubedriver.kubeclient.mod_director import LIST_ACTION
-from kubernetes.client.models import V1beta1CustomResourceDefinitionList
+from kubernetes.client.models import V1beta1CustomResourceDefinitionList, V1ListMeta
 from tests.unit.utils.crd_builder import build_crd
 
 class TestCrdDirector(unittest.TestCase):
@@ -11,12 +13,14 @@ class TestCrdDirector(unittest.TestCase):
         self._setUp_mock_crd_client()
         self._setUp_mod_director_to_return_crd_client()
         self.base_kube_client = MagicMock()
-        self.crd_director = CrdDirector(self.base_kube_client, mod_director=self.mod_director)
+        # Discovery unavailable, so the CRDs are listed
+        self.base_kube_client.call_api.side_effect = ApiException(status=403, reason='Forbidden')
+        self.crd_director = CrdDirector(self.base_kube_client, mod_director=self.mod_director, crd_index=CrdIndex())
 
     def _setUp_mock_crd_client(self):
         self.crd_api_client = MagicMock()
         self.crds = []
-        def list_crds():
+        def list_crds(**kwargs):
             return V1beta1CustomResourceDefinitionList(items=self.crds)
         self.crd_api_client.list_crds.side_effect = list_crds
 
@@ -38,8 +42,10 @@ class TestCrdDirector(unittest.TestCase):
     def test_get_crd_by_kind_not_in_cache(self):
         created_crd = self._add_crd()
         crd = self.crd_director.get_crd_by_kind('example.com', 'MyCustom')
-        self.assertEqual(crd, created_crd)
-        self.crd_api_client.list_crds.assert_called_once()
+        self.assertEqual(crd, IndexedCrd.from_crd(created_crd))
+        self.assertEqual(crd.spec.scope, 'Namespaced')
+        self.assertEqual(crd.spec.names.plural, 'mycustoms')
+        self.crd_api_client.list_crds.assert_called_once_with(limit=100)
 
     def test_get_crd_by_kind_not_found(self):
         crd = self.crd_director.get_crd_by_kind('example.com', 'MyCustom')
@@ -54,7 +60,7 @@ class TestCrdDirector(unittest.TestCase):
         # Now from cache
         crd = self.crd_director.get_crd_by_kind('example.com', 'MyCustom')
         self.crd_api_client.list_crds.assert_not_called()
-        self.assertEqual(crd, created_crd)
+        self.assertEqual(crd, IndexedCrd.from_crd(created_crd))
 
     def test_get_crd_by_kind_fills_cache(self):
         created_crdA = self._add_crd(kind='MyCustomA')   
@@ -97,4 +103,104 @@ class TestCrdDirector(unittest.TestCase):
         self.crd_director = CrdDirector(self.base_kube_client, mod_director=self.mod_director, crd_api_version='v1')
         self.mod_director.build_api_client_for_version.assert_called_once_with('v1', self.base_kube_client)
         crd_api_client = self.mod_director.build_api_client_for_version.return_value
-        self.mod_director.try_plain_method.assert_called_once_with(crd_api_client, LIST_ACTION, 'custom_resource_definition')
\ No newline at end of file
+        self.mod_director.try_plain_method.assert_called_once_with(crd_api_client, LIST_ACTION, 'custom_resource_definition')
+    def test_get_crd_by_kind_not_found_is_negatively_cached(self):
+        self.crd_director.get_crd_by_kind('example.com', 'MyCustom')
+        self.crd_api_client.list_crds.reset_mock()
+        crd = self.crd_director.get_crd_by_kind('example.com', 'MyCustom')
+        self.assertIsNone(crd)
+        self.crd_api_client.list_crds.assert_not_called()
+
+    def test_get_crd_by_kind_follows_list_pages(self):
+        pages = [
+            V1beta1CustomResourceDefinitionList(items=[build_crd(kind='MyCustomA')], metadata=V1ListMeta(_continue='next')),
+            V1beta1CustomResourceDefinitionList(items=[build_crd(kind='MyCustomB')], metadata=V1ListMeta())
+        ]
+        self.crd_api_client.list_crds.side_effect = pages
+        crd = self.crd_director.get_crd_by_kind('example.com', 'MyCustomB')
+        self.assertEqual(crd.spec.names.kind, 'MyCustomB')
+        self.assertEqual(self.crd_api_client.list_crds.call_count, 2)
+        self.crd_api_client.list_crds.assert_called_with(limit=100, _continue='next')
+
+    def test_shares_index_for_same_cluster(self):
+        registry = CrdIndexRegistry()
+        self.base_kube_client.configuration.host = 'https://cluster-a:6443'
+        other_kube_client = MagicMock()
+        other_kube_client.configuration.host = 'https://cluster-a:6443'
+        director_a = CrdDirector(self.base_kube_client, mod_director=self.mod_director, crd_index_registry=registry)
+        director_b = CrdDirector(other_kube_client, mod_director=self.mod_director, crd_index_registry=registry)
+        self.assertIs(director_a.crd_index, director_b.crd_index)
+
+    def test_start_watch(self):
+        crd_index = MagicMock()
+        CrdDirector(self.base_kube_client, mod_director=self.mod_director, crd_index=crd_index, watch=True)
+        crd_index.start_watch.assert_called_once_with(self.crd_api_client.list_crds)
+
+class TestCrdDirectorDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.crd_api_client = MagicMock()
+        self.mod_director = MagicMock()
+        self.mod_director.build_api_client_for_version.return_value = self.crd_api_client
+        self.mod_director.try_plain_method.return_value = (True, self.crd_api_client.list_crds)
+        self.base_kube_client = MagicMock()
+        self.documents = {
+            '/apis/example.com': {
+                'versions': [{'groupVersion': 'example.com/v1alpha1', 'version': 'v1alpha1'}, {'groupVersion': 'example.com/v1', 'version': 'v1'}],
+                'preferredVersion': {'groupVersion': 'example.com/v1', 'version': 'v1'}
+            },
+            '/apis/example.com/v1': {
+                'resources': [
+                    {'name': 'mycustoms', 'kind': 'MyCustom', 'namespaced': True},
+                    {'name': 'mycustoms/status', 'kind': 'MyCustom', 'namespaced': True},
+                    {'name': 'myclusters', 'kind': 'MyCluster', 'namespaced': False}
+                ]
+            },
+            '/apis/example.com/v1alpha1': {
+                'resources': [
+                    {'name': 'myolds', 'kind': 'MyOld', 'namespaced': True}
+                ]
+            }
+        }
+        self.base_kube_client.call_api.side_effect = self._call_api
+        self.crd_director = CrdDirector(self.base_kube_client, mod_director=self.mod_director, crd_index=CrdIndex())
+
+    def _call_api(self, path, method, **kwargs):
+        if path not in self.documents:
+            raise ApiException(status=404, reason='Not Found')
+        return self.documents[path]
+
+    def _called_paths(self):
+        return [call[0][0] for call in self.base_kube_client.call_api.call_args_list]
+
+    def test_resolves_from_preferred_version(self):
+        crd = self.crd_director.get_crd_by_kind('example.com', 'MyCustom')
+        self.assertEqual(crd, IndexedCrd('example.com', 'MyCustom', 'mycustoms', 'Namespaced'))
+        self.assertEqual(self._called_paths(), ['/apis/example.com', '/apis/example.com/v1'])
+        self.crd_api_client.list_crds.assert_not_called()
+
+    def test_indexes_other_kinds_in_group_version(self):
+        self.crd_director.get_crd_by_kind('example.com', 'MyCustom')
+        self.base_kube_client.call_api.reset_mock()
+        crd = self.crd_director.get_crd_by_kind('example.com', 'MyCluster')
+        self.assertEqual(crd.spec.scope, 'Cluster')
+        self.base_kube_client.call_api.assert_not_called()
+
+    def test_resolves_from_other_versions(self):
+        crd = self.crd_director.get_crd_by_kind('example.com', 'MyOld')
+        self.assertEqual(crd.spec.names.plural, 'myolds')
+        self.assertEqual(self._called_paths(), ['/apis/example.com', '/apis/example.com/v1', '/apis/example.com/v1alpha1'])
+
+    def test_missing_kind_is_negatively_cached(self):
+        self.assertIsNone(self.crd_director.get_crd_by_kind('example.com', 'Unknown'))
+        self.base_kube_client.call_api.reset_mock()
+        self.assertIsNone(self.crd_director.get_crd_by_kind('example.com', 'Unknown'))
+        self.base_kube_client.call_api.assert_not_called()
+        self.crd_api_client.list_crds.assert_not_called()
+
+    def test_missing_group_is_negatively_cached(self):
+        self.assertIsNone(self.crd_director.get_crd_by_kind('other.com', 'MyCustom'))
+        self.base_kube_client.call_api.reset_mock()
+        self.assertIsNone(self.crd_director.get_crd_by_kind('other.com', 'MyCustom'))
+        self.base_kube_client.call_api.assert_not_called()
+        self.crd_api_client.list_crds.assert_not_called()
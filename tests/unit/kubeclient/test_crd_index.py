@@ -0,0 +1,105 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from kubedriver.kubeclient.crd_index import CrdIndex, CrdIndexRegistry, IndexedCrd
+from tests.unit.utils.crd_builder import build_crd
+
+class TestCrdIndex(unittest.TestCase):
+
+    def test_get_missing(self):
+        crd_index = CrdIndex()
+        self.assertEqual(crd_index.get('example.com', 'MyCustom'), (False, None))
+
+    def test_add_and_get(self):
+        crd_index = CrdIndex()
+        indexed_crd = IndexedCrd('example.com', 'MyCustom', 'mycustoms', 'Namespaced')
+        crd_index.add(indexed_crd)
+        self.assertEqual(crd_index.get('example.com', 'MyCustom'), (True, indexed_crd))
+
+    def test_capacity(self):
+        crd_index = CrdIndex(capacity=2)
+        crd_index.add(IndexedCrd('example.com', 'A', 'as', 'Namespaced'))
+        crd_index.add(IndexedCrd('example.com', 'B', 'bs', 'Namespaced'))
+        crd_index.get('example.com', 'A')
+        crd_index.add(IndexedCrd('example.com', 'C', 'cs', 'Namespaced'))
+        self.assertTrue(crd_index.get('example.com', 'A')[0])
+        self.assertFalse(crd_index.get('example.com', 'B')[0])
+        self.assertTrue(crd_index.get('example.com', 'C')[0])
+
+    def test_add_missing(self):
+        crd_index = CrdIndex(negative_ttl_seconds=30)
+        crd_index.add_missing('example.com', 'MyCustom')
+        self.assertEqual(crd_index.get('example.com', 'MyCustom'), (True, None))
+
+    def test_add_missing_expires(self):
+        crd_index = CrdIndex(negative_ttl_seconds=30)
+        with patch('kubedriver.kubeclient.crd_index.time.monotonic', return_value=100):
+            crd_index.add_missing('example.com', 'MyCustom')
+        with patch('kubedriver.kubeclient.crd_index.time.monotonic', return_value=131):
+            self.assertEqual(crd_index.get('example.com', 'MyCustom'), (False, None))
+
+    def test_add_missing_disabled(self):
+        crd_index = CrdIndex(negative_ttl_seconds=0)
+        crd_index.add_missing('example.com', 'MyCustom')
+        self.assertEqual(crd_index.get('example.com', 'MyCustom'), (False, None))
+
+    def test_apply_event_modified_updates_indexed(self):
+        crd_index = CrdIndex()
+        crd_index.add(IndexedCrd('example.com', 'MyCustom', 'mycustoms', 'Namespaced'))
+        crd_index.apply_event('MODIFIED', build_crd(scope='Cluster'))
+        self.assertEqual(crd_index.get('example.com', 'MyCustom')[1].spec.scope, 'Cluster')
+
+    def test_apply_event_added_replaces_missing(self):
+        crd_index = CrdIndex()
+        crd_index.add_missing('example.com', 'MyCustom')
+        crd_index.apply_event('ADDED', build_crd())
+        self.assertEqual(crd_index.get('example.com', 'MyCustom'), (True, IndexedCrd('example.com', 'MyCustom', 'mycustoms', 'Namespaced')))
+
+    def test_apply_event_added_ignores_unrequested(self):
+        crd_index = CrdIndex()
+        crd_index.apply_event('ADDED', build_crd())
+        self.assertEqual(crd_index.size(), 0)
+
+    def test_apply_event_deleted(self):
+        crd_index = CrdIndex()
+        crd_index.add(IndexedCrd('example.com', 'MyCustom', 'mycustoms', 'Namespaced'))
+        crd_index.apply_event('DELETED', build_crd())
+        self.assertEqual(crd_index.get('example.com', 'MyCustom'), (False, None))
+
+    @patch('kubedriver.kubeclient.crd_index.watch.Watch')
+    def test_watch(self, mock_watch_class):
+        crd_index = CrdIndex(watch_retry_seconds=0.01)
+        crd_index.add_missing('example.com', 'MyCustom')
+        list_crds = MagicMock()
+        def stream(func, **kwargs):
+            yield {'type': 'ADDED', 'object': build_crd()}
+            crd_index.stop_watch()
+        mock_watch_class.return_value.stream.side_effect = stream
+        crd_index.start_watch(list_crds)
+        deadline = time.time() + 2
+        while crd_index.get('example.com', 'MyCustom')[1] is None and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(crd_index.get('example.com', 'MyCustom')[1].spec.names.plural, 'mycustoms')
+        self.assertEqual(mock_watch_class.return_value.stream.call_args[0][0], list_crds)
+        crd_index.stop_watch()
+        self.assertFalse(crd_index.is_watching())
+
+class TestCrdIndexRegistry(unittest.TestCase):
+
+    def test_get_same_index(self):
+        registry = CrdIndexRegistry()
+        self.assertIs(registry.get('https://a'), registry.get('https://a'))
+        self.assertIsNot(registry.get('https://a'), registry.get('https://b'))
+
+    def test_configure(self):
+        registry = CrdIndexRegistry()
+        registry.configure(index_capacity=5, negative_ttl_seconds=10)
+        crd_index = registry.get('https://a')
+        self.assertEqual(crd_index.capacity, 5)
+        self.assertEqual(crd_index.negative_ttl_seconds, 10)
+
+    def test_capacity(self):
+        registry = CrdIndexRegistry(capacity=1)
+        first = registry.get('https://a')
+        registry.get('https://b')
+        self.assertIsNot(registry.get('https://a'), first)
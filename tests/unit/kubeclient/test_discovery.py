@@ -0,0 +1,232 @@
+import unittest
+import os
+import tempfile
+import shutil
+from unittest.mock import MagicMock, patch
+from openshift.dynamic.exceptions import NotFoundError, ResourceNotFoundError
+from kubedriver.kubeclient.discovery import CachingDiscoverer, DynamicClientRegistry, DiscoveryStats
+
+def resource_def(name, kind, namespaced=True):
+    return {'name': name, 'kind': kind, 'namespaced': namespaced, 'verbs': ['get', 'list', 'create']}
+
+class FakeCluster:
+
+    def __init__(self):
+        self.groups = [
+            {'name': 'apps', 'versions': [{'version': 'v1'}], 'preferredVersion': {'version': 'v1'}}
+        ]
+        self.resources = {
+            'api/v1': [resource_def('configmaps', 'ConfigMap'), resource_def('namespaces', 'Namespace', namespaced=False)],
+            'apis/apps/v1': [resource_def('deployments', 'Deployment')]
+        }
+        self.requests = []
+
+    def build_client(self):
+        client = MagicMock()
+        client.configuration.host = 'https://localhost'
+        client.request.side_effect = self.request
+        return client
+
+    def request(self, method, path, serializer=None):
+        self.requests.append(path)
+        if path == '/version':
+            return {'major': '1', 'minor': '18'}
+        if path == '/version/openshift':
+            raise NotFoundError(MagicMock(status=404, reason='Not Found', data=b'{}', getheaders=MagicMock(return_value={})))
+        response = MagicMock()
+        if path == '/apis':
+            response.groups = self.groups
+        else:
+            response.resources = [dict(r) for r in self.resources.get(path, [])]
+        return response
+
+class TestCachingDiscoverer(unittest.TestCase):
+
+    def setUp(self):
+        self.cluster = FakeCluster()
+        self.client = self.cluster.build_client()
+
+    def test_get_core_kind(self):
+        discoverer = CachingDiscoverer(self.client)
+        resource = discoverer.get(api_version='v1', kind='ConfigMap')
+        self.assertEqual(resource.kind, 'ConfigMap')
+        self.assertTrue(resource.namespaced)
+        resource = discoverer.get(api_version='v1', kind='Namespace')
+        self.assertFalse(resource.namespaced)
+        self.assertEqual(discoverer.stats.hits, 2)
+        self.assertEqual(discoverer.stats.misses, 0)
+        self.assertEqual(self.cluster.requests.count('api/v1'), 1)
+
+    def test_get_group_kind_only_loads_that_group_version(self):
+        discoverer = CachingDiscoverer(self.client)
+        resource = discoverer.get(api_version='apps/v1', kind='Deployment')
+        self.assertEqual(resource.kind, 'Deployment')
+        self.assertNotIn('api/v1', self.cluster.requests)
+        self.assertEqual(discoverer.stats.group_version_loads, 1)
+
+    def test_miss_on_known_group_version_refreshes_only_that_group_version(self):
+        discoverer = CachingDiscoverer(self.client)
+        discoverer.get(api_version='apps/v1', kind='Deployment')
+        self.cluster.resources['apis/apps/v1'].append(resource_def('statefulsets', 'StatefulSet'))
+        apis_requests_before = self.cluster.requests.count('/apis')
+        resource = discoverer.get(api_version='apps/v1', kind='StatefulSet')
+        self.assertEqual(resource.kind, 'StatefulSet')
+        self.assertEqual(self.cluster.requests.count('/apis'), apis_requests_before)
+        self.assertEqual(self.cluster.requests.count('/version'), 1)
+        self.assertEqual(discoverer.stats.misses, 1)
+        self.assertEqual(discoverer.stats.group_version_refreshes, 1)
+
+    def test_miss_on_unknown_group_refreshes_group_list(self):
+        discoverer = CachingDiscoverer(self.client)
+        discoverer.get(api_version='v1', kind='ConfigMap')
+        self.cluster.groups.append({'name': 'example.com', 'versions': [{'version': 'v1alpha1'}], 'preferredVersion': {'version': 'v1alpha1'}})
+        self.cluster.resources['apis/example.com/v1alpha1'] = [resource_def('mycrds', 'MyCrd')]
+        resource = discoverer.get(api_version='example.com/v1alpha1', kind='MyCrd')
+        self.assertEqual(resource.kind, 'MyCrd')
+        self.assertEqual(discoverer.stats.group_list_refreshes, 1)
+        # Core resources already loaded are kept
+        discoverer.get(api_version='v1', kind='ConfigMap')
+        self.assertEqual(self.cluster.requests.count('api/v1'), 1)
+
+    def test_invalidate_group(self):
+        discoverer = CachingDiscoverer(self.client)
+        discoverer.get(api_version='apps/v1', kind='Deployment')
+        discoverer.invalidate_group('apps')
+        discoverer.get(api_version='apps/v1', kind='Deployment')
+        self.assertEqual(self.cluster.requests.count('apis/apps/v1'), 2)
+
+    def test_resolve(self):
+        discoverer = CachingDiscoverer(self.client)
+        resolved = discoverer.resolve('v1', 'ConfigMap')
+        self.assertEqual(resolved.resource.kind, 'ConfigMap')
+        self.assertTrue(resolved.namespaced)
+        self.assertEqual(resolved.base_url, '/api/v1/configmaps')
+        self.assertIs(discoverer.resolve('v1', 'ConfigMap'), resolved)
+        self.assertEqual(discoverer.stats.resolution_hits, 1)
+        self.assertEqual(discoverer.stats.hits, 1)
+
+    def test_resolve_not_found_is_cached(self):
+        discoverer = CachingDiscoverer(self.client, negative_ttl_seconds=60)
+        with self.assertRaises(ResourceNotFoundError):
+            discoverer.resolve('example.com/v1', 'Missing')
+        refreshes = discoverer.stats.group_list_refreshes
+        requests = len(self.cluster.requests)
+        with self.assertRaises(ResourceNotFoundError):
+            discoverer.resolve('example.com/v1', 'Missing')
+        self.assertEqual(discoverer.stats.group_list_refreshes, refreshes)
+        self.assertEqual(len(self.cluster.requests), requests)
+        self.assertEqual(discoverer.stats.negative_resolution_hits, 1)
+
+    def test_resolve_not_found_expires(self):
+        discoverer = CachingDiscoverer(self.client, negative_ttl_seconds=60)
+        with self.assertRaises(ResourceNotFoundError):
+            discoverer.resolve('example.com/v1', 'Missing')
+        with patch('kubedriver.kubeclient.discovery.time.monotonic', return_value=10**9):
+            with self.assertRaises(ResourceNotFoundError):
+                discoverer.resolve('example.com/v1', 'Missing')
+        self.assertEqual(discoverer.stats.negative_resolution_hits, 0)
+
+    def test_resolve_not_found_without_negative_ttl(self):
+        discoverer = CachingDiscoverer(self.client, negative_ttl_seconds=0)
+        for i in range(2):
+            with self.assertRaises(ResourceNotFoundError):
+                discoverer.resolve('example.com/v1', 'Missing')
+        self.assertEqual(discoverer.stats.negative_resolution_hits, 0)
+
+    def test_resolve_forgotten_on_refresh(self):
+        discoverer = CachingDiscoverer(self.client, negative_ttl_seconds=60)
+        discoverer.resolve('v1', 'ConfigMap')
+        with self.assertRaises(ResourceNotFoundError):
+            discoverer.resolve('example.com/v1alpha1', 'MyCrd')
+        self.cluster.groups.append({'name': 'example.com', 'versions': [{'version': 'v1alpha1'}], 'preferredVersion': {'version': 'v1alpha1'}})
+        self.cluster.resources['apis/example.com/v1alpha1'] = [resource_def('mycrds', 'MyCrd')]
+        discoverer.invalidate_group('example.com')
+        self.assertEqual(discoverer.resolve('example.com/v1alpha1', 'MyCrd').resource.kind, 'MyCrd')
+        discoverer.resolve('v1', 'ConfigMap')
+        self.assertEqual(discoverer.stats.resolution_hits, 0)
+
+    def test_persist_writes_and_reloads_cache(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            cache_file = os.path.join(tmp_dir, 'discovery.json')
+            discoverer = CachingDiscoverer(self.client, cache_file=cache_file, persist=True)
+            discoverer.get(api_version='apps/v1', kind='Deployment')
+            self.assertTrue(os.path.exists(cache_file))
+            second_cluster = FakeCluster()
+            second_discoverer = CachingDiscoverer(second_cluster.build_client(), cache_file=cache_file, persist=True)
+            resource = second_discoverer.get(api_version='apps/v1', kind='Deployment')
+            self.assertEqual(resource.kind, 'Deployment')
+            self.assertEqual(second_cluster.requests, [])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_no_persist_does_not_write_cache(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            cache_file = os.path.join(tmp_dir, 'discovery.json')
+            discoverer = CachingDiscoverer(self.client, cache_file=cache_file, persist=False)
+            discoverer.get(api_version='apps/v1', kind='Deployment')
+            self.assertFalse(os.path.exists(cache_file))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+class TestDynamicClientRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.dynamic_client_patcher = patch('kubedriver.kubeclient.discovery.DynamicClient')
+        self.mock_dynamic_client_class = self.dynamic_client_patcher.start()
+        self.mock_dynamic_client_class.side_effect = self._build_dynamic_client
+        self.addCleanup(self.dynamic_client_patcher.stop)
+
+    def _build_dynamic_client(self, base_client, cache_file=None, discoverer=None):
+        dynamic_client = MagicMock()
+        dynamic_client.client = base_client
+        dynamic_client.resources.stats = DiscoveryStats()
+        return dynamic_client
+
+    def test_get_reuses_dynamic_client(self):
+        registry = DynamicClientRegistry()
+        base_client = MagicMock()
+        dynamic_client = registry.get('loc', base_client)
+        self.assertIs(registry.get('loc', base_client), dynamic_client)
+        self.mock_dynamic_client_class.assert_called_once()
+        self.assertEqual(self.mock_dynamic_client_class.call_args[1]['discoverer'].func, CachingDiscoverer)
+
+    def test_get_rebuilds_when_base_client_changes(self):
+        registry = DynamicClientRegistry()
+        dynamic_client = registry.get('loc', MagicMock())
+        new_base_client = MagicMock()
+        new_dynamic_client = registry.get('loc', new_base_client)
+        self.assertIsNot(new_dynamic_client, dynamic_client)
+        self.assertIs(new_dynamic_client.client, new_base_client)
+
+    def test_get_evicts_over_capacity(self):
+        registry = DynamicClientRegistry(capacity=1)
+        registry.get('A', MagicMock())
+        registry.get('B', MagicMock())
+        self.assertEqual(len(registry), 1)
+
+    def test_get_with_persist_uses_cache_file_per_key(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            registry = DynamicClientRegistry(persist=True, cache_dir=tmp_dir)
+            registry.get('A', MagicMock())
+            self.assertEqual(self.mock_dynamic_client_class.call_args[1]['cache_file'], os.path.join(tmp_dir, 'kubedriver-discovery-A.json'))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_stats(self):
+        registry = DynamicClientRegistry()
+        registry.get('A', MagicMock()).resources.stats.hits = 2
+        registry.get('B', MagicMock()).resources.stats.hits = 3
+        self.assertEqual(registry.stats().hits, 5)
+
+    def test_stats_include_evicted_and_replaced_clients(self):
+        registry = DynamicClientRegistry(capacity=1)
+        registry.get('A', MagicMock()).resources.stats.hits = 2
+        # Replaced as the base client changed
+        registry.get('A', MagicMock()).resources.stats.hits = 3
+        # Evicts A
+        registry.get('B', MagicMock()).resources.stats.hits = 4
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(registry.stats().hits, 9)
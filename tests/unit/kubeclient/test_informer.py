@@ -0,0 +1,271 @@
+import unittest
+import threading
+from unittest.mock import MagicMock
+from kubedriver.kubeclient.informer import ObjectStore, KindInformer, InformerManager, ChangeNotifier, StoreFullError, ADDED, MODIFIED, DELETED
+
+def build_obj(name, namespace='default', keg=None, resource_version='1'):
+    metadata = {'name': name, 'namespace': namespace, 'resourceVersion': resource_version}
+    if keg is not None:
+        metadata['labels'] = {'keg': keg}
+    return {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': metadata}
+
+class FakeWatchApiController:
+
+    def __init__(self, list_results, watch_events=None):
+        self.list_results = list(list_results)
+        self.watch_events = list(watch_events or [])
+        self.list_calls = []
+        self.watch_calls = []
+        self.watched = threading.Event()
+
+    def list_objects(self, api_version, kind, **kwargs):
+        self.list_calls.append(kwargs)
+        if len(self.list_results) > 1:
+            return self.list_results.pop(0)
+        return self.list_results[0]
+
+    def watch_objects(self, api_version, kind, **kwargs):
+        self.watch_calls.append(kwargs)
+        events = self.watch_events.pop(0) if len(self.watch_events) > 0 else []
+        for event in events:
+            yield event
+        self.watched.set()
+
+class TestObjectStore(unittest.TestCase):
+
+    def test_put_and_get(self):
+        store = ObjectStore()
+        store.put('v1', 'ConfigMap', build_obj('a'))
+        self.assertEqual(store.get('v1', 'ConfigMap', 'default', 'a'), build_obj('a'))
+        self.assertIsNone(store.get('v1', 'ConfigMap', 'default', 'b'))
+        self.assertIsNone(store.get('v1', 'Secret', 'default', 'a'))
+        self.assertEqual(store.count(), 1)
+
+    def test_put_replaces_existing(self):
+        store = ObjectStore()
+        store.put('v1', 'ConfigMap', build_obj('a', resource_version='1'))
+        store.put('v1', 'ConfigMap', build_obj('a', resource_version='2'))
+        self.assertEqual(store.get('v1', 'ConfigMap', 'default', 'a')['metadata']['resourceVersion'], '2')
+        self.assertEqual(store.count(), 1)
+
+    def test_remove(self):
+        store = ObjectStore()
+        store.put('v1', 'ConfigMap', build_obj('a'))
+        store.remove('v1', 'ConfigMap', build_obj('a'))
+        self.assertIsNone(store.get('v1', 'ConfigMap', 'default', 'a'))
+        self.assertEqual(store.count(), 0)
+
+    def test_index(self):
+        store = ObjectStore(index_label='keg')
+        store.put('v1', 'ConfigMap', build_obj('a', keg='one'))
+        store.put('v1', 'ConfigMap', build_obj('b', keg='two'))
+        store.put('v1', 'Secret', build_obj('c', keg='one'))
+        self.assertEqual(sorted([obj['metadata']['name'] for obj in store.list_indexed('one')]), ['a', 'c'])
+        store.put('v1', 'ConfigMap', build_obj('a', keg='two'))
+        self.assertEqual([obj['metadata']['name'] for obj in store.list_indexed('one')], ['c'])
+        store.clear_kind('v1', 'Secret')
+        self.assertEqual(store.list_indexed('one'), [])
+
+    def test_replace_kind(self):
+        store = ObjectStore()
+        store.put('v1', 'ConfigMap', build_obj('a'))
+        store.put('v1', 'Secret', build_obj('s'))
+        store.replace_kind('v1', 'ConfigMap', [build_obj('b'), build_obj('c')])
+        self.assertIsNone(store.get('v1', 'ConfigMap', 'default', 'a'))
+        self.assertIsNotNone(store.get('v1', 'ConfigMap', 'default', 'b'))
+        self.assertIsNotNone(store.get('v1', 'Secret', 'default', 's'))
+        self.assertEqual(store.count(), 3)
+
+    def test_max_objects(self):
+        store = ObjectStore(max_objects=1)
+        store.put('v1', 'ConfigMap', build_obj('a'))
+        store.put('v1', 'ConfigMap', build_obj('a'))
+        with self.assertRaises(StoreFullError):
+            store.put('v1', 'ConfigMap', build_obj('b'))
+
+    def test_listeners(self):
+        store = ObjectStore()
+        listener = MagicMock()
+        store.add_listener(listener)
+        store.put('v1', 'ConfigMap', build_obj('a'))
+        store.put('v1', 'ConfigMap', build_obj('a'))
+        store.remove('v1', 'ConfigMap', build_obj('a'))
+        self.assertEqual([call[0][0] for call in listener.call_args_list], [ADDED, MODIFIED, DELETED])
+        store.remove_listener(listener)
+        store.put('v1', 'ConfigMap', build_obj('a'))
+        self.assertEqual(listener.call_count, 3)
+
+    def test_listener_errors_ignored(self):
+        store = ObjectStore()
+        store.add_listener(MagicMock(side_effect=ValueError('mock error')))
+        store.put('v1', 'ConfigMap', build_obj('a'))
+        self.assertIsNotNone(store.get('v1', 'ConfigMap', 'default', 'a'))
+
+    def test_replace_kind_notifies_changes(self):
+        store = ObjectStore()
+        store.put('v1', 'ConfigMap', build_obj('a', resource_version='1'))
+        store.put('v1', 'ConfigMap', build_obj('b', resource_version='1'))
+        store.put('v1', 'ConfigMap', build_obj('c', resource_version='1'))
+        listener = MagicMock()
+        store.add_listener(listener)
+        store.replace_kind('v1', 'ConfigMap', [build_obj('a', resource_version='1'), build_obj('b', resource_version='2'), build_obj('d')])
+        events = sorted([(call[0][0], call[0][3]['metadata']['name']) for call in listener.call_args_list])
+        self.assertEqual(events, [(ADDED, 'd'), (DELETED, 'c'), (MODIFIED, 'b')])
+
+class TestChangeNotifier(unittest.TestCase):
+
+    def setUp(self):
+        self.store = ObjectStore()
+        self.notifier = ChangeNotifier(max_subscriptions=2)
+        self.notifier.attach(self.store, lambda api_version, kind, obj: [obj['metadata'].get('labels', {}).get('keg')])
+
+    def test_consume_after_matching_change(self):
+        self.notifier.subscribe('req1', ['one'])
+        self.assertFalse(self.notifier.consume('req1'))
+        self.store.put('v1', 'ConfigMap', build_obj('a', keg='one'))
+        self.assertTrue(self.notifier.consume('req1'))
+        self.assertFalse(self.notifier.consume('req1'))
+
+    def test_ignores_other_changes(self):
+        self.notifier.subscribe('req1', ['one'])
+        self.store.put('v1', 'ConfigMap', build_obj('a', keg='two'))
+        self.assertFalse(self.notifier.consume('req1'))
+
+    def test_subscribe_resets_notification(self):
+        self.notifier.subscribe('req1', ['one'])
+        self.store.put('v1', 'ConfigMap', build_obj('a', keg='one'))
+        self.notifier.subscribe('req1', ['one'])
+        self.assertFalse(self.notifier.consume('req1'))
+
+    def test_unsubscribe(self):
+        self.notifier.subscribe('req1', ['one'])
+        self.notifier.unsubscribe('req1')
+        self.store.put('v1', 'ConfigMap', build_obj('a', keg='one'))
+        self.assertFalse(self.notifier.consume('req1'))
+        self.assertFalse(self.notifier.is_subscribed('req1'))
+
+    def test_max_subscriptions(self):
+        self.notifier.subscribe('req1', ['one'])
+        self.notifier.subscribe('req2', ['one'])
+        self.notifier.subscribe('req3', ['one'])
+        self.assertFalse(self.notifier.is_subscribed('req1'))
+        self.assertTrue(self.notifier.is_subscribed('req3'))
+
+class TestKindInformer(unittest.TestCase):
+
+    def test_lists_then_watches(self):
+        api_ctl = FakeWatchApiController(
+            list_results=[
+                {'items': [build_obj('a')], 'metadata': {'continue': 'next'}},
+                {'items': [build_obj('b')], 'metadata': {'resourceVersion': '5'}}
+            ],
+            watch_events=[[
+                {'type': ADDED, 'raw_object': build_obj('c', resource_version='6')},
+                {'type': DELETED, 'raw_object': build_obj('a', resource_version='7')}
+            ]]
+        )
+        store = ObjectStore()
+        informer = KindInformer(api_ctl, 'v1', 'ConfigMap', store, label_selector='managed=true', page_size=10)
+        informer.start()
+        try:
+            self.assertTrue(informer.wait_for_sync(timeout=5))
+            self.assertTrue(api_ctl.watched.wait(timeout=5))
+            self.assertTrue(informer.synced)
+            self.assertIsNone(store.get('v1', 'ConfigMap', 'default', 'a'))
+            self.assertIsNotNone(store.get('v1', 'ConfigMap', 'default', 'b'))
+            self.assertIsNotNone(store.get('v1', 'ConfigMap', 'default', 'c'))
+            self.assertEqual(api_ctl.list_calls[0], {'label_selector': 'managed=true', 'limit': 10, 'continue_token': None})
+            self.assertEqual(api_ctl.list_calls[1]['continue_token'], 'next')
+            self.assertEqual(api_ctl.watch_calls[0]['resource_version'], '5')
+            self.assertEqual(api_ctl.watch_calls[0]['label_selector'], 'managed=true')
+        finally:
+            informer.stop()
+
+    def test_relists_when_resource_version_gone(self):
+        api_ctl = FakeWatchApiController(
+            list_results=[
+                {'items': [build_obj('a')], 'metadata': {'resourceVersion': '5'}},
+                {'items': [build_obj('b')], 'metadata': {'resourceVersion': '9'}}
+            ],
+            watch_events=[[{'type': 'ERROR', 'raw_object': {'code': 410, 'message': 'too old'}}]]
+        )
+        store = ObjectStore()
+        informer = KindInformer(api_ctl, 'v1', 'ConfigMap', store)
+        informer.start()
+        try:
+            self.assertTrue(api_ctl.watched.wait(timeout=5))
+            self.assertGreaterEqual(len(api_ctl.list_calls), 2)
+            self.assertIsNone(store.get('v1', 'ConfigMap', 'default', 'a'))
+            self.assertIsNotNone(store.get('v1', 'ConfigMap', 'default', 'b'))
+        finally:
+            informer.stop()
+
+    def test_disabled_when_store_full(self):
+        api_ctl = FakeWatchApiController(list_results=[{'items': [build_obj('a'), build_obj('b')], 'metadata': {}}])
+        store = ObjectStore(max_objects=1)
+        informer = KindInformer(api_ctl, 'v1', 'ConfigMap', store)
+        informer.start()
+        informer._thread.join(timeout=5)
+        self.assertTrue(informer.disabled)
+        self.assertFalse(informer.synced)
+        self.assertEqual(store.count(), 0)
+
+class TestInformerManager(unittest.TestCase):
+
+    def test_get_before_synced(self):
+        manager = InformerManager(MagicMock())
+        self.assertEqual(manager.get('v1', 'ConfigMap', 'default', 'a'), (False, None))
+
+    def test_watch_and_get(self):
+        api_ctl = FakeWatchApiController(list_results=[{'items': [build_obj('a')], 'metadata': {'resourceVersion': '1'}}])
+        manager = InformerManager(api_ctl, label_selector='managed=true')
+        try:
+            manager.watch('v1', 'ConfigMap')
+            manager.watch('v1', 'ConfigMap')
+            self.assertEqual(len(manager._informers), 1)
+            self.assertTrue(manager._informers[('v1', 'ConfigMap')].wait_for_sync(timeout=5))
+            self.assertEqual(manager.get('v1', 'ConfigMap', 'default', 'a'), (True, build_obj('a')))
+            self.assertEqual(manager.get('v1', 'ConfigMap', 'default', 'b'), (True, None))
+        finally:
+            manager.close()
+
+    def test_max_kinds(self):
+        manager = InformerManager(FakeWatchApiController(list_results=[{'items': [], 'metadata': {}}]), max_kinds=1)
+        try:
+            manager.watch('v1', 'ConfigMap')
+            manager.watch('v1', 'Secret')
+            self.assertEqual(list(manager._informers.keys()), [('v1', 'ConfigMap')])
+        finally:
+            manager.close()
+
+    def test_notifier_matches_index_label(self):
+        manager = InformerManager(MagicMock(), index_label='keg')
+        manager.notifier.subscribe('req1', [InformerManager.index_match_key('one')])
+        manager.store.put('v1', 'ConfigMap', build_obj('a', keg='one'))
+        self.assertTrue(manager.notifier.consume('req1'))
+
+    def test_notifier_matches_helm_release(self):
+        manager = InformerManager(MagicMock())
+        manager.notifier.subscribe('req1', [InformerManager.helm_release_match_key('release', 'default')])
+        manager.helm_release_store.put('v1', 'Secret', {'metadata': {'name': 'sh.helm.release.v1.release.v2', 'namespace': 'default', 'labels': {'owner': 'helm', 'name': 'release'}}})
+        self.assertTrue(manager.notifier.consume('req1'))
+
+    def test_watch_helm_releases(self):
+        api_ctl = FakeWatchApiController(list_results=[{'items': [], 'metadata': {}}])
+        manager = InformerManager(api_ctl)
+        try:
+            manager.watch_helm_releases()
+            manager.watch_helm_releases()
+            self.assertTrue(manager._helm_release_informer.wait_for_sync(timeout=5))
+            self.assertEqual(manager._helm_release_informer.label_selector, 'owner=helm')
+            self.assertEqual(manager._helm_release_informer.kind, 'Secret')
+        finally:
+            manager.close()
+
+    def test_close(self):
+        manager = InformerManager(FakeWatchApiController(list_results=[{'items': [], 'metadata': {}}]))
+        manager.watch('v1', 'ConfigMap')
+        manager.close()
+        manager.watch('v1', 'Secret')
+        self.assertEqual(manager._informers, {})
+        self.assertFalse(manager.is_synced('v1', 'ConfigMap'))
@@ -22,4 +22,46 @@ class TestImports(unittest.TestCase):
         imported = kubeclient.DEFAULT_CRD_API_VERSION
 
     def test_error_reader(self):
-        imported = kubeclient.ErrorReader
\ No newline at end of file
+        imported = kubeclient.ErrorReader
+
+    def test_caching_discoverer(self):
+        imported = kubeclient.CachingDiscoverer
+
+    def test_dynamic_client_registry(self):
+        imported = kubeclient.DynamicClientRegistry
+
+    def test_async_api_controller(self):
+        imported = kubeclient.AsyncApiController
+
+    def test_sync_api_bridge(self):
+        imported = kubeclient.SyncApiBridge
+
+    def test_informer_manager(self):
+        imported = kubeclient.InformerManager
+
+    def test_object_store(self):
+        imported = kubeclient.ObjectStore
+
+    def test_crd_index(self):
+        imported = kubeclient.CrdIndex
+
+    def test_crd_index_registry(self):
+        imported = kubeclient.CrdIndexRegistry
+
+    def test_indexed_crd(self):
+        imported = kubeclient.IndexedCrd
+
+    def test_default_crd_index_registry(self):
+        imported = kubeclient.default_crd_index_registry
+
+    def test_rate_limiter(self):
+        imported = kubeclient.RateLimiter
+
+    def test_rate_limiter_registry(self):
+        imported = kubeclient.RateLimiterRegistry
+
+    def test_install_rate_limiter(self):
+        imported = kubeclient.install_rate_limiter
+
+    def test_default_rate_limiter_registry(self):
+        imported = kubeclient.default_rate_limiter_registry
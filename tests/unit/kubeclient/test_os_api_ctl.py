@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import MagicMock, patch
-from kubedriver.kubeclient.os_api_ctl import OpenshiftApiController
+from kubedriver.kubeclient.os_api_ctl import OpenshiftApiController, API_REQUEST_SECONDS
+from kubedriver.kubeclient.discovery import CachingDiscoverer
 from kubedriver.kubeobjects.object_config import ObjectConfiguration
 from kubernetes import client
         
@@ -43,6 +44,69 @@ class TestOpenshiftApiController(unittest.TestCase):
         self.os_api_ctl.update_object(object_config)
         assert self.os_api_ctl._generate_additional_logs.called
 
+    def test_is_object_namespaced_uses_resolve_of_caching_discoverer(self):
+        resources = MagicMock(spec=CachingDiscoverer)
+        resources.resolve.return_value.namespaced = False
+        os_api_ctl = OpenshiftApiController(MagicMock(), dynamic_client=MagicMock(resources=resources))
+        self.assertFalse(os_api_ctl.is_object_namespaced('v1', 'Namespace'))
+        resources.resolve.assert_called_once_with('v1', 'Namespace')
+        resources.get.assert_not_called()
+
+    def test_apply_object(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = True
+        object_config = ObjectConfiguration({
+            'apiVersion': 'v1',
+            'kind': 'ConfigMap',
+            'metadata': {
+                'name': 'Testing'
+            },
+            'data': {
+                'dataItemA': 'C'
+            }
+        })
+        result = self.os_api_ctl.apply_object(object_config)
+        self.assertEqual(result, resource_client.patch.return_value)
+        resource_client.patch.assert_called_once_with(
+            body='{"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": "Testing"}, "data": {"dataItemA": "C"}}',
+            name='Testing',
+            namespace='default',
+            content_type='application/apply-patch+yaml',
+            query_params=[('fieldManager', 'kubedriver'), ('force', 'true')]
+        )
+        assert self.os_api_ctl._generate_additional_logs.called
+
+    def test_patch_object_status_subresource(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = True
+        status_client = MagicMock()
+        resource_client.subresources = {'status': status_client}
+        result = self.os_api_ctl.patch_object('keg.ibm/v1alpha1', 'Keg', 'Testing', {'status': {'phase': 'Complete'}}, namespace='driver', subresource='status')
+        self.assertEqual(result, status_client.patch.return_value)
+        status_client.patch.assert_called_once_with(body={'status': {'phase': 'Complete'}}, name='Testing', namespace='driver', content_type='application/merge-patch+json')
+        resource_client.patch.assert_not_called()
+        assert self.os_api_ctl._generate_additional_logs.called
+
+    def test_patch_object_without_subresource_patches_object(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = True
+        resource_client.subresources = {}
+        self.os_api_ctl.patch_object('keg.ibm/v1alpha1', 'Keg', 'Testing', {'status': {'phase': 'Complete'}}, subresource='status')
+        resource_client.patch.assert_called_once_with(body={'status': {'phase': 'Complete'}}, name='Testing', namespace='default', content_type='application/merge-patch+json')
+
+    def test_apply_object_without_force(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = False
+        object_config = ObjectConfiguration({'apiVersion': 'v1', 'kind': 'Namespace', 'metadata': {'name': 'Testing'}})
+        self.os_api_ctl.apply_object(object_config, field_manager='other', force=False)
+        call_kwargs = resource_client.patch.call_args[1]
+        self.assertEqual(call_kwargs['query_params'], [('fieldManager', 'other')])
+        self.assertNotIn('namespace', call_kwargs)
+
     def test_delete_object(self):
         self.os_api_ctl._generate_additional_logs = MagicMock()
         self.os_api_ctl.delete_object('v1', 'ConfigMap', 'Testing')
@@ -51,4 +115,143 @@ class TestOpenshiftApiController(unittest.TestCase):
     def test_read_object(self):
         self.os_api_ctl._generate_additional_logs = MagicMock()
         self.os_api_ctl.read_object('v1', 'ConfigMap', 'Testing')
-        assert self.os_api_ctl._generate_additional_logs.called
\ No newline at end of file
+        assert self.os_api_ctl._generate_additional_logs.called
+
+    def test_read_object_records_request_duration(self):
+        os_api_ctl = OpenshiftApiController(self.base_kube_client, default_namespace='default', dynamic_client=MagicMock(), location_name='metrics-location')
+        os_api_ctl._generate_additional_logs = MagicMock()
+        os_api_ctl.read_object('v1', 'ConfigMap', 'Testing')
+        recorded = API_REQUEST_SECONDS.get(verb='get', kind='ConfigMap', location='metrics-location')
+        self.assertIsNotNone(recorded)
+        self.assertEqual(recorded.count, 1)
+
+    def test_init_with_dynamic_client(self):
+        dynamic_client = MagicMock()
+        os_api_ctl = OpenshiftApiController(self.base_kube_client, default_namespace='default', dynamic_client=dynamic_client)
+        self.assertEqual(os_api_ctl.dynamic_client, dynamic_client)
+
+    def test_create_crd_invalidates_discovery_for_group(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        object_config = ObjectConfiguration({
+            'apiVersion': 'apiextensions.k8s.io/v1',
+            'kind': 'CustomResourceDefinition',
+            'metadata': {
+                'name': 'mycrds.example.com'
+            },
+            'spec': {
+                'group': 'example.com'
+            }
+        })
+        self.os_api_ctl.create_object(object_config)
+        self.os_api_ctl.dynamic_client.resources.invalidate_group.assert_called_once_with('example.com')
+
+    def test_create_object_does_not_invalidate_discovery(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        object_config = ObjectConfiguration({
+            'apiVersion': 'v1',
+            'kind': 'ConfigMap',
+            'metadata': {
+                'name': 'Testing'
+            }
+        })
+        self.os_api_ctl.create_object(object_config)
+        self.os_api_ctl.dynamic_client.resources.invalidate_group.assert_not_called()
+
+    def test_list_objects(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = True
+        result = self.os_api_ctl.list_objects('v1', 'ConfigMap', namespace='default', label_selector='keg=test', limit=10, continue_token='abc')
+        resource_client.get.assert_called_once_with(namespace='default', label_selector='keg=test', limit=10, _continue='abc')
+        self.assertEqual(result, resource_client.get.return_value.to_dict.return_value)
+        assert self.os_api_ctl._generate_additional_logs.called
+
+    def test_delete_collection(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = True
+        result = self.os_api_ctl.delete_collection('v1', 'ConfigMap', namespace='default', label_selector='keg=test')
+        resource_client.delete.assert_called_once_with(namespace='default', label_selector='keg=test')
+        self.assertEqual(result, resource_client.delete.return_value.to_dict.return_value)
+        assert self.os_api_ctl._generate_additional_logs.called
+
+    def test_delete_collection_requires_selector(self):
+        with self.assertRaises(ValueError) as context:
+            self.os_api_ctl.delete_collection('v1', 'ConfigMap', namespace='default')
+        self.assertEqual(str(context.exception), 'A label_selector or field_selector is required to delete a collection')
+
+    def test_watch_objects(self):
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = True
+        result = self.os_api_ctl.watch_objects('v1', 'ConfigMap', namespace='default', label_selector='keg=test', resource_version='10', timeout_seconds=30)
+        self.os_api_ctl.dynamic_client.watch.assert_called_once_with(resource_client, namespace='default', label_selector='keg=test', resource_version='10', timeout=30)
+        self.assertEqual(result, self.os_api_ctl.dynamic_client.watch.return_value)
+
+    def test_create_object_dry_run(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = True
+        object_config = ObjectConfiguration({'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'Testing'}})
+        self.os_api_ctl.create_object(object_config, dry_run=True)
+        resource_client.create.assert_called_once_with(body=object_config.data, namespace='default', dry_run='All')
+
+    def test_update_object_dry_run(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        object_config = ObjectConfiguration({'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'Testing'}})
+        self.os_api_ctl.update_object(object_config, dry_run=True)
+        self.assertEqual(resource_client.replace.call_args[1]['dry_run'], 'All')
+
+    def test_apply_object_dry_run(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        object_config = ObjectConfiguration({'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'Testing'}})
+        self.os_api_ctl.apply_object(object_config, dry_run=True)
+        self.assertEqual(resource_client.patch.call_args[1]['dry_run'], 'All')
+
+    def test_create_object_without_dry_run(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        object_config = ObjectConfiguration({'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'Testing'}})
+        self.os_api_ctl.create_object(object_config)
+        self.assertNotIn('dry_run', resource_client.create.call_args[1])
+
+    def test_watch_objects_with_field_selector(self):
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = True
+        self.os_api_ctl.watch_objects('v1', 'ConfigMap', namespace='default', field_selector='metadata.name=test', resource_version='10', timeout_seconds=30)
+        self.os_api_ctl.dynamic_client.watch.assert_called_once_with(resource_client, namespace='default', field_selector='metadata.name=test', 
+                                                                        label_selector=None, resource_version='10', timeout=30)
+
+    def test_wait_for_deletion_not_found(self):
+        self.os_api_ctl.safe_read_object = MagicMock(return_value=(False, None))
+        self.assertTrue(self.os_api_ctl.wait_for_deletion('v1', 'ConfigMap', 'test', namespace='default', timeout_seconds=30))
+        self.os_api_ctl.dynamic_client.watch.assert_not_called()
+
+    def test_wait_for_deletion_watches_from_resource_version(self):
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = True
+        self.os_api_ctl.safe_read_object = MagicMock(return_value=(True, MagicMock(metadata=MagicMock(resourceVersion='15'))))
+        self.os_api_ctl.dynamic_client.watch.return_value = iter([{'type': 'MODIFIED'}, {'type': 'DELETED'}])
+        self.assertTrue(self.os_api_ctl.wait_for_deletion('v1', 'ConfigMap', 'test', namespace='default', timeout_seconds=30))
+        self.os_api_ctl.dynamic_client.watch.assert_called_once_with(resource_client, namespace='default', field_selector='metadata.name=test', 
+                                                                        label_selector=None, resource_version='15', timeout=30)
+        self.os_api_ctl.safe_read_object.assert_called_once()
+
+    def test_wait_for_deletion_timeout(self):
+        self.os_api_ctl.safe_read_object = MagicMock(return_value=(True, MagicMock(metadata=MagicMock(resourceVersion='15'))))
+        self.os_api_ctl.dynamic_client.watch.return_value = iter([{'type': 'MODIFIED'}])
+        self.assertFalse(self.os_api_ctl.wait_for_deletion('v1', 'ConfigMap', 'test', namespace='default', timeout_seconds=30))
+        self.assertEqual(self.os_api_ctl.safe_read_object.call_count, 2)
+
+    def test_wait_for_deletion_deleted_as_watch_closed(self):
+        self.os_api_ctl.safe_read_object = MagicMock(side_effect=[(True, MagicMock(metadata=MagicMock(resourceVersion='15'))), (False, None)])
+        self.os_api_ctl.dynamic_client.watch.return_value = iter([])
+        self.assertTrue(self.os_api_ctl.wait_for_deletion('v1', 'ConfigMap', 'test', namespace='default', timeout_seconds=30))
+
+    def test_list_objects_cluster_scoped_ignores_namespace(self):
+        self.os_api_ctl._generate_additional_logs = MagicMock()
+        resource_client = self.os_api_ctl.dynamic_client.resources.get.return_value
+        resource_client.namespaced = False
+        self.os_api_ctl.list_objects('v1', 'Namespace', namespace='default')
+        resource_client.get.assert_called_once_with()
@@ -0,0 +1,281 @@
+import unittest
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from kubernetes.client.rest import ApiException
+from kubedriver.kubeclient.rate_limiter import TokenBucket, RateLimiter, RateLimiterRegistry, install_rate_limiter
+from kubedriver.kubeclient.os_api_ctl_factory import OpenshiftApiControllerFactory
+from kubedriver.kubeclient.properties import KubeApiProperties
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class FakeApiClient:
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, *args, **kwargs):
+        self.requests.append((args, kwargs))
+        return 'response'
+
+def throttled_error(status=429, retry_after=None):
+    error = ApiException(status=status, reason='Too Many Requests')
+    error.headers = {'Retry-After': retry_after} if retry_after is not None else {}
+    return error
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_without_waiting(self):
+        clock = FakeClock()
+        bucket = TokenBucket(qps=10, burst=3, clock=clock, sleep=clock.sleep)
+        for i in range(3):
+            self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(clock.sleeps, [])
+
+    def test_waits_for_refill_once_burst_used(self):
+        clock = FakeClock()
+        bucket = TokenBucket(qps=10, burst=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertAlmostEqual(bucket.acquire(), 0.1)
+        self.assertAlmostEqual(bucket.acquire(), 0.1)
+
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        bucket = TokenBucket(qps=10, burst=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+        clock.now += 1
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+
+    def test_configure_does_not_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(qps=10, burst=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+        bucket.configure(10, 2)
+        self.assertAlmostEqual(bucket.acquire(), 0.1)
+
+    def test_disabled_with_zero_qps(self):
+        clock = FakeClock()
+        bucket = TokenBucket(qps=0, burst=1, clock=clock, sleep=clock.sleep)
+        for i in range(5):
+            self.assertEqual(bucket.acquire(), 0.0)
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def _limiter(self, **kwargs):
+        return RateLimiter(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_call_returns_result(self):
+        limiter = self._limiter()
+        func = MagicMock(return_value='result')
+        self.assertEqual(limiter.call(func, 'GET', url='/api'), 'result')
+        func.assert_called_once_with('GET', url='/api')
+        self.assertEqual(limiter.stats.requests, 1)
+
+    def test_records_blocked_time(self):
+        limiter = self._limiter(qps=10, burst=1)
+        func = MagicMock()
+        limiter.call(func)
+        limiter.call(func)
+        self.assertEqual(limiter.stats.blocked_requests, 1)
+        self.assertAlmostEqual(limiter.stats.blocked_seconds, 0.1)
+
+    def test_retries_429_with_backoff(self):
+        limiter = self._limiter(max_retries=3, backoff_base_seconds=1, backoff_max_seconds=10)
+        func = MagicMock(side_effect=[throttled_error(), throttled_error(), 'result'])
+        self.assertEqual(limiter.call(func), 'result')
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(len(self.clock.sleeps), 2)
+        self.assertTrue(0.5 <= self.clock.sleeps[0] <= 1)
+        self.assertTrue(1 <= self.clock.sleeps[1] <= 2)
+        self.assertEqual(limiter.stats.retries, 2)
+        self.assertEqual(limiter.stats.throttled_responses, 2)
+
+    def test_honours_retry_after_seconds(self):
+        limiter = self._limiter(backoff_base_seconds=0.1)
+        func = MagicMock(side_effect=[throttled_error(retry_after='7'), 'result'])
+        limiter.call(func)
+        self.assertTrue(7 <= self.clock.sleeps[0] <= 7.7)
+
+    def test_retry_after_capped_by_backoff_max(self):
+        limiter = self._limiter(backoff_max_seconds=5)
+        func = MagicMock(side_effect=[throttled_error(retry_after='120'), 'result'])
+        limiter.call(func)
+        self.assertTrue(5 <= self.clock.sleeps[0] <= 5.5)
+
+    def test_honours_retry_after_http_date(self):
+        limiter = self._limiter()
+        with patch('kubedriver.kubeclient.rate_limiter.time.time', return_value=784111777.0):
+            func = MagicMock(side_effect=[throttled_error(retry_after='Sun, 06 Nov 1994 08:49:40 GMT'), 'result'])
+            limiter.call(func)
+        self.assertTrue(3 <= self.clock.sleeps[0] <= 3.3)
+
+    def test_retries_503_with_retry_after(self):
+        limiter = self._limiter()
+        func = MagicMock(side_effect=[throttled_error(status=503, retry_after='1'), 'result'])
+        self.assertEqual(limiter.call(func), 'result')
+
+    def test_does_not_retry_503_without_retry_after(self):
+        limiter = self._limiter()
+        func = MagicMock(side_effect=throttled_error(status=503))
+        with self.assertRaises(ApiException):
+            limiter.call(func)
+        func.assert_called_once()
+        self.assertEqual(limiter.stats.retries, 0)
+
+    def test_does_not_retry_other_errors(self):
+        limiter = self._limiter()
+        func = MagicMock(side_effect=ApiException(status=404, reason='Not Found'))
+        with self.assertRaises(ApiException):
+            limiter.call(func)
+        func.assert_called_once()
+
+    def test_raises_when_retries_exhausted(self):
+        limiter = self._limiter(max_retries=2)
+        func = MagicMock(side_effect=throttled_error())
+        with self.assertRaises(ApiException) as context:
+            limiter.call(func)
+        self.assertEqual(context.exception.status, 429)
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(limiter.stats.retries_exhausted, 1)
+
+    def test_caps_requests_in_flight(self):
+        limiter = RateLimiter(qps=0, max_in_flight=2)
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'max_in_flight': 0}
+        def request():
+            with lock:
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+            time.sleep(0.02)
+            with lock:
+                state['in_flight'] -= 1
+        threads = [threading.Thread(target=limiter.call, args=(request,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(state['max_in_flight'], 2)
+        self.assertEqual(limiter.stats.requests, 6)
+        self.assertTrue(limiter.stats.queued_requests > 0)
+        self.assertTrue(limiter.stats.queued_seconds > 0)
+
+class TestInstallRateLimiter(unittest.TestCase):
+
+    def test_routes_requests_through_limiter(self):
+        api_client = FakeApiClient()
+        limiter = RateLimiter(qps=0)
+        install_rate_limiter(api_client, limiter)
+        self.assertEqual(api_client.request('GET', '/api', headers={}), 'response')
+        self.assertEqual(api_client.requests, [(('GET', '/api'), {'headers': {}})])
+        self.assertEqual(limiter.stats.requests, 1)
+
+    def test_install_again_replaces_limiter(self):
+        api_client = FakeApiClient()
+        first = RateLimiter(qps=0)
+        second = RateLimiter(qps=0)
+        install_rate_limiter(api_client, first)
+        install_rate_limiter(api_client, second)
+        api_client.request('GET', '/api')
+        self.assertEqual(api_client.requests, [(('GET', '/api'), {})])
+        self.assertEqual(first.stats.requests, 0)
+        self.assertEqual(second.stats.requests, 1)
+        self.assertEqual(api_client.rate_limiter, second)
+
+class TestRateLimiterRegistry(unittest.TestCase):
+
+    def test_get_shares_limiter_per_key(self):
+        registry = RateLimiterRegistry(qps=5)
+        limiter = registry.get('a')
+        self.assertIs(registry.get('a'), limiter)
+        self.assertIsNot(registry.get('b'), limiter)
+        self.assertEqual(limiter.bucket.qps, 5)
+
+    def test_get_applies_overrides(self):
+        registry = RateLimiterRegistry(qps=5, burst=10, max_in_flight=4)
+        limiter = registry.get('a', qps=1, max_in_flight=None)
+        self.assertEqual(limiter.bucket.qps, 1)
+        self.assertEqual(limiter.bucket.burst, 10)
+        self.assertEqual(limiter.max_in_flight, 4)
+
+    def test_evicts_least_recently_used(self):
+        registry = RateLimiterRegistry(capacity=2)
+        first = registry.get('a')
+        registry.get('b')
+        registry.get('a')
+        registry.get('c')
+        self.assertEqual(len(registry), 2)
+        self.assertIs(registry.get('a'), first)
+
+    def test_stats_totals_all_limiters(self):
+        registry = RateLimiterRegistry(qps=0)
+        registry.get('a').call(MagicMock())
+        registry.get('b').call(MagicMock())
+        self.assertEqual(registry.stats().requests, 2)
+        self.assertEqual(registry.stats().to_dict()['requests'], 2)
+
+    def test_stats_include_evicted_limiters(self):
+        registry = RateLimiterRegistry(capacity=1, qps=0)
+        registry.get('a').call(MagicMock())
+        registry.get('b').call(MagicMock())
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(registry.stats().requests, 2)
+
+class TestOpenshiftApiControllerFactoryRateLimit(unittest.TestCase):
+
+    def _properties(self, enabled=True):
+        properties = MagicMock()
+        properties.rate_limit.enabled = enabled
+        properties.rate_limit.qps = 5
+        properties.rate_limit.burst = 10
+        properties.rate_limit.max_in_flight = 3
+        properties.rate_limit.max_retries = 2
+        properties.rate_limit.backoff_base_seconds = 0.1
+        properties.rate_limit.backoff_max_seconds = 1
+        return properties
+
+    def test_build_installs_location_limiter(self):
+        registry = RateLimiterRegistry()
+        factory = OpenshiftApiControllerFactory(kube_api_properties=self._properties(), dynamic_client_registry=MagicMock(), rate_limiter_registry=registry)
+        kube_location = MagicMock(client_fingerprint='abc', rate_limit={'qps': 1})
+        kube_location.client = FakeApiClient()
+        factory.build(kube_location)
+        limiter = kube_location.client.rate_limiter
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(limiter.bucket.qps, 1)
+        self.assertEqual(limiter.max_in_flight, 3)
+
+    def test_build_without_limiter_when_disabled(self):
+        registry = RateLimiterRegistry()
+        factory = OpenshiftApiControllerFactory(kube_api_properties=self._properties(enabled=False), dynamic_client_registry=MagicMock(), rate_limiter_registry=registry)
+        kube_location = MagicMock(client_fingerprint='abc', rate_limit={})
+        original_request = kube_location.client.request
+        factory.build(kube_location)
+        self.assertIs(kube_location.client.request, original_request)
+        self.assertEqual(len(registry), 0)
+
+    def test_build_without_limiter_by_default(self):
+        registry = RateLimiterRegistry()
+        factory = OpenshiftApiControllerFactory(kube_api_properties=KubeApiProperties(), dynamic_client_registry=MagicMock(), rate_limiter_registry=registry)
+        kube_location = MagicMock(client_fingerprint='abc', rate_limit={'qps': 1})
+        original_request = kube_location.client.request
+        factory.build(kube_location)
+        self.assertIs(kube_location.client.request, original_request)
+        self.assertEqual(len(registry), 0)
@@ -0,0 +1,134 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from kubedriver.location.client_pool import KubeClientPool, fingerprint_client_config
+
+class TestFingerprintClientConfig(unittest.TestCase):
+
+    def test_fingerprint_ignores_key_order(self):
+        self.assertEqual(fingerprint_client_config({'a': 1, 'b': 2}), fingerprint_client_config({'b': 2, 'a': 1}))
+
+    def test_fingerprint_differs_on_value_change(self):
+        self.assertNotEqual(fingerprint_client_config({'a': 1}), fingerprint_client_config({'a': 2}))
+
+class TestKubeClientPool(unittest.TestCase):
+
+    def test_get_builds_client_once(self):
+        pool = KubeClientPool()
+        builder = MagicMock()
+        first = pool.get('key', builder)
+        second = pool.get('key', builder)
+        self.assertEqual(first, builder.return_value)
+        self.assertEqual(second, builder.return_value)
+        builder.assert_called_once()
+
+    def __get_and_release(self, pool, key, builder=None):
+        client = pool.get(key, builder if builder is not None else MagicMock())
+        pool.release(key, client)
+        return client
+
+    def test_get_evicts_least_recently_used_over_capacity(self):
+        pool = KubeClientPool(capacity=2)
+        client_a = self.__get_and_release(pool, 'A')
+        self.__get_and_release(pool, 'B')
+        self.__get_and_release(pool, 'A')
+        client_b = self.__get_and_release(pool, 'B')
+        self.__get_and_release(pool, 'C')
+        self.assertEqual(len(pool), 2)
+        self.assertNotIn('A', pool)
+        client_a.close.assert_called_once()
+        client_a.rest_client.pool_manager.clear.assert_called_once()
+        client_b.close.assert_not_called()
+
+    def test_capacity_does_not_evict_leased_clients(self):
+        pool = KubeClientPool(capacity=1)
+        client_a = pool.get('A', MagicMock())
+        self.__get_and_release(pool, 'B')
+        self.assertIn('A', pool)
+        client_a.close.assert_not_called()
+
+    @patch('kubedriver.location.client_pool.time')
+    def test_get_evicts_idle_clients(self, mock_time):
+        mock_time.monotonic.return_value = 100
+        pool = KubeClientPool(idle_ttl_seconds=10)
+        client_a = self.__get_and_release(pool, 'A')
+        mock_time.monotonic.return_value = 111
+        pool.get('B', MagicMock())
+        self.assertNotIn('A', pool)
+        client_a.close.assert_called_once()
+
+    @patch('kubedriver.location.client_pool.time')
+    def test_idle_timeout_does_not_evict_leased_clients(self, mock_time):
+        mock_time.monotonic.return_value = 100
+        pool = KubeClientPool(idle_ttl_seconds=10)
+        client_a = pool.get('A', MagicMock())
+        mock_time.monotonic.return_value = 200
+        pool.evict_idle()
+        self.assertIn('A', pool)
+        # Idle from the time it was released
+        pool.release('A', client_a)
+        mock_time.monotonic.return_value = 205
+        pool.evict_idle()
+        self.assertIn('A', pool)
+        mock_time.monotonic.return_value = 211
+        pool.evict_idle()
+        self.assertNotIn('A', pool)
+        client_a.close.assert_called_once()
+
+    @patch('kubedriver.location.client_pool.time')
+    def test_get_refreshes_last_used(self, mock_time):
+        mock_time.monotonic.return_value = 100
+        pool = KubeClientPool(idle_ttl_seconds=10)
+        self.__get_and_release(pool, 'A')
+        mock_time.monotonic.return_value = 105
+        self.__get_and_release(pool, 'A')
+        mock_time.monotonic.return_value = 112
+        pool.evict_idle()
+        self.assertIn('A', pool)
+
+    def test_get_keeps_leased_clients_of_other_configs(self):
+        pool = KubeClientPool()
+        old_client = pool.get('old', MagicMock())
+        new_client = pool.get('new', MagicMock())
+        self.assertIn('old', pool)
+        self.assertIn('new', pool)
+        old_client.close.assert_not_called()
+        new_client.close.assert_not_called()
+
+    def test_configure_shrinks_pool(self):
+        pool = KubeClientPool(capacity=3)
+        client_a = self.__get_and_release(pool, 'A')
+        self.__get_and_release(pool, 'B')
+        self.__get_and_release(pool, 'C')
+        pool.configure(capacity=2)
+        self.assertEqual(len(pool), 2)
+        client_a.close.assert_called_once()
+
+    def test_clear_closes_all(self):
+        pool = KubeClientPool()
+        client_a = self.__get_and_release(pool, 'A')
+        client_b = self.__get_and_release(pool, 'B')
+        pool.clear()
+        self.assertEqual(len(pool), 0)
+        client_a.close.assert_called_once()
+        client_b.close.assert_called_once()
+
+    def test_clear_closes_leased_client_once_released(self):
+        pool = KubeClientPool()
+        client_a = pool.get('A', MagicMock())
+        pool.clear()
+        self.assertNotIn('A', pool)
+        client_a.close.assert_not_called()
+        # A new client pooled for the key is not released in its place
+        new_client_a = pool.get('A', MagicMock())
+        pool.release('A', client_a)
+        client_a.close.assert_called_once()
+        new_client_a.close.assert_not_called()
+        self.assertIn('A', pool)
+
+    def test_close_error_does_not_prevent_eviction(self):
+        pool = KubeClientPool(capacity=1)
+        builder = MagicMock()
+        builder.return_value.close.side_effect = ValueError('mock error')
+        self.__get_and_release(pool, 'A', builder)
+        self.__get_and_release(pool, 'B')
+        self.assertNotIn('A', pool)
@@ -1,7 +1,9 @@
 import unittest
 import os
-from unittest.mock import patch
-from kubedriver.location import KubeDeploymentLocation
+import copy
+from unittest.mock import patch, MagicMock
+from ignition.locations.exceptions import InvalidDeploymentLocationError
+from kubedriver.location import KubeDeploymentLocation, default_client_pool
 
 EXAMPLE_CONFIG = {
                     'apiVersion': 'v1',
@@ -21,6 +23,12 @@ EXAMPLE_CONFIG = {
 
 class TestKubeDeploymentLocation(unittest.TestCase):
 
+    def setUp(self):
+        default_client_pool.clear()
+
+    def tearDown(self):
+        default_client_pool.clear()
+
     def test_from_dict(self):
         dl_dict = {
             'name': 'TestKube',
@@ -43,6 +51,93 @@ class TestKubeDeploymentLocation(unittest.TestCase):
         self.assertEqual(location.name, 'TestKube')
         self.assertEqual(location.client_config, EXAMPLE_CONFIG)
 
+    def test_to_dict_leaves_out_unset_optional_properties(self):
+        location = KubeDeploymentLocation.from_dict({'name': 'TestKube', 'properties': {'clientConfig': EXAMPLE_CONFIG}})
+        properties = location.to_dict()['properties']
+        for prop_name in ['kegLayout', 'kegShardSize', 'persistenceBackend', 'rateLimit.qps', 'rateLimit.burst', 'rateLimit.maxInFlight', 'rateLimit.maxRetries']:
+            self.assertNotIn(prop_name, properties)
+        self.assertEqual(KubeDeploymentLocation.from_dict(location.to_dict()).to_dict(), location.to_dict())
+
+    def test_from_dict_rate_limit(self):
+        dl_dict = {
+            'name': 'TestKube',
+            'properties': {
+                'clientConfig': EXAMPLE_CONFIG,
+                'rateLimit.qps': '5',
+                'rateLimit.burst': 10,
+                'rateLimit.maxInFlight': '2'
+            }
+        }
+        location = KubeDeploymentLocation.from_dict(dl_dict)
+        self.assertEqual(location.rate_limit, {'qps': 5.0, 'burst': 10, 'max_in_flight': 2})
+        properties = location.to_dict()['properties']
+        self.assertEqual(properties['rateLimit.qps'], 5.0)
+        self.assertNotIn('rateLimit.maxRetries', properties)
+
+    def test_from_dict_rate_limit_not_a_number(self):
+        dl_dict = {
+            'name': 'TestKube',
+            'properties': {
+                'clientConfig': EXAMPLE_CONFIG,
+                'rateLimit.qps': 'fast'
+            }
+        }
+        with self.assertRaises(InvalidDeploymentLocationError) as context:
+            KubeDeploymentLocation.from_dict(dl_dict)
+        self.assertEqual(str(context.exception), 'Deployment location property \'rateLimit.qps\' must be a number but was: fast')
+
+    def test_from_dict_keg_layout(self):
+        dl_dict = {
+            'name': 'TestKube',
+            'properties': {
+                'clientConfig': EXAMPLE_CONFIG,
+                'kegLayout': 'sharded',
+                'kegShardSize': '50'
+            }
+        }
+        location = KubeDeploymentLocation.from_dict(dl_dict)
+        self.assertEqual(location.keg_layout, 'sharded')
+        self.assertEqual(location.keg_shard_size, 50)
+        properties = location.to_dict()['properties']
+        self.assertEqual(properties['kegLayout'], 'sharded')
+        self.assertEqual(properties['kegShardSize'], 50)
+
+    def test_from_dict_invalid_keg_layout(self):
+        dl_dict = {
+            'name': 'TestKube',
+            'properties': {
+                'clientConfig': EXAMPLE_CONFIG,
+                'kegLayout': 'split'
+            }
+        }
+        with self.assertRaises(InvalidDeploymentLocationError) as context:
+            KubeDeploymentLocation.from_dict(dl_dict)
+        self.assertEqual(str(context.exception), 'Deployment location property \'kegLayout\' must be one of [\'single\', \'sharded\'] but was: split')
+
+    def test_from_dict_persistence_backend(self):
+        dl_dict = {
+            'name': 'TestKube',
+            'properties': {
+                'clientConfig': EXAMPLE_CONFIG,
+                'persistenceBackend': 'customResource'
+            }
+        }
+        location = KubeDeploymentLocation.from_dict(dl_dict)
+        self.assertEqual(location.persistence_backend, 'customResource')
+        self.assertEqual(location.to_dict()['properties']['persistenceBackend'], 'customResource')
+
+    def test_from_dict_invalid_persistence_backend(self):
+        dl_dict = {
+            'name': 'TestKube',
+            'properties': {
+                'clientConfig': EXAMPLE_CONFIG,
+                'persistenceBackend': 'etcd'
+            }
+        }
+        with self.assertRaises(InvalidDeploymentLocationError) as context:
+            KubeDeploymentLocation.from_dict(dl_dict)
+        self.assertEqual(str(context.exception), 'Deployment location property \'persistenceBackend\' must be one of [\'configMap\', \'customResource\'] but was: etcd')
+
     @patch('kubedriver.location.deployment_location.kubeconfig')
     def test_client(self, mock_kube_config):
         location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)
@@ -57,3 +152,46 @@ class TestKubeDeploymentLocation(unittest.TestCase):
         self.assertFalse(os.path.exists(file_path))
         single_call_kwargs = single_call[1]
         self.assertEqual(single_call_kwargs, {'persist_config': False})
+
+    @patch('kubedriver.location.deployment_location.kubeconfig')
+    def test_client_reused_across_locations_with_same_config(self, mock_kube_config):
+        location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)
+        client = location.client
+        second_location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)
+        self.assertEqual(second_location.client, client)
+        self.assertEqual(len(mock_kube_config.new_client_from_config.call_args_list), 1)
+
+    @patch('kubedriver.location.deployment_location.kubeconfig')
+    def test_client_rebuilt_when_config_changes(self, mock_kube_config):
+        first_client = MagicMock()
+        second_client = MagicMock()
+        mock_kube_config.new_client_from_config.side_effect = [first_client, second_client]
+        location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)
+        self.assertEqual(location.client, first_client)
+        changed_config = copy.deepcopy(EXAMPLE_CONFIG)
+        changed_config['users'][0]['user'] = {'token': 'new-token'}
+        changed_location = KubeDeploymentLocation('TestKube', changed_config)
+        self.assertEqual(changed_location.client, second_client)
+        # Still in use by the first location
+        first_client.close.assert_not_called()
+
+    @patch('kubedriver.location.deployment_location.kubeconfig')
+    def test_clean_releases_client(self, mock_kube_config):
+        client = MagicMock()
+        mock_kube_config.new_client_from_config.return_value = client
+        location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)
+        location.client
+        default_client_pool.clear()
+        client.close.assert_not_called()
+        location.clean()
+        client.close.assert_called_once()
+
+    @patch('kubedriver.location.deployment_location.kubeconfig')
+    def test_client_released_when_location_garbage_collected(self, mock_kube_config):
+        client = MagicMock()
+        mock_kube_config.new_client_from_config.return_value = client
+        location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)
+        location.client
+        default_client_pool.clear()
+        del location
+        client.close.assert_called_once()
@@ -5,3 +5,9 @@ class TestImports(unittest.TestCase):
 
     def test_deployment_location(self):
         imported = location.KubeDeploymentLocation
+
+    def test_client_pool(self):
+        imported = location.KubeClientPool
+
+    def test_default_client_pool(self):
+        imported = location.default_client_pool
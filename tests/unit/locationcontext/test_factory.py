@@ -0,0 +1,212 @@
+import logging
+import unittest
+from unittest.mock import MagicMock
+from kubedriver.location import KubeDeploymentLocation
+from kubedriver.kubeclient import AsyncApiController, InformerManager
+from kubedriver.kegd.report_sweeper import ReportSweeper
+from kubedriver.kegd.report_cache import ReportStatusCache
+from kubedriver.locationcontext import LocationContextFactory, LocationContextRegistry, LocationContextProperties
+from kubedriver.wirelog import WireLogSettings
+
+EXAMPLE_CONFIG = {
+                    'apiVersion': 'v1',
+                    'clusters': [
+                        {'cluster': {'server': 'localhost'}, 'name': 'kubernetes'}
+                    ],
+                    'contexts': [
+                        {'context': {'cluster': 'kubernetes', 'user': 'kubernetes-admin'}, 'name': 'kubernetes-admin@kubernetes' }
+                    ],
+                    'current-context': 'kubernetes-admin@kubernetes',
+                    'kind': 'Config',
+                    'preferences': {},
+                    'users': [
+                        {'name': 'kubernetes-admin', 'user': {}}
+                    ]
+                }
+
+class TestLocationContextFactory(unittest.TestCase):
+
+    def setUp(self):
+        self.api_ctl_factory = MagicMock()
+        self.kegd_persister_factory = MagicMock()
+        self.keg_persister_factory = MagicMock()
+        self.factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory,
+                                                client_pool=MagicMock(), context_registry=LocationContextRegistry())
+
+    def test_build(self):
+        kube_location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)
+        context = self.factory.build(kube_location)
+        self.assertEqual(context.kube_location, kube_location)
+        self.assertEqual(context.api_ctl, self.api_ctl_factory.build.return_value)
+        self.api_ctl_factory.build.assert_called_once_with(kube_location)
+        self.kegd_persister_factory.build.assert_called_once_with(kube_location, self.api_ctl_factory.build.return_value)
+        self.keg_persister_factory.build.assert_called_once_with(kube_location, self.api_ctl_factory.build.return_value)
+
+    def test_session_reuses_context_for_same_location(self):
+        with self.factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+            first_context = context
+        with self.factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+            second_context = context
+        self.assertIs(first_context, second_context)
+        self.api_ctl_factory.build.assert_called_once()
+
+    def test_session_uses_copy_of_location(self):
+        kube_location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG, driver_namespace='driver')
+        with self.factory.session(kube_location) as context:
+            self.assertIsNot(context.kube_location, kube_location)
+            self.assertEqual(context.kube_location.to_dict(), kube_location.to_dict())
+
+    def test_session_different_context_for_different_location(self):
+        with self.factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+            first_context = context
+        with self.factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG, driver_namespace='other')) as context:
+            second_context = context
+        self.assertIsNot(first_context, second_context)
+        self.assertEqual(self.api_ctl_factory.build.call_count, 2)
+
+    def test_session_releases_on_error(self):
+        kube_location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)
+        with self.assertRaises(ValueError):
+            with self.factory.session(kube_location) as context:
+                raise ValueError('mock error')
+        entry = self.factory.context_registry.acquire(next(iter(self.factory.context_registry._entries)), MagicMock())
+        self.assertEqual(entry.references, 1)
+
+    def test_session_when_disabled_builds_new_context(self):
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory,
+                                                client_pool=MagicMock(), context_registry=LocationContextRegistry(capacity=0))
+        kube_location = KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)
+        with factory.session(kube_location) as context:
+            self.assertEqual(context.kube_location, kube_location)
+        with factory.session(kube_location) as context:
+            pass
+        self.assertEqual(self.api_ctl_factory.build.call_count, 2)
+
+    def test_session_when_disabled_closes_context(self):
+        kube_api_properties = MagicMock()
+        kube_api_properties.concurrency.max_concurrent_requests = 4
+        kube_api_properties.informers.enabled = False
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory, kube_api_properties=kube_api_properties,
+                                                client_pool=MagicMock(), context_registry=LocationContextRegistry(capacity=0))
+        with factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+            async_api_ctl = context.async_api_ctl
+            async_api_ctl.close = MagicMock(wraps=async_api_ctl.close)
+        async_api_ctl.close.assert_called_once()
+
+    def test_session_when_disabled_closes_context_on_error(self):
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory,
+                                                client_pool=MagicMock(), context_registry=LocationContextRegistry(capacity=0))
+        with self.assertRaises(ValueError):
+            with factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+                context.close = MagicMock()
+                raise ValueError('Mock error')
+        context.close.assert_called_once()
+
+    def test_build_with_concurrency_includes_async_api_ctl(self):
+        kube_api_properties = MagicMock()
+        kube_api_properties.concurrency.max_concurrent_requests = 4
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory,
+                                                kube_api_properties=kube_api_properties, client_pool=MagicMock())
+        context = factory.build(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG))
+        try:
+            self.assertIsInstance(context.async_api_ctl, AsyncApiController)
+            self.assertEqual(context.async_api_ctl.api_ctl, self.api_ctl_factory.build.return_value)
+            self.assertEqual(context.async_api_ctl.max_concurrency, 4)
+        finally:
+            context.close()
+
+    def test_build_without_concurrency(self):
+        context = self.factory.build(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG))
+        self.assertIsNone(context.async_api_ctl)
+
+    def test_build_with_informers_enabled(self):
+        kube_api_properties = MagicMock()
+        kube_api_properties.concurrency.max_concurrent_requests = 1
+        kube_api_properties.informers.enabled = True
+        kube_api_properties.informers.max_objects = 100
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory,
+                                                kube_api_properties=kube_api_properties, client_pool=MagicMock())
+        context = factory.build(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG))
+        try:
+            self.assertIsInstance(context.informers, InformerManager)
+            self.assertEqual(context.informers.api_ctl, self.api_ctl_factory.build.return_value)
+            self.assertEqual(context.informers.label_selector, 'app.kubernetes.io/managed-by=kubedriver.alm')
+            self.assertEqual(context.informers.store.max_objects, 100)
+        finally:
+            context.close()
+
+    def test_configures_wire_log_settings(self):
+        wire_log_properties = MagicMock(level='DEBUG', max_body_chars=100, sample_rate=0.5, redact_keys=['secret'], redact_secret_data=False)
+        wire_log_settings = WireLogSettings()
+        LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory, client_pool=MagicMock(),
+                                    wire_log_properties=wire_log_properties, wire_log_settings=wire_log_settings)
+        self.assertEqual(wire_log_settings.level, logging.DEBUG)
+        self.assertEqual(wire_log_settings.max_body_chars, 100)
+        self.assertEqual(wire_log_settings.sample_rate, 0.5)
+        self.assertEqual(wire_log_settings.redact_keys, frozenset(['secret']))
+        self.assertFalse(wire_log_settings.redact_secret_data)
+
+    def test_build_without_informers(self):
+        context = self.factory.build(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG))
+        self.assertIsNone(context.informers)
+
+    def test_session_starts_report_sweeper(self):
+        location_context_properties = LocationContextProperties()
+        location_context_properties.report_sweeper.enabled = True
+        location_context_properties.report_sweeper.interval_seconds = 60
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory, client_pool=MagicMock(),
+                                                location_context_properties=location_context_properties, context_registry=LocationContextRegistry())
+        with factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+            report_sweeper = context.report_sweeper
+        self.assertIsInstance(report_sweeper, ReportSweeper)
+        self.assertEqual(report_sweeper.kegd_persister, self.kegd_persister_factory.build.return_value)
+        self.assertEqual(report_sweeper.location_name, 'TestKube')
+        self.assertEqual(report_sweeper.interval_seconds, 60)
+        self.assertTrue(report_sweeper._thread.is_alive())
+        context.close()
+        report_sweeper._thread.join(timeout=5)
+        self.assertFalse(report_sweeper._thread.is_alive())
+
+    def test_session_without_report_sweeper_by_default(self):
+        location_context_properties = LocationContextProperties()
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory, client_pool=MagicMock(),
+                                                location_context_properties=location_context_properties, context_registry=LocationContextRegistry())
+        with factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+            self.assertIsNone(context.report_sweeper)
+
+    def test_build_without_report_sweeper(self):
+        context = self.factory.build(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG))
+        self.assertIsNone(context.report_sweeper)
+
+    def test_session_without_report_cache_by_default(self):
+        location_context_properties = LocationContextProperties()
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory, client_pool=MagicMock(),
+                                                location_context_properties=location_context_properties, context_registry=LocationContextRegistry())
+        with factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+            self.assertIsNone(context.report_cache)
+
+    def test_session_builds_report_cache(self):
+        location_context_properties = LocationContextProperties()
+        location_context_properties.report_sweeper.enabled = False
+        location_context_properties.report_cache.enabled = True
+        location_context_properties.report_cache.max_reports = 10
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory, client_pool=MagicMock(),
+                                                location_context_properties=location_context_properties, context_registry=LocationContextRegistry())
+        with factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+            self.assertIsInstance(context.report_cache, ReportStatusCache)
+            self.assertEqual(context.report_cache.kegd_persister, self.kegd_persister_factory.build.return_value)
+            self.assertEqual(context.report_cache.location_name, 'TestKube')
+            self.assertEqual(context.report_cache.max_reports, 10)
+
+    def test_session_without_report_cache_when_disabled(self):
+        location_context_properties = LocationContextProperties()
+        location_context_properties.report_sweeper.enabled = False
+        location_context_properties.report_cache.enabled = False
+        factory = LocationContextFactory(self.api_ctl_factory, self.kegd_persister_factory, self.keg_persister_factory, client_pool=MagicMock(),
+                                                location_context_properties=location_context_properties, context_registry=LocationContextRegistry())
+        with factory.session(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG)) as context:
+            self.assertIsNone(context.report_cache)
+
+    def test_build_without_report_cache(self):
+        context = self.factory.build(KubeDeploymentLocation('TestKube', EXAMPLE_CONFIG))
+        self.assertIsNone(context.report_cache)
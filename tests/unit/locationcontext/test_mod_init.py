@@ -8,3 +8,9 @@ class TestImports(unittest.TestCase):
 
     def test_context(self):
         imported = locationcontext.LocationContext
+
+    def test_location_context_registry(self):
+        imported = locationcontext.LocationContextRegistry
+
+    def test_location_context_properties(self):
+        imported = locationcontext.LocationContextProperties
@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from kubedriver.locationcontext.registry import LocationContextRegistry
+
+class TestLocationContextRegistry(unittest.TestCase):
+
+    def test_acquire_builds_once(self):
+        registry = LocationContextRegistry()
+        builder = MagicMock()
+        first = registry.acquire('key', builder)
+        registry.release(first)
+        second = registry.acquire('key', builder)
+        self.assertIs(first.context, second.context)
+        builder.assert_called_once()
+
+    def test_acquire_counts_references(self):
+        registry = LocationContextRegistry()
+        entry = registry.acquire('key', MagicMock())
+        registry.acquire('key', MagicMock())
+        self.assertEqual(entry.references, 2)
+        registry.release(entry)
+        self.assertEqual(entry.references, 1)
+
+    def test_evicts_least_recently_used_over_capacity(self):
+        registry = LocationContextRegistry(capacity=1)
+        entry_a = registry.acquire('A', MagicMock())
+        registry.release(entry_a)
+        entry_b = registry.acquire('B', MagicMock())
+        registry.release(entry_b)
+        self.assertNotIn('A', registry)
+        self.assertIn('B', registry)
+        entry_a.context.close.assert_called_once()
+
+    def test_does_not_clean_in_use_context_until_released(self):
+        registry = LocationContextRegistry(capacity=1)
+        entry_a = registry.acquire('A', MagicMock())
+        entry_b = registry.acquire('B', MagicMock())
+        # A is in use so can't be evicted yet
+        self.assertIn('A', registry)
+        registry.release(entry_b)
+        entry_c = registry.acquire('C', MagicMock())
+        self.assertNotIn('B', registry)
+        entry_b.context.close.assert_called_once()
+        registry.clear()
+        entry_a.context.close.assert_not_called()
+        registry.release(entry_a)
+        entry_a.context.close.assert_called_once()
+
+    @patch('kubedriver.locationcontext.registry.time')
+    def test_evict_idle(self, mock_time):
+        mock_time.monotonic.return_value = 100
+        registry = LocationContextRegistry(idle_ttl_seconds=10)
+        entry = registry.acquire('A', MagicMock())
+        registry.release(entry)
+        mock_time.monotonic.return_value = 105
+        registry.evict_idle()
+        self.assertIn('A', registry)
+        mock_time.monotonic.return_value = 116
+        registry.evict_idle()
+        self.assertNotIn('A', registry)
+        entry.context.close.assert_called_once()
+
+    def test_clean_error_is_not_raised(self):
+        registry = LocationContextRegistry(capacity=1)
+        builder = MagicMock()
+        builder.return_value.close.side_effect = ValueError('mock error')
+        entry = registry.acquire('A', builder)
+        registry.release(entry)
+        registry.release(registry.acquire('B', MagicMock()))
+        self.assertNotIn('A', registry)
+
+    def test_enabled(self):
+        self.assertTrue(LocationContextRegistry(capacity=1).enabled)
+        self.assertFalse(LocationContextRegistry(capacity=0).enabled)
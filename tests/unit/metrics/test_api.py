@@ -0,0 +1,20 @@
+import unittest
+from unittest.mock import MagicMock
+from kubedriver.metrics import MetricsApiService, MetricsRegistry, TEXT_CONTENT_TYPE
+
+class TestMetricsApiService(unittest.TestCase):
+
+    def test_metrics(self):
+        registry = MetricsRegistry()
+        registry.counter('requests_total', 'Requests').inc()
+        service = MetricsApiService(metrics_registry=registry)
+        body, status, headers = service.metrics()
+        self.assertEqual(status, 200)
+        self.assertEqual(headers, {'Content-Type': TEXT_CONTENT_TYPE})
+        self.assertIn('requests_total 1', body)
+
+    def test_metrics_disabled(self):
+        registry = MetricsRegistry()
+        service = MetricsApiService(metrics_properties=MagicMock(enabled=False), metrics_registry=registry)
+        body, status, headers = service.metrics()
+        self.assertEqual(status, 404)
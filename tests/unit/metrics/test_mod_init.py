@@ -0,0 +1,25 @@
+import unittest
+import kubedriver.metrics as metrics
+
+class TestImports(unittest.TestCase):
+
+    def test_metrics_registry(self):
+        imported = metrics.MetricsRegistry
+
+    def test_default_metrics_registry(self):
+        imported = metrics.default_metrics_registry
+
+    def test_histogram(self):
+        imported = metrics.Histogram
+
+    def test_counter(self):
+        imported = metrics.Counter
+
+    def test_metrics_api_service(self):
+        imported = metrics.MetricsApiService
+
+    def test_metrics_properties(self):
+        imported = metrics.MetricsProperties
+
+    def test_metrics_api_spec(self):
+        imported = metrics.metrics_api_spec
@@ -0,0 +1,84 @@
+import unittest
+from kubedriver.metrics import MetricsRegistry, Counter
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        counter = self.registry.counter('requests_total', 'Requests', label_names=['verb'])
+        counter.inc(verb='get')
+        counter.inc(2, verb='get')
+        counter.inc(verb='list')
+        self.assertEqual(counter.get(verb='get'), 3)
+        self.assertEqual(self.registry.render(), '\n'.join([
+            '# HELP requests_total Requests',
+            '# TYPE requests_total counter',
+            'requests_total{verb="get"} 3',
+            'requests_total{verb="list"} 1'
+        ]) + '\n')
+
+    def test_histogram(self):
+        histogram = self.registry.histogram('request_seconds', 'Request time', label_names=['verb'], buckets=(0.1, 1.0))
+        histogram.observe(0.05, verb='get')
+        histogram.observe(0.5, verb='get')
+        histogram.observe(5, verb='get')
+        self.assertEqual(self.registry.render(), '\n'.join([
+            '# HELP request_seconds Request time',
+            '# TYPE request_seconds histogram',
+            'request_seconds_bucket{verb="get",le="0.1"} 1',
+            'request_seconds_bucket{verb="get",le="1"} 2',
+            'request_seconds_bucket{verb="get",le="+Inf"} 3',
+            'request_seconds_sum{verb="get"} 5.55',
+            'request_seconds_count{verb="get"} 3'
+        ]) + '\n')
+
+    def test_histogram_time_observes_on_error(self):
+        histogram = self.registry.histogram('request_seconds', 'Request time', label_names=['verb'])
+        with self.assertRaises(ValueError):
+            with histogram.time(verb='get'):
+                raise ValueError('failed')
+        self.assertEqual(histogram.get(verb='get').count, 1)
+
+    def test_get_existing_metric(self):
+        first = self.registry.histogram('request_seconds', 'Request time')
+        self.assertIs(self.registry.histogram('request_seconds', 'Request time'), first)
+
+    def test_get_existing_metric_of_other_type_fails(self):
+        self.registry.histogram('request_seconds', 'Request time')
+        with self.assertRaises(ValueError):
+            self.registry.counter('request_seconds', 'Request time')
+
+    def test_wrong_labels_fails(self):
+        counter = self.registry.counter('requests_total', 'Requests', label_names=['verb'])
+        with self.assertRaises(ValueError):
+            counter.inc(kind='Pod')
+
+    def test_escapes_label_values(self):
+        counter = self.registry.counter('requests_total', 'Requests', label_names=['location'])
+        counter.inc(location='a "quoted"\\name\n')
+        self.assertIn('requests_total{location="a \\"quoted\\"\\\\name\\n"} 1', self.registry.render())
+
+    def test_disabled_records_nothing(self):
+        counter = self.registry.counter('requests_total', 'Requests')
+        self.registry.configure(enabled=False)
+        counter.inc()
+        self.assertEqual(counter.get(), 0)
+
+    def test_collectors_included_in_render(self):
+        def collect():
+            counter = Counter('cache_hits_total', 'Cache hits')
+            counter.set_total(7)
+            return [counter]
+        self.registry.add_collector('cache', collect)
+        self.assertIn('cache_hits_total 7', self.registry.render())
+        self.registry.remove_collector('cache')
+        self.assertEqual(self.registry.render(), '')
+
+    def test_reset(self):
+        counter = self.registry.counter('requests_total', 'Requests')
+        counter.inc()
+        self.registry.reset()
+        self.assertEqual(counter.get(), 0)
+        self.assertIs(self.registry.get('requests_total'), counter)
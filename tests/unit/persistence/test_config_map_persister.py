@@ -0,0 +1,201 @@
+import unittest
+from unittest.mock import MagicMock
+from kubernetes.client.rest import ApiException
+from openshift.dynamic.exceptions import ConflictError, NotFoundError
+from kubedriver.persistence import ConfigMapPersister, RecordNotFoundError, PersistenceError, RecordConflictError
+
+def config_map(resource_version, labels=None, record='{}'):
+    return MagicMock(metadata=MagicMock(resourceVersion=resource_version, labels=labels, uid='123'), data={'record': record})
+
+def api_error(error_class, status):
+    return error_class(ApiException(status=status, reason='Error'))
+
+class TestConfigMapPersister(unittest.TestCase):
+
+    def setUp(self):
+        self.api_ctl = MagicMock()
+        self.record_builder = MagicMock()
+        self.record_builder.to_record_fields.side_effect = lambda data: ({'record': f'record-{data}'}, None)
+        self.persister = ConfigMapPersister('Keg', self.api_ctl, 'driver', self.record_builder)
+
+    def __updated_config(self, call_idx=-1):
+        return self.api_ctl.update_object.call_args_list[call_idx][0][0]
+
+    def test_update_without_known_version_reads_first(self):
+        self.api_ctl.read_object.return_value = config_map('1', labels={'app': 'test'})
+        self.api_ctl.update_object.return_value = config_map('2')
+        self.persister.update('keg-a', 'data')
+        self.api_ctl.read_object.assert_called_once()
+        updated = self.__updated_config()
+        self.assertEqual(updated.metadata['resourceVersion'], '1')
+        self.assertEqual(updated.metadata['labels'], {'app': 'test'})
+
+    def test_update_after_get_uses_known_version(self):
+        self.api_ctl.read_object.return_value = config_map('1', labels={'app': 'test'})
+        self.api_ctl.update_object.return_value = config_map('2')
+        self.persister.get('keg-a')
+        self.persister.update('keg-a', 'data')
+        self.api_ctl.read_object.assert_called_once()
+        self.assertEqual(self.__updated_config().metadata['resourceVersion'], '1')
+
+    def test_update_after_create_uses_created_version(self):
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.api_ctl.update_object.return_value = config_map('6')
+        self.persister.create('keg-a', 'data', labels={'app': 'test'})
+        self.persister.update('keg-a', 'data')
+        self.api_ctl.read_object.assert_not_called()
+        updated = self.__updated_config()
+        self.assertEqual(updated.metadata['resourceVersion'], '5')
+        self.assertEqual(updated.metadata['labels'], {'app': 'test'})
+
+    def test_consecutive_updates_use_previous_update_version(self):
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.api_ctl.update_object.side_effect = [config_map('6'), config_map('7')]
+        self.persister.create('keg-a', 'data')
+        self.persister.update('keg-a', 'data')
+        self.persister.update('keg-a', 'more data')
+        self.api_ctl.read_object.assert_not_called()
+        self.assertEqual(self.__updated_config(0).metadata['resourceVersion'], '5')
+        self.assertEqual(self.__updated_config(1).metadata['resourceVersion'], '6')
+
+    def test_update_refetches_on_conflict(self):
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.api_ctl.read_object.return_value = config_map('9', labels={'changed': 'yes'})
+        self.api_ctl.update_object.side_effect = [api_error(ConflictError, 409), config_map('10')]
+        self.persister.create('keg-a', 'data')
+        self.persister.update('keg-a', 'data')
+        self.api_ctl.read_object.assert_called_once()
+        self.assertEqual(self.__updated_config(0).metadata['resourceVersion'], '5')
+        retried = self.__updated_config(1)
+        self.assertEqual(retried.metadata['resourceVersion'], '9')
+        self.assertEqual(retried.metadata['labels'], {'changed': 'yes'})
+
+    def test_update_does_not_overwrite_concurrent_write(self):
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.api_ctl.read_object.return_value = config_map('9', record='{"written": "elsewhere"}')
+        self.api_ctl.update_object.side_effect = api_error(ConflictError, 409)
+        self.persister.create('keg-a', 'data')
+        with self.assertLogs('kubedriver.persistence.config_map_persister', level='WARNING') as logs:
+            with self.assertRaises(RecordConflictError):
+                self.persister.update('keg-a', 'data')
+        self.assertIn('since version 5 (now version 9)', logs.output[0])
+        # The concurrent write is left in place
+        self.assertEqual(self.api_ctl.update_object.call_count, 1)
+        # The caller can read the record again, then update from that version
+        self.api_ctl.update_object.side_effect = None
+        self.api_ctl.update_object.return_value = config_map('10')
+        self.persister.get('keg-a')
+        self.persister.update('keg-a', 'merged data')
+        self.assertEqual(self.__updated_config().metadata['resourceVersion'], '9')
+
+    def test_update_fails_on_second_conflict(self):
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.api_ctl.read_object.return_value = config_map('9')
+        self.api_ctl.update_object.side_effect = api_error(ConflictError, 409)
+        self.persister.create('keg-a', 'data')
+        with self.assertRaises(PersistenceError):
+            self.persister.update('keg-a', 'data')
+        self.assertEqual(self.api_ctl.update_object.call_count, 2)
+        # Version forgotten, so the next update reads first
+        self.api_ctl.update_object.side_effect = None
+        self.api_ctl.update_object.return_value = config_map('10')
+        self.persister.update('keg-a', 'data')
+        self.assertEqual(self.api_ctl.read_object.call_count, 2)
+
+    def test_update_not_found(self):
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.api_ctl.update_object.side_effect = api_error(NotFoundError, 404)
+        self.persister.create('keg-a', 'data')
+        with self.assertRaises(RecordNotFoundError):
+            self.persister.update('keg-a', 'data')
+        self.api_ctl.read_object.assert_not_called()
+
+    def test_delete_forgets_version(self):
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.api_ctl.read_object.return_value = config_map('1')
+        self.api_ctl.update_object.return_value = config_map('2')
+        self.persister.create('keg-a', 'data')
+        self.persister.delete('keg-a')
+        self.persister.update('keg-a', 'data')
+        self.api_ctl.read_object.assert_called_once()
+
+    def test_known_versions_capacity(self):
+        persister = ConfigMapPersister('Keg', self.api_ctl, 'driver', self.record_builder, known_versions_capacity=1)
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.api_ctl.read_object.return_value = config_map('1')
+        self.api_ctl.update_object.return_value = config_map('2')
+        persister.create('keg-a', 'data')
+        persister.create('keg-b', 'data')
+        persister.update('keg-a', 'data')
+        self.api_ctl.read_object.assert_called_once()
+
+    def test_create_with_binary_data(self):
+        self.record_builder.to_record_fields.side_effect = lambda data: ({'recordFormat': 'json+gzip'}, {'record': 'abc'})
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.persister.create('keg-a', 'data')
+        created = self.api_ctl.create_object.call_args[0][0]
+        self.assertEqual(created.data['data'], {'recordFormat': 'json+gzip'})
+        self.assertEqual(created.data['binaryData'], {'record': 'abc'})
+
+    def test_create_with_binary_data_on_kind_without_binary_data(self):
+        persister = ConfigMapPersister('Keg', self.api_ctl, 'driver', self.record_builder, cm_kind='Record', cm_data_field='spec')
+        self.record_builder.to_record_fields.side_effect = lambda data: ({'recordFormat': 'json+gzip'}, {'record': 'abc'})
+        self.api_ctl.create_object.return_value = config_map('5')
+        persister.create('keg-a', 'data')
+        created = self.api_ctl.create_object.call_args[0][0]
+        self.assertEqual(created.data['spec'], {'recordFormat': 'json+gzip', 'record': 'abc'})
+        self.assertNotIn('binaryData', created.data)
+
+    def test_get_reads_data_and_binary_data(self):
+        record_cm = config_map('1')
+        record_cm.binaryData = {'record': 'abc'}
+        self.api_ctl.read_object.return_value = record_cm
+        result = self.persister.get('keg-a')
+        self.assertEqual(result, self.record_builder.from_record_fields.return_value)
+        self.record_builder.from_record_fields.assert_called_once_with({'record': '{}'}, binary_data={'record': 'abc'})
+
+    def test_update_with_labels_adds_to_existing_labels(self):
+        self.api_ctl.read_object.return_value = config_map('1', labels={'app': 'test', 'state': 'Pending'})
+        self.api_ctl.update_object.return_value = config_map('2')
+        self.persister.update('keg-a', 'data', labels={'state': 'Complete'})
+        self.assertEqual(self.__updated_config().metadata['labels'], {'app': 'test', 'state': 'Complete'})
+
+    def test_find_page(self):
+        self.api_ctl.list_objects.return_value = {
+            'metadata': {'continue': 'next'},
+            'items': [{'metadata': {'name': 'keg-a', 'labels': {'app': 'test'}}, 'data': {'record': 'a'}}]
+        }
+        page = self.persister.find_page(label_selector='app=test', limit=1)
+        self.api_ctl.list_objects.assert_called_once_with('v1', 'ConfigMap', namespace='driver', label_selector='app=test', limit=1,
+                                                            continue_token=None, driver_request_id=None)
+        self.assertEqual(page.names, ['keg-a'])
+        self.assertEqual(page.labels, {'keg-a': {'app': 'test'}})
+        self.assertEqual(page.continue_token, 'next')
+        self.assertEqual(page.get_record('keg-a'), self.record_builder.from_record_fields.return_value)
+        self.record_builder.from_record_fields.assert_called_once_with({'record': 'a'}, binary_data=None)
+
+    def test_delete_collection_forgets_versions(self):
+        self.api_ctl.create_object.return_value = config_map('5')
+        self.persister.create('keg-a', 'data')
+        self.api_ctl.delete_collection.return_value = {'items': [{'metadata': {'name': 'keg-a'}}]}
+        self.assertEqual(self.persister.delete_collection(label_selector='app=test'), 1)
+        self.api_ctl.delete_collection.assert_called_once_with('v1', 'ConfigMap', namespace='driver', label_selector='app=test',
+                                                                field_selector=None, driver_request_id=None)
+        self.api_ctl.read_object.return_value = config_map('1')
+        self.api_ctl.update_object.return_value = config_map('2')
+        self.persister.update('keg-a', 'data')
+        self.api_ctl.read_object.assert_called_once()
+
+    def test_watch(self):
+        self.api_ctl.watch_objects.return_value = iter([
+            {'type': 'MODIFIED', 'raw_object': {'metadata': {'name': 'keg-a', 'resourceVersion': '3', 'labels': {'app': 'test'}}, 'data': {'record': 'a'}}}
+        ])
+        events = list(self.persister.watch(label_selector='app=test', resource_version='2', timeout_seconds=30))
+        self.api_ctl.watch_objects.assert_called_once_with('v1', 'ConfigMap', namespace='driver', label_selector='app=test', resource_version='2', timeout_seconds=30)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].event_type, 'MODIFIED')
+        self.assertEqual(events[0].name, 'keg-a')
+        self.assertEqual(events[0].resource_version, '3')
+        self.assertEqual(events[0].labels, {'app': 'test'})
+        self.assertEqual(events[0].record, self.record_builder.from_record_fields.return_value)
+        self.record_builder.from_record_fields.assert_called_once_with({'record': 'a'}, binary_data=None)
@@ -0,0 +1,182 @@
+import unittest
+import functools
+from unittest.mock import MagicMock
+from kubernetes.client.rest import ApiException
+from openshift.dynamic.exceptions import ConflictError
+from openshift.dynamic import DynamicClient
+from kubedriver.kubeclient import OpenshiftApiController, CachingDiscoverer
+from kubedriver.keg import KegPersistenceFactory
+from kubedriver.keg.model import V1alpha1KegStatus, V1alpha1KegCompositionStatus, V1alpha1ObjectStatus
+from kubedriver.kegd import KegdReportPersistenceFactory
+from kubedriver.kegd.model import V1alpha1KegdStrategyReportStatus
+from kubedriver.persistence import (CustomResourcePersister, ConfigMapPersister, PersistenceProperties, build_merge_patch,
+                                        RecordNotFoundError, RecordAlreadyExistsError, PersistenceError)
+from kubedriver.persistence.custom_resource_persister import MAX_CONFLICT_RETRIES
+from tests.utils import FakeKubeApiServer, FakeKind
+
+def build_keg_status(num_objects=3):
+    objects = [V1alpha1ObjectStatus(group='v1', kind='ConfigMap', namespace='default', name=f'cm-{idx}', state='Created') for idx in range(num_objects)]
+    return V1alpha1KegStatus(uid='123', composition=V1alpha1KegCompositionStatus(objects=objects, helm_releases=[]))
+
+def build_location(persistence_backend='customResource'):
+    kube_location = MagicMock(driver_namespace='driver', persistence_backend=persistence_backend, keg_layout=None, keg_shard_size=None)
+    kube_location.get_cm_persister_args.return_value = {}
+    return kube_location
+
+class TestBuildMergePatch(unittest.TestCase):
+
+    def test_changed_and_removed_keys(self):
+        previous = {'phase': 'Running', 'errors': ['a'], 'delta': {'deployed': 1, 'removed': 2}, 'uid': '1'}
+        current = {'phase': 'Complete', 'errors': ['a'], 'delta': {'deployed': 1}, 'state': 'Done'}
+        self.assertEqual(build_merge_patch(previous, current), {'phase': 'Complete', 'delta': {'removed': None}, 'uid': None, 'state': 'Done'})
+
+    def test_lists_replaced_whole(self):
+        self.assertEqual(build_merge_patch({'errors': ['a']}, {'errors': ['a', 'b']}), {'errors': ['a', 'b']})
+
+    def test_no_changes(self):
+        self.assertEqual(build_merge_patch({'phase': 'Running'}, {'phase': 'Running'}), {})
+
+class TestCustomResourcePersister(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeKubeApiServer(kinds=[FakeKind('Keg', 'kegs'), FakeKind('KegdStrategyReport', 'kegdstrategyreports', status_subresource=False)]).start()
+        self.addCleanup(self.server.stop)
+        dynamic_client = DynamicClient(self.server.build_api_client(), discoverer=functools.partial(CachingDiscoverer, persist=False))
+        self.api_ctl = OpenshiftApiController(dynamic_client.client, default_namespace='driver', dynamic_client=dynamic_client)
+
+    def __keg_persister(self):
+        return KegPersistenceFactory(persistence_properties=PersistenceProperties()).build(build_location(), self.api_ctl)
+
+    def __report_persister(self):
+        return KegdReportPersistenceFactory(persistence_properties=PersistenceProperties()).build(build_location(), self.api_ctl)
+
+    def test_create_and_get(self):
+        persister = self.__keg_persister()
+        persister.create('keg', build_keg_status(), labels={'keg.kubedriver.alm/keg': 'keg'})
+        stored = self.server.objects[('kegs', 'driver', 'keg')]
+        self.assertEqual(stored['apiVersion'], 'keg.ibm/v1alpha1')
+        self.assertEqual(stored['kind'], 'Keg')
+        self.assertEqual(stored['metadata']['labels'], {'keg.kubedriver.alm/keg': 'keg'})
+        self.assertEqual(self.__keg_persister().get('keg'), build_keg_status())
+
+    def test_create_writes_status_dropped_by_server(self):
+        self.__keg_persister().create('keg', build_keg_status())
+        post, patch = self.server.requests_of('POST')[0], self.server.requests_of('PATCH')[0]
+        self.assertEqual(post[1], '/apis/keg.ibm/v1alpha1/namespaces/driver/kegs')
+        self.assertEqual(patch[1], '/apis/keg.ibm/v1alpha1/namespaces/driver/kegs/keg/status')
+
+    def test_create_already_exists(self):
+        self.__keg_persister().create('keg', build_keg_status())
+        with self.assertRaises(RecordAlreadyExistsError):
+            self.__keg_persister().create('keg', build_keg_status())
+
+    def test_update_patches_changed_status_fields(self):
+        persister = self.__keg_persister()
+        persister.create('keg', build_keg_status())
+        self.server.clear_requests()
+        keg_status = build_keg_status()
+        keg_status.composition.objects[1].state = 'Deleted'
+        persister.update('keg', keg_status)
+        self.assertEqual(len(self.server.requests), 1)
+        method, path, content_type, body = self.server.requests[0]
+        self.assertEqual((method, path, content_type), ('PATCH', '/apis/keg.ibm/v1alpha1/namespaces/driver/kegs/keg/status', 'application/merge-patch+json'))
+        self.assertEqual(list(body['status'].keys()), ['composition'])
+        self.assertEqual(self.__keg_persister().get('keg'), keg_status)
+
+    def test_update_without_changes_sends_nothing(self):
+        persister = self.__keg_persister()
+        persister.create('keg', build_keg_status())
+        self.server.clear_requests()
+        persister.update('keg', build_keg_status())
+        self.assertEqual(self.server.requests, [])
+
+    def test_update_reads_status_not_seen(self):
+        self.__keg_persister().create('keg', build_keg_status())
+        self.server.clear_requests()
+        self.__keg_persister().update('keg', V1alpha1KegStatus(uid='123'))
+        self.assertEqual([request[0] for request in self.server.requests], ['GET', 'PATCH'])
+        self.assertEqual(self.server.requests[1][3], {'status': {'composition': None}, 'metadata': {'resourceVersion': '2'}})
+        self.assertEqual(self.__keg_persister().get('keg'), V1alpha1KegStatus(uid='123'))
+
+    def test_update_not_found(self):
+        with self.assertRaises(RecordNotFoundError):
+            self.__keg_persister().update('keg', build_keg_status())
+
+    def test_update_without_status_subresource_patches_object(self):
+        persister = self.__report_persister()
+        persister.create('report', V1alpha1KegdStrategyReportStatus(uid='123', keg_name='keg', phase='Running'))
+        self.assertEqual(self.server.requests_of('PATCH'), [])
+        persister.update('report', V1alpha1KegdStrategyReportStatus(uid='123', keg_name='keg', phase='Complete'))
+        method, path, content_type, body = self.server.requests_of('PATCH')[0]
+        self.assertEqual(path, '/apis/keg.ibm/v1alpha1/namespaces/driver/kegdstrategyreports/report')
+        self.assertEqual(body, {'status': {'phase': 'Complete'}, 'metadata': {'resourceVersion': '1'}})
+        self.assertEqual(self.__report_persister().get('report').phase, 'Complete')
+
+    def test_update_after_concurrent_write_patches_from_current_status(self):
+        persister = self.__keg_persister()
+        persister.create('keg', build_keg_status())
+        # Written elsewhere, so the status known to the persister is out of date
+        self.__keg_persister().update('keg', V1alpha1KegStatus(uid='456'))
+        self.server.clear_requests()
+        keg_status = build_keg_status()
+        keg_status.composition.objects[1].state = 'Deleted'
+        persister.update('keg', keg_status)
+        self.assertEqual([request[0] for request in self.server.requests], ['PATCH', 'GET', 'PATCH'])
+        # A patch from the out of date status would not have restored the uid
+        self.assertEqual(self.server.requests[2][3]['status']['uid'], '123')
+        self.assertEqual(self.__keg_persister().get('keg'), keg_status)
+
+    def test_update_conflict_retries_limited(self):
+        api_ctl = MagicMock()
+        api_ctl.read_object.return_value = {'metadata': {'resourceVersion': '1'}, 'status': {'uid': '123'}}
+        api_ctl.patch_object.side_effect = ConflictError(ApiException(status=409, reason='Conflict'))
+        persister = CustomResourcePersister('Keg', api_ctl, 'driver', MagicMock(to_dict=MagicMock(return_value={'uid': '456'})))
+        with self.assertRaises(PersistenceError):
+            persister.update('keg', V1alpha1KegStatus(uid='456'))
+        self.assertEqual(api_ctl.patch_object.call_count, MAX_CONFLICT_RETRIES)
+        self.assertEqual(api_ctl.read_object.call_count, MAX_CONFLICT_RETRIES)
+
+    def test_find_by_label_selector(self):
+        persister = self.__report_persister()
+        persister.list_page_size = 2
+        for idx in range(5):
+            persister.create(f'report-{idx}', V1alpha1KegdStrategyReportStatus(uid=f'{idx}', keg_name='keg'), labels={'keg.kubedriver.alm/keg': 'keg' if idx % 2 == 0 else 'other'})
+        records = persister.find(label_selector='keg.kubedriver.alm/keg=keg')
+        self.assertEqual(sorted(records.keys()), ['report-0', 'report-2', 'report-4'])
+        self.assertEqual(records['report-2'].uid, '2')
+        self.assertEqual(len(persister.find()), 5)
+
+    def test_get_record_uid_and_reference(self):
+        persister = self.__keg_persister()
+        persister.create('keg', build_keg_status())
+        uid = persister.get_record_uid('keg')
+        self.assertEqual(uid, self.server.objects[('kegs', 'driver', 'keg')]['metadata']['uid'])
+        self.assertEqual(persister.build_record_reference(uid, 'keg'), {'apiVersion': 'keg.ibm/v1alpha1', 'kind': 'Keg', 'metadata': {'name': 'keg', 'namespace': 'driver', 'uid': uid}})
+
+    def test_delete(self):
+        persister = self.__keg_persister()
+        persister.create('keg', build_keg_status())
+        persister.delete('keg')
+        self.assertEqual(self.server.objects, {})
+        with self.assertRaises(RecordNotFoundError):
+            persister.delete('keg')
+
+class TestPersistenceBackendSelection(unittest.TestCase):
+
+    def test_backend_from_location(self):
+        properties = PersistenceProperties()
+        self.assertIsInstance(KegPersistenceFactory(persistence_properties=properties).build(build_location(), MagicMock()), CustomResourcePersister)
+        self.assertIsInstance(KegdReportPersistenceFactory(persistence_properties=properties).build(build_location(), MagicMock()), CustomResourcePersister)
+
+    def test_backend_from_properties(self):
+        properties = PersistenceProperties()
+        properties.backend = 'customResource'
+        properties.custom_resource_api_version = 'example.com/v1'
+        persister = KegdReportPersistenceFactory(persistence_properties=properties).build(build_location(persistence_backend=None), MagicMock())
+        self.assertIsInstance(persister, CustomResourcePersister)
+        self.assertEqual(persister.cr_api_version, 'example.com/v1')
+        self.assertEqual(persister.cr_kind, 'KegdStrategyReport')
+
+    def test_default_backend(self):
+        persister = KegdReportPersistenceFactory().build(build_location(persistence_backend=None), MagicMock())
+        self.assertIsInstance(persister, ConfigMapPersister)
@@ -0,0 +1,173 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import json
+import yaml
+import gzip
+import base64
+import kubernetes.client.models
+from kubernetes.client import ApiClient
+from kubedriver.keg import KegPersistenceFactory
+from kubedriver.keg.model import V1alpha1KegStatus, V1alpha1KegCompositionStatus, V1alpha1ObjectStatus, V1alpha1HelmReleaseStatus
+from kubedriver.keg.persistence import data_types
+from kubedriver.persistence import ModelCodec, ModelCodecGenerator, RecordCodec, RecordFormats, CmRecordBuilder, InvalidRecordError
+
+def build_keg_status(num_objects=2):
+    objects = []
+    for idx in range(num_objects):
+        objects.append(V1alpha1ObjectStatus(group='v1', kind='ConfigMap', namespace='default', name=f'cm-{idx}', uid=f'uid-{idx}',
+                                                state='Created', tags={'deployOn': ['Create'], 'removeOn': ['Delete']}))
+    helm_releases = [V1alpha1HelmReleaseStatus(name='release', namespace='default', state='Created', tags={'deployOn': ['Create']})]
+    return V1alpha1KegStatus(uid='123', composition=V1alpha1KegCompositionStatus(objects=objects, helm_releases=helm_releases))
+
+class TestModelCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.api_client = ApiClient()
+        self.codec = ModelCodec(V1alpha1KegStatus, data_types)
+
+    def test_to_dict_matches_client_sanitize(self):
+        keg_status = build_keg_status()
+        self.assertEqual(self.codec.to_dict(keg_status), self.api_client.sanitize_for_serialization(keg_status))
+
+    def test_to_dict_omits_none_values(self):
+        keg_status = V1alpha1KegStatus(uid='123')
+        self.assertEqual(self.codec.to_dict(keg_status), {'uid': '123'})
+
+    def test_round_trip(self):
+        keg_status = build_keg_status()
+        self.assertEqual(self.codec.from_dict(self.codec.to_dict(keg_status)), keg_status)
+
+    def test_from_dict_uses_attribute_map(self):
+        keg_status = self.codec.from_dict({'uid': '123', 'composition': {'helmReleases': [{'name': 'release'}]}})
+        self.assertEqual(keg_status.composition.helm_releases[0].name, 'release')
+        self.assertIsNone(keg_status.composition.objects)
+
+    def test_from_dict_none(self):
+        self.assertIsNone(self.codec.from_dict(None))
+
+    def test_to_dict_sanitizes_values_not_matching_declared_type(self):
+        keg_status = V1alpha1KegStatus(uid='123', composition={'objects': (V1alpha1ObjectStatus(name='a'),)})
+        self.assertEqual(self.codec.to_dict(keg_status), {'uid': '123', 'composition': {'objects': [{'name': 'a'}]}})
+
+    def test_from_dict_converts_primitives(self):
+        keg_status = self.codec.from_dict({'uid': 123, 'composition': {'objects': [{'name': 'a', 'tags': {'deployOn': ['Create', 1]}}]}})
+        self.assertEqual(keg_status.uid, '123')
+        self.assertEqual(keg_status.composition.objects[0].tags, {'deployOn': ['Create', '1']})
+
+    def test_codec_shared_for_same_types(self):
+        other_codec = ModelCodec(V1alpha1KegStatus, data_types)
+        self.assertIs(other_codec.encoders, self.codec.encoders)
+        self.assertIs(other_codec.decoders, self.codec.decoders)
+
+    def test_generates_function_per_model(self):
+        self.assertEqual(set(self.codec.encoders.keys()), {V1alpha1KegStatus, V1alpha1KegCompositionStatus, V1alpha1ObjectStatus, V1alpha1HelmReleaseStatus})
+        self.assertIn('def decode_V1alpha1ObjectStatus(data):', self.codec.source)
+
+    def test_generate_fails_on_missing_model(self):
+        with self.assertRaises(ValueError) as context:
+            ModelCodecGenerator(V1alpha1KegStatus, {}).generate()
+        self.assertEqual(str(context.exception), 'Cannot generate codec for V1alpha1KegStatus, no model provided for type: V1alpha1KegCompositionStatus')
+
+class TestRecordCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.model_codec = ModelCodec(V1alpha1KegStatus, data_types)
+
+    def test_encode_json(self):
+        codec = RecordCodec(self.model_codec)
+        data, binary_data = codec.encode(build_keg_status())
+        self.assertIsNone(binary_data)
+        self.assertEqual(data['recordFormat'], 'json')
+        self.assertEqual(json.loads(data['record'])['uid'], '123')
+
+    def test_encode_yaml_has_no_format(self):
+        codec = RecordCodec(self.model_codec, record_format=RecordFormats.YAML)
+        data, binary_data = codec.encode(build_keg_status())
+        self.assertIsNone(binary_data)
+        self.assertEqual(list(data.keys()), ['record'])
+        self.assertEqual(yaml.safe_load(data['record'])['uid'], '123')
+
+    def test_encode_compressed(self):
+        codec = RecordCodec(self.model_codec, compress=True, compress_min_bytes=0)
+        data, binary_data = codec.encode(build_keg_status(num_objects=50))
+        self.assertEqual(data, {'recordFormat': 'json+gzip'})
+        uncompressed = gzip.decompress(base64.b64decode(binary_data['record'])).decode('utf-8')
+        self.assertEqual(json.loads(uncompressed)['uid'], '123')
+        self.assertTrue(len(binary_data['record']) < len(uncompressed))
+
+    def test_encode_compressed_is_deterministic(self):
+        codec = RecordCodec(self.model_codec, compress=True, compress_min_bytes=0)
+        self.assertEqual(codec.encode(build_keg_status()), codec.encode(build_keg_status()))
+
+    def test_encode_does_not_compress_small_records(self):
+        codec = RecordCodec(self.model_codec, compress=True, compress_min_bytes=100000)
+        data, binary_data = codec.encode(build_keg_status())
+        self.assertIsNone(binary_data)
+        self.assertEqual(data['recordFormat'], 'json')
+
+    def test_decode_each_format(self):
+        keg_status = build_keg_status()
+        reader = RecordCodec(self.model_codec)
+        for writer in [RecordCodec(self.model_codec), RecordCodec(self.model_codec, record_format=RecordFormats.YAML),
+                        RecordCodec(self.model_codec, compress=True, compress_min_bytes=0)]:
+            data, binary_data = writer.encode(keg_status)
+            self.assertEqual(reader.decode(data, binary_data=binary_data), keg_status)
+
+    def test_decode_compressed_from_data(self):
+        codec = RecordCodec(self.model_codec, compress=True, compress_min_bytes=0)
+        data, binary_data = codec.encode(build_keg_status())
+        data.update(binary_data)
+        self.assertEqual(codec.decode(data), build_keg_status())
+
+    def test_decode_legacy_yaml_record(self):
+        legacy_record = yaml.safe_dump(ApiClient().sanitize_for_serialization(build_keg_status()))
+        codec = RecordCodec(self.model_codec)
+        self.assertEqual(codec.decode({'record': legacy_record}), build_keg_status())
+
+    def test_decode_unsupported_format(self):
+        codec = RecordCodec(self.model_codec)
+        with self.assertRaises(InvalidRecordError) as context:
+            codec.decode({'record': '{}', 'recordFormat': 'xml'})
+        self.assertEqual(str(context.exception), 'Cannot read record, unsupported format: xml')
+
+    def test_decode_invalid_compressed_data(self):
+        codec = RecordCodec(self.model_codec)
+        with self.assertRaises(InvalidRecordError):
+            codec.decode({'recordFormat': 'json+gzip'}, binary_data={'record': 'bm90IGd6aXA='})
+
+    def test_invalid_record_format(self):
+        with self.assertRaises(ValueError):
+            RecordCodec(self.model_codec, record_format='xml')
+
+class TestCmRecordBuilder(unittest.TestCase):
+
+    def test_to_record_and_from_record(self):
+        builder = CmRecordBuilder(ApiClient(), V1alpha1KegStatus, data_types)
+        record = builder.to_record(build_keg_status())
+        self.assertEqual(json.loads(record)['uid'], '123')
+        self.assertEqual(builder.from_record(record), build_keg_status())
+
+    def test_from_record_matches_client_deserialize(self):
+        api_client = ApiClient()
+        legacy_record = yaml.safe_dump(api_client.sanitize_for_serialization(build_keg_status()))
+        builder = CmRecordBuilder(api_client, V1alpha1KegStatus, data_types)
+        # The client only finds models registered on its models module
+        with patch.multiple(kubernetes.client.models, create=True, **data_types):
+            expected = api_client._ApiClient__deserialize(yaml.safe_load(legacy_record), V1alpha1KegStatus)
+        self.assertEqual(builder.from_record(legacy_record), expected)
+
+    def test_does_not_register_models_on_kubernetes_client(self):
+        CmRecordBuilder(ApiClient(), V1alpha1KegStatus, data_types)
+        self.assertFalse(hasattr(kubernetes.client.models, 'V1alpha1KegStatus'))
+
+class TestPersistenceFactoryRecordFormat(unittest.TestCase):
+
+    def test_build_applies_persistence_properties(self):
+        properties = MagicMock(record_format='yaml', compress_records=True, compress_min_bytes=10, keg_layout=None, keg_shard_size=None, keg_shard_cache_capacity=10)
+        kube_location = MagicMock(driver_namespace='driver', keg_layout=None, keg_shard_size=None)
+        kube_location.get_cm_persister_args.return_value = {}
+        persister = KegPersistenceFactory(persistence_properties=properties).build(kube_location, MagicMock())
+        codec = persister.keg_record_builder.codec
+        self.assertEqual(codec.record_format, 'yaml')
+        self.assertTrue(codec.compress)
+        self.assertEqual(codec.compress_min_bytes, 10)
@@ -0,0 +1,119 @@
+import json
+import logging
+import unittest
+from subprocess import CompletedProcess
+from unittest.mock import MagicMock, patch
+from kubedriver.wirelog import WireLogger, WireLogSettings
+
+class TestWireLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = MagicMock()
+        self.logger.isEnabledFor.return_value = True
+        self.settings = WireLogSettings(max_body_chars=0)
+        self.wire_logger = WireLogger(self.logger, settings=self.settings)
+
+    def _log(self, body, protocol_metadata=None, external_request_id='123'):
+        self.wire_logger.log(body, 'received', external_request_id, 'application/json', 'response', 'http', protocol_metadata or {}, 'driver123')
+
+    def test_body_not_serialized_when_disabled(self):
+        self.logger.isEnabledFor.return_value = False
+        obj = MagicMock()
+        self._log(obj.to_dict)
+        obj.to_dict.assert_not_called()
+        self.logger.log.assert_not_called()
+        self.logger.isEnabledFor.assert_called_once_with(logging.INFO)
+
+    def test_lazy_body(self):
+        obj = MagicMock()
+        obj.to_dict.return_value = {'kind': 'ConfigMap'}
+        self._log(lambda: obj.to_dict())
+        obj.to_dict.assert_called_once()
+        self.logger.log.assert_called_once_with(logging.INFO, '{"kind": "ConfigMap"}')
+
+    def test_dict_body_as_json(self):
+        body = {'metadata': {'name': 'test', 'labels': {'a': 'b'}}, 'list': [1, True, None, 'x'], 'value': 1.5}
+        self.assertEqual(json.loads(self.wire_logger.serialize(body)), body)
+
+    def test_text_body(self):
+        self.assertEqual(self.wire_logger.serialize('helm install test'), 'helm install test')
+        self.assertEqual(self.wire_logger.serialize(b'{"message": "not found"}'), '{"message": "not found"}')
+        self.assertEqual(self.wire_logger.serialize(None), '')
+
+    def test_completed_process_body(self):
+        process = CompletedProcess(args=[], returncode=0, stdout=b'output', stderr=b'error')
+        self.assertEqual(self.wire_logger.serialize(process), 'stdout=output,stderr=error')
+        process = CompletedProcess(args=[], returncode=0, stdout=None, stderr=b'error')
+        self.assertEqual(self.wire_logger.serialize(process), 'stderr=error')
+
+    def test_object_with_to_dict(self):
+        obj = MagicMock()
+        obj.to_dict.return_value = {'kind': 'Status'}
+        self.assertEqual(self.wire_logger.serialize({'body': obj}), '{"body": {"kind": "Status"}}')
+
+    def test_redacts_keys(self):
+        body = {'spec': {'Password': 'secret123', 'user': 'admin', 'nested': [{'token': 'abc'}]}}
+        serialized = json.loads(self.wire_logger.serialize(body))
+        self.assertEqual(serialized['spec']['Password'], '******')
+        self.assertEqual(serialized['spec']['user'], 'admin')
+        self.assertEqual(serialized['spec']['nested'][0]['token'], '******')
+
+    def test_redacts_secret_data(self):
+        body = {'kind': 'Secret', 'metadata': {'name': 'test'}, 'data': {'key': 'dmFsdWU='}, 'stringData': {'key': 'value'}}
+        serialized = json.loads(self.wire_logger.serialize(body))
+        self.assertEqual(serialized['data'], '******')
+        self.assertEqual(serialized['stringData'], '******')
+        self.assertEqual(serialized['metadata'], {'name': 'test'})
+        config_map = {'kind': 'ConfigMap', 'data': {'key': 'value'}}
+        self.assertEqual(json.loads(self.wire_logger.serialize(config_map)), config_map)
+
+    def test_secret_data_not_redacted_when_disabled(self):
+        self.settings.configure(redact_secret_data=False)
+        body = {'kind': 'Secret', 'data': {'key': 'dmFsdWU='}}
+        self.assertEqual(json.loads(self.wire_logger.serialize(body)), body)
+
+    def test_truncates_body(self):
+        self.settings.configure(max_body_chars=20)
+        serialized = self.wire_logger.serialize({'data': {'key': 'x' * 1000}})
+        self.assertEqual(serialized, '{"data": {"key": "xx... [truncated at 20 characters]')
+        serialized = self.wire_logger.serialize(b'y' * 1000)
+        self.assertEqual(serialized, 'y' * 20 + '... [truncated at 20 characters]')
+
+    def test_stops_serializing_at_limit(self):
+        self.settings.configure(max_body_chars=10)
+        later_item = MagicMock()
+        self.wire_logger.serialize({'a': 'x' * 100, 'b': later_item})
+        later_item.to_dict.assert_not_called()
+
+    def test_removes_sensitive_headers(self):
+        protocol_metadata = {'status_code': 401, 'headers': {'Authorization': 'Bearer abc', 'Set-Cookie': 'abc', 'Content-Type': 'application/json'}}
+        self.assertEqual(json.loads(self.wire_logger.serialize_metadata(protocol_metadata)), {'status_code': 401, 'headers': {'Content-Type': 'application/json'}})
+        # Original not modified
+        self.assertIn('Authorization', protocol_metadata['headers'])
+
+    def test_sets_and_clears_logging_context(self):
+        with patch('kubedriver.wirelog.logger.logging_context') as mock_logging_context:
+            mock_logging_context.data = {}
+            self._log('body', protocol_metadata={'uri': 'http://localhost'})
+            context_dict = mock_logging_context.set_from_dict.call_args[0][0]
+            self.assertEqual(context_dict['message_direction'], 'received')
+            self.assertEqual(context_dict['tracectx.externalrequestid'], '123')
+            self.assertEqual(context_dict['tracectx.driverrequestid'], 'driver123')
+            self.assertEqual(context_dict['protocol_metadata'], '{"uri": "http://localhost"}')
+
+    def test_sampling(self):
+        self.settings.configure(sample_rate=0.0)
+        self.assertFalse(self.wire_logger.is_enabled('123'))
+        self.settings.configure(sample_rate=1.0)
+        self.assertTrue(self.wire_logger.is_enabled('123'))
+        self.settings.configure(sample_rate=0.5)
+        sampled = [self.wire_logger.is_enabled(str(i)) for i in range(1000)]
+        self.assertTrue(200 < sampled.count(True) < 800)
+        # Same decision for the request and response of an exchange
+        self.assertEqual(sampled, [self.wire_logger.is_enabled(str(i)) for i in range(1000)])
+
+    def test_level(self):
+        self.settings.configure(level='debug')
+        self._log('body')
+        self.logger.isEnabledFor.assert_called_with(logging.DEBUG)
+        self.logger.log.assert_called_once_with(logging.DEBUG, 'body')
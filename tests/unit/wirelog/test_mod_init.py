@@ -0,0 +1,16 @@
+import unittest
+import kubedriver.wirelog as wirelog
+
+class TestImports(unittest.TestCase):
+
+    def test_wire_logger(self):
+        imported = wirelog.WireLogger
+
+    def test_wire_log_settings(self):
+        imported = wirelog.WireLogSettings
+
+    def test_default_wire_log_settings(self):
+        imported = wirelog.default_wire_log_settings
+
+    def test_wire_log_properties(self):
+        imported = wirelog.WireLogProperties
@@ -5,6 +5,7 @@
 from . import controlled_job_queue_mock
 from . import copy_args_mock
 from . import mem_persistence_mock
+from .fake_kube_api_server import FakeKubeApiServer, FakeKind
 from .kube_http_response_sub import KubeHttpResponse
 from .mocked_error import MockedError
 from .example_kube_config import example_kube_config
\ No newline at end of file
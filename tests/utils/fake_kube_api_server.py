@@ -0,0 +1,260 @@
+import re
+import json
+import copy
+import uuid
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from kubernetes import client
+
+RESOURCE_PATH_PATTERN = re.compile(r'^/apis/(?P<group>[^/]+)/(?P<version>[^/]+)/namespaces/(?P<namespace>[^/]+)/(?P<plural>[^/]+)(/(?P<name>[^/]+))?(/(?P<subresource>[^/]+))?$')
+
+# Splits a selector on the commas not within the values of an in/notin requirement
+SELECTOR_REQUIREMENT_PATTERN = re.compile(r'(?:[^,(]|\([^)]*\))+')
+SET_REQUIREMENT_PATTERN = re.compile(r'^(?P<key>\S+)\s+(?P<operator>in|notin)\s+\((?P<values>[^)]*)\)$')
+
+class FakeKind:
+
+    def __init__(self, kind, plural, status_subresource=True):
+        self.kind = kind
+        self.plural = plural
+        self.status_subresource = status_subresource
+
+class FakeKubeApiServer:
+    """
+    A local HTTP server answering the Kubernetes API requests made by the driver for namespaced custom resources in one group/version:
+    discovery, create, get, list (with label selectors and paging), merge patch (of the object or its status subresource, conditional on any resourceVersion given), delete and deletecollection.
+
+    Every request is recorded in `requests` as (method, path, content type, body)
+    """
+
+    def __init__(self, group='keg.ibm', version='v1alpha1', kinds=None):
+        self.group = group
+        self.version = version
+        self.kinds = {fake_kind.plural: fake_kind for fake_kind in (kinds if kinds is not None else [])}
+        self.objects = {}
+        self.requests = []
+        self.resource_version = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def host(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def start(self):
+        fake = self
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                fake._handle(self, 'GET')
+
+            def do_POST(self):
+                fake._handle(self, 'POST')
+
+            def do_PATCH(self):
+                fake._handle(self, 'PATCH')
+
+            def do_DELETE(self):
+                fake._handle(self, 'DELETE')
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def build_api_client(self):
+        configuration = client.Configuration()
+        configuration.host = self.host
+        return client.ApiClient(configuration)
+
+    def requests_of(self, method):
+        return [request for request in self.requests if request[0] == method]
+
+    def clear_requests(self):
+        self.requests = []
+
+    def _handle(self, handler, method):
+        url = urlparse(handler.path)
+        query = parse_qs(url.query)
+        length = int(handler.headers.get('Content-Length') or 0)
+        raw_body = handler.rfile.read(length) if length > 0 else b''
+        body = json.loads(raw_body) if len(raw_body) > 0 else None
+        content_type = handler.headers.get('Content-Type')
+        with self._lock:
+            self.requests.append((method, url.path, content_type, body))
+            status, response = self._route(method, url.path, query, content_type, body)
+        payload = json.dumps(response).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _route(self, method, path, query, content_type, body):
+        if path == '/version':
+            return 200, {'major': '1', 'minor': '20', 'gitVersion': 'v1.20.0'}
+        if path == '/api':
+            return 200, {'kind': 'APIVersions', 'versions': ['v1']}
+        if path == '/api/v1':
+            return 200, {'kind': 'APIResourceList', 'groupVersion': 'v1', 'resources': []}
+        if path == '/apis':
+            group_version = {'groupVersion': f'{self.group}/{self.version}', 'version': self.version}
+            return 200, {'kind': 'APIGroupList', 'groups': [{'name': self.group, 'versions': [group_version], 'preferredVersion': group_version}]}
+        if path == f'/apis/{self.group}/{self.version}':
+            return 200, self._resource_list()
+        match = RESOURCE_PATH_PATTERN.match(path)
+        if match is None or match.group('plural') not in self.kinds:
+            return self._status(404, 'NotFound', f'the server could not find the requested resource ({path})')
+        fake_kind = self.kinds[match.group('plural')]
+        namespace = match.group('namespace')
+        name = match.group('name')
+        subresource = match.group('subresource')
+        if subresource is not None and (subresource != 'status' or not fake_kind.status_subresource):
+            return self._status(404, 'NotFound', f'the server could not find the requested resource ({path})')
+        if name is None:
+            if method == 'POST':
+                return self._create(fake_kind, namespace, body)
+            if method == 'GET':
+                return self._list(fake_kind, namespace, query)
+            if method == 'DELETE':
+                return self._delete_collection(fake_kind, namespace, query)
+        else:
+            if method == 'GET':
+                return self._get(fake_kind, namespace, name)
+            if method == 'PATCH':
+                return self._patch(fake_kind, namespace, name, subresource, content_type, body)
+            if method == 'DELETE':
+                return self._delete(fake_kind, namespace, name)
+        return self._status(405, 'MethodNotAllowed', f'{method} is not supported on {path}')
+
+    def _resource_list(self):
+        resources = []
+        for fake_kind in self.kinds.values():
+            resources.append({'name': fake_kind.plural, 'singularName': fake_kind.kind.lower(), 'namespaced': True, 'kind': fake_kind.kind,
+                                'verbs': ['create', 'delete', 'deletecollection', 'get', 'list', 'patch', 'update', 'watch']})
+            if fake_kind.status_subresource:
+                resources.append({'name': f'{fake_kind.plural}/status', 'singularName': '', 'namespaced': True, 'kind': fake_kind.kind,
+                                    'verbs': ['get', 'patch', 'update']})
+        return {'kind': 'APIResourceList', 'groupVersion': f'{self.group}/{self.version}', 'resources': resources}
+
+    def _status(self, code, reason, message):
+        return code, {'kind': 'Status', 'apiVersion': 'v1', 'status': 'Failure', 'message': message, 'reason': reason, 'code': code}
+
+    def _next_version(self):
+        self.resource_version += 1
+        return str(self.resource_version)
+
+    def _create(self, fake_kind, namespace, body):
+        name = body.get('metadata', {}).get('name')
+        key = (fake_kind.plural, namespace, name)
+        if key in self.objects:
+            return self._status(409, 'AlreadyExists', f'{fake_kind.plural}.{self.group} "{name}" already exists')
+        obj = copy.deepcopy(body)
+        obj['metadata']['namespace'] = namespace
+        obj['metadata']['uid'] = str(uuid.uuid4())
+        obj['metadata']['resourceVersion'] = self._next_version()
+        if fake_kind.status_subresource:
+            obj.pop('status', None)
+        self.objects[key] = obj
+        return 201, obj
+
+    def _get(self, fake_kind, namespace, name):
+        obj = self.objects.get((fake_kind.plural, namespace, name))
+        if obj is None:
+            return self._status(404, 'NotFound', f'{fake_kind.plural}.{self.group} "{name}" not found')
+        return 200, obj
+
+    def _list(self, fake_kind, namespace, query):
+        selector = query.get('labelSelector', [None])[0]
+        # As with the API server, a continue token resumes the list after the name of the last object returned
+        after = query.get('continue', [None])[0]
+        items = [obj for (plural, obj_namespace, name), obj in sorted(self.objects.items()) if plural == fake_kind.plural and obj_namespace == namespace
+                    and (after is None or name > after) and self._matches(obj, selector)]
+        limit = int(query.get('limit', ['0'])[0])
+        end = limit if limit > 0 else len(items)
+        metadata = {'resourceVersion': str(self.resource_version)}
+        if end < len(items):
+            metadata['continue'] = items[end - 1]['metadata']['name']
+        return 200, {'kind': f'{fake_kind.kind}List', 'apiVersion': f'{self.group}/{self.version}', 'metadata': metadata, 'items': items[:end]}
+
+    def _matches(self, obj, selector):
+        if selector is None or selector == '':
+            return True
+        labels = obj.get('metadata', {}).get('labels') or {}
+        for requirement in SELECTOR_REQUIREMENT_PATTERN.findall(selector):
+            requirement = requirement.strip()
+            set_match = SET_REQUIREMENT_PATTERN.match(requirement)
+            if set_match is not None:
+                values = [value.strip() for value in set_match.group('values').split(',')]
+                key = set_match.group('key')
+                if set_match.group('operator') == 'in' and labels.get(key) not in values:
+                    return False
+                if set_match.group('operator') == 'notin' and key in labels and labels.get(key) in values:
+                    return False
+            elif requirement.startswith('!'):
+                if requirement[1:] in labels:
+                    return False
+            elif '!=' in requirement:
+                key, value = requirement.split('!=', 1)
+                if labels.get(key.strip()) == value.strip():
+                    return False
+            elif '=' in requirement:
+                key, value = requirement.split('=', 1)
+                if labels.get(key.strip()) != value.strip():
+                    return False
+            elif requirement not in labels:
+                return False
+        return True
+
+    def _delete_collection(self, fake_kind, namespace, query):
+        selector = query.get('labelSelector', [None])[0]
+        deleted = [key for key, obj in sorted(self.objects.items()) if key[0] == fake_kind.plural and key[1] == namespace and self._matches(obj, selector)]
+        items = [self.objects.pop(key) for key in deleted]
+        return 200, {'kind': f'{fake_kind.kind}List', 'apiVersion': f'{self.group}/{self.version}', 'metadata': {}, 'items': items}
+
+    def _patch(self, fake_kind, namespace, name, subresource, content_type, body):
+        if content_type != 'application/merge-patch+json':
+            return self._status(415, 'UnsupportedMediaType', f'Unsupported patch type: {content_type}')
+        obj = self.objects.get((fake_kind.plural, namespace, name))
+        if obj is None:
+            return self._status(404, 'NotFound', f'{fake_kind.plural}.{self.group} "{name}" not found')
+        expected_version = (body.get('metadata') or {}).get('resourceVersion')
+        if expected_version is not None and expected_version != obj['metadata'].get('resourceVersion'):
+            return self._status(409, 'Conflict', f'Operation cannot be fulfilled on {fake_kind.plural}.{self.group} "{name}": the object has been modified')
+        if subresource == 'status':
+            # Only the status may be changed through the subresource
+            body = {'status': body.get('status')} if 'status' in body else {}
+        elif fake_kind.status_subresource:
+            body = {key: value for key, value in body.items() if key != 'status'}
+        patched = merge_patch(obj, body)
+        patched['metadata']['resourceVersion'] = self._next_version()
+        self.objects[(fake_kind.plural, namespace, name)] = patched
+        return 200, patched
+
+    def _delete(self, fake_kind, namespace, name):
+        obj = self.objects.pop((fake_kind.plural, namespace, name), None)
+        if obj is None:
+            return self._status(404, 'NotFound', f'{fake_kind.plural}.{self.group} "{name}" not found')
+        return 200, {'kind': 'Status', 'apiVersion': 'v1', 'status': 'Success', 'details': {'name': name, 'kind': fake_kind.plural}}
+
+def merge_patch(target, patch):
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
@@ -51,7 +51,7 @@ class MemoryPersistenceWorker():
             raise RecordNotFoundError('Mock persistence has not been configured with record_name: {0}'.format(record_name))
         self.store.pop(uid)
 
-    def update(self, record_name, record_data, driver_request_id=None):
+    def update(self, record_name, record_data, labels=None, driver_request_id=None):
         if record_name not in self.store:
             raise RecordNotFoundError('Mock persistence has not been configured with record_name: {0}'.format(record_name))
         self.store[record_name] = copy.deepcopy(record_data)